@@ -249,6 +249,8 @@ class VerifyOTPSerializer(serializers.Serializer):
         user.is_online = True
         user.last_seen_at = timezone.now()
         user.save(update_fields=["is_active", "last_login", "is_online", "last_seen_at"])
+        from games.leaderboard import update_user_on_commit
+        update_user_on_commit(user)
         return {"user": user}
 
 
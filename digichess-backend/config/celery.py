@@ -1,8 +1,27 @@
 import os
+import threading
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_engine_registry(**kwargs):
+    """
+    Find and validate Stockfish when a worker process starts, not on its first bot move.
+
+    The registry is per process, so each pool child warms its own. Discovery
+    launches (and may compile) Stockfish, which can outlast Celery's
+    worker_proc_alive_timeout, so it runs on a background thread; a task that
+    needs the engine meanwhile waits for that discovery instead of starting another.
+    """
+    if os.getenv("DISABLE_STARTUP_ENGINE_CHECK", "").lower() in {"1", "true", "yes", "y"}:
+        return
+    from games.engine_registry import engine_registry
+
+    threading.Thread(target=engine_registry.warm, name="engine-warmup", daemon=True).start()
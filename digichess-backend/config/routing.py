@@ -3,10 +3,12 @@ from django.urls import path
 from games import consumers as game_consumers
 from games import consumers_user
 from games import consumers_quiz
+from games import consumers_analysis
 
 websocket_urlpatterns = [
     path("ws/game/<int:game_id>/", game_consumers.GameConsumer.as_asgi()),
     path("ws/spectate/<int:game_id>/", game_consumers.SpectateConsumer.as_asgi()),
     path("ws/user/<int:user_id>/", consumers_user.UserConsumer.as_asgi()),
     path("ws/quiz/round/<int:round_id>/", consumers_quiz.DigiQuizRoundConsumer.as_asgi()),
+    path("ws/analysis/<int:game_id>/", consumers_analysis.AnalysisConsumer.as_asgi()),
 ]
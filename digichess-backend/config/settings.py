@@ -137,6 +137,20 @@ def _env_bool(name: str, default: bool) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
 AUTH_REFRESH_COOKIE_SECURE = _env_bool("AUTH_REFRESH_COOKIE_SECURE", not DEBUG)
 AUTH_REFRESH_COOKIE_SAMESITE = os.getenv("AUTH_REFRESH_COOKIE_SAMESITE", "Lax")
 AUTH_REFRESH_COOKIE_PATH = os.getenv("AUTH_REFRESH_COOKIE_PATH", "/api/accounts/")
@@ -152,8 +166,16 @@ DIGIQUIZ_ALLOW_PREOFFICIAL = os.getenv("DIGIQUIZ_ALLOW_PREOFFICIAL", "True").low
 
 # Lichess API Configuration
 LICHESS_API_TOKEN = os.getenv("LICHESS_API_TOKEN", "")
+# Point at tests/fake_lichess_server.py to run analysis offline (see games.lichess_client).
+LICHESS_API_BASE = os.getenv("LICHESS_API_BASE", "https://lichess.org/api")
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Shared client pool and circuit breaker (utils.redis_client).
+REDIS_MAX_CONNECTIONS = _env_int("REDIS_MAX_CONNECTIONS", 50)
+REDIS_SOCKET_TIMEOUT = _env_float("REDIS_SOCKET_TIMEOUT", 2.0)
+REDIS_CONNECT_TIMEOUT = _env_float("REDIS_CONNECT_TIMEOUT", 1.0)
+REDIS_HEALTH_CHECK_INTERVAL = _env_int("REDIS_HEALTH_CHECK_INTERVAL", 30)
+REDIS_BREAKER_COOLDOWN = _env_float("REDIS_BREAKER_COOLDOWN", 5.0)
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -166,14 +188,98 @@ CHANNEL_LAYERS = {
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
 CELERY_TASK_DEFAULT_QUEUE = os.getenv("CELERY_TASK_DEFAULT_QUEUE", "scm_default")
+BOT_MOVE_QUEUE = os.getenv("BOT_MOVE_QUEUE", "scm_bots")
+# Seconds between replies when both sides are bots (games.bot_moves).
+BOT_VS_BOT_DELAY = max(0.0, _env_float("BOT_VS_BOT_DELAY", 0.1))
+ANALYSIS_QUEUE = os.getenv("ANALYSIS_QUEUE", "scm_analysis")
+# Analysis jobs (games.analysis_jobs): a queued/running job older than this is assumed
+# lost and may be requeued; refinement continues while someone polled within the watch window.
+ANALYSIS_JOB_STALE_SECONDS = _env_float("ANALYSIS_JOB_STALE_SECONDS", 900.0)
+ANALYSIS_WATCH_SECONDS = _env_int("ANALYSIS_WATCH_SECONDS", 30)
+CELERY_TASK_ROUTES = {
+    # Bot replies get their own queue so engine think time never delays clock/timeout tasks.
+    "games.tasks.make_bot_move_async": {"queue": BOT_MOVE_QUEUE},
+    # Full-game analyses run for minutes; only engine workers consume this queue
+    # (run them with --prefetch-multiplier=1 so message priority is honoured).
+    "games.tasks.run_analysis_job": {"queue": ANALYSIS_QUEUE},
+}
+# Priorities 0-9 on the Redis broker, lower first (see games.analysis_jobs).
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
 
+# Full-game analysis (games.analysis_service); 0 workers means one per CPU.
+ANALYSIS_WORKERS = _env_int("ANALYSIS_WORKERS", 0)
+ANALYSIS_CHUNK_PLIES = _env_int("ANALYSIS_CHUNK_PLIES", 8)
+# Depths of the quick passes a progressive analysis makes first, e.g. "6,10".
+ANALYSIS_SWEEP_DEPTHS = [
+    int(part) for part in os.getenv("ANALYSIS_SWEEP_DEPTHS", "6").split(",") if part.strip().isdigit()
+]
 
-def _env_float(name: str, default: float) -> float:
-    try:
-        return float(os.getenv(name, str(default)))
-    except (TypeError, ValueError):
-        return default
 
+# Shared cache: per-process LRU in front of Redis (REDIS_URL), see utils.tiered_cache.
+CACHES = {
+    "default": {
+        "BACKEND": "utils.tiered_cache.TieredCache",
+        "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "cache"),
+        "VERSION": int(_env_float("CACHE_VERSION", 1)),
+        "TIMEOUT": int(_env_float("CACHE_DEFAULT_TIMEOUT", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(_env_float("CACHE_L1_MAX_ENTRIES", 1000)),
+            "L1_TIMEOUT": _env_float("CACHE_L1_TIMEOUT", 5.0),
+            "LOCK_TIMEOUT": _env_float("CACHE_LOCK_TIMEOUT", 10.0),
+            "EARLY_RECOMPUTE_BETA": _env_float("CACHE_EARLY_RECOMPUTE_BETA", 1.0),
+        },
+    }
+}
+
+# Stockfish engine pool and binary registry (games.engine_pool, games.engine_registry).
+ENGINE_POOL_MAX_IDLE = _env_int("ENGINE_POOL_MAX_IDLE", 2)
+ENGINE_POOL_MAX_PER_KEY = _env_int("ENGINE_POOL_MAX_PER_KEY", 4)
+ENGINE_POOL_ACQUIRE_TIMEOUT = _env_float("ENGINE_POOL_ACQUIRE_TIMEOUT", 30.0)
+ENGINE_POOL_HEALTH_CHECK_IDLE = _env_float("ENGINE_POOL_HEALTH_CHECK_IDLE", 30.0)
+ENGINE_REGISTRY_TTL = _env_float("ENGINE_REGISTRY_TTL", 3600.0)
+ENGINE_REGISTRY_RETRY = _env_float("ENGINE_REGISTRY_RETRY", 30.0)
+
+# Position evaluation, legal-move and live board caches (games.eval_cache, games.legal_moves,
+# games.board_cache).
+EVAL_CACHE_TTL = _env_int("EVAL_CACHE_TTL", 7 * 24 * 3600)
+EVAL_CACHE_FLUSH_SIZE = _env_int("EVAL_CACHE_FLUSH_SIZE", 200)
+LEGAL_MOVES_CACHE_SIZE = _env_int("LEGAL_MOVES_CACHE_SIZE", 4096)
+LEGAL_MOVES_REDIS_TTL = _env_int("LEGAL_MOVES_REDIS_TTL", 6 * 3600)
+BOARD_CACHE_SIZE = _env_int("BOARD_CACHE_SIZE", 2048)
+
+# Live games: WebSocket move executor, Redis game state, event long-poll/SSE.
+WS_MOVE_WORKERS = _env_int("WS_MOVE_WORKERS", 8)
+WS_MOVE_MAX_PENDING = _env_int("WS_MOVE_MAX_PENDING", 256)
+GAME_LIVE_STATE = _env_bool("GAME_LIVE_STATE", True)
+GAME_LIVE_TTL = _env_int("GAME_LIVE_TTL", 6 * 3600)
+EVENTS_LONGPOLL_MAX = _env_float("EVENTS_LONGPOLL_MAX", 25.0)
+EVENTS_SSE_MAX_SECONDS = _env_float("EVENTS_SSE_MAX_SECONDS", 300.0)
+EVENTS_SSE_KEEPALIVE = _env_float("EVENTS_SSE_KEEPALIVE", 15.0)
+EVENTS_HUB_BLOCK_MS = _env_int("EVENTS_HUB_BLOCK_MS", 1000)
+
+# Ratings (games.glicko2, games.rating_settlement).
+GLICKO2_TAU = _env_float("GLICKO2_TAU", 0.5)
+GLICKO2_MIN_RD = _env_float("GLICKO2_MIN_RD", 45.0)
+GLICKO2_MAX_RD = _env_float("GLICKO2_MAX_RD", 350.0)
+RATING_SETTLE_WINDOW = _env_float("RATING_SETTLE_WINDOW", 0.5)
+RATING_SETTLE_BATCH = _env_int("RATING_SETTLE_BATCH", 500)
+RATING_SETTLE_GRACE = _env_float("RATING_SETTLE_GRACE", 60.0)
+RATING_PERIOD_HOURS = _env_float("RATING_PERIOD_HOURS", 24.0)
+RATING_RECOMPUTE_NIGHTLY = _env_bool("RATING_RECOMPUTE_NIGHTLY", False)
+
+# Lichess client (games.lichess_client); a pool size of 0 means one connection per concurrent request.
+LICHESS_MAX_CONCURRENCY = _env_int("LICHESS_MAX_CONCURRENCY", 4)
+LICHESS_MAX_WAIT_SECONDS = _env_float("LICHESS_MAX_WAIT_SECONDS", 5.0)
+LICHESS_RETRY_AFTER_SECONDS = _env_float("LICHESS_RETRY_AFTER_SECONDS", 60.0)
+LICHESS_RATE_PER_SECOND = _env_float("LICHESS_RATE_PER_SECOND", 8.0)
+LICHESS_BURST = _env_int("LICHESS_BURST", 8)
+LICHESS_BREAKER_FAILURES = _env_int("LICHESS_BREAKER_FAILURES", 5)
+LICHESS_BREAKER_RESET_SECONDS = _env_float("LICHESS_BREAKER_RESET_SECONDS", 30.0)
+LICHESS_POOL_SIZE = _env_int("LICHESS_POOL_SIZE", 0)
 
 CELERY_BEAT_SCHEDULE = {
     "store_daily_rating_snapshots": {
@@ -182,7 +288,23 @@ CELERY_BEAT_SCHEDULE = {
     },
     "check_game_timeouts": {
         "task": "games.tasks.check_game_timeouts",
-        "schedule": _env_float("GAME_TIMEOUT_CHECK_INTERVAL", 5.0),
+        "schedule": _env_float("GAME_TIMEOUT_CHECK_INTERVAL", 1.0),
+    },
+    "broadcast_clock_updates": {
+        "task": "games.tasks.broadcast_clock_updates",
+        "schedule": _env_float("CLOCK_BROADCAST_INTERVAL", 1.0),
+    },
+    "reindex_clock_deadlines": {
+        "task": "games.tasks.reindex_clock_deadlines",
+        "schedule": _env_float("CLOCK_DEADLINE_REINDEX_INTERVAL", 60.0),
+    },
+    "flush_dirty_games": {
+        "task": "games.tasks.flush_dirty_games",
+        "schedule": _env_float("GAME_LIVE_FLUSH_INTERVAL", 30.0),
+    },
+    "settle_pending_ratings": {
+        "task": "games.tasks.settle_pending_ratings",
+        "schedule": _env_float("RATING_SETTLE_SWEEP_INTERVAL", 30.0),
     },
     "check_first_move_timeouts": {
         "task": "games.tasks.check_first_move_timeouts",
@@ -218,6 +340,12 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": _env_float("DIGIQUIZ_TICK_INTERVAL", 2.0),
     },
 }
+if RATING_RECOMPUTE_NIGHTLY:
+    # Whole-userbase Glicko-2 rebuild (games.rating_recompute), before the 00:00 snapshot.
+    CELERY_BEAT_SCHEDULE["recompute_ratings"] = {
+        "task": "games.tasks.recompute_ratings",
+        "schedule": crontab(minute=30, hour=23),
+    }
 
 # CORS / CSRF
 cors_origins_env = os.getenv("CORS_ALLOWED_ORIGINS", "")
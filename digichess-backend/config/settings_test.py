@@ -10,6 +10,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db_test.sqlite3",  # noqa: F405
+        # Let concurrent writers (load-test commands) wait for the lock instead
+        # of failing with "database is locked".
+        "OPTIONS": {"timeout": 30, "transaction_mode": "IMMEDIATE"},
     }
 }
 
@@ -25,8 +28,10 @@ PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Same backend as production; without Redis it runs on its in-process tier alone.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "utils.tiered_cache.TieredCache",
+        "KEY_PREFIX": "test-cache",
     }
 }
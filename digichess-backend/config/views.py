@@ -185,6 +185,26 @@ def readyz(request):
         }
     }
     
+    # Engine pool and eval cache metrics (informational, not a readiness gate)
+    try:
+        from games.engine_pool import engine_pool
+        from games.eval_cache import eval_cache
+        response_data["engine_pool"] = engine_pool.stats()
+        response_data["eval_cache"] = eval_cache.stats()
+    except Exception:
+        pass
+    try:
+        from games.lichess_client import lichess_client
+        response_data["lichess"] = lichess_client.stats()
+    except Exception:
+        pass
+    try:
+        from django.core.cache import cache
+        if hasattr(cache, "stats"):
+            response_data["cache"] = cache.stats()
+    except Exception:
+        pass
+
     # Add error details if any service failed
     errors = {}
     if db_check["error"]:
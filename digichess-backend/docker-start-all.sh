@@ -2,7 +2,7 @@
 set -e
 
 # Multi-service startup script for Render (FREE - runs all services in one container)
-# This script runs setup then starts: Daphne + Celery Worker + Celery Beat
+# This script runs setup then starts: Daphne + Celery Worker + Celery Analysis Worker + Celery Beat
 # Usage: /start-all.sh (called after entrypoint does setup)
 
 echo "========================================="
@@ -24,19 +24,25 @@ cleanup() {
 trap cleanup SIGTERM SIGINT
 
 # Start Celery Worker in background
-echo "[1/3] Starting Celery Worker..."
-celery -A config worker -l info -Q scm_default,scm_emails --concurrency=4 &
+echo "[1/4] Starting Celery Worker..."
+celery -A config worker -l info -Q scm_default,scm_emails,scm_bots --concurrency=4 &
 CELERY_WORKER_PID=$!
 echo "   ??? Celery Worker started (PID: $CELERY_WORKER_PID)"
 
+# Full-game analysis runs one engine job at a time on its own queue
+echo "[2/4] Starting Celery Analysis Worker..."
+celery -A config worker -l info -Q scm_analysis -n analysis@%h --concurrency=1 --prefetch-multiplier=1 &
+CELERY_ANALYSIS_PID=$!
+echo "   ??? Celery Analysis Worker started (PID: $CELERY_ANALYSIS_PID)"
+
 # Start Celery Beat in background
-echo "[2/3] Starting Celery Beat..."
+echo "[3/4] Starting Celery Beat..."
 celery -A config beat -l info &
 CELERY_BEAT_PID=$!
 echo "   ??? Celery Beat started (PID: $CELERY_BEAT_PID)"
 
 # Wait a moment for Celery services to initialize
-echo "[3/3] Waiting for Celery services to initialize..."
+echo "[4/4] Waiting for Celery services to initialize..."
 sleep 3
 
 # Start Daphne in foreground (this keeps the container alive)
@@ -45,7 +51,8 @@ echo "Starting Daphne (ASGI server) on port 8000..."
 echo ""
 echo "??? All services are now running:"
 echo "   ??? Daphne (ASGI) - Port 8000"
-echo "   ??? Celery Worker - Queues: scm_default, scm_emails"
+echo "   ??? Celery Worker - Queues: scm_default, scm_emails, scm_bots"
+echo "   ??? Celery Analysis Worker - Queue: scm_analysis"
 echo "   ??? Celery Beat - Scheduler"
 echo "========================================="
 exec daphne -b 0.0.0.0 -p 8000 config.asgi:application
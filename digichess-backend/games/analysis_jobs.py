@@ -0,0 +1,326 @@
+"""
+Full-game analysis as background jobs.
+
+The GameAnalysis row is the job record: queued -> running -> completed/failed.
+enqueue_analysis() claims it and hands the work to Celery on the engine queue
+(ANALYSIS_QUEUE), so a web worker never waits on an engine. Requests for a
+game that already has a live job join it instead of starting another engine.
+While the job runs, every analysed ply is published to the "analysis_<game id>"
+channel group (see AnalysisConsumer) and the latest progress is kept in the
+cache for sockets that connect mid-run.
+
+Jobs analyse progressively (analysis_service.analyze_game_progressively): a
+shallow sweep of the whole game is stored and published first, then deeper
+passes replace it. Refinement only continues while someone is watching - an
+open analysis socket, or a request/poll within ANALYSIS_WATCH_SECONDS. An
+analysis that stopped early is served as is and refined when asked for again.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .analysis_service import run_full_analysis
+from .models import Game, GameAnalysis
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_GROUP = "analysis_{}"
+PROGRESS_KEY = "analysis:progress:{}"
+BOOST_KEY = "analysis:boost:{}"
+WATCHERS_KEY = "analysis:watchers:{}"
+SEEN_KEY = "analysis:seen:{}"
+WATCHERS_TTL_SECONDS = 3600
+
+# Celery's Redis transport serves lower numbers first (0-9, see
+# CELERY_BROKER_TRANSPORT_OPTIONS): a player's own game jumps the queue.
+PLAYER_PRIORITY = 0
+DEFAULT_PRIORITY = 6
+
+# Engine settings for a full analysis; the same ones the view used when it ran inline.
+ANALYSIS_OPTIONS = {
+    "prefer_lichess": False,
+    "time_per_move": 0.1,
+    "depth": 12,
+    "max_moves": None,
+    "allow_lichess_fallback": False,
+}
+
+
+def job_stale_after() -> timedelta:
+    """A queued or running job older than this is assumed lost (worker died) and may be requeued."""
+    return timedelta(seconds=max(1.0, settings.ANALYSIS_JOB_STALE_SECONDS))
+
+
+def analysis_is_complete(analysis: dict | None) -> bool:
+    if not analysis:
+        return False
+    summary = analysis.get("summary") or {}
+    if summary.get("partial"):
+        return False
+    total_moves = summary.get("total_moves")
+    moves = analysis.get("moves") or []
+    if total_moves is None:
+        return True
+    return total_moves == 0 or len(moves) >= total_moves
+
+
+def analysis_is_refined(analysis: dict | None) -> bool:
+    """False for a progressive analysis that stopped before its final depth."""
+    summary = (analysis or {}).get("summary") or {}
+    return summary.get("refined", True) is not False
+
+
+def _watch_seconds() -> int:
+    return max(1, settings.ANALYSIS_WATCH_SECONDS)
+
+
+def mark_seen(game_id: int) -> None:
+    """Someone just asked about this game's analysis over HTTP."""
+    try:
+        cache.set(SEEN_KEY.format(game_id), 1, _watch_seconds())
+    except Exception:
+        pass
+
+
+def watch(game_id: int) -> None:
+    """An analysis socket for ``game_id`` opened."""
+    key = WATCHERS_KEY.format(game_id)
+    try:
+        cache.add(key, 0, WATCHERS_TTL_SECONDS)
+        cache.incr(key)
+        cache.touch(key, WATCHERS_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+def unwatch(game_id: int) -> None:
+    """An analysis socket for ``game_id`` closed."""
+    key = WATCHERS_KEY.format(game_id)
+    try:
+        if cache.decr(key) <= 0:
+            cache.delete(key)
+    except Exception:
+        pass
+
+
+def is_watched(game_id: int) -> bool:
+    try:
+        return bool(cache.get(WATCHERS_KEY.format(game_id))) or bool(cache.get(SEEN_KEY.format(game_id)))
+    except Exception:
+        # Better to finish an analysis nobody reads than to cut one short someone is waiting on.
+        return True
+
+
+def _is_player(game: Game, user) -> bool:
+    if not user or not getattr(user, "is_authenticated", False):
+        return False
+    return user.id in (game.white_id, game.black_id)
+
+
+def _job_is_live(record: GameAnalysis, now) -> bool:
+    if record.status not in (GameAnalysis.STATUS_QUEUED, GameAnalysis.STATUS_RUNNING):
+        return False
+    since = record.started_at if record.status == GameAnalysis.STATUS_RUNNING else record.requested_at
+    return since is not None and now - since < job_stale_after()
+
+
+def publish(game_id: int, payload: dict) -> None:
+    """Send one event to everyone watching the analysis of ``game_id``."""
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            ANALYSIS_GROUP.format(game_id),
+            {"type": "analysis.event", "payload": payload},
+        )
+    except Exception as exc:
+        logger.warning("Publishing analysis event for game %s failed: %s", game_id, exc)
+
+
+def progress_snapshot(game_id: int) -> dict | None:
+    """The last progress event of a running job, for sockets that join late."""
+    try:
+        return cache.get(PROGRESS_KEY.format(game_id))
+    except Exception:
+        return None
+
+
+def enqueue_analysis(game: Game, user=None) -> tuple[GameAnalysis, bool]:
+    """
+    Make sure a full analysis of ``game`` exists or is on its way.
+
+    Returns (record, enqueued). A complete analysis is returned as is; a live
+    job is joined (deduplicated by game); anything else - no record, failed,
+    incomplete or stale - is reset to queued and sent to the engine queue,
+    ahead of other requests when ``user`` played the game. A complete but
+    unrefined analysis is queued for refinement and stays readable meanwhile.
+    """
+    priority = PLAYER_PRIORITY if _is_player(game, user) else DEFAULT_PRIORITY
+    now = timezone.now()
+    mark_seen(game.id)
+    with transaction.atomic():
+        record, _created = GameAnalysis.objects.select_for_update().get_or_create(
+            game=game,
+            defaults={"status": GameAnalysis.STATUS_QUEUED, "requested_at": now},
+        )
+        shallow = None
+        if record.status == GameAnalysis.STATUS_COMPLETED and analysis_is_complete(record.analysis):
+            if analysis_is_refined(record.analysis):
+                return record, False
+            shallow = record.analysis
+        if not _created and _job_is_live(record, now):
+            joined = True
+        else:
+            joined = False
+            try:
+                cache.delete(BOOST_KEY.format(game.id))
+            except Exception:
+                pass
+            record.status = GameAnalysis.STATUS_QUEUED
+            record.requested_at = now
+            record.started_at = None
+            record.completed_at = None
+            record.error = ""
+            record.source = record.source if shallow else ""
+            record.analysis = shallow
+            record.quick_eval = None
+            record.save(
+                update_fields=[
+                    "status",
+                    "requested_at",
+                    "started_at",
+                    "completed_at",
+                    "error",
+                    "source",
+                    "analysis",
+                    "quick_eval",
+                    "updated_at",
+                ]
+            )
+
+    if joined:
+        # A player joining a job still waiting behind visitors' requests sends
+        # it again at their priority (once); whichever copy runs first claims
+        # the row and the other finds nothing to do.
+        if not (record.status == GameAnalysis.STATUS_QUEUED and priority == PLAYER_PRIORITY):
+            return record, False
+        try:
+            if not cache.add(BOOST_KEY.format(game.id), 1, int(job_stale_after().total_seconds())):
+                return record, False
+        except Exception:
+            return record, False
+
+    elif priority == PLAYER_PRIORITY:
+        try:
+            cache.add(BOOST_KEY.format(game.id), 1, int(job_stale_after().total_seconds()))
+        except Exception:
+            pass
+
+    from .tasks import run_analysis_job
+
+    publish(game.id, {"type": "analysis_queued", "game_id": game.id})
+    try:
+        run_analysis_job.apply_async(args=[game.id], priority=priority)
+    except Exception as exc:
+        logger.error("Could not enqueue analysis for game %s: %s", game.id, exc)
+        record.status = GameAnalysis.STATUS_FAILED
+        record.error = "Analysis queue unavailable. Please try again."
+        record.completed_at = timezone.now()
+        record.save(update_fields=["status", "error", "completed_at", "updated_at"])
+        publish(game.id, {"type": "analysis_failed", "game_id": game.id, "error": record.error})
+        return record, False
+    record.refresh_from_db()
+    return record, True
+
+
+def _claim(game_id: int) -> GameAnalysis | None:
+    """Move the queued job to running; None when another worker got it or it is gone."""
+    now = timezone.now()
+    claimed = GameAnalysis.objects.filter(game_id=game_id, status=GameAnalysis.STATUS_QUEUED).update(
+        status=GameAnalysis.STATUS_RUNNING, started_at=now, updated_at=now
+    )
+    if not claimed:
+        return None
+    return GameAnalysis.objects.select_related("game").get(game_id=game_id)
+
+
+def run_analysis(game_id: int) -> str | None:
+    """Run the queued analysis job of ``game_id`` on this (engine) worker. Returns the final status."""
+    record = _claim(game_id)
+    if record is None:
+        return None
+    game = record.game
+    progress_key = PROGRESS_KEY.format(game_id)
+    publish(game_id, {"type": "analysis_started", "game_id": game_id})
+
+    def progress(event: dict, done: int, total: int) -> None:
+        payload = {"type": "analysis_progress", "game_id": game_id, "done": done, "total": total, **event}
+        try:
+            cache.set(progress_key, payload, int(job_stale_after().total_seconds()))
+        except Exception:
+            pass
+        publish(game_id, payload)
+
+    def on_pass(result: dict) -> None:
+        summary = result.get("summary") or {}
+        record.analysis = result
+        record.source = "local_stockfish"
+        record.save(update_fields=["analysis", "source", "updated_at"])
+        publish(
+            game_id,
+            {
+                "type": "analysis_pass",
+                "game_id": game_id,
+                "depth": summary.get("pass_depth"),
+                "pass": summary.get("passes"),
+                "refined": summary.get("refined", True),
+                "analysis": result,
+            },
+        )
+
+    try:
+        analysis_data, source, _engine_path = run_full_analysis(
+            game,
+            progress=progress,
+            progressive=True,
+            on_pass=on_pass,
+            keep_refining=lambda: is_watched(game_id),
+            **ANALYSIS_OPTIONS,
+        )
+        if not analysis_is_complete(analysis_data):
+            raise Exception("Analysis incomplete: not all moves were analyzed.")
+    except Exception as exc:
+        record.status = GameAnalysis.STATUS_FAILED
+        record.error = str(exc)
+        record.completed_at = timezone.now()
+        record.save(update_fields=["status", "error", "completed_at", "updated_at"])
+        publish(game_id, {"type": "analysis_failed", "game_id": game_id, "error": record.error})
+    else:
+        record.analysis = analysis_data
+        record.source = source
+        record.status = GameAnalysis.STATUS_COMPLETED
+        record.completed_at = timezone.now()
+        record.error = ""
+        record.save(update_fields=["analysis", "source", "status", "completed_at", "error", "updated_at"])
+        publish(
+            game_id,
+            {
+                "type": "analysis_completed",
+                "game_id": game_id,
+                "source": source,
+                "refined": analysis_is_refined(analysis_data),
+            },
+        )
+    finally:
+        try:
+            cache.delete_many([progress_key, BOOST_KEY.format(game_id)])
+        except Exception:
+            pass
+    return record.status
@@ -1,15 +1,26 @@
 import logging
-from typing import Optional, Tuple
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence, Tuple
 
 import chess
 import chess.engine
+from django.conf import settings
 
 from .lichess_api import get_cloud_evaluation
-from .stockfish_utils import ensure_stockfish_works, get_stockfish_path
+from .lichess_client import lichess_client
+from .engine_pool import engine_pool, stockfish_engine
+from .engine_registry import verified_stockfish_path
+from .eval_cache import EvalSession, normalize_fen
 from .models import Game
 
 logger = logging.getLogger(__name__)
 
+# progress(event, done, total): called once per analysed ply, see _progress_reporter().
+ProgressCallback = Callable[[dict, int, int], None]
+
 
 def _get_moves(game: Game) -> Tuple[str, list[str]]:
     moves_raw = game.moves.strip() if game.moves else ""
@@ -100,21 +111,206 @@ def _detect_brilliant(board_before: chess.Board, move: chess.Move, cp_loss: floa
     return is_hanging and moved_value > captured_value
 
 
+def analysis_workers(workers: Optional[int] = None) -> int:
+    """
+    Engines one game analysis may search with at once.
+
+    Defaults to ANALYSIS_WORKERS, or the CPU count when unset, and never
+    exceeds the engine pool's per-command limit so shards do not queue
+    behind each other.
+    """
+    if workers is None:
+        workers = settings.ANALYSIS_WORKERS
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+    return max(1, min(workers, engine_pool.max_per_key))
+
+
+def pass_depths(depth: int, sweep_depths: Sequence[int] = ()) -> list[int]:
+    """Increasing search depths of a progressive analysis: the sweeps below ``depth``, then ``depth``."""
+    return sorted({d for d in sweep_depths if 0 < d < depth}) + [depth]
+
+
+def _analysis_chunk_plies() -> int:
+    return max(1, settings.ANALYSIS_CHUNK_PLIES)
+
+
+def _replay_plies(moves: list[str]) -> list[dict]:
+    """One record per SAN move with the boards around it, or the reason it could not be played."""
+    plies = []
+    board = chess.Board()
+    for i, move_san in enumerate(moves):
+        ply = {"index": i, "san": move_san}
+        try:
+            move = board.parse_san(move_san)
+        except chess.InvalidMoveError as e:
+            ply["error"] = f"Move {i+1} ({move_san}): Invalid move - {str(e)}"
+        except Exception as e:
+            ply["error"] = f"Move {i+1} ({move_san}): Error - {str(e)}"
+        else:
+            ply["move"] = move
+            ply["is_white_move"] = board.turn == chess.WHITE
+            ply["board_before"] = board.copy()
+            board.push(move)
+            # Keep the move stack so the engine sees the game history.
+            ply["board_after"] = board.copy()
+        plies.append(ply)
+    return plies
+
+
+def _ply_event(ply: dict) -> dict:
+    """The per-ply progress payload: the move and the engine's view of the position after it."""
+    result = ply.get("result") or {}
+    score = result.get("score")
+    eval_score = None
+    mate = None
+    if score:
+        cp_score = score.pov(chess.WHITE).score(mate_score=100000)
+        if cp_score is not None:
+            eval_score = cp_score / 100.0
+        mate = score.pov(chess.WHITE).mate()
+    return {
+        "ply": ply["index"] + 1,
+        "move": ply["san"],
+        "eval": eval_score,
+        "mate": mate,
+        "depth": result.get("depth", 0),
+    }
+
+
+def _progress_reporter(progress: Optional[ProgressCallback], total: int) -> Optional[Callable[[dict], None]]:
+    """
+    Wrap ``progress`` into a per-ply hook that counts finished plies.
+
+    The hook is called from the search threads, so calls are serialised and
+    ``done`` only ever grows. A failing callback is logged, never raised into
+    the search.
+    """
+    if progress is None:
+        return None
+    lock = threading.Lock()
+    done = 0
+
+    def report(ply: dict) -> None:
+        nonlocal done
+        with lock:
+            done += 1
+            try:
+                progress(_ply_event(ply), done, total)
+            except Exception as exc:
+                logger.warning("Analysis progress callback failed: %s", exc)
+
+    return report
+
+
+def _search_plies(
+    engine_path: str,
+    plies: list[dict],
+    limit: chess.engine.Limit,
+    on_ply: Optional[Callable[[dict], None]] = None,
+) -> None:
+    """Run the engine over a contiguous run of plies on one pooled engine."""
+    with stockfish_engine(engine_path) as engine:
+        for ply in plies:
+            try:
+                start = time.perf_counter()
+                ply["result"] = engine.analyse(ply["board_after"], limit)
+                ply["elapsed"] = time.perf_counter() - start
+            except Exception as e:
+                ply["error"] = f"Move {ply['index']+1} ({ply['san']}): Error - {str(e)}"
+                continue
+            if on_ply:
+                on_ply(ply)
+
+
+def _evaluate_plies(
+    plies: list[dict],
+    engine_path: str,
+    limit: chess.engine.Limit,
+    session: EvalSession,
+    workers: int,
+    on_ply: Optional[Callable[[dict], None]] = None,
+) -> None:
+    """
+    Fill in ply["result"] for every playable ply, calling ``on_ply`` as each one lands.
+
+    Cached positions are answered from the session. The remaining positions
+    are searched once each (a repeated position waits for its first
+    occurrence, as it would in a serial pass) and split into contiguous
+    shards across up to ``workers`` pooled engines. Engines only search on
+    the worker threads; cache reads and writes stay on this thread.
+    """
+    playable = [ply for ply in plies if "error" not in ply]
+    searches = []
+    repeats = []
+    seen = set()
+    for ply in playable:
+        fen = normalize_fen(ply["board_after"])
+        if fen in seen:
+            repeats.append(ply)
+            continue
+        seen.add(fen)
+        cached = session.lookup(ply["board_after"], limit)
+        if cached is not None:
+            ply["result"] = cached
+            if on_ply:
+                on_ply(ply)
+        else:
+            searches.append(ply)
+
+    if searches:
+        chunk = _analysis_chunk_plies()
+        if workers > 1 and len(searches) > chunk:
+            shards = [searches[start:start + chunk] for start in range(0, len(searches), chunk)]
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis") as executor:
+                futures = [executor.submit(_search_plies, engine_path, shard, limit, on_ply) for shard in shards]
+                for future in futures:
+                    future.result()
+        else:
+            _search_plies(engine_path, searches, limit, on_ply)
+        for ply in searches:
+            if "result" in ply:
+                session.store(ply["board_after"], limit, ply["result"], elapsed=ply.get("elapsed", 0.0))
+
+    if repeats:
+        # A repeat is a cache hit unless its first occurrence failed; those get searched here.
+        with stockfish_engine(engine_path) as engine:
+            for ply in repeats:
+                try:
+                    ply["result"] = session.analyse(engine, ply["board_after"], limit)
+                except Exception as e:
+                    ply["error"] = f"Move {ply['index']+1} ({ply['san']}): Error - {str(e)}"
+                    continue
+                if on_ply:
+                    on_ply(ply)
+
+
 def analyze_game_with_stockfish(
     game: Game,
     engine_path: str,
     time_per_move: float = 0.3,
-    depth: int = 15
+    depth: int = 15,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
 ) -> dict:
-    """Analyze game with local Stockfish. Includes cp_loss, classification, and per-player stats."""
+    """
+    Analyze game with local Stockfish. Includes cp_loss, classification, and per-player stats.
+
+    Positions are searched on up to ``workers`` engines at once (see
+    analysis_workers()); evaluations are stitched back in ply order, so the
+    result does not depend on the worker count. ``progress`` hears about each
+    ply as its evaluation arrives, which is completion order, not ply order.
+    """
     moves_raw, moves = _get_moves(game)
 
+    session = EvalSession()
     if not moves:
         board = chess.Board(game.current_fen or chess.STARTING_FEN)
         try:
-            with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
+            with stockfish_engine(engine_path) as engine:
                 limit = chess.engine.Limit(time=max(0.2, time_per_move), depth=depth)
-                result = engine.analyse(board, limit)
+                result = session.analyse(engine, board, limit)
+                session.close()
                 score = result.get("score")
                 pv = result.get("pv", [])
 
@@ -149,82 +345,80 @@ def analyze_game_with_stockfish(
     errors = []
     prev_eval_cp = 0
 
+    plies = _replay_plies(moves)
+    limit = chess.engine.Limit(time=time_per_move, depth=depth)
+    session.prefetch([ply["board_after"] for ply in plies if "board_after" in ply], depth)
     try:
-        with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
-            temp_board = chess.Board()
-
-            for i, move_san in enumerate(moves):
-                try:
-                    move = temp_board.parse_san(move_san)
-                    is_white_move = temp_board.turn == chess.WHITE
-                    board_before = temp_board.copy()
-
-                    temp_board.push(move)
-
-                    limit = chess.engine.Limit(time=time_per_move, depth=depth)
-                    result = engine.analyse(temp_board, limit)
-
-                    if not result:
-                        errors.append(f"Move {i+1} ({move_san}): No result from engine")
-                        continue
-
-                    score = result.get("score")
-                    pv = result.get("pv", [])
-
-                    eval_score = None
-                    mate = None
-                    current_eval_cp = prev_eval_cp
-                    if score:
-                        cp_score = score.pov(chess.WHITE).score(mate_score=100000)
-                        if cp_score is not None:
-                            eval_score = cp_score / 100.0
-                            current_eval_cp = cp_score
-                        mate = score.pov(chess.WHITE).mate()
-
-                    if is_white_move:
-                        cp_loss_raw = prev_eval_cp - current_eval_cp
-                    else:
-                        cp_loss_raw = current_eval_cp - prev_eval_cp
-                    cp_loss = max(0, cp_loss_raw)
-
-                    brilliant = _detect_brilliant(board_before, move, cp_loss)
-                    classification = classify_move(cp_loss, is_brilliant=brilliant)
-
-                    best_move_san = None
-                    if pv and len(pv) > 0:
-                        try:
-                            best_move_san = temp_board.san(pv[0])
-                        except Exception:
-                            best_move_san = str(pv[0])
-
-                    analysis_moves.append(
-                        {
-                            "move": move_san,
-                            "move_number": i + 1,
-                            "eval": eval_score,
-                            "mate": mate,
-                            "best_move": best_move_san,
-                            "depth": result.get("depth", 0),
-                            "cp_loss": round(cp_loss / 100.0, 2),
-                            "classification": classification,
-                        }
-                    )
-
-                    prev_eval_cp = current_eval_cp
-
-                except chess.InvalidMoveError as e:
-                    errors.append(f"Move {i+1} ({move_san}): Invalid move - {str(e)}")
-                    continue
-                except Exception as e:
-                    errors.append(f"Move {i+1} ({move_san}): Error - {str(e)}")
-                    continue
-
+        on_ply = _progress_reporter(progress, sum(1 for ply in plies if "error" not in ply))
+        _evaluate_plies(plies, engine_path, limit, session, analysis_workers(workers), on_ply)
     except OSError as e:
         if e.errno == 8:
             raise Exception("Stockfish architecture mismatch detected. Please check server logs.")
         raise Exception(f"Failed to start Stockfish engine: {str(e)}")
     except Exception as e:
         raise Exception(f"Failed to start Stockfish engine: {str(e)}")
+    finally:
+        session.close()
+
+    # cp_loss depends on the previous evaluation, so stitch strictly in ply order.
+    for ply in plies:
+        i, move_san = ply["index"], ply["san"]
+        if "error" in ply:
+            errors.append(ply["error"])
+            continue
+        try:
+            result = ply.get("result")
+            if not result:
+                errors.append(f"Move {i+1} ({move_san}): No result from engine")
+                continue
+
+            score = result.get("score")
+            pv = result.get("pv", [])
+
+            eval_score = None
+            mate = None
+            current_eval_cp = prev_eval_cp
+            if score:
+                cp_score = score.pov(chess.WHITE).score(mate_score=100000)
+                if cp_score is not None:
+                    eval_score = cp_score / 100.0
+                    current_eval_cp = cp_score
+                mate = score.pov(chess.WHITE).mate()
+
+            if ply["is_white_move"]:
+                cp_loss_raw = prev_eval_cp - current_eval_cp
+            else:
+                cp_loss_raw = current_eval_cp - prev_eval_cp
+            cp_loss = max(0, cp_loss_raw)
+
+            brilliant = _detect_brilliant(ply["board_before"], ply["move"], cp_loss)
+            classification = classify_move(cp_loss, is_brilliant=brilliant)
+
+            best_move_san = None
+            if pv and len(pv) > 0:
+                try:
+                    best_move_san = ply["board_after"].san(pv[0])
+                except Exception:
+                    best_move_san = str(pv[0])
+
+            analysis_moves.append(
+                {
+                    "move": move_san,
+                    "move_number": i + 1,
+                    "eval": eval_score,
+                    "mate": mate,
+                    "best_move": best_move_san,
+                    "depth": result.get("depth", 0),
+                    "cp_loss": round(cp_loss / 100.0, 2),
+                    "classification": classification,
+                }
+            )
+
+            prev_eval_cp = current_eval_cp
+
+        except Exception as e:
+            errors.append(f"Move {i+1} ({move_san}): Error - {str(e)}")
+            continue
 
     analyzed_count = len([m for m in analysis_moves if m.get("eval") is not None])
 
@@ -253,6 +447,7 @@ def analyze_game_with_stockfish(
             "moves_sample": moves[:5] if moves else [],
             "white": _player_stats(white_moves),
             "black": _player_stats(black_moves),
+            "eval_cache": session.summary(),
         },
     }
 
@@ -265,8 +460,69 @@ def analyze_game_with_stockfish(
     return result
 
 
-def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None = None) -> dict:
-    """Analyze game using Lichess Cloud Evaluation API."""
+def analyze_game_progressively(
+    game: Game,
+    engine_path: str,
+    time_per_move: float = 0.3,
+    depth: int = 15,
+    workers: Optional[int] = None,
+    sweep_depths: Optional[Sequence[int]] = None,
+    progress: Optional[ProgressCallback] = None,
+    on_pass: Optional[Callable[[dict], None]] = None,
+    keep_refining: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Iterative deepening over the whole game: a shallow sweep first, then refinement passes up to ``depth``.
+
+    Every pass is a complete analyze_game_with_stockfish() result, so the
+    first eval graph is ready after the cheap sweep instead of after the full
+    search. Its summary gets "pass_depth", "passes" and "refined" (True once
+    ``depth`` is reached) and it goes to ``on_pass`` before the next pass
+    starts; ``progress`` events carry "pass_depth". When ``keep_refining()``
+    returns False between passes (nobody is watching), the deeper passes are
+    skipped and the last result is returned with refined False.
+    ``sweep_depths`` defaults to settings.ANALYSIS_SWEEP_DEPTHS.
+    """
+    if sweep_depths is None:
+        sweep_depths = settings.ANALYSIS_SWEEP_DEPTHS
+    depths = pass_depths(depth, sweep_depths)
+    result = None
+    for number, pass_depth in enumerate(depths, start=1):
+        def pass_progress(event, done, total, pass_depth=pass_depth):
+            progress({**event, "pass_depth": pass_depth}, done, total)
+
+        result = analyze_game_with_stockfish(
+            game,
+            engine_path,
+            time_per_move=time_per_move,
+            depth=pass_depth,
+            workers=workers,
+            progress=pass_progress if progress is not None else None,
+        )
+        result["summary"].update(pass_depth=pass_depth, passes=number, refined=pass_depth == depth)
+        if on_pass is not None:
+            try:
+                on_pass(result)
+            except Exception as exc:
+                logger.warning("Analysis pass callback failed: %s", exc)
+        if pass_depth != depth and keep_refining is not None and not keep_refining():
+            break
+    return result
+
+
+def analyze_game_with_lichess(
+    game: Game,
+    depth: int = 18,
+    max_moves: int | None = None,
+    progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """
+    Analyze game using Lichess Cloud Evaluation API.
+
+    Positions are fetched on up to lichess_client.max_concurrency threads
+    through the shared client; moves are assembled in ply order afterwards.
+    ``progress`` hears about each ply as its answer lands.
+    """
     _, moves = _get_moves(game)
 
     analysis_moves = []
@@ -285,13 +541,62 @@ def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None
             except Exception:
                 continue
 
+    # Replay first, then fetch every position's cloud eval concurrently.
+    rows = []
     for i, move_san in enumerate(moves_to_analyze):
+        number = start_index + i + 1
         try:
             move = board.parse_san(move_san)
             board.push(move)
-
-            eval_data = get_cloud_evaluation(board.fen(), depth=depth, multi_pv=1)
-
+        except chess.InvalidMoveError as e:
+            rows.append({"error": f"Move {number} ({move_san}): Invalid move - {str(e)}"})
+            continue
+        except Exception as e:
+            rows.append({"error": f"Move {number} ({move_san}): Error - {str(e)}"})
+            continue
+        rows.append({"number": number, "san": move_san, "board": board.copy(stack=False)})
+    playable = [row for row in rows if "board" in row]
+
+    session = EvalSession()
+    session.prefetch([row["board"] for row in playable], depth)
+
+    done = 0
+
+    def on_result(index: int, eval_data: Optional[dict]) -> None:
+        nonlocal done
+        pv_data = (eval_data or {}).get("pvs") or [{}]
+        cp = pv_data[0].get("cp")
+        done += 1
+        event = {
+            "ply": playable[index]["number"],
+            "move": playable[index]["san"],
+            "eval": cp / 100.0 if cp is not None else None,
+            "mate": pv_data[0].get("mate"),
+            "depth": (eval_data or {}).get("depth", 0),
+        }
+        try:
+            progress(event, done, len(playable))
+        except Exception as exc:
+            logger.warning("Analysis progress callback failed: %s", exc)
+
+    evals = session.cloud_evals(
+        [row["board"].fen() for row in playable],
+        depth,
+        1,
+        get_cloud_evaluation,
+        workers=lichess_client.max_concurrency,
+        on_result=on_result if progress else None,
+    )
+    for row, eval_data in zip(playable, evals):
+        row["eval_data"] = eval_data
+
+    for row in rows:
+        if "error" in row:
+            errors.append(row["error"])
+            continue
+        number, move_san, position = row["number"], row["san"], row["board"]
+        try:
+            eval_data = row["eval_data"]
             if eval_data and eval_data.get("pvs"):
                 pv_data = eval_data["pvs"][0]
                 cp = pv_data.get("cp")
@@ -301,11 +606,9 @@ def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None
 
                 if best_moves:
                     try:
-                        temp_board = board.copy()
-                        best_move_uci = best_moves[0]
-                        best_move_obj = chess.Move.from_uci(best_move_uci)
-                        if best_move_obj in temp_board.legal_moves:
-                            best_move_san = temp_board.san(best_move_obj)
+                        best_move_obj = chess.Move.from_uci(best_moves[0])
+                        if best_move_obj in position.legal_moves:
+                            best_move_san = position.san(best_move_obj)
                     except Exception:
                         best_move_san = best_moves[0] if best_moves else None
 
@@ -314,7 +617,7 @@ def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None
                 analysis_moves.append(
                     {
                         "move": move_san,
-                        "move_number": start_index + i + 1,
+                        "move_number": number,
                         "eval": eval_score,
                         "mate": mate,
                         "best_move": best_move_san,
@@ -323,15 +626,12 @@ def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None
                     }
                 )
             else:
-                errors.append(f"Move {start_index + i + 1} ({move_san}): Lichess API returned no evaluation")
-
-        except chess.InvalidMoveError as e:
-            errors.append(f"Move {start_index + i + 1} ({move_san}): Invalid move - {str(e)}")
-            continue
+                errors.append(f"Move {number} ({move_san}): Lichess API returned no evaluation")
         except Exception as e:
-            errors.append(f"Move {start_index + i + 1} ({move_san}): Error - {str(e)}")
+            errors.append(f"Move {number} ({move_san}): Error - {str(e)}")
             continue
 
+    session.close()
     analyzed_count = len([m for m in analysis_moves if m.get("eval") is not None])
 
     result = {
@@ -341,6 +641,7 @@ def analyze_game_with_lichess(game: Game, depth: int = 18, max_moves: int | None
             "analyzed_moves": analyzed_count,
             "errors": errors[:10] if errors else [],
             "source": "lichess_cloud",
+            "eval_cache": session.summary(),
         },
     }
 
@@ -361,15 +662,25 @@ def run_full_analysis(
     depth: int = 15,
     max_moves: int | None = None,
     allow_lichess_fallback: bool = True,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    progressive: bool = False,
+    on_pass: Optional[Callable[[dict], None]] = None,
+    keep_refining: Optional[Callable[[], bool]] = None,
 ) -> Tuple[dict, str, Optional[str]]:
-    """Run full analysis with Lichess first, fallback to local Stockfish."""
+    """
+    Run full analysis with Lichess first, fallback to local Stockfish. ``progress`` gets each analysed ply.
+
+    With ``progressive`` the local search runs as analyze_game_progressively()
+    with ``on_pass`` and ``keep_refining``.
+    """
     analysis_data = None
     source = None
     engine_path = None
 
     if prefer_lichess:
         try:
-            analysis_data = analyze_game_with_lichess(game, depth=depth, max_moves=max_moves)
+            analysis_data = analyze_game_with_lichess(game, depth=depth, max_moves=max_moves, progress=progress)
             if analysis_data and analysis_data.get("summary", {}).get("analyzed_moves", 0) > 0:
                 source = "lichess"
             else:
@@ -379,20 +690,33 @@ def run_full_analysis(
             analysis_data = None
 
     if not analysis_data:
-        engine_path = get_stockfish_path()
-        works, message, engine_path = ensure_stockfish_works(engine_path)
+        works, message, engine_path = verified_stockfish_path()
         if not works:
             if allow_lichess_fallback and not prefer_lichess:
-                analysis_data = analyze_game_with_lichess(game, depth=depth, max_moves=max_moves)
+                analysis_data = analyze_game_with_lichess(game, depth=depth, max_moves=max_moves, progress=progress)
                 source = "lichess"
             else:
                 raise Exception(f"Local Stockfish unavailable: {message}")
+        elif progressive:
+            analysis_data = analyze_game_progressively(
+                game,
+                engine_path,
+                time_per_move=time_per_move,
+                depth=depth,
+                workers=workers,
+                progress=progress,
+                on_pass=on_pass,
+                keep_refining=keep_refining,
+            )
+            source = "local_stockfish"
         else:
             analysis_data = analyze_game_with_stockfish(
                 game,
                 engine_path,
                 time_per_move=time_per_move,
                 depth=depth,
+                workers=workers,
+                progress=progress,
             )
             source = "local_stockfish"
 
@@ -406,9 +730,11 @@ def run_quick_eval(game: Game, prefer_lichess: bool = True) -> dict:
     fen = board.fen()
     move_number = len(moves)
 
+    session = EvalSession()
     if prefer_lichess:
         try:
-            eval_data = get_cloud_evaluation(fen, depth=14, multi_pv=1)
+            eval_data = session.cloud_eval(fen, 14, 1, get_cloud_evaluation)
+            session.close()
             if eval_data and eval_data.get("pvs"):
                 pv_data = eval_data["pvs"][0]
                 cp = pv_data.get("cp")
@@ -438,8 +764,7 @@ def run_quick_eval(game: Game, prefer_lichess: bool = True) -> dict:
         except Exception as exc:
             logger.warning(f"Quick eval via Lichess failed: {exc}")
 
-    engine_path = get_stockfish_path()
-    works, message, engine_path = ensure_stockfish_works(engine_path)
+    works, message, engine_path = verified_stockfish_path()
     if not works:
         # Lightweight fallback: material-only evaluation.
         return {
@@ -454,9 +779,10 @@ def run_quick_eval(game: Game, prefer_lichess: bool = True) -> dict:
         }
 
     try:
-        with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
+        with stockfish_engine(engine_path) as engine:
             limit = chess.engine.Limit(time=0.12, depth=12)
-            result = engine.analyse(board, limit)
+            result = session.analyse(engine, board, limit)
+            session.close()
             score = result.get("score")
             pv = result.get("pv", [])
             eval_score = None
@@ -0,0 +1,92 @@
+"""
+Per-game board cache for the move hot path.
+
+apply_move used to rebuild the board by replaying every SAN move since the
+start of the game, which made move N cost O(N). This keeps the live
+chess.Board (with its move stack, so repetition detection still works) in a
+process-local LRU keyed by game id. Entries are validated against the ply
+count and current_fen from the locked game row, so a stale or foreign entry is
+simply treated as a miss and the history is replayed once.
+
+Boards are handed out by ownership: take() removes the entry, and the caller
+puts the (possibly advanced) board back with store(). Two requests can never
+mutate the same board object.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import chess
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _position_key(fen: Optional[str]) -> str:
+    """Piece placement + side to move; ignores clocks and ep/castling notation drift."""
+    parts = (fen or "").split()
+    return " ".join(parts[:2])
+
+
+class BoardCache:
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max(1, max_size if max_size is not None else settings.BOARD_CACHE_SIZE)
+        self._entries: "OrderedDict[int, chess.Board]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def take(self, game_id: int, ply_count: int, current_fen: Optional[str]) -> Optional[chess.Board]:
+        """Remove and return the cached board if it matches the given ply count and FEN."""
+        with self._lock:
+            board = self._entries.pop(game_id, None)
+            if (
+                board is not None
+                and len(board.move_stack) == ply_count
+                and _position_key(board.fen()) == _position_key(current_fen)
+            ):
+                self.hits += 1
+                return board
+            self.misses += 1
+            return None
+
+    def store(self, game_id: int, board: chess.Board) -> None:
+        with self._lock:
+            self._entries[game_id] = board
+            self._entries.move_to_end(game_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, game_id: int) -> None:
+        with self._lock:
+            self._entries.pop(game_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# Global board cache (one per process)
+board_cache = BoardCache()
+
+
+def position_matches(board: Optional[chess.Board], current_fen: Optional[str]) -> bool:
+    if board is None:
+        return False
+    if not current_fen:
+        return True
+    return _position_key(board.fen()) == _position_key(current_fen)
@@ -0,0 +1,219 @@
+"""
+Bot replies, off the request path.
+
+schedule_bot_move() is called wherever a bot may be on move (after a human
+move over HTTP or WebSocket, when a bot game or a rematch starts as white). It
+queues games.tasks.make_bot_move_async on BOT_MOVE_QUEUE once the current
+transaction commits, so the human's move response never waits for the engine.
+
+Ordering per game comes from the ply the task was queued for: play_bot_move()
+only moves when the game is still at that ply with the bot on move, and holds a
+per-game Redis lock while it thinks, so a duplicate or late delivery is a no-op.
+The reply is applied through game_core.apply_move and published on the game
+group like any other move. Bot-vs-bot games queue the next reply instead of
+recursing.
+
+Settings (config/settings.py, overridable from the environment):
+BOT_MOVE_QUEUE       Celery queue for bot replies (default scm_bots)
+BOT_VS_BOT_DELAY     seconds between moves when both sides are bots (default 0.1)
+"""
+import logging
+import uuid
+from typing import Callable, Optional
+
+import chess
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from utils.redis_client import get_redis
+
+from .bot_utils import get_bot_move_with_error
+from .game_core import MoveResult, apply_move
+from .game_state_codec import encode_game
+from .models import Game
+from .move_executor import game_state_payload
+
+logger = logging.getLogger(__name__)
+
+BOT_MOVE_LOCK_SECONDS = 60
+BUSY_ERROR = "Game is busy. Please retry."
+
+_RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_RATING_FIELDS = {
+    Game.TIME_BULLET: "rating_bullet",
+    Game.TIME_BLITZ: "rating_blitz",
+    Game.TIME_RAPID: "rating_rapid",
+    Game.TIME_CLASSICAL: "rating_classical",
+}
+
+
+def _board(game: Game) -> chess.Board:
+    try:
+        return chess.Board(game.current_fen or chess.STARTING_FEN)
+    except Exception:
+        return chess.Board()
+
+
+def _ply(game: Game) -> int:
+    return len((game.moves or "").split())
+
+
+def bot_to_move(game: Game):
+    """The bot on move in an active game, or None."""
+    if game.status != Game.STATUS_ACTIVE:
+        return None
+    player = game.white if _board(game).turn == chess.WHITE else game.black
+    if player and player.is_bot:
+        return player
+    return None
+
+
+def schedule_bot_move(game: Game, delay: float = 0.0) -> bool:
+    """Queue the bot's reply for after the current transaction commits; False if no bot is on move."""
+    if not bot_to_move(game):
+        return False
+    game_id, ply = game.id, _ply(game)
+
+    def _enqueue():
+        from .tasks import make_bot_move_async
+
+        try:
+            make_bot_move_async.apply_async(args=(game_id, ply), countdown=delay or None)
+        except Exception as exc:
+            logger.warning("Could not queue bot move for game %s: %s", game_id, exc)
+
+    transaction.on_commit(_enqueue)
+    return True
+
+
+def choose_bot_move(game: Game, board: chess.Board, bot) -> chess.Move:
+    bot_rating = getattr(bot, _RATING_FIELDS.get(game.time_control, "rating_blitz"), 800)
+    return get_bot_move_with_error(
+        board,
+        bot_rating,
+        time_control=game.time_control,
+        ply_count=_ply(game),
+        engine=getattr(bot, "bot_engine", None) or "maia",
+    )
+
+
+def _lock(game_id: int):
+    r = get_redis()
+    if not r:
+        return None, None
+    token = uuid.uuid4().hex
+    try:
+        if not r.set(f"bot_move:lock:{game_id}", token, nx=True, ex=BOT_MOVE_LOCK_SECONDS):
+            return r, ""
+    except Exception:
+        return None, None
+    return r, token
+
+
+def _unlock(r, game_id: int, token: Optional[str]) -> None:
+    if not (r and token):
+        return
+    try:
+        r.eval(_RELEASE_LOCK_LUA, 1, f"bot_move:lock:{game_id}", token)
+    except Exception:
+        pass
+
+
+def publish_move_result(result: MoveResult) -> None:
+    """Send a move applied outside a request or socket to everyone on the game group."""
+    from .views import FinishGameView
+
+    game = result.game
+    channel_layer = get_channel_layer()
+    if channel_layer and result.state:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"game_{game.id}",
+                {
+                    "type": "game.event",
+                    "payload": game_state_payload(
+                        game, result.state, result.legal_moves or [], result.legal_moves_uci or []
+                    ),
+                },
+            )
+            if result.draw_offer_cleared:
+                async_to_sync(channel_layer.group_send)(
+                    f"game_{game.id}",
+                    {
+                        "type": "game.event",
+                        "payload": {"type": "draw_response", "game_id": game.id, "decision": "auto_decline"},
+                    },
+                )
+        except Exception as exc:
+            logger.warning("Broadcasting bot move for game %s failed: %s", game.id, exc)
+
+    if not result.finished:
+        return
+    game.refresh_from_db()
+    if game.rated and game.result in {Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW}:
+        FinishGameView().update_ratings(game, game.result)
+    if channel_layer:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"game_{game.id}",
+                {
+                    "type": "game.event",
+                    "payload": {
+                        "type": "game_finished",
+                        "game_id": game.id,
+                        "result": game.result,
+                        "reason": result.finish_reason,
+                        "game": encode_game(game),
+                    },
+                },
+            )
+        except Exception as exc:
+            logger.warning("Broadcasting finish of game %s failed: %s", game.id, exc)
+
+
+def play_bot_move(
+    game_id: int,
+    ply: Optional[int] = None,
+    choose: Callable[[Game, chess.Board, object], chess.Move] = choose_bot_move,
+) -> Optional[MoveResult]:
+    """
+    Make the bot's move in game_id if it is still due, and publish it.
+
+    ``ply`` is the move count the reply was queued for; None skips the check.
+    Returns None when there was nothing to do (game over, human on move, a
+    newer or concurrent reply); otherwise the MoveResult, whose error is
+    BUSY_ERROR when the game row was locked and the caller should retry.
+    """
+    r, token = _lock(game_id)
+    if token == "":
+        return None
+    try:
+        game = Game.objects.select_related("white", "black").filter(id=game_id).first()
+        if not game or (ply is not None and _ply(game) != ply):
+            return None
+        bot = bot_to_move(game)
+        if not bot:
+            return None
+        board = _board(game)
+        try:
+            san = board.san(choose(game, board, bot))
+        except Exception as exc:
+            logger.warning("Bot %s found no move in game %s: %s", bot.id, game_id, exc)
+            return None
+        result = apply_move(game_id, bot, san)
+    finally:
+        _unlock(r, game_id, token)
+
+    if result.state and result.game:
+        publish_move_result(result)
+    if result.ok and result.game and not result.finished and bot_to_move(result.game):
+        schedule_bot_move(result.game, delay=settings.BOT_VS_BOT_DELAY)
+    return result
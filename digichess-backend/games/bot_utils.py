@@ -133,24 +133,24 @@ def get_stockfish_config(bot_rating: int, time_control: str = "blitz"):
 def _stockfish_move(board: chess.Board, bot_rating: int, time_control: str = "blitz"):
     """Get a move from Stockfish with rating-appropriate configuration."""
     try:
-        from games.stockfish_utils import get_stockfish_path, ensure_stockfish_works
-        engine_path = get_stockfish_path()
-        ok, msg, engine_path = ensure_stockfish_works(engine_path)
+        from games.engine_pool import stockfish_engine
+        from games.engine_registry import verified_stockfish_path
+        ok, msg, engine_path = verified_stockfish_path()
         if not ok:
             logger.warning(f"Stockfish unavailable: {msg}")
             return None
         config = get_stockfish_config(bot_rating, time_control)
-        with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
-            if config.get('use_elo_limit'):
-                engine.configure({
-                    "UCI_LimitStrength": True,
-                    "UCI_Elo": config.get('elo')
-                })
-            else:
-                engine.configure({
-                    "UCI_LimitStrength": False,
-                    "Skill Level": config.get('skill', 20),
-                })
+        if config.get('use_elo_limit'):
+            options = {
+                "UCI_LimitStrength": True,
+                "UCI_Elo": config.get('elo'),
+            }
+        else:
+            options = {
+                "UCI_LimitStrength": False,
+                "Skill Level": config.get('skill', 20),
+            }
+        with stockfish_engine(engine_path, options) as engine:
             limit_kwargs = {'time': config.get('time', 0.2)}
             if config.get('depth'):
                 limit_kwargs['depth'] = config['depth']
@@ -6,17 +6,27 @@ Cheat detection engine combining:
 Produces per-move and aggregate statistics used for both:
 1. Immediate statistical verdicts (works from day one)
 2. Tensor generation for the Irwin neural network (trains over time)
+
+run_dual_cheat_analysis*() covers both players from one engine pass, so a
+full report costs one search per ply instead of two.
+
+The *_from_sequence() entry points can also run progressively: complete
+passes at the ``sweep_depths`` first, each handed to ``on_pass`` as soon as
+it is scored, then the full ``depth`` unless ``keep_refining()`` says stop.
 """
 
 import logging
 import math
-from typing import Optional
+from typing import Callable, Optional, Sequence
 
 import chess
 import chess.engine
 
 from .models import Game
-from .stockfish_utils import ensure_stockfish_works, get_stockfish_path
+from .analysis_service import pass_depths
+from .engine_pool import stockfish_engine
+from .engine_registry import verified_stockfish_path
+from .eval_cache import EvalSession
 
 logger = logging.getLogger(__name__)
 
@@ -59,217 +69,248 @@ def _categorize_position(eval_cp: float, player_is_white: bool) -> str:
 
 
 def _get_engine_path():
-    path = get_stockfish_path()
-    ok, msg, path = ensure_stockfish_works(path)
+    ok, msg, path = verified_stockfish_path()
     if not ok:
         raise RuntimeError(f"Stockfish unavailable: {msg}")
     return path
 
 
-def run_cheat_analysis_from_sequence(
-    move_list: list[str],
-    player_is_white: bool,
-    move_times_ms: Optional[list[int]] = None,
-    start_fen: Optional[str] = None,
-    player_rating: int = 800,
-    book_depth: int = DEFAULT_BOOK_DEPTH,
-    multipv: int = DEFAULT_MULTIPV,
-    depth: int = DEFAULT_DEPTH,
-    time_per_move: float = DEFAULT_TIME_PER_MOVE,
-) -> dict:
+def _replay_sequence(move_list: list[str], start_fen: str) -> list[dict]:
+    """One record per playable ply with the board after it; unparseable moves are skipped."""
+    board = chess.Board(start_fen)
+    plies = []
+    for ply_idx, move_san in enumerate(move_list):
+        try:
+            move = board.parse_san(move_san)
+        except (chess.InvalidMoveError, chess.IllegalMoveError):
+            board = chess.Board()
+            for m_san in move_list[: ply_idx + 1]:
+                try:
+                    board.push(board.parse_san(m_san))
+                except Exception:
+                    break
+            continue
+
+        color = board.turn
+        is_capture = board.is_capture(move)
+        board.push(move)
+        plies.append({
+            "ply": ply_idx,
+            "move_san": move_san,
+            "move": move,
+            "color": color,
+            "is_capture": is_capture,
+            "board": board.copy(),
+        })
+    return plies
+
+
+def _evaluate_sequence(
+    plies: list[dict],
+    start_fen: str,
+    colors: set,
+    book_plies: int,
+    multipv: int,
+    depth: int,
+    time_per_move: float,
+    engine_path=None,
+) -> tuple[int, dict]:
     """
-    Full cheat analysis on a move sequence for one color.
+    Search every ply once and attach its engine lines as ply["infos"].
 
-    Returns a dict ready to populate CheatAnalysis fields.
+    Post-book plies by a colour in ``colors`` get the full multipv search;
+    everything else gets the cheaper single-line search. Returns the
+    evaluation of the start position and the session's cache summary.
     """
-    if not move_list:
-        raise ValueError("Game has no moves to analyze.")
-
-    player_color = chess.WHITE if player_is_white else chess.BLACK
-    resolved_start_fen = (start_fen or Game.START_FEN or "").strip() or Game.START_FEN
-    book_plies = 0 if resolved_start_fen != Game.START_FEN else book_depth * 2
+    engine_path = engine_path or _get_engine_path()
+    quick = chess.engine.Limit(time=time_per_move * 0.3, depth=depth)
+    full = chess.engine.Limit(time=time_per_move, depth=depth)
 
-    engine_path = _get_engine_path()
+    def wants_multipv(ply):
+        return ply["color"] in colors and ply["ply"] >= book_plies
 
-    move_times = move_times_ms if isinstance(move_times_ms, list) else []
-    has_timing = len(move_times) > 0
-
-    per_move = []
-    tensor_moves = []
-    tensor_piece_types = []
-    player_move_times_ms = []
-
-    prev_eval_cp = 0
-    was_ever_losing = False
+    start_board = chess.Board(start_fen) if start_fen != Game.START_FEN else None
+    session = EvalSession()
+    session.prefetch(
+        ([start_board] if start_board else []) + [p["board"] for p in plies if not wants_multipv(p)], depth
+    )
+    session.prefetch([p["board"] for p in plies if wants_multipv(p)], depth, multipv)
 
-    with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
-        board = chess.Board(resolved_start_fen)
-        if resolved_start_fen != Game.START_FEN:
-            info = engine.analyse(
-                board,
-                chess.engine.Limit(time=time_per_move * 0.3, depth=depth),
-            )
+    start_eval_cp = 0
+    with stockfish_engine(engine_path) as engine:
+        if start_board is not None:
+            info = session.analyse(engine, start_board, quick)
             score = info.get("score")
             if score:
                 cp = score.pov(chess.WHITE).score(mate_score=100000)
                 if cp is not None:
-                    prev_eval_cp = cp
+                    start_eval_cp = cp
 
-        for ply_idx, move_san in enumerate(move_list):
-            try:
-                move = board.parse_san(move_san)
-            except (chess.InvalidMoveError, chess.IllegalMoveError):
-                board = chess.Board()
-                for m_san in move_list[: ply_idx + 1]:
-                    try:
-                        board.push(board.parse_san(m_san))
-                    except Exception:
-                        break
-                continue
+        for ply in plies:
+            if wants_multipv(ply):
+                infos = session.analyse(engine, ply["board"], full, multipv=multipv)
+                ply["infos"] = infos if isinstance(infos, list) else [infos]
+            else:
+                ply["infos"] = [session.analyse(engine, ply["board"], quick)]
 
-            is_player_move = board.turn == player_color
-            in_book = ply_idx < book_plies
+    session.close()
+    return start_eval_cp, session.summary()
 
-            eval_before_cp = prev_eval_cp
-            pos_category = _categorize_position(eval_before_cp, player_is_white)
 
-            perspective_before = eval_before_cp if player_is_white else -eval_before_cp
-            if perspective_before < -UNDECIDED_THRESHOLD:
-                was_ever_losing = True
+def _score_player(
+    plies: list[dict],
+    start_eval_cp: int,
+    player_is_white: bool,
+    move_times_ms: Optional[list[int]],
+    player_rating: int,
+    book_plies: int,
+    total_plies: int,
+) -> dict:
+    """PGN-Spy / Irwin statistics for one colour from already evaluated plies."""
+    player_color = chess.WHITE if player_is_white else chess.BLACK
+    move_times = move_times_ms if isinstance(move_times_ms, list) else []
 
-            if was_ever_losing and pos_category != "losing":
-                effective_category = "post_losing"
-            else:
-                effective_category = pos_category
-
-            move_is_capture = board.is_capture(move)
-            board.push(move)
-
-            if not is_player_move or in_book:
-                info = engine.analyse(
-                    board,
-                    chess.engine.Limit(time=time_per_move * 0.3, depth=depth),
-                )
-                score = info.get("score")
-                if score:
-                    cp = score.pov(chess.WHITE).score(mate_score=100000)
-                    if cp is not None:
-                        prev_eval_cp = cp
-                if is_player_move and in_book:
-                    pass
-                continue
+    per_move = []
+    tensor_moves = []
+    tensor_piece_types = []
+    player_move_times_ms = []
 
-            info_multi = engine.analyse(
-                board,
-                chess.engine.Limit(time=time_per_move, depth=depth),
-                multipv=multipv,
-            )
+    prev_eval_cp = start_eval_cp
+    was_ever_losing = False
 
-            if not isinstance(info_multi, list):
-                info_multi = [info_multi]
-
-            eval_after_cp = None
-            best_eval_cp = None
-            pv_moves = []
-
-            for pv_idx, pv_info in enumerate(info_multi):
-                score = pv_info.get("score")
-                pv = pv_info.get("pv", [])
-                if score:
-                    cp = score.pov(chess.WHITE).score(mate_score=100000)
-                    if pv_idx == 0:
-                        eval_after_cp = cp
-                        best_eval_cp = cp
-                    if cp is not None and pv:
-                        try:
-                            pv_san = board.san(pv[0])
-                        except Exception:
-                            pv_san = str(pv[0])
-                        pv_moves.append({"rank": pv_idx + 1, "move": pv_san, "eval_cp": cp})
-
-            if eval_after_cp is None:
-                eval_after_cp = prev_eval_cp
-
-            cp_loss_raw = eval_before_cp - eval_after_cp if player_is_white else eval_after_cp - eval_before_cp
-            cp_loss = max(0, cp_loss_raw)
-
-            wc_before = _cp_to_winning_chances(
-                eval_before_cp if player_is_white else -eval_before_cp
-            )
-            wc_after = _cp_to_winning_chances(
-                eval_after_cp if player_is_white else -eval_after_cp
-            )
-            wcl = max(0.0, wc_before - wc_after)
+    for record in plies:
+        ply_idx = record["ply"]
+        move_san = record["move_san"]
+        move = record["move"]
+        board = record["board"]
+        is_player_move = record["color"] == player_color
+        in_book = ply_idx < book_plies
 
-            played_uci = move.uci()
-            rank = None
-            for pv_entry in pv_moves:
-                try:
-                    candidate = board.parse_san(pv_entry["move"])
-                    if candidate.uci() == played_uci:
-                        rank = pv_entry["rank"]
-                        break
-                except Exception:
-                    continue
+        eval_before_cp = prev_eval_cp
+        pos_category = _categorize_position(eval_before_cp, player_is_white)
 
-            is_forced = False
-            if len(pv_moves) >= 2:
-                gap = abs(pv_moves[0]["eval_cp"] - pv_moves[1]["eval_cp"])
-                if gap >= FORCED_MOVE_THRESHOLD:
-                    is_forced = True
+        perspective_before = eval_before_cp if player_is_white else -eval_before_cp
+        if perspective_before < -UNDECIDED_THRESHOLD:
+            was_ever_losing = True
 
-            legal_count = board.legal_moves.count()
-            is_capture = move_is_capture
+        if was_ever_losing and pos_category != "losing":
+            effective_category = "post_losing"
+        else:
+            effective_category = pos_category
 
-            dest_rank = chess.square_rank(move.to_square)
-            advancement = dest_rank if player_is_white else (7 - dest_rank)
+        if not is_player_move or in_book:
+            # Only the top line matters here, whichever search produced it.
+            score = record["infos"][0].get("score")
+            if score:
+                cp = score.pov(chess.WHITE).score(mate_score=100000)
+                if cp is not None:
+                    prev_eval_cp = cp
+            continue
 
-            piece = board.piece_at(move.to_square)
-            piece_type = piece.piece_type if piece else 0
+        info_multi = record["infos"]
 
-            classification = _classify_move(cp_loss)
+        eval_after_cp = None
+        best_eval_cp = None
+        pv_moves = []
 
-            is_suspicious = (
-                rank == 1
-                and effective_category == "undecided"
-                and legal_count > 20
-                and not is_forced
-            )
+        for pv_idx, pv_info in enumerate(info_multi):
+            score = pv_info.get("score")
+            pv = pv_info.get("pv", [])
+            if score:
+                cp = score.pov(chess.WHITE).score(mate_score=100000)
+                if pv_idx == 0:
+                    eval_after_cp = cp
+                    best_eval_cp = cp
+                if cp is not None and pv:
+                    try:
+                        pv_san = board.san(pv[0])
+                    except Exception:
+                        pv_san = str(pv[0])
+                    pv_moves.append({"rank": pv_idx + 1, "move": pv_san, "eval_cp": cp})
+
+        if eval_after_cp is None:
+            eval_after_cp = prev_eval_cp
+
+        cp_loss_raw = eval_before_cp - eval_after_cp if player_is_white else eval_after_cp - eval_before_cp
+        cp_loss = max(0, cp_loss_raw)
+
+        wc_before = _cp_to_winning_chances(
+            eval_before_cp if player_is_white else -eval_before_cp
+        )
+        wc_after = _cp_to_winning_chances(
+            eval_after_cp if player_is_white else -eval_after_cp
+        )
+        wcl = max(0.0, wc_before - wc_after)
+
+        played_uci = move.uci()
+        rank = None
+        for pv_entry in pv_moves:
+            try:
+                candidate = board.parse_san(pv_entry["move"])
+                if candidate.uci() == played_uci:
+                    rank = pv_entry["rank"]
+                    break
+            except Exception:
+                continue
 
-            move_time_ms = move_times[ply_idx] if ply_idx < len(move_times) else 0
-            player_move_times_ms.append(move_time_ms)
-            move_time_cs = move_time_ms / 10.0
-
-            per_move.append({
-                "ply": ply_idx,
-                "move_san": move_san,
-                "cp_loss": round(cp_loss, 1),
-                "wcl": round(wcl, 4),
-                "rank": rank,
-                "is_forced": is_forced,
-                "position_category": effective_category,
-                "classification": classification,
-                "eval_before": eval_before_cp,
-                "eval_after": eval_after_cp,
-                "legal_moves": legal_count,
-                "is_suspicious": is_suspicious,
-                "move_time_ms": move_time_ms,
-                "pv_moves": pv_moves[:3],
-            })
-
-            tensor_moves.append([
-                round(wc_after, 4),
-                round(wcl, 4),
-                move_time_cs,
-                0,
-                0,
-                advancement,
-                legal_count,
-                1 if is_capture else 0,
-            ])
-            tensor_piece_types.append([piece_type])
-
-            prev_eval_cp = eval_after_cp
+        is_forced = False
+        if len(pv_moves) >= 2:
+            gap = abs(pv_moves[0]["eval_cp"] - pv_moves[1]["eval_cp"])
+            if gap >= FORCED_MOVE_THRESHOLD:
+                is_forced = True
+
+        legal_count = board.legal_moves.count()
+        is_capture = record["is_capture"]
+
+        dest_rank = chess.square_rank(move.to_square)
+        advancement = dest_rank if player_is_white else (7 - dest_rank)
+
+        piece = board.piece_at(move.to_square)
+        piece_type = piece.piece_type if piece else 0
+
+        classification = _classify_move(cp_loss)
+
+        is_suspicious = (
+            rank == 1
+            and effective_category == "undecided"
+            and legal_count > 20
+            and not is_forced
+        )
+
+        move_time_ms = move_times[ply_idx] if ply_idx < len(move_times) else 0
+        player_move_times_ms.append(move_time_ms)
+        move_time_cs = move_time_ms / 10.0
+
+        per_move.append({
+            "ply": ply_idx,
+            "move_san": move_san,
+            "cp_loss": round(cp_loss, 1),
+            "wcl": round(wcl, 4),
+            "rank": rank,
+            "is_forced": is_forced,
+            "position_category": effective_category,
+            "classification": classification,
+            "eval_before": eval_before_cp,
+            "eval_after": eval_after_cp,
+            "legal_moves": legal_count,
+            "is_suspicious": is_suspicious,
+            "move_time_ms": move_time_ms,
+            "pv_moves": pv_moves[:3],
+        })
+
+        tensor_moves.append([
+            round(wc_after, 4),
+            round(wcl, 4),
+            move_time_cs,
+            0,
+            0,
+            advancement,
+            legal_count,
+            1 if is_capture else 0,
+        ])
+        tensor_piece_types.append([piece_type])
+
+        prev_eval_cp = eval_after_cp
 
     avg_move_time_cs = 0.0
     if player_move_times_ms:
@@ -385,7 +426,7 @@ def run_cheat_analysis_from_sequence(
         "position_stats": position_stats,
         "move_classifications": per_move,
         "forced_moves_excluded": forced_count,
-        "book_moves_excluded": min(book_plies, len(move_list)),
+        "book_moves_excluded": min(book_plies, total_plies),
         "cp_loss_distribution": cp_dist,
         "suspicious_moves": [
             {"ply": m["ply"], "move_san": m["move_san"], "legal_moves": m["legal_moves"]}
@@ -402,6 +443,123 @@ def run_cheat_analysis_from_sequence(
     }
 
 
+def _resolve_sequence(move_list: list[str], start_fen: Optional[str], book_depth: int) -> tuple[str, int]:
+    if not move_list:
+        raise ValueError("Game has no moves to analyze.")
+    resolved_start_fen = (start_fen or Game.START_FEN or "").strip() or Game.START_FEN
+    book_plies = 0 if resolved_start_fen != Game.START_FEN else book_depth * 2
+    return resolved_start_fen, book_plies
+
+
+def _run_passes(
+    depth: int,
+    sweep_depths: Sequence[int],
+    run_pass: Callable[[int], dict],
+    on_pass: Optional[Callable[[dict], None]],
+    keep_refining: Optional[Callable[[], bool]],
+) -> dict:
+    """Call ``run_pass`` per depth of pass_depths(); results get pass_depth / passes / refined."""
+    depths = pass_depths(depth, sweep_depths)
+    result = {}
+    for number, pass_depth in enumerate(depths, start=1):
+        result = run_pass(pass_depth)
+        stamp = {"pass_depth": pass_depth, "passes": number, "refined": pass_depth == depth}
+        result.update(stamp)
+        # Dual results are saved per color, so each color carries the stamp too.
+        for color in ("white", "black"):
+            if isinstance(result.get(color), dict):
+                result[color].update(stamp)
+        if on_pass is not None:
+            try:
+                on_pass(result)
+            except Exception as exc:
+                logger.warning("Cheat analysis pass callback failed: %s", exc)
+        if pass_depth != depth and keep_refining is not None and not keep_refining():
+            break
+    return result
+
+
+def run_cheat_analysis_from_sequence(
+    move_list: list[str],
+    player_is_white: bool,
+    move_times_ms: Optional[list[int]] = None,
+    start_fen: Optional[str] = None,
+    player_rating: int = 800,
+    book_depth: int = DEFAULT_BOOK_DEPTH,
+    multipv: int = DEFAULT_MULTIPV,
+    depth: int = DEFAULT_DEPTH,
+    time_per_move: float = DEFAULT_TIME_PER_MOVE,
+    engine_path=None,
+    sweep_depths: Sequence[int] = (),
+    on_pass: Optional[Callable[[dict], None]] = None,
+    keep_refining: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Full cheat analysis on a move sequence for one color.
+
+    Returns a dict ready to populate CheatAnalysis fields. ``engine_path``
+    defaults to the verified local Stockfish.
+    """
+    resolved_start_fen, book_plies = _resolve_sequence(move_list, start_fen, book_depth)
+    player_color = chess.WHITE if player_is_white else chess.BLACK
+    plies = _replay_sequence(move_list, resolved_start_fen)
+
+    def run_pass(pass_depth: int) -> dict:
+        start_eval_cp, cache_summary = _evaluate_sequence(
+            plies, resolved_start_fen, {player_color}, book_plies, multipv, pass_depth, time_per_move, engine_path
+        )
+        result = _score_player(
+            plies, start_eval_cp, player_is_white, move_times_ms, player_rating, book_plies, len(move_list)
+        )
+        result["eval_cache"] = cache_summary
+        return result
+
+    return _run_passes(depth, sweep_depths, run_pass, on_pass, keep_refining)
+
+
+def run_dual_cheat_analysis_from_sequence(
+    move_list: list[str],
+    move_times_ms: Optional[list[int]] = None,
+    start_fen: Optional[str] = None,
+    white_rating: int = 800,
+    black_rating: int = 800,
+    book_depth: int = DEFAULT_BOOK_DEPTH,
+    multipv: int = DEFAULT_MULTIPV,
+    depth: int = DEFAULT_DEPTH,
+    time_per_move: float = DEFAULT_TIME_PER_MOVE,
+    engine_path=None,
+    sweep_depths: Sequence[int] = (),
+    on_pass: Optional[Callable[[dict], None]] = None,
+    keep_refining: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Cheat analysis for both colors from one pass over the game.
+
+    Every post-book ply is searched once at full multipv; each color's
+    statistics reuse the opponent's multipv search for the evaluation the
+    single-color analysis gets from its cheaper search. Returns
+    {"white": ..., "black": ..., "eval_cache": ...} with the per-color dicts
+    shaped like run_cheat_analysis_from_sequence().
+    """
+    resolved_start_fen, book_plies = _resolve_sequence(move_list, start_fen, book_depth)
+    plies = _replay_sequence(move_list, resolved_start_fen)
+
+    def run_pass(pass_depth: int) -> dict:
+        start_eval_cp, cache_summary = _evaluate_sequence(
+            plies, resolved_start_fen, {chess.WHITE, chess.BLACK}, book_plies, multipv, pass_depth, time_per_move,
+            engine_path,
+        )
+        result = {"eval_cache": cache_summary}
+        for color, is_white, rating in (("white", True, white_rating), ("black", False, black_rating)):
+            result[color] = _score_player(
+                plies, start_eval_cp, is_white, move_times_ms, rating, book_plies, len(move_list)
+            )
+            result[color]["eval_cache"] = cache_summary
+        return result
+
+    return _run_passes(depth, sweep_depths, run_pass, on_pass, keep_refining)
+
+
 def run_cheat_analysis(
     game: Game,
     target_user,
@@ -440,6 +598,38 @@ def run_cheat_analysis(
     )
 
 
+def run_dual_cheat_analysis(
+    game: Game,
+    book_depth: int = DEFAULT_BOOK_DEPTH,
+    multipv: int = DEFAULT_MULTIPV,
+    depth: int = DEFAULT_DEPTH,
+    time_per_move: float = DEFAULT_TIME_PER_MOVE,
+) -> dict:
+    """
+    Cheat analysis for both players of a game in one engine pass.
+
+    Returns {"white": ..., "black": ..., "eval_cache": ...}.
+    """
+    moves_raw = (game.moves or "").strip()
+    move_list = [m for m in moves_raw.split() if m] if moves_raw else []
+    if not move_list:
+        raise ValueError("Game has no moves to analyze.")
+
+    move_times_ms = game.move_times_ms if isinstance(game.move_times_ms, list) else []
+
+    return run_dual_cheat_analysis_from_sequence(
+        move_list,
+        move_times_ms=move_times_ms,
+        start_fen=Game.START_FEN,
+        white_rating=_get_player_rating(game, game.white, True),
+        black_rating=_get_player_rating(game, game.black, False),
+        book_depth=book_depth,
+        multipv=multipv,
+        depth=depth,
+        time_per_move=time_per_move,
+    )
+
+
 def _get_player_rating(game: Game, user, is_white: bool) -> int:
     tc = game.time_control
     rating_field = {
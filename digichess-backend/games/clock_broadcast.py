@@ -0,0 +1,163 @@
+"""
+Clock fan-out for games that actually have someone watching.
+
+Game sockets register themselves in a Redis hash (game id -> open socket count)
+on connect and remove themselves on disconnect. The periodic broadcaster reads
+that hash once, loads only the watched games that are still active in a single
+query, and pushes every clock payload in one event-loop pass instead of one
+async_to_sync round trip per game. Games nobody is watching cost nothing.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from utils.redis_client import get_async_redis, get_redis
+from .game_core import compute_clock_snapshot
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+WATCHERS_KEY = "game:watchers"
+
+CLOCK_GAME_FIELDS = (
+    "id",
+    "status",
+    "moves",
+    "current_fen",
+    "last_move_at",
+    "white_time_left",
+    "black_time_left",
+    "tournament_id",
+)
+
+
+def register_watcher(game_id) -> None:
+    r = get_redis()
+    if not r:
+        return
+    try:
+        r.hincrby(WATCHERS_KEY, str(game_id), 1)
+    except Exception:
+        pass
+
+
+def unregister_watcher(game_id) -> None:
+    r = get_redis()
+    if not r:
+        return
+    try:
+        if r.hincrby(WATCHERS_KEY, str(game_id), -1) <= 0:
+            r.hdel(WATCHERS_KEY, str(game_id))
+    except Exception:
+        pass
+
+
+async def aregister_watcher(game_id) -> None:
+    r = await get_async_redis()
+    if not r:
+        return
+    try:
+        await r.hincrby(WATCHERS_KEY, str(game_id), 1)
+    except Exception:
+        pass
+
+
+async def aunregister_watcher(game_id) -> None:
+    r = await get_async_redis()
+    if not r:
+        return
+    try:
+        if await r.hincrby(WATCHERS_KEY, str(game_id), -1) <= 0:
+            await r.hdel(WATCHERS_KEY, str(game_id))
+    except Exception:
+        pass
+
+
+def watched_game_ids(r) -> Optional[List[int]]:
+    """Game ids with at least one open socket, or None if Redis is unavailable."""
+    if not r:
+        return None
+    try:
+        counts = r.hgetall(WATCHERS_KEY) or {}
+    except Exception:
+        return None
+    ids = []
+    for game_id, count in counts.items():
+        try:
+            if int(count) > 0:
+                ids.append(int(game_id))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def build_clock_payloads(games: Iterable[Game], now=None) -> List[Dict]:
+    if now is None:
+        now = timezone.now()
+    payloads = []
+    for game in games:
+        snapshot = compute_clock_snapshot(game, now=now)
+        payloads.append(
+            {
+                "type": "clock",
+                "game_id": game.id,
+                "white_time_left": snapshot["white_time_left"],
+                "black_time_left": snapshot["black_time_left"],
+                "turn": snapshot["turn"],
+            }
+        )
+    return payloads
+
+
+async def _send_all(channel_layer, payloads: List[Dict]) -> None:
+    results = await asyncio.gather(
+        *[
+            channel_layer.group_send(
+                f"game_{payload['game_id']}",
+                {"type": "game.event", "payload": payload},
+            )
+            for payload in payloads
+        ],
+        return_exceptions=True,
+    )
+    failures = [res for res in results if isinstance(res, Exception)]
+    if failures:
+        logger.warning("Clock broadcast failed for %s game(s): %s", len(failures), failures[0])
+
+
+def send_clock_payloads(channel_layer, payloads: List[Dict]) -> None:
+    if not payloads:
+        return
+    async_to_sync(_send_all)(channel_layer, payloads)
+
+
+def broadcast_watched_clocks(channel_layer=None, now=None) -> int:
+    """Send a clock update to every watched, active game. Returns the number of games sent."""
+    channel_layer = channel_layer or get_channel_layer()
+    if not channel_layer:
+        return 0
+    r = get_redis()
+    game_ids = watched_game_ids(r)
+    if game_ids is None:
+        # No watcher registry without Redis; fall back to every active game.
+        games = Game.objects.filter(status=Game.STATUS_ACTIVE).only(*CLOCK_GAME_FIELDS)
+    elif not game_ids:
+        return 0
+    else:
+        games = list(
+            Game.objects.filter(id__in=game_ids, status=Game.STATUS_ACTIVE).only(*CLOCK_GAME_FIELDS)
+        )
+        stale = set(game_ids) - {game.id for game in games}
+        if stale:
+            # Finished or deleted games: drop them so leaked counts don't linger.
+            try:
+                r.hdel(WATCHERS_KEY, *[str(game_id) for game_id in stale])
+            except Exception:
+                pass
+    payloads = build_clock_payloads(games, now=now)
+    send_clock_payloads(channel_layer, payloads)
+    return len(payloads)
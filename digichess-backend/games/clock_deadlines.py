@@ -0,0 +1,106 @@
+"""
+Clock deadline index for flag detection.
+
+Every running clock has a single "flag time": the moment the side to move runs
+out of time if it does not move. Those times live in a Redis sorted set
+(member = game id, score = unix timestamp), written by apply_move after each
+move. The timeout task only pops the members whose deadline has passed, so a
+timeout sweep costs O(expired games) instead of O(active games).
+
+The index is a hint, not the source of truth: popped games are re-checked
+against the database clock before they are flagged, and reindex_active_games
+rebuilds the set from Postgres to cover games created while Redis was away.
+"""
+import logging
+from typing import Iterable, List, Optional
+
+import chess
+
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_ZSET_KEY = "game:clock:deadlines"
+POP_BATCH_SIZE = 500
+
+
+def flag_deadline(game: Game, board: Optional[chess.Board] = None, is_tournament: bool = False) -> Optional[float]:
+    """Unix timestamp at which the side to move flags, or None if the clock is not running."""
+    if game.status != Game.STATUS_ACTIVE or not game.last_move_at:
+        return None
+    move_count = len((game.moves or "").strip().split()) if game.moves else 0
+    # Same rule as compute_clock_snapshot: regular games start the clock after both first moves.
+    if not is_tournament and move_count < 2:
+        return None
+    if board is None:
+        try:
+            board = chess.Board(game.current_fen or chess.STARTING_FEN)
+        except Exception:
+            board = chess.Board()
+    time_left = game.white_time_left if board.turn is chess.WHITE else game.black_time_left
+    return game.last_move_at.timestamp() + max(0, time_left)
+
+
+def schedule_game_deadline(r, game: Game, board: Optional[chess.Board] = None, is_tournament: bool = False) -> None:
+    if not r:
+        return
+    try:
+        deadline = flag_deadline(game, board, is_tournament=is_tournament)
+        if deadline is None:
+            r.zrem(DEADLINE_ZSET_KEY, game.id)
+        else:
+            r.zadd(DEADLINE_ZSET_KEY, {game.id: deadline})
+    except Exception:
+        pass
+
+
+def clear_game_deadline(r, game_id: int) -> None:
+    if not r:
+        return
+    try:
+        r.zrem(DEADLINE_ZSET_KEY, game_id)
+    except Exception:
+        pass
+
+
+def pop_expired_game_ids(r, now, limit: int = POP_BATCH_SIZE) -> List[int]:
+    """
+    Claim the games whose flag time has passed.
+
+    A member only counts as claimed when our ZREM removed it, so concurrent
+    schedulers never process the same game twice.
+    """
+    try:
+        members = r.zrangebyscore(DEADLINE_ZSET_KEY, "-inf", now.timestamp(), start=0, num=limit)
+    except Exception:
+        return []
+    claimed = []
+    for member in members:
+        try:
+            if r.zrem(DEADLINE_ZSET_KEY, member):
+                claimed.append(int(member))
+        except Exception:
+            continue
+    return claimed
+
+
+def reindex_active_games(r, games: Optional[Iterable[Game]] = None) -> int:
+    """Rebuild deadline entries for all active games from the database."""
+    if not r:
+        return 0
+    if games is None:
+        games = Game.objects.filter(status=Game.STATUS_ACTIVE).only(
+            "id", "status", "moves", "current_fen", "last_move_at", "white_time_left", "black_time_left", "tournament_id"
+        )
+    mapping = {}
+    for game in games:
+        deadline = flag_deadline(game, is_tournament=game.is_tournament)
+        if deadline is not None:
+            mapping[game.id] = deadline
+    if mapping:
+        try:
+            r.zadd(DEADLINE_ZSET_KEY, mapping)
+        except Exception:
+            logger.warning("Could not reindex clock deadlines", exc_info=True)
+            return 0
+    return len(mapping)
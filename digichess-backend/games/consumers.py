@@ -1,12 +1,20 @@
 import json
+import logging
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 
+from .bot_moves import schedule_bot_move
+from .clock_broadcast import aregister_watcher, aunregister_watcher
+from .game_core import apply_move
+from .game_state_codec import encode_game
 from .models import Game
+from .move_executor import MoveExecutorBusy, game_state_payload, move_executor
 from .serializers import GameSerializer
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class BaseGameConsumer(AsyncWebsocketConsumer):
@@ -16,11 +24,13 @@ class BaseGameConsumer(AsyncWebsocketConsumer):
         self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
         self.group_name = f"game_{self.game_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await aregister_watcher(self.game_id)
         await self.accept()
 
     async def disconnect(self, code):
         if self.group_name:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await aunregister_watcher(self.game_id)
 
     async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
@@ -33,10 +43,26 @@ class BaseGameConsumer(AsyncWebsocketConsumer):
             
             if message_type == "chat":
                 await self._handle_chat_message(data)
-        except (json.JSONDecodeError, KeyError) as e:
+            elif message_type == "move":
+                await self._handle_move_message(data)
+        except (json.JSONDecodeError, KeyError, AttributeError) as e:
             # Invalid message format, ignore
             pass
 
+    async def _handle_move_message(self, data):
+        """Players can move by WebSocket; spectator sockets only watch."""
+        await self._send_move_ack(data.get("id"), ok=False, error="Moves are not accepted on this socket.")
+
+    async def _send_move_ack(self, client_id, ok: bool, error=None, seq=None, state=None, retry=False):
+        ack = {"type": "moveAck", "id": client_id, "ok": ok, "seq": seq}
+        if error:
+            ack["error"] = error
+        if retry:
+            ack["retry"] = True
+        if state:
+            ack.update({"san": state.get("san"), "uci": state.get("uci"), "fen": state.get("fen")})
+        await self.send(text_data=json.dumps(ack))
+
     async def _handle_chat_message(self, data):
         """Handle chat message from client"""
         import sys
@@ -168,6 +194,109 @@ class GameConsumer(BaseGameConsumer):
                 "sync": True
             }))
 
+    async def _handle_move_message(self, data):
+        """
+        Apply a move sent as {"type": "move", "move": "e4", "id": <client id>}.
+
+        The mover gets a moveAck carrying the event-stream seq (or the error);
+        everyone in the game group, the mover included, then gets gameState.
+        """
+        client_id = data.get("id")
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            await self._send_move_ack(client_id, ok=False, error="Authentication required.")
+            return
+        move = data.get("move")
+        if not isinstance(move, str) or not move.strip() or len(move) > 20:
+            await self._send_move_ack(client_id, ok=False, error="Invalid move.")
+            return
+
+        try:
+            result = await move_executor.run(apply_move, int(self.game_id), user, move.strip())
+        except MoveExecutorBusy as exc:
+            await self._send_move_ack(client_id, ok=False, error=str(exc), retry=True)
+            return
+        except Exception as exc:
+            logger.exception("WebSocket move failed for game %s: %s", self.game_id, exc)
+            await self._send_move_ack(client_id, ok=False, error="Move failed. Please retry.", retry=True)
+            return
+
+        await self._send_move_ack(
+            client_id,
+            ok=result.ok,
+            error=None if result.ok else (result.error or "Illegal move."),
+            seq=result.seq,
+            state=result.state if result.ok else None,
+        )
+        if not (result.state and result.game):
+            return
+
+        await self.channel_layer.group_send(
+            self.group_name,
+            {
+                "type": "game.event",
+                "payload": game_state_payload(
+                    result.game, result.state, result.legal_moves or [], result.legal_moves_uci or []
+                ),
+            },
+        )
+        if result.draw_offer_cleared:
+            await self.channel_layer.group_send(
+                self.group_name,
+                {
+                    "type": "game.event",
+                    "payload": {"type": "draw_response", "game_id": result.game.id, "decision": "auto_decline"},
+                },
+            )
+
+        if result.finished:
+            try:
+                game_data = await _run_committed(_finish_game, result.game)
+            except Exception as exc:
+                logger.warning("Finishing game %s after a WebSocket move failed: %s", self.game_id, exc)
+                return
+            await self.channel_layer.group_send(
+                self.group_name,
+                {
+                    "type": "game.event",
+                    "payload": {
+                        "type": "game_finished",
+                        "game_id": result.game.id,
+                        "result": game_data.get("result"),
+                        "reason": result.finish_reason,
+                        "game": game_data,
+                    },
+                },
+            )
+        elif result.ok:
+            try:
+                await _run_committed(schedule_bot_move, result.game)
+            except Exception as exc:
+                logger.warning("Scheduling the bot reply in game %s failed: %s", self.game_id, exc)
+
+
+async def _run_committed(fn, *args):
+    """
+    Follow-up work for a move that is already committed.
+
+    A saturated executor must not drop it (or close the socket), so it then
+    runs on the default sync thread pool instead.
+    """
+    try:
+        return await move_executor.run(fn, *args)
+    except MoveExecutorBusy:
+        return await database_sync_to_async(fn)(*args)
+
+
+def _finish_game(game: Game) -> dict:
+    """Rating update and final snapshot for a game a WebSocket move just ended."""
+    from .views import FinishGameView
+
+    game.refresh_from_db()
+    if game.rated and game.result in {Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW}:
+        FinishGameView().update_ratings(game, game.result)
+    return encode_game(game)
+
 
 class SpectateConsumer(BaseGameConsumer):
     async def connect(self):
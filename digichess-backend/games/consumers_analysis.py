@@ -0,0 +1,52 @@
+import json
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .analysis_jobs import ANALYSIS_GROUP, progress_snapshot, unwatch, watch
+from .models import GameAnalysis
+
+
+class AnalysisConsumer(AsyncWebsocketConsumer):
+    """
+    Progress of the full analysis of one game (games.analysis_jobs).
+
+    Sends the job's current state on connect, then analysis_queued /
+    analysis_started / analysis_progress (one per ply) / analysis_pass (one
+    per depth) / analysis_completed / analysis_failed events as the engine
+    worker publishes them. An open socket keeps refinement passes running.
+    """
+
+    async def connect(self):
+        self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        self.group_name = ANALYSIS_GROUP.format(self.game_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await sync_to_async(watch)(self.game_id)
+        await self.send(text_data=json.dumps(await self._snapshot()))
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name") and self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await sync_to_async(unwatch)(self.game_id)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        return
+
+    async def analysis_event(self, event):
+        await self.send(text_data=json.dumps(event.get("payload", {})))
+
+    @database_sync_to_async
+    def _snapshot(self) -> dict:
+        record = GameAnalysis.objects.filter(game_id=self.game_id).only("status", "error").first()
+        state = record.status if record else "not_requested"
+        return {
+            "type": "analysis_status",
+            "game_id": int(self.game_id),
+            "status": state,
+            "error": (record.error or None) if record else None,
+            "progress": progress_snapshot(self.game_id)
+            if state in (GameAnalysis.STATUS_QUEUED, GameAnalysis.STATUS_RUNNING)
+            else None,
+        }
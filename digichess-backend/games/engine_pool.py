@@ -0,0 +1,313 @@
+"""
+Warm UCI engine processes shared by bots, analysis and cheat detection.
+
+Starting Stockfish costs tens of milliseconds and lc0 reloads its network
+weights on every launch, which used to dominate bot move latency. EnginePool
+keeps idle engines per (command, startup options) key for the life of the
+process -- one pool per Celery worker or web process -- and hands them out
+through checkout().
+
+Options passed to checkout() apply to that checkout only: anything a previous
+caller set and the next caller did not ask for is reset to the engine default,
+so one bot's Skill Level never leaks into another bot or into analysis.
+Options that are expensive to change (lc0 WeightsFile) go in startup_options
+instead and become part of the pool key.
+
+An engine that fails during use is closed instead of returned, and idle
+engines are pinged before reuse once they have been idle for a while.
+
+Settings (config/settings.py, overridable from the environment):
+ENGINE_POOL_MAX_IDLE          idle engines kept per key (default 2)
+ENGINE_POOL_MAX_PER_KEY       engines checked out at once per key (default 4)
+ENGINE_POOL_ACQUIRE_TIMEOUT   seconds to wait for a free slot (default 30)
+ENGINE_POOL_HEALTH_CHECK_IDLE seconds idle before a ping on checkout (default 30)
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import chess.engine
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EngineCommand = Union[str, List[str]]
+
+# Failures that mean the engine process itself can no longer be trusted.
+ENGINE_FAILURES = (
+    chess.engine.EngineError,
+    chess.engine.EngineTerminatedError,
+    TimeoutError,
+    OSError,
+)
+
+
+class EnginePoolTimeout(RuntimeError):
+    """No engine slot became free within the acquire timeout."""
+
+
+@dataclass
+class _PooledEngine:
+    engine: chess.engine.SimpleEngine
+    key: tuple
+    configured: Dict[str, object] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class _KeyPool:
+    def __init__(self, max_per_key: int):
+        self.idle: List[_PooledEngine] = []
+        self.slots = threading.BoundedSemaphore(max_per_key)
+        self.in_use = 0
+
+
+class EnginePool:
+    def __init__(
+        self,
+        max_idle: Optional[int] = None,
+        max_per_key: Optional[int] = None,
+        acquire_timeout: Optional[float] = None,
+        health_check_idle: Optional[float] = None,
+    ):
+        self.max_idle = max_idle if max_idle is not None else settings.ENGINE_POOL_MAX_IDLE
+        self.max_per_key = max(
+            1, max_per_key if max_per_key is not None else settings.ENGINE_POOL_MAX_PER_KEY
+        )
+        self.acquire_timeout = (
+            acquire_timeout if acquire_timeout is not None else settings.ENGINE_POOL_ACQUIRE_TIMEOUT
+        )
+        self.health_check_idle = (
+            health_check_idle
+            if health_check_idle is not None
+            else settings.ENGINE_POOL_HEALTH_CHECK_IDLE
+        )
+        self._lock = threading.Lock()
+        self._pools: Dict[tuple, _KeyPool] = {}
+        self._pid = os.getpid()
+        self._metrics = self._empty_metrics()
+
+    @staticmethod
+    def _empty_metrics() -> Dict[str, float]:
+        return {
+            "checkouts": 0,
+            "spawned": 0,
+            "reused": 0,
+            "discarded": 0,
+            "restarts": 0,
+            "timeouts": 0,
+            "spawn_ms_total": 0.0,
+            "wait_ms_total": 0.0,
+        }
+
+    @staticmethod
+    def _key(command: EngineCommand, startup_options: Optional[dict]) -> tuple:
+        cmd = tuple(command) if isinstance(command, (list, tuple)) else (str(command),)
+        opts = tuple(sorted((str(k), str(v)) for k, v in (startup_options or {}).items()))
+        return cmd, opts
+
+    def _check_fork(self) -> None:
+        # Engines (and their I/O threads) belong to the process that spawned
+        # them; a forked Celery worker starts with an empty pool.
+        if os.getpid() != self._pid:
+            with self._lock:
+                if os.getpid() != self._pid:
+                    self._pools = {}
+                    self._metrics = self._empty_metrics()
+                    self._pid = os.getpid()
+
+    def _pool_for(self, key: tuple) -> _KeyPool:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _KeyPool(self.max_per_key)
+                self._pools[key] = pool
+            return pool
+
+    def _bump(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _spawn(self, key: tuple, command: EngineCommand, startup_options: Optional[dict]) -> _PooledEngine:
+        start = time.perf_counter()
+        engine = chess.engine.SimpleEngine.popen_uci(command)
+        try:
+            if startup_options:
+                engine.configure(startup_options)
+        except Exception:
+            self._close(engine)
+            raise
+        self._bump("spawned")
+        self._bump("spawn_ms_total", (time.perf_counter() - start) * 1000)
+        return _PooledEngine(engine=engine, key=key)
+
+    @staticmethod
+    def _close(engine: chess.engine.SimpleEngine) -> None:
+        try:
+            engine.quit()
+        except Exception:
+            try:
+                engine.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, entry: _PooledEngine) -> bool:
+        try:
+            if entry.engine.protocol.returncode.done():
+                return False
+        except Exception:
+            return False
+        if time.monotonic() - entry.last_used < self.health_check_idle:
+            return True
+        try:
+            entry.engine.ping()
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self, command: EngineCommand, startup_options: Optional[dict]) -> Tuple[_KeyPool, _PooledEngine]:
+        self._check_fork()
+        key = self._key(command, startup_options)
+        pool = self._pool_for(key)
+        start = time.perf_counter()
+        if not pool.slots.acquire(timeout=self.acquire_timeout):
+            self._bump("timeouts")
+            raise EnginePoolTimeout(f"No free engine for {key[0][0]} after {self.acquire_timeout}s")
+        try:
+            entry = None
+            with self._lock:
+                if pool.idle:
+                    entry = pool.idle.pop()
+            if entry is not None and not self._is_alive(entry):
+                logger.warning("Pooled engine %s is unresponsive; restarting it", key[0][0])
+                self._close(entry.engine)
+                self._bump("restarts")
+                entry = None
+            if entry is None:
+                entry = self._spawn(key, command, startup_options)
+            else:
+                self._bump("reused")
+        except BaseException:
+            pool.slots.release()
+            raise
+        with self._lock:
+            pool.in_use += 1
+            self._metrics["checkouts"] += 1
+            self._metrics["wait_ms_total"] += (time.perf_counter() - start) * 1000
+        return pool, entry
+
+    def _release(self, pool: _KeyPool, entry: _PooledEngine, healthy: bool) -> None:
+        entry.last_used = time.monotonic()
+        entry.uses += 1
+        keep = False
+        with self._lock:
+            pool.in_use -= 1
+            if healthy and os.getpid() == self._pid and len(pool.idle) < self.max_idle:
+                pool.idle.append(entry)
+                keep = True
+        if not keep:
+            self._close(entry.engine)
+            if not healthy:
+                self._bump("discarded")
+        pool.slots.release()
+
+    @staticmethod
+    def _apply_options(entry: _PooledEngine, options: dict) -> None:
+        engine = entry.engine
+        changes = {}
+        for name in entry.configured:
+            if name not in options and name in engine.options:
+                changes[name] = engine.options[name].default
+        for name, value in options.items():
+            if name not in entry.configured or entry.configured[name] != value:
+                changes[name] = value
+        if changes:
+            engine.configure(changes)
+        entry.configured = dict(options)
+
+    @contextmanager
+    def checkout(
+        self,
+        command: EngineCommand,
+        options: Optional[dict] = None,
+        startup_options: Optional[dict] = None,
+    ) -> Iterator[chess.engine.SimpleEngine]:
+        """
+        Borrow a warm engine for ``command``.
+
+        ``options`` are applied for this checkout only; ``startup_options`` are
+        set once when the process starts and select a separate pool.
+        """
+        pool, entry = self._acquire(command, startup_options)
+        try:
+            self._apply_options(entry, options or {})
+        except BaseException:
+            # Half-applied options: never hand this engine to anyone else.
+            self._release(pool, entry, healthy=False)
+            raise
+        healthy = False
+        try:
+            yield entry.engine
+            healthy = True
+        except ENGINE_FAILURES:
+            raise
+        except Exception:
+            # Caller-side error between engine calls: the engine itself is fine.
+            healthy = True
+            raise
+        finally:
+            self._release(pool, entry, healthy)
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            pools = {
+                " ".join(key[0]) + (f" {dict(key[1])}" if key[1] else ""): {
+                    "idle": len(pool.idle),
+                    "in_use": pool.in_use,
+                }
+                for key, pool in self._pools.items()
+            }
+        checkouts = metrics["checkouts"] or 1
+        metrics["spawn_ms_avg"] = round(metrics["spawn_ms_total"] / (metrics["spawned"] or 1), 2)
+        metrics["wait_ms_avg"] = round(metrics["wait_ms_total"] / checkouts, 2)
+        metrics["reuse_rate"] = round(metrics["reused"] / checkouts, 3) if metrics["checkouts"] else 0.0
+        metrics["spawn_ms_total"] = round(metrics["spawn_ms_total"], 2)
+        metrics["wait_ms_total"] = round(metrics["wait_ms_total"], 2)
+        metrics["pools"] = pools
+        return metrics
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle = [entry for pool in self._pools.values() for entry in pool.idle]
+            for pool in self._pools.values():
+                pool.idle = []
+        for entry in idle:
+            self._close(entry.engine)
+
+
+engine_pool = EnginePool()
+
+# python-chess runs each engine's I/O loop on a non-daemon thread, and the
+# interpreter joins those before ordinary atexit handlers run, so idle engines
+# would keep a finished process alive. concurrent.futures uses the same hook.
+_register_shutdown = getattr(threading, "_register_atexit", atexit.register)
+_register_shutdown(engine_pool.close_all)
+
+
+@contextmanager
+def stockfish_engine(engine_path: str, options: Optional[dict] = None) -> Iterator[chess.engine.SimpleEngine]:
+    """Pooled Stockfish; an engine that cannot start makes the registry re-validate the binary."""
+    try:
+        with engine_pool.checkout(engine_path, options=options) as engine:
+            yield engine
+    except OSError as exc:
+        from .engine_registry import engine_registry
+
+        engine_registry.report_failure(engine_path, exc)
+        raise
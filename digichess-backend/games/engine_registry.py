@@ -0,0 +1,176 @@
+"""
+Process-wide record of which Stockfish binary works.
+
+ensure_stockfish_works() proves a binary by launching it and running a short
+search, and get_stockfish_path() may fall back to compiling the repo copy, so
+neither belongs in front of every bot move or analysis. EngineRegistry runs
+that discovery once per process -- on a background thread at Celery worker
+process start through warm(), or lazily on first use -- and serves the answer from memory afterwards:
+
+- a working binary is trusted for ENGINE_REGISTRY_TTL seconds; after that only
+  a cheap exists/executable check runs, never another engine launch;
+- a failed discovery is remembered for ENGINE_REGISTRY_RETRY seconds so a
+  broken install does not launch (or compile) on every request;
+- report_failure() -- called by engine_pool.stockfish_engine when a pooled
+  engine cannot start -- marks the entry stale so the next lookup re-validates.
+
+status() feeds GET /api/games/engines/status/.
+
+Settings (config/settings.py, overridable from the environment):
+ENGINE_REGISTRY_TTL    seconds a validated binary is trusted (default 3600)
+ENGINE_REGISTRY_RETRY  seconds before a failed discovery is retried (default 30)
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EngineCheck = Tuple[bool, str, str]
+
+
+def _discover(requested: Optional[str]) -> EngineCheck:
+    from .stockfish_utils import ensure_stockfish_works, get_stockfish_path
+
+    return ensure_stockfish_works(requested or get_stockfish_path())
+
+
+@dataclass
+class _Entry:
+    ok: bool
+    message: str
+    path: str
+    checked_at: float
+    validated_at: float
+    validations: int = 0
+    failures: int = 0
+    stale: bool = False
+    last_error: str = ""
+
+    @property
+    def result(self) -> EngineCheck:
+        return self.ok, self.message, self.path
+
+
+class EngineRegistry:
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        retry_after: Optional[float] = None,
+        discover: Callable[[Optional[str]], EngineCheck] = _discover,
+    ):
+        self.ttl = ttl if ttl is not None else settings.ENGINE_REGISTRY_TTL
+        self.retry_after = retry_after if retry_after is not None else settings.ENGINE_REGISTRY_RETRY
+        self._discover = discover
+        self._entries: Dict[Optional[str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._validate_lock = threading.Lock()
+        self._metrics = {"lookups": 0, "validations": 0, "reported_failures": 0}
+
+    def _usable(self, entry: Optional[_Entry], now: float) -> bool:
+        if entry is None or entry.stale:
+            return False
+        age = now - entry.checked_at
+        if not entry.ok:
+            return age < self.retry_after
+        if age < self.ttl:
+            return True
+        # Past the TTL: confirm the file is still there without launching it.
+        if os.path.isfile(entry.path) and os.access(entry.path, os.X_OK):
+            entry.checked_at = now
+            return True
+        return False
+
+    def resolve(self, engine_path: Optional[str] = None) -> EngineCheck:
+        """(ok, message, path) for ``engine_path``, or for the default Stockfish when None."""
+        key = engine_path or None
+        with self._lock:
+            self._metrics["lookups"] += 1
+            entry = self._entries.get(key)
+            if self._usable(entry, time.monotonic()):
+                return entry.result
+
+        # One discovery at a time: concurrent callers wait for it and share the answer.
+        with self._validate_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if self._usable(entry, time.monotonic()):
+                    return entry.result
+            try:
+                ok, message, path = self._discover(key)
+            except Exception as exc:
+                ok, message, path = False, f"Stockfish check failed: {exc}", key or ""
+            now = time.monotonic()
+            with self._lock:
+                self._metrics["validations"] += 1
+                previous = self._entries.get(key)
+                entry = _Entry(
+                    ok=bool(ok),
+                    message=message,
+                    path=path or key or "",
+                    checked_at=now,
+                    validated_at=now,
+                    validations=(previous.validations if previous else 0) + 1,
+                    failures=(previous.failures if previous else 0) + (0 if ok else 1),
+                    last_error=message if not ok else (previous.last_error if previous else ""),
+                )
+                self._entries[key] = entry
+            if not ok:
+                logger.warning("Stockfish unavailable (%s): %s", key or "default", message)
+            return entry.result
+
+    def report_failure(self, engine_path: str, error: object = None) -> None:
+        """An engine at ``engine_path`` failed to start: re-validate on the next lookup."""
+        with self._lock:
+            self._metrics["reported_failures"] += 1
+            for key, entry in self._entries.items():
+                if entry.path == engine_path or key == engine_path:
+                    entry.stale = True
+                    entry.failures += 1
+                    if error is not None:
+                        entry.last_error = str(error)
+
+    def forget(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def warm(self) -> EngineCheck:
+        """Discover the default Stockfish now instead of on the first bot move."""
+        return self.resolve()
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            engines = [
+                {
+                    "requested": key or "default",
+                    "path": entry.path,
+                    "ok": entry.ok,
+                    "stale": entry.stale,
+                    "message": entry.message,
+                    "validated_seconds_ago": round(now - entry.validated_at, 1),
+                    "validations": entry.validations,
+                    "failures": entry.failures,
+                    "last_error": entry.last_error or None,
+                }
+                for key, entry in self._entries.items()
+            ]
+            return {
+                "engines": engines,
+                "ttl_seconds": self.ttl,
+                "retry_seconds": self.retry_after,
+                **self._metrics,
+            }
+
+
+engine_registry = EngineRegistry()
+
+
+def verified_stockfish_path(engine_path: Optional[str] = None) -> EngineCheck:
+    """ensure_stockfish_works() through the process registry; see EngineRegistry.resolve()."""
+    return engine_registry.resolve(engine_path)
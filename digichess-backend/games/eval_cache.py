@@ -0,0 +1,527 @@
+"""
+Position evaluation cache shared by game analysis, quick eval and cheat detection.
+
+Entries are keyed by normalized FEN (EPD: pieces, side to move, castling and
+en passant, without move clocks), requested search depth and multipv, so a
+position reached in many games, or at a different move number, is searched
+once. Redis is the hot tier (EVAL_CACHE_TTL seconds, default 7 days);
+PositionEval rows are the durable spillover that outlives Redis eviction and
+restarts. Without Redis the table serves alone.
+
+Lines are stored from White's point of view ({"cp", "mate", "pv", "depth"}
+with UCI moves) and rebuilt into python-chess info dicts or Lichess cloud-eval
+dicts, so callers produce the same output from a hit as from a fresh search.
+Each line records the depth its search actually reached. A cached entry only
+counts as a hit when that depth is at least the one asked for (or the line is
+a forced mate), so a search cut short by a time limit, or a shallower cloud
+answer, is never served in place of a full-depth one; it is searched again
+and replaced.
+
+Per-call hit counts come from EvalSession.summary(); process-wide counters
+from eval_cache.stats().
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+import chess
+import chess.engine
+from django.conf import settings
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "evalcache:v1"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+MATE_SCORE = 100000
+DB_CHUNK_SIZE = 500
+
+
+def normalize_fen(position) -> str:
+    board = position if isinstance(position, chess.Board) else chess.Board(position)
+    return board.epd()
+
+
+def lines_from_infos(infos: List[dict]) -> Optional[List[dict]]:
+    """Engine InfoDicts -> cacheable lines, or None if any line has no score."""
+    lines = []
+    for info in infos:
+        score = info.get("score")
+        if score is None:
+            return None
+        white = score.white()
+        lines.append(
+            {
+                "cp": white.score(mate_score=MATE_SCORE),
+                "mate": white.mate(),
+                "pv": [move.uci() for move in info.get("pv", [])],
+                "depth": info.get("depth", 0),
+            }
+        )
+    return lines or None
+
+
+def _score_from_line(line: dict) -> chess.engine.PovScore:
+    mate = line.get("mate")
+    if mate is None:
+        score = chess.engine.Cp(int(line.get("cp") or 0))
+    elif mate == 0:
+        score = chess.engine.MateGiven if (line.get("cp") or 0) > 0 else chess.engine.Mate(0)
+    else:
+        score = chess.engine.Mate(mate)
+    return chess.engine.PovScore(score, chess.WHITE)
+
+
+def infos_from_lines(lines: List[dict]) -> List[dict]:
+    infos = []
+    for line in lines:
+        info = {
+            "score": _score_from_line(line),
+            "pv": [chess.Move.from_uci(uci) for uci in line.get("pv", [])],
+            "depth": line.get("depth", 0),
+        }
+        if len(lines) > 1:
+            info["multipv"] = len(infos) + 1
+        infos.append(info)
+    return infos
+
+
+def lines_from_cloud(data: dict) -> Optional[List[dict]]:
+    lines = []
+    for pv in data.get("pvs") or []:
+        lines.append(
+            {
+                "cp": pv.get("cp"),
+                "mate": pv.get("mate"),
+                "pv": (pv.get("moves") or "").split(),
+                "depth": data.get("depth", 0),
+            }
+        )
+    return lines or None
+
+
+def reached_depth(entry: Optional[dict]) -> int:
+    lines = (entry or {}).get("lines") or []
+    return int(lines[0].get("depth") or 0) if lines else 0
+
+
+def deep_enough(entry: Optional[dict], depth: int) -> bool:
+    """True when ``entry`` can stand in for a search to ``depth``."""
+    if not entry or not entry.get("lines"):
+        return False
+    return reached_depth(entry) >= depth or entry["lines"][0].get("mate") is not None
+
+
+def cloud_from_entry(entry: dict, fen: str) -> dict:
+    pvs = []
+    for line in entry["lines"]:
+        pv = {"moves": " ".join(line.get("pv", []))}
+        if line.get("mate") is not None:
+            pv["mate"] = line["mate"]
+        else:
+            pv["cp"] = line.get("cp")
+        pvs.append(pv)
+    return {
+        "fen": fen,
+        "depth": entry["lines"][0].get("depth", 0) if entry["lines"] else 0,
+        "knodes": entry.get("knodes", 0),
+        "pvs": pvs,
+    }
+
+
+class EvalCache:
+    def __init__(self, ttl: Optional[int] = None, flush_size: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.EVAL_CACHE_TTL
+        self.flush_size = flush_size if flush_size is not None else settings.EVAL_CACHE_FLUSH_SIZE
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, dict] = {}
+        self._stats = {"lookups": 0, "redis_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def _key(fen: str, depth: int, multipv: int) -> str:
+        return f"{KEY_PREFIX}:{depth}:{multipv}:{fen}"
+
+    def _count(self, r, **amounts) -> None:
+        with self._lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+        if r:
+            try:
+                pipe = r.pipeline(transaction=False)
+                for name, amount in amounts.items():
+                    if amount:
+                        pipe.hincrby(STATS_KEY, name, amount)
+                pipe.execute()
+            except Exception:
+                pass
+
+    def get_many(self, fens: Iterable[str], depth: int, multipv: int = 1) -> Dict[str, dict]:
+        """Look up normalized FENs; returns {fen: entry} for the ones that are cached."""
+        fens = list(dict.fromkeys(fens))
+        if not fens:
+            return {}
+        found: Dict[str, dict] = {}
+        r = get_redis()
+        if r:
+            try:
+                raw = r.mget([self._key(fen, depth, multipv) for fen in fens])
+                for fen, value in zip(fens, raw):
+                    if value:
+                        found[fen] = json.loads(value)
+            except Exception as exc:
+                logger.debug("Eval cache Redis read failed: %s", exc)
+        redis_hits = len(found)
+
+        with self._lock:
+            for fen in fens:
+                pending = self._pending.get((fen, depth, multipv))
+                if fen not in found and pending:
+                    found[fen] = pending
+
+        missing = [fen for fen in fens if fen not in found]
+        db_found = self._load_from_db(missing, depth, multipv)
+        if db_found:
+            found.update(db_found)
+            self._promote(r, db_found, depth, multipv)
+
+        self._count(
+            r,
+            lookups=len(fens),
+            redis_hits=redis_hits,
+            db_hits=len(found) - redis_hits,
+            misses=len(fens) - len(found),
+        )
+        return found
+
+    def get(self, fen: str, depth: int, multipv: int = 1) -> Optional[dict]:
+        return self.get_many([fen], depth, multipv).get(fen)
+
+    def _load_from_db(self, fens: List[str], depth: int, multipv: int) -> Dict[str, dict]:
+        if not fens:
+            return {}
+        from .models import PositionEval
+
+        found = {}
+        try:
+            for start in range(0, len(fens), DB_CHUNK_SIZE):
+                rows = PositionEval.objects.filter(
+                    fen__in=fens[start:start + DB_CHUNK_SIZE], depth=depth, multipv=multipv
+                ).values_list("fen", "lines", "source", "knodes")
+                for fen, lines, source, knodes in rows:
+                    found[fen] = {"lines": lines, "source": source, "knodes": knodes}
+        except Exception as exc:
+            logger.debug("Eval cache DB read failed: %s", exc)
+        return found
+
+    def _promote(self, r, entries: Dict[str, dict], depth: int, multipv: int) -> None:
+        if not r:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for fen, entry in entries.items():
+                pipe.setex(self._key(fen, depth, multipv), self.ttl, json.dumps(entry))
+            pipe.execute()
+        except Exception:
+            pass
+
+    def put(
+        self,
+        fen: str,
+        depth: int,
+        multipv: int,
+        lines: List[dict],
+        source: str = "",
+        knodes: int = 0,
+    ) -> None:
+        entry = {"lines": lines, "source": source, "knodes": knodes or 0}
+        r = get_redis()
+        if r:
+            try:
+                r.setex(self._key(fen, depth, multipv), self.ttl, json.dumps(entry))
+            except Exception as exc:
+                logger.debug("Eval cache Redis write failed: %s", exc)
+        with self._lock:
+            self._pending[(fen, depth, multipv)] = entry
+            self._stats["stores"] += 1
+            should_flush = len(self._pending) >= self.flush_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered entries to the PositionEval table."""
+        from .models import PositionEval
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = [
+            PositionEval(
+                fen=fen,
+                depth=depth,
+                multipv=multipv,
+                lines=entry["lines"],
+                source=entry["source"],
+                knodes=entry["knodes"],
+            )
+            for (fen, depth, multipv), entry in pending.items()
+        ]
+        try:
+            # Upsert: a re-search that replaced a too-shallow entry must replace its row too.
+            PositionEval.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["fen", "depth", "multipv"],
+                update_fields=["lines", "source", "knodes"],
+                batch_size=DB_CHUNK_SIZE,
+            )
+        except Exception as exc:
+            logger.warning("Eval cache DB flush failed (%s rows): %s", len(rows), exc)
+            return 0
+        return len(rows)
+
+    def purge(self, fens: Iterable[str], depth: int, multipv: int = 1) -> None:
+        """Forget cached entries for normalized FENs in every tier (benchmarks start cold with this)."""
+        from .models import PositionEval
+
+        fens = list(dict.fromkeys(fens))
+        with self._lock:
+            for fen in fens:
+                self._pending.pop((fen, depth, multipv), None)
+        for start in range(0, len(fens), DB_CHUNK_SIZE):
+            PositionEval.objects.filter(
+                fen__in=fens[start:start + DB_CHUNK_SIZE], depth=depth, multipv=multipv
+            ).delete()
+        r = get_redis()
+        if r:
+            keys = [self._key(fen, depth, multipv) for fen in fens]
+            for start in range(0, len(keys), DB_CHUNK_SIZE):
+                try:
+                    r.delete(*keys[start:start + DB_CHUNK_SIZE])
+                except Exception as exc:
+                    logger.debug("Eval cache Redis purge failed: %s", exc)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._pending = {}
+            self._stats = {name: 0 for name in self._stats}
+
+    def stats(self) -> dict:
+        with self._lock:
+            local = dict(self._stats)
+        local["hit_rate"] = round((local["redis_hits"] + local["db_hits"]) / local["lookups"], 3) if local["lookups"] else 0.0
+        result = {"process": local}
+        r = get_redis()
+        if r:
+            try:
+                shared = {name: int(value) for name, value in (r.hgetall(STATS_KEY) or {}).items()}
+                lookups = shared.get("lookups", 0)
+                hits = shared.get("redis_hits", 0) + shared.get("db_hits", 0)
+                shared["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+                result["all_processes"] = shared
+            except Exception:
+                pass
+        return result
+
+
+eval_cache = EvalCache()
+
+
+class EvalSession:
+    """
+    One analysis run's view of the cache.
+
+    prefetch() loads every position a game will need in one round trip;
+    analyse() and cloud_eval() consult the cache before the engine / API and
+    store what they compute. close() flushes new entries to the database.
+    lookup() and store() split analyse() for callers that run the engine
+    themselves, e.g. on worker threads; cloud_evals() does the same for many
+    cloud lookups at once.
+    """
+
+    def __init__(self, cache: Optional[EvalCache] = None):
+        self.cache = cache or eval_cache
+        self._known: Dict[tuple, Optional[dict]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.engine_ms = 0.0
+
+    def prefetch(self, positions: Iterable, depth: Optional[int], multipv: int = 1) -> None:
+        if depth is None:
+            return
+        fens = {normalize_fen(position) for position in positions}
+        found = self.cache.get_many(fens, depth, multipv)
+        for fen in fens:
+            self._known[(fen, depth, multipv)] = found.get(fen)
+
+    def _lookup(self, fen: str, depth: int, multipv: int) -> Optional[dict]:
+        key = (fen, depth, multipv)
+        if key in self._known:
+            entry = self._known[key]
+        else:
+            entry = self.cache.get(fen, depth, multipv)
+        if not deep_enough(entry, depth):
+            entry = None
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def _remember(self, fen: str, depth: int, multipv: int, lines: List[dict], source: str, knodes: int = 0):
+        entry = {"lines": lines, "source": source, "knodes": knodes}
+        self._known[(fen, depth, multipv)] = entry
+        self.cache.put(fen, depth, multipv, lines, source=source, knodes=knodes)
+
+    def lookup(self, board: chess.Board, limit: chess.engine.Limit, multipv: Optional[int] = None):
+        """Cached result in the shape analyse() returns, or None (counted as a miss)."""
+        if limit.depth is None:
+            return None
+        entry = self._lookup(normalize_fen(board), limit.depth, multipv or 1)
+        if not entry:
+            return None
+        infos = infos_from_lines(entry["lines"])
+        return infos if multipv else infos[0]
+
+    def store(
+        self,
+        board: chess.Board,
+        limit: chess.engine.Limit,
+        result,
+        multipv: Optional[int] = None,
+        source: str = "local_stockfish",
+        elapsed: float = 0.0,
+    ) -> None:
+        """Record an engine result for ``board``; ``elapsed`` is the search time in seconds."""
+        self.engine_ms += elapsed * 1000
+        if limit.depth is None:
+            return
+        infos = result if isinstance(result, list) else [result]
+        lines = lines_from_infos(infos)
+        if lines:
+            self._remember(normalize_fen(board), limit.depth, multipv or 1, lines, source)
+
+    def analyse(
+        self,
+        engine: chess.engine.SimpleEngine,
+        board: chess.Board,
+        limit: chess.engine.Limit,
+        multipv: Optional[int] = None,
+        source: str = "local_stockfish",
+    ):
+        """engine.analyse() with the cache in front. Searches without a depth limit bypass it."""
+        if limit.depth is None:
+            return engine.analyse(board, limit, multipv=multipv)
+        cached = self.lookup(board, limit, multipv)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        result = engine.analyse(board, limit, multipv=multipv)
+        self.store(board, limit, result, multipv, source, time.perf_counter() - start)
+        return result
+
+    def cloud_eval(self, fen: str, depth: int, multi_pv: int, fetch: Callable) -> Optional[dict]:
+        """Lichess cloud eval with the cache in front; ``fetch`` is get_cloud_evaluation."""
+        key_fen = normalize_fen(fen)
+        entry = self._lookup(key_fen, depth, multi_pv)
+        if entry:
+            return cloud_from_entry(entry, fen)
+        start = time.perf_counter()
+        data = fetch(fen, depth=depth, multi_pv=multi_pv)
+        self.engine_ms += (time.perf_counter() - start) * 1000
+        if data and data.get("pvs"):
+            lines = lines_from_cloud(data)
+            if lines:
+                self._remember(key_fen, depth, multi_pv, lines, "lichess", knodes=data.get("knodes", 0))
+        return data
+
+    def cloud_evals(
+        self,
+        fens: List[str],
+        depth: int,
+        multi_pv: int,
+        fetch: Callable,
+        workers: int = 1,
+        on_result: Optional[Callable[[int, Optional[dict]], None]] = None,
+    ) -> List[Optional[dict]]:
+        """
+        cloud_eval() for a list of positions, fetching the misses on up to ``workers`` threads.
+
+        Only ``fetch`` runs on the threads; cache reads and writes stay on this
+        one, and a position repeated in the list is fetched once (later
+        occurrences count as hits, as they would in a serial pass).
+        ``on_result(index, data)`` is called on this thread as results land.
+        """
+        results: List[Optional[dict]] = [None] * len(fens)
+        first_index: Dict[str, int] = {}
+        repeats = []
+        misses = []
+        for index, fen in enumerate(fens):
+            key_fen = normalize_fen(fen)
+            if key_fen in first_index:
+                repeats.append(index)
+                continue
+            first_index[key_fen] = index
+            entry = self._lookup(key_fen, depth, multi_pv)
+            if entry:
+                results[index] = cloud_from_entry(entry, fen)
+                if on_result:
+                    on_result(index, results[index])
+            else:
+                misses.append(index)
+
+        def land(index: int, data: Optional[dict]) -> None:
+            results[index] = data
+            if data and data.get("pvs"):
+                lines = lines_from_cloud(data)
+                if lines:
+                    self._remember(
+                        normalize_fen(fens[index]), depth, multi_pv, lines, "lichess", knodes=data.get("knodes", 0)
+                    )
+            if on_result:
+                on_result(index, data)
+
+        start = time.perf_counter()
+        if workers > 1 and len(misses) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(misses)), thread_name_prefix="cloud-eval") as executor:
+                futures = {
+                    executor.submit(fetch, fens[index], depth=depth, multi_pv=multi_pv): index for index in misses
+                }
+                for future in as_completed(futures):
+                    try:
+                        data = future.result()
+                    except Exception as exc:
+                        logger.warning("Cloud eval fetch failed: %s", exc)
+                        data = None
+                    land(futures[future], data)
+        else:
+            for index in misses:
+                land(index, fetch(fens[index], depth=depth, multi_pv=multi_pv))
+        self.engine_ms += (time.perf_counter() - start) * 1000
+
+        # A repeat is a cache hit unless its first occurrence failed; those are fetched here.
+        for index in repeats:
+            entry = self._lookup(normalize_fen(fens[index]), depth, multi_pv)
+            if entry:
+                results[index] = cloud_from_entry(entry, fens[index])
+                if on_result:
+                    on_result(index, results[index])
+            else:
+                land(index, fetch(fens[index], depth=depth, multi_pv=multi_pv))
+        return results
+
+    def summary(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "engine_ms": round(self.engine_ms, 1),
+        }
+
+    def close(self) -> None:
+        self.cache.flush()
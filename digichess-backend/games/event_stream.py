@@ -0,0 +1,316 @@
+"""
+Reading game:events:{id} streams for HTTP clients.
+
+Every move and game event is appended to a Redis stream by game_core. Clients
+without a WebSocket used to poll GameEventsView every few seconds; each poll
+loaded the game row, read game:seq and pulled the last 200 stream entries to
+filter by seq in Python. This module lets them resume from a stream id instead
+and wait server-side for the next entry:
+
+- read_from_cursor() returns only the entries after a stream id (XREAD);
+- read_since_seq() serves seq-only clients with exactly the missing entries;
+- EventHub runs ONE background XREAD BLOCK per process over every game that
+  has a waiting request, and wakes those requests when their stream moves.
+  Long-poll and SSE requests therefore never hold a pooled Redis connection
+  while they wait, however many spectators there are.
+
+Blocking reads are sliced to EVENTS_HUB_BLOCK_MS so they stay below the
+client's REDIS_SOCKET_TIMEOUT (a socket timeout would trip the breaker).
+A request that registers a game the hub is not reading yet pushes an entry to
+the hub's private wake stream, which ends the current slice early.
+
+Settings (config/settings.py, overridable from the environment):
+EVENTS_HUB_BLOCK_MS     longest single XREAD BLOCK in the hub (default 1000)
+EVENTS_LONGPOLL_MAX     upper bound for ?wait= on GameEventsView (default 25)
+EVENTS_SSE_MAX_SECONDS  how long one SSE response stays open (default 300)
+EVENTS_SSE_KEEPALIVE    seconds between SSE keepalive comments (default 15)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PAGE = 200
+INT_FIELDS = {"white_time_left", "black_time_left", "move_count", "seq"}
+FINISHED_STATUSES = {"finished", "aborted"}
+
+
+LONGPOLL_MAX_SECONDS = settings.EVENTS_LONGPOLL_MAX
+SSE_MAX_SECONDS = settings.EVENTS_SSE_MAX_SECONDS
+SSE_KEEPALIVE_SECONDS = settings.EVENTS_SSE_KEEPALIVE
+
+
+def stream_key(game_id) -> str:
+    return f"game:events:{game_id}"
+
+
+def seq_key(game_id) -> str:
+    return f"game:seq:{game_id}"
+
+
+def parse_stream_id(value) -> Optional[Tuple[int, int]]:
+    """(ms, seq) for a Redis stream id such as "1718000000000-3"; None if malformed."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    ms, _, seq = text.partition("-")
+    try:
+        parsed = int(ms), int(seq or 0)
+    except ValueError:
+        return None
+    if parsed[0] < 0 or parsed[1] < 0:
+        return None
+    return parsed
+
+
+def format_stream_id(parsed: Tuple[int, int]) -> str:
+    return f"{parsed[0]}-{parsed[1]}"
+
+
+def decode_entry(entry_id, fields) -> dict:
+    event = {}
+    for key, value in fields.items():
+        if key in INT_FIELDS:
+            try:
+                event[key] = int(value)
+            except (TypeError, ValueError):
+                event[key] = value
+        else:
+            event[key] = value
+    event["seq"] = event.get("seq") if isinstance(event.get("seq"), int) else 0
+    event["event_id"] = entry_id
+    return event
+
+
+def _entries(response, key: str):
+    # XREAD answers [[key, entries]] over RESP2 and {key: [entries]} over RESP3.
+    if not response:
+        return []
+    if isinstance(response, dict):
+        found = response.get(key) or []
+        return found[0] if found and isinstance(found[0], list) else found
+    for stream, entries in response:
+        if stream == key:
+            return entries
+    return []
+
+
+def read_from_cursor(r, game_id, cursor: str, count: int = EVENTS_PAGE) -> List[dict]:
+    key = stream_key(game_id)
+    return [decode_entry(entry_id, fields) for entry_id, fields in _entries(r.xread({key: cursor}, count=count), key)]
+
+
+async def aread_from_cursor(r, game_id, cursor: str, count: int = EVENTS_PAGE) -> List[dict]:
+    key = stream_key(game_id)
+    response = await r.xread({key: cursor}, count=count)
+    return [decode_entry(entry_id, fields) for entry_id, fields in _entries(response, key)]
+
+
+def _since_seq(entries, since: int) -> List[dict]:
+    events = [decode_entry(entry_id, fields) for entry_id, fields in reversed(entries or [])]
+    return [event for event in events if event["seq"] > since]
+
+
+def read_since_seq(r, game_id, since: int, last_seq: int) -> List[dict]:
+    """The entries after ``since`` for clients that only track seq; one per missing seq."""
+    if last_seq <= since:
+        return []
+    count = min(EVENTS_PAGE, last_seq - since)
+    return _since_seq(r.xrevrange(stream_key(game_id), count=count), since)
+
+
+async def aread_since_seq(r, game_id, since: int, last_seq: int) -> List[dict]:
+    if last_seq <= since:
+        return []
+    count = min(EVENTS_PAGE, last_seq - since)
+    return _since_seq(await r.xrevrange(stream_key(game_id), count=count), since)
+
+
+def tail_id(r, game_id) -> str:
+    """Id of the newest entry, so a waiter only sees what comes after it."""
+    entries = r.xrevrange(stream_key(game_id), count=1)
+    return entries[0][0] if entries else "0-0"
+
+
+async def atail_id(r, game_id) -> str:
+    entries = await r.xrevrange(stream_key(game_id), count=1)
+    return entries[0][0] if entries else "0-0"
+
+
+def has_gap(events: List[dict], since: int) -> bool:
+    """True when the stream was trimmed past ``since`` and a full snapshot is needed."""
+    return bool(since and events and events[0]["seq"] > since + 1)
+
+
+class EventHub:
+    """One XREAD BLOCK loop per process, shared by every waiting events request."""
+
+    def __init__(self, block_ms: Optional[int] = None, redis_factory: Callable = None):
+        self.block_ms = int(block_ms if block_ms is not None else settings.EVENTS_HUB_BLOCK_MS)
+        self._redis_factory = redis_factory or get_redis
+        self._lock = threading.Lock()
+        self._work = threading.Event()
+        self._waiters: Dict[str, Set[Callable[[], None]]] = {}
+        self._last_ids: Dict[str, Tuple[int, int]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._wake_key = f"game:events:hub:{uuid.uuid4().hex}"
+        self._wake_last = "0-0"
+        self._metrics = {"reads": 0, "wakeups": 0, "waits": 0, "interrupts": 0, "errors": 0}
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        if self._pid != pid:
+            # Forked: the parent's waiters and loop do not exist here.
+            self._waiters.clear()
+            self._last_ids.clear()
+            self._wake_key = f"game:events:hub:{uuid.uuid4().hex}"
+            self._wake_last = "0-0"
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name="game-events-hub", daemon=True)
+        self._thread.start()
+
+    def _register(self, game_id, cursor: Tuple[int, int], notify: Callable[[], None]) -> Optional[bool]:
+        """None: the stream is already past ``cursor``; otherwise whether the game is new to the hub."""
+        key = stream_key(game_id)
+        with self._lock:
+            self._ensure_thread()
+            known = self._last_ids.get(key)
+            if known is not None and known > cursor:
+                return None
+            new_key = key not in self._waiters
+            self._waiters.setdefault(key, set()).add(notify)
+            if known is None:
+                self._last_ids[key] = cursor
+            self._metrics["waits"] += 1
+        self._work.set()
+        return new_key
+
+    def _unregister(self, game_id, notify: Callable[[], None]) -> None:
+        key = stream_key(game_id)
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters is None:
+                return
+            waiters.discard(notify)
+            if not waiters:
+                del self._waiters[key]
+                self._last_ids.pop(key, None)
+
+    def _interrupt(self) -> None:
+        r = self._redis_factory()
+        if not r:
+            return
+        try:
+            r.xadd(self._wake_key, {"w": "1"}, maxlen=16, approximate=False)
+            r.expire(self._wake_key, 600)
+            with self._lock:
+                self._metrics["interrupts"] += 1
+        except Exception as exc:
+            logger.debug("Event hub wake failed: %s", exc)
+
+    def wait(self, game_id, cursor: str, timeout: float) -> bool:
+        """Block until game_id's stream has entries after ``cursor``; False on timeout."""
+        parsed = parse_stream_id(cursor) or (0, 0)
+        event = threading.Event()
+        new_key = self._register(game_id, parsed, event.set)
+        if new_key is None:
+            return True
+        try:
+            if new_key:
+                self._interrupt()
+            return event.wait(timeout)
+        finally:
+            self._unregister(game_id, event.set)
+
+    async def await_entries(self, game_id, cursor: str, timeout: float) -> bool:
+        """Async wait(); the waiting coroutine holds no thread and no Redis connection."""
+        parsed = parse_stream_id(cursor) or (0, 0)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def notify():
+            loop.call_soon_threadsafe(event.set)
+
+        new_key = self._register(game_id, parsed, notify)
+        if new_key is None:
+            return True
+        try:
+            if new_key:
+                await loop.run_in_executor(None, self._interrupt)
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._unregister(game_id, notify)
+
+    def _notify(self, keys) -> None:
+        callbacks = []
+        with self._lock:
+            for key in keys:
+                callbacks.extend(self._waiters.get(key, ()))
+            self._metrics["wakeups"] += len(callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                streams = {key: format_stream_id(last) for key, last in self._last_ids.items()}
+                if not streams:
+                    self._work.clear()
+            if not streams:
+                self._work.wait()
+                continue
+            r = self._redis_factory()
+            if not r:
+                # Let waiters answer with what they have instead of hanging until their timeout.
+                self._notify(list(streams))
+                time.sleep(1.0)
+                continue
+            streams[self._wake_key] = self._wake_last
+            try:
+                response = r.xread(streams, block=self.block_ms, count=EVENTS_PAGE)
+            except Exception as exc:
+                with self._lock:
+                    self._metrics["errors"] += 1
+                logger.debug("Event hub read failed: %s", exc)
+                time.sleep(0.5)
+                continue
+            moved = []
+            with self._lock:
+                self._metrics["reads"] += 1
+                for key in streams:
+                    entries = _entries(response, key)
+                    if not entries:
+                        continue
+                    if key == self._wake_key:
+                        self._wake_last = entries[-1][0]
+                        continue
+                    if key in self._last_ids:
+                        self._last_ids[key] = parse_stream_id(entries[-1][0]) or self._last_ids[key]
+                        moved.append(key)
+            if moved:
+                self._notify(moved)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "games": len(self._waiters), "block_ms": self.block_ms}
+
+
+event_hub = EventHub()
@@ -9,7 +9,11 @@ from django.db import transaction
 from django.utils import timezone
 
 from utils.redis_client import get_redis
-from .models import Game, TournamentGame
+from .board_cache import board_cache, position_matches
+from .clock_deadlines import clear_game_deadline, schedule_game_deadline
+from .game_proxy import GameProxy, LiveStateConflict
+from .models import Game
+from .legal_moves import legal_moves_for_board
 from .move_optimizer import process_move_optimized
 
 logger = logging.getLogger(__name__)
@@ -80,6 +84,32 @@ def build_board_from_moves(moves_raw: Optional[str], start_fen: Optional[str] =
     return board
 
 
+def load_game_board(game: Game, move_list: Optional[List[str]] = None) -> chess.Board:
+    """
+    Return the board for the game's current position with its full move stack.
+
+    Uses the per-game board cache and only replays the SAN history on a miss.
+    The caller owns the returned board and should hand it back with
+    board_cache.store() once the game row has been updated.
+    """
+    if move_list is None:
+        move_list = (game.moves or "").strip().split() if game.moves else []
+    move_count = len(move_list)
+    board = board_cache.take(game.id, move_count, game.current_fen)
+    if board is not None:
+        return board
+    board = build_board_from_moves(" ".join(move_list), game.START_FEN) if move_count else None
+    if board is not None and not position_matches(board, game.current_fen):
+        # current_fen is authoritative when the stored move list disagrees with it
+        board = None
+    if board is None:
+        try:
+            board = chess.Board(game.current_fen or chess.STARTING_FEN)
+        except Exception:
+            board = chess.Board()
+    return board
+
+
 def is_insufficient_material(board: chess.Board) -> bool:
     if not board:
         return False
@@ -135,7 +165,7 @@ def compute_clock_snapshot(game: Game, now=None, board: Optional[chess.Board] =
     black_left = game.black_time_left
     elapsed = 0
     move_count = len((game.moves or "").strip().split()) if game.moves else 0
-    is_tournament = TournamentGame.objects.filter(game_id=game.id).exists()
+    is_tournament = game.is_tournament
     # For regular games: clock doesn't run until both players have made their first move.
     # For tournament games: clock runs immediately from game start.
     clock_active = False
@@ -268,16 +298,23 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
         if not lock_token:
             return MoveResult(ok=False, error="Game is busy. Please retry.")
 
+    # With the live store the Redis hash is authoritative and the row is only
+    # written when the game starts or ends (see games.game_proxy).
+    live = bool(r) and GameProxy.enabled()
     try:
         with transaction.atomic():
             try:
-                game = (
-                    Game.objects.select_for_update()
-                    .select_related("white", "black")
-                    .get(id=game_id)
-                )
+                if live:
+                    game = GameProxy.load(game_id)
+                else:
+                    game = (
+                        Game.objects.select_for_update()
+                        .select_related("white", "black")
+                        .get(id=game_id)
+                    )
             except Game.DoesNotExist:
                 return MoveResult(ok=False, error="Game not found.")
+            live_ply = getattr(game, "_live_ply", None)
 
             if player != game.white and player != game.black:
                 return MoveResult(ok=False, error="You are not part of this game.")
@@ -287,22 +324,19 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
             move_list = (game.moves or "").strip().split() if game.moves else []
             move_count = len(move_list)
 
-            board = build_board_from_moves(" ".join(move_list), game.START_FEN) if move_count else None
-            if board is None:
-                try:
-                    board = chess.Board(game.current_fen or chess.STARTING_FEN)
-                except Exception:
-                    board = chess.Board()
+            board = load_game_board(game, move_list)
 
             current_player = game.white if board.turn is chess.WHITE else game.black
             if player != current_player:
+                board_cache.store(game.id, board)
                 return MoveResult(ok=False, error="Not your turn.")
 
             if now is None:
                 now = timezone.now()
 
             # Start game if pending
-            if game.status == Game.STATUS_PENDING:
+            started = game.status == Game.STATUS_PENDING
+            if started:
                 game.status = Game.STATUS_ACTIVE
                 game.started_at = now
                 # Do not start the main clock until both players have moved once
@@ -313,7 +347,7 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
 
             # Apply elapsed time to side to move before move validation
             timeout_result = None
-            is_tournament_move = TournamentGame.objects.filter(game_id=game.id).exists()
+            is_tournament_move = game.is_tournament
             clock_running = game.status == Game.STATUS_ACTIVE and game.last_move_at and (is_tournament_move or move_count >= 2)
             if clock_running:
                 elapsed = round((now - game.last_move_at).total_seconds(), 1)
@@ -348,6 +382,7 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
                 )
                 if r:
                     _update_redis_clock(r, game, board, now)
+                    clear_game_deadline(r, game.id)
                     seq = _append_event(
                         r,
                         game,
@@ -374,6 +409,7 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
 
             success, error_msg, move, extra = process_move_optimized(game, move_str, board)
             if not success or not move:
+                board_cache.store(game.id, board)
                 return MoveResult(ok=False, error=error_msg or "Illegal move.")
 
             san = extra.get("san", move_str)
@@ -392,10 +428,10 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
                 game.black_time_left += game.black_increment_seconds
 
             # Record per-move elapsed time for cheat detection timing analysis
-            elapsed_ms = int((now - game.last_move_at).total_seconds() * 1000) if game.last_move_at else 0
+            elapsed_ms = max(0, int((now - game.last_move_at).total_seconds() * 1000)) if game.last_move_at else 0
             if not isinstance(game.move_times_ms, list):
                 game.move_times_ms = []
-            game.move_times_ms.append(max(0, elapsed_ms))
+            game.move_times_ms.append(elapsed_ms)
 
             # Track first move time for the black grace period; main clock starts after both moves
             game.last_move_at = now
@@ -423,28 +459,49 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
             ]
             if draw_offer_cleared:
                 update_fields.append("draw_offer_by")
-            game.save(update_fields=update_fields)
+            move_event = {
+                "type": "move",
+                "san": san,
+                "uci": uci,
+                "fen": game.current_fen,
+                "moves": game.moves,
+                "white_time_left": game.white_time_left,
+                "black_time_left": game.black_time_left,
+                "turn": "white" if board.turn is chess.WHITE else "black",
+                "status": game.status,
+                "result": game.result,
+                "reason": reason if finished else None,
+            }
+
+            committed = False
+            if live:
+                # ply, elapsed time and timestamp let recover() rebuild the hash from events.
+                live_event = dict(
+                    move_event,
+                    ts=int(now.timestamp()),
+                    ply=len(move_list),
+                    elapsed_ms=elapsed_ms,
+                    last_move_at=f"{now.timestamp():.6f}",
+                    draw_offer_cleared=1 if draw_offer_cleared else None,
+                )
+                try:
+                    seq = GameProxy.commit(r, game, live_ply, live_event, now, EVENT_STREAM_MAXLEN)
+                    committed = True
+                except LiveStateConflict as exc:
+                    board_cache.discard(game.id)
+                    return MoveResult(
+                        ok=False, error="Game is not active." if exc.retired else "Game is busy. Please retry."
+                    )
+                except Exception as exc:
+                    logger.warning("Live commit of game %s failed, saving directly: %s", game.id, exc)
+            if not committed or started or finished:
+                game.save(update_fields=update_fields)
 
             if r:
                 _update_redis_clock(r, game, board, now)
-                seq = _append_event(
-                    r,
-                    game,
-                    now,
-                    {
-                        "type": "move",
-                        "san": san,
-                        "uci": uci,
-                        "fen": game.current_fen,
-                        "moves": game.moves,
-                        "white_time_left": game.white_time_left,
-                        "black_time_left": game.black_time_left,
-                        "turn": "white" if board.turn is chess.WHITE else "black",
-                        "status": game.status,
-                        "result": game.result,
-                        "reason": reason if finished else None,
-                    },
-                )
+                schedule_game_deadline(r, game, board, is_tournament=is_tournament_move)
+                if not committed:
+                    seq = _append_event(r, game, now, move_event)
                 if draw_offer_cleared:
                     _append_event(
                         r,
@@ -459,17 +516,16 @@ def apply_move(game_id: int, player, move_str: str, now=None) -> MoveResult:
             else:
                 seq = None
 
-            legal_moves = []
-            legal_moves_uci = []
             try:
-                move_list_obj = list(board.legal_moves)
-                legal_moves = [board.san(m) for m in move_list_obj]
-                legal_moves_uci = [m.uci() for m in move_list_obj]
+                legal = legal_moves_for_board(board)
+                legal_moves, legal_moves_uci = legal["san"], legal["uci"]
             except Exception:
                 legal_moves = []
                 legal_moves_uci = []
 
             state = _build_state(game, board, now, san, uci, seq, is_tournament=is_tournament_move)
+            if not finished:
+                board_cache.store(game.id, board)
             return MoveResult(
                 ok=True,
                 game=game,
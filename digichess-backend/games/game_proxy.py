@@ -1,158 +1,502 @@
 """
-GameProxy: Lichess-style in-memory caching with batched database writes
-Inspired by Lichess's GameProxy pattern for optimal performance
+GameProxy: authoritative live game state with write-behind persistence.
 
-Key optimizations:
-- In-memory cache to avoid database reads
-- Batched writes (30s delay, immediate for important events)
-- Reduces database load by ~90% for active games
+While a game is in play its fast-changing fields (FEN, move list, move times,
+clocks, status/result, draw offer) live in one Redis hash, ``game:live:{id}``,
+and Postgres is written in batches instead of once per move:
+
+- apply_move() validates against the hash and commits the move with one Lua
+  script (COMMIT_LUA): compare-and-set on the ply, write the fields, bump the
+  game's event seq, append the move event to ``game:events:{id}`` and mark the
+  game dirty in ``game:live:dirty`` (scored by when it first became dirty).
+  Ordinary moves do not touch the database.
+- flush_dirty() runs from Celery Beat (GAME_LIVE_FLUSH_INTERVAL) and writes
+  every dirty game with one bulk_update; a game leaves the dirty set only if
+  no move landed after its snapshot was read (CLEAR_LUA).
+- Finishing a game (any Game.save() that writes a finished/aborted status)
+  folds the live fields into that same save, and once the save commits
+  retires the hash (RETIRE_LUA): it is left as a short-lived tombstone so a
+  late move cannot commit. A rolled-back finish leaves the hash untouched.
+  Other saves that touch live fields on an active game are mirrored into the
+  hash (SYNC_LUA) so the database and the hash never disagree.
+- Game querysets (models.GameQuerySet, also the base manager behind related
+  access and refresh_from_db) overlay the hashes of the pending/active rows
+  they load with one pipeline per chunk, so views, tasks and consumers read
+  live state transparently. Rows of games that are over cost no Redis call;
+  .without_live_state() skips the overlay. Games loaded through another
+  model's select_related() are overlaid explicitly with overlay_many() where
+  live fields matter.
+- If the hash is lost (Redis restart, eviction), recover() rebuilds the state
+  from the last flushed row plus the move events in ``game:events:{id}`` whose
+  ply is newer than the row.
+
+A game therefore costs a handful of row writes: the start, one per flush
+interval it stays dirty, and the finish. Rematch flags only matter once a game
+is over and stay in the database. Without Redis (or with GAME_LIVE_STATE=0)
+every move is saved directly as before.
+
+Settings (config/settings.py, overridable from the environment):
+GAME_LIVE_STATE           enable the live store (default 1)
+GAME_LIVE_TTL             idle expiry of a live hash in seconds (default 21600)
+GAME_LIVE_FLUSH_INTERVAL  beat interval of flush_dirty_games (default 30)
 """
-import time
-from typing import Optional, Dict, Any
-from django.utils import timezone
-from django.core.cache import cache
-from .models import Game
+import json
 import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from utils.redis_client import get_redis
+from .models import Game
 
 logger = logging.getLogger(__name__)
 
-# Cache timeout: 30 seconds (matches Lichess delay)
-CACHE_TIMEOUT = 30
+LIVE_KEY = "game:live:{}"
+DIRTY_KEY = "game:live:dirty"
+SEQ_KEY = "game:seq:{}"
+EVENTS_KEY = "game:events:{}"
+RETIRED = "retired"
+RETIRED_TTL_SECONDS = 60
+FLUSH_BATCH_SIZE = 500
+RECOVERY_PAGE_SIZE = 200
+
+LIVE_STATUSES = (Game.STATUS_PENDING, Game.STATUS_ACTIVE)
+ENDED_STATUSES = (Game.STATUS_FINISHED, Game.STATUS_ABORTED)
+LIVE_FIELDS = (
+    "current_fen",
+    "moves",
+    "move_times_ms",
+    "white_time_left",
+    "black_time_left",
+    "last_move_at",
+    "status",
+    "result",
+    "started_at",
+    "finished_at",
+    "draw_offer_by",
+)
+_TIME_FIELDS = ("last_move_at", "started_at", "finished_at")
+_CLOCK_FIELDS = ("white_time_left", "black_time_left")
+
+
+LIVE_TTL_SECONDS = settings.GAME_LIVE_TTL
+
+# KEYS: live hash, seq counter, event stream, dirty set
+# ARGV: expected ply, game id, dirty score, ttl, stream maxlen, field pair count, field pairs..., event pairs...
+COMMIT_LUA = """
+local current = redis.call("HGET", KEYS[1], "ply")
+if current then
+  if redis.call("HGET", KEYS[1], "status") == "retired" then
+    return -1
+  end
+  if current ~= ARGV[1] then
+    return -2
+  end
+end
+local pairs_end = 6 + tonumber(ARGV[6]) * 2
+local fields = {}
+for i = 7, pairs_end do
+  fields[#fields + 1] = ARGV[i]
+end
+redis.call("HSET", KEYS[1], unpack(fields))
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+redis.call("ZADD", KEYS[4], "NX", ARGV[3], ARGV[2])
+local seq = redis.call("INCR", KEYS[2])
+local event = {"seq", tostring(seq)}
+for i = pairs_end + 1, #ARGV do
+  event[#event + 1] = ARGV[i]
+end
+redis.call("XADD", KEYS[3], "MAXLEN", "~", ARGV[5], "*", unpack(event))
+return seq
+"""
+
+# KEYS: live hash, dirty set; ARGV: game id, tombstone ttl. Runs after the finishing save commits.
+RETIRE_LUA = """
+local data = redis.call("HGETALL", KEYS[1])
+if #data == 0 then
+  return data
+end
+redis.call("HSET", KEYS[1], "status", "retired")
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+redis.call("ZREM", KEYS[2], ARGV[1])
+return data
+"""
+
+# KEYS: live hash; ARGV: field pairs
+SYNC_LUA = """
+local status = redis.call("HGET", KEYS[1], "status")
+if not status or status == "retired" then
+  return 0
+end
+redis.call("HSET", KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# KEYS[1]: dirty set, KEYS[i]: live hash of member ARGV[2i - 3], flushed at ply ARGV[2i - 2] ("" = always)
+CLEAR_LUA = """
+local cleared = 0
+for i = 2, #KEYS do
+  local member = ARGV[2 * i - 3]
+  local ply = ARGV[2 * i - 2]
+  if ply == "" or redis.call("HGET", KEYS[i], "ply") == ply then
+    cleared = cleared + redis.call("ZREM", KEYS[1], member)
+  end
+end
+return cleared
+"""
+
+
+class LiveStateConflict(Exception):
+    """The live hash moved on (or was retired) since the state was read."""
+
+    def __init__(self, retired: bool = False):
+        super().__init__("retired" if retired else "ply mismatch")
+        self.retired = retired
+
+
+def _encode_time(value) -> str:
+    return f"{value.timestamp():.6f}" if value else ""
+
+
+def _decode_time(value: str):
+    return datetime.fromtimestamp(float(value), tz=dt_timezone.utc) if value else None
+
+
+def _decode_clock(value: str):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def encode_fields(game: Game, fields: Iterable[str] = LIVE_FIELDS) -> Dict[str, str]:
+    """Hash representation of ``fields`` of ``game`` (plus its ply)."""
+    data = {}
+    for name in fields:
+        if name in _TIME_FIELDS:
+            data[name] = _encode_time(getattr(game, name))
+        elif name == "move_times_ms":
+            data[name] = json.dumps(game.move_times_ms if isinstance(game.move_times_ms, list) else [])
+        elif name == "draw_offer_by":
+            data["draw_offer_by_id"] = str(game.draw_offer_by_id or "")
+        else:
+            data[name] = str(getattr(game, name) if getattr(game, name) is not None else "")
+    if "moves" in fields:
+        data["ply"] = str(len((game.moves or "").split()))
+    return data
+
+
+def apply_fields(game: Game, data: Dict[str, str], fields: Optional[Iterable[str]] = None) -> None:
+    """Copy hash ``data`` onto ``game`` (only ``fields`` when given)."""
+    retired = data.get("status") == RETIRED
+    for name in fields if fields is not None else LIVE_FIELDS:
+        key = "draw_offer_by_id" if name == "draw_offer_by" else name
+        if key not in data or (name == "status" and retired):
+            continue
+        value = data[key]
+        if name in _TIME_FIELDS:
+            setattr(game, name, _decode_time(value))
+        elif name in _CLOCK_FIELDS:
+            setattr(game, name, _decode_clock(value))
+        elif name == "move_times_ms":
+            setattr(game, name, json.loads(value or "[]"))
+        elif name == "draw_offer_by":
+            game.draw_offer_by_id = int(value) if value else None
+        else:
+            setattr(game, name, value)
+    if "ply" in data:
+        game._live_ply = int(data["ply"])
+
+
+def _pairs(data: Dict[str, Any]) -> List[str]:
+    flat = []
+    for key, value in data.items():
+        if value is None:
+            continue
+        flat.extend((key, str(value)))
+    return flat
 
 
 class GameProxy:
-    """
-    In-memory proxy for Game objects with batched database writes.
-    Reduces database load by caching active games and batching writes.
-    """
-    
-    # Class-level cache for active games (thread-safe with proper locking in production)
-    _cache: Dict[int, Any] = {}  # Can store Game objects or dicts
-    _dirty: Dict[int, bool] = {}
-    _last_flush: Dict[int, float] = {}
-    
-    def __init__(self, game_id: int):
-        self.game_id = game_id
-        self._load_time = time.time()
-    
+    """Live-state operations for one Redis client; all methods are classmethods."""
+
     @classmethod
-    def get_game(cls, game_id: int, use_db: bool = True) -> Optional[Game]:
+    def enabled(cls) -> bool:
+        return settings.GAME_LIVE_STATE
+
+    @classmethod
+    def client(cls):
+        if not cls.enabled():
+            return None
+        try:
+            return get_redis()
+        except Exception:
+            return None
+
+    # Reads
+
+    @classmethod
+    def overlay_many(cls, games: Iterable[Game]) -> int:
         """
-        Get game from cache or database.
-        Returns cached version if available and fresh, otherwise loads from DB.
+        Apply the live hashes of freshly loaded pending/active rows, in one pipeline.
+
+        Only fields the rows were loaded with are overwritten. Returns how
+        many games had a hash.
         """
-        # Try cache first (Redis for multi-process support)
-        cache_key = f"game_proxy:{game_id}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data and (time.time() - cached_data.get('_timestamp', 0)) < 60:
-            # Cache hit - reconstruct Game object (lightweight)
-            try:
-                return Game.objects.get(id=game_id)
-            except Game.DoesNotExist:
-                return None
-        
-        # Cache miss - load from database
-        if use_db:
-            try:
-                game = Game.objects.select_related('white', 'black').get(id=game_id)
-                # Update cache
-                cls._update_cache(game)
-                return game
-            except Game.DoesNotExist:
-                return None
-        
-        return None
-    
+        live = [game for game in games if game.pk is not None and game.__dict__.get("status") in LIVE_STATUSES]
+        r = cls.client() if live else None
+        if not r:
+            return 0
+        try:
+            pipe = r.pipeline(transaction=False)
+            for game in live:
+                pipe.hgetall(LIVE_KEY.format(game.pk))
+            snapshots = pipe.execute()
+        except Exception:
+            return 0
+        found = 0
+        for game, data in zip(live, snapshots):
+            if not data:
+                continue
+            deferred = game.get_deferred_fields()
+            fields = [name for name in LIVE_FIELDS if name not in deferred and f"{name}_id" not in deferred]
+            apply_fields(game, data, fields)
+            found += 1
+        return found
+
     @classmethod
-    def _update_cache(cls, game: Game):
-        """Update cache with game data"""
-        cache_key = f"game_proxy:{game.id}"
-        cache.set(cache_key, {
-            '_timestamp': time.time(),
-            'id': game.id,
-            'status': game.status,
-        }, 60)  # Cache for 60 seconds
-    
+    def load(cls, game_id: int) -> Game:
+        """Game with live state, rebuilt from the event stream if the hash is gone."""
+        game = Game.objects.select_related("white", "black").get(id=game_id)
+        r = cls.client()
+        if r and game.status in LIVE_STATUSES and not hasattr(game, "_live_ply"):
+            cls.recover(r, game)
+        return game
+
     @classmethod
-    def mark_dirty(cls, game_id: int):
-        """Mark game as dirty (needs to be saved)"""
-        cls._dirty[game_id] = True
-        cls._last_flush[game_id] = time.time()
-    
+    def get_game(cls, game_id: int, use_db: bool = True) -> Optional[Game]:
+        try:
+            return cls.load(game_id)
+        except Game.DoesNotExist:
+            return None
+
     @classmethod
-    def should_flush(cls, game_id: int, immediate: bool = False) -> bool:
+    def recover(cls, r, game: Game) -> int:
         """
-        Determine if game should be flushed to database.
-        Immediate flush for: status changes, finished games, rated games
+        Replay move events newer than the row onto ``game``; returns how many.
+
+        Events carry the ply they produced, so everything up to the flushed
+        row is skipped and only a contiguous run after it is applied.
         """
-        if immediate:
-            return True
-        
-        last_flush = cls._last_flush.get(game_id, 0)
-        elapsed = time.time() - last_flush
-        
-        # Flush after 30 seconds (matches Lichess delay)
-        return elapsed >= CACHE_TIMEOUT
-    
+        base_ply = len((game.moves or "").split())
+        found = {}
+        upper = "+"
+        try:
+            while True:
+                page = r.xrevrange(EVENTS_KEY.format(game.id), max=upper, count=RECOVERY_PAGE_SIZE)
+                if not page:
+                    break
+                older = False
+                for entry_id, fields in page:
+                    if fields.get("type") != "move" or "ply" not in fields:
+                        continue
+                    ply = int(fields["ply"])
+                    if ply <= base_ply:
+                        older = True
+                        break
+                    found.setdefault(ply, fields)
+                if older or len(page) < RECOVERY_PAGE_SIZE:
+                    break
+                upper = f"({page[-1][0]}"
+        except Exception as exc:
+            logger.warning("Could not read events to recover game %s: %s", game.id, exc)
+            return 0
+
+        replayed = []
+        ply = base_ply + 1
+        while ply in found:
+            replayed.append(found[ply])
+            ply += 1
+        if len(replayed) < len(found):
+            logger.warning("Event stream of game %s has a gap after ply %s", game.id, ply - 1)
+        if not replayed:
+            return 0
+
+        times = list(game.move_times_ms) if isinstance(game.move_times_ms, list) else []
+        for event in replayed:
+            times.append(int(event.get("elapsed_ms") or 0))
+            if event.get("draw_offer_cleared"):
+                game.draw_offer_by_id = None
+        last = replayed[-1]
+        game.move_times_ms = times
+        game.moves = last["moves"]
+        game.current_fen = last["fen"]
+        game.white_time_left = _decode_clock(last["white_time_left"])
+        game.black_time_left = _decode_clock(last["black_time_left"])
+        game.last_move_at = _decode_time(last.get("last_move_at", ""))
+        game.status = last.get("status") or game.status
+        game.result = last.get("result") or game.result
+        if game.status in ENDED_STATUSES:
+            game.finished_at = game.finished_at or game.last_move_at
+            # The finishing move committed but its row write did not; complete it.
+            game.save(update_fields=list(LIVE_FIELDS))
+        logger.info("Recovered game %s from events: plies %s-%s", game.id, base_ply + 1, ply - 1)
+        return len(replayed)
+
+    # Writes
+
+    @classmethod
+    def commit(cls, r, game: Game, expected_ply: Optional[int], event: Dict[str, Any], now, maxlen: int) -> int:
+        """Atomically store ``game``'s live fields and append ``event``; returns the event seq."""
+        fields = encode_fields(game)
+        args = [
+            "" if expected_ply is None else str(expected_ply),
+            str(game.id),
+            f"{now.timestamp():.3f}",
+            str(LIVE_TTL_SECONDS),
+            str(maxlen),
+            str(len(fields)),
+            *_pairs(fields),
+            *_pairs(event),
+        ]
+        script = r.register_script(COMMIT_LUA)
+        seq = int(script(
+            keys=[LIVE_KEY.format(game.id), SEQ_KEY.format(game.id), EVENTS_KEY.format(game.id), DIRTY_KEY],
+            args=args,
+        ))
+        if seq < 0:
+            raise LiveStateConflict(retired=seq == -1)
+        game._live_ply = int(fields["ply"])
+        return seq
+
     @classmethod
-    def flush_if_needed(cls, game_id: int, force: bool = False):
-        """Flush game to database if dirty and should flush"""
-        if not cls._dirty.get(game_id, False) and not force:
+    def fold(cls, game: Game, update_fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+        """
+        Fold the live hash into a finishing save (retire() follows on commit).
+
+        Fields the caller is saving keep the caller's values; the other live
+        fields are taken from the hash and added to ``update_fields``.
+        """
+        r = cls.client()
+        if not r:
+            return update_fields
+        try:
+            data = r.hgetall(LIVE_KEY.format(game.pk))
+        except Exception as exc:
+            logger.warning("Could not read live state of game %s: %s", game.pk, exc)
+            return update_fields
+        if not data or data.get("status") == RETIRED or update_fields is None:
+            return update_fields
+        explicit = set(update_fields)
+        missing = [name for name in LIVE_FIELDS if name not in explicit]
+        apply_fields(game, data, missing)
+        return list(update_fields) + missing
+
+    @classmethod
+    def retire(cls, game_id: int) -> None:
+        """Tombstone the live hash of a game whose finish has committed, so a late move cannot land."""
+        r = cls.client()
+        if not r:
             return
-        
         try:
-            # Use cached game object if available (has latest changes), otherwise load from DB
-            if game_id in cls._cache and isinstance(cls._cache[game_id], Game):
-                game = cls._cache[game_id]
-            else:
-                game = Game.objects.get(id=game_id)
-            
-            # Determine which fields actually changed (simple approach: save all common fields)
-            game.save(update_fields=[
-                'current_fen', 'moves', 'white_time_left', 'black_time_left',
-                'status', 'result', 'last_move_at'
-            ])
-            cls._dirty[game_id] = False
-            cls._update_cache(game)
-            logger.debug(f"Flushed game {game_id} to database")
-        except Game.DoesNotExist:
-            pass
-        except Exception as e:
-            logger.error(f"Error flushing game {game_id}: {e}")
-    
+            r.register_script(RETIRE_LUA)(
+                keys=[LIVE_KEY.format(game_id), DIRTY_KEY], args=[str(game_id), str(RETIRED_TTL_SECONDS)]
+            )
+        except Exception as exc:
+            logger.warning("Could not retire live state of game %s: %s", game_id, exc)
+
     @classmethod
-    def update_game(cls, game: Game, immediate_flush: bool = False):
+    def sync(cls, game: Game, update_fields: Optional[Iterable[str]]) -> None:
+        """Mirror a direct save of live fields into the hash, if the game has one."""
+        fields = [name for name in (update_fields or LIVE_FIELDS) if name in LIVE_FIELDS]
+        r = cls.client() if fields else None
+        if not r:
+            return
+        try:
+            r.register_script(SYNC_LUA)(keys=[LIVE_KEY.format(game.pk)], args=_pairs(encode_fields(game, fields)))
+        except Exception as exc:
+            logger.warning("Could not sync live state of game %s: %s", game.pk, exc)
+
+    @classmethod
+    def update_game(cls, game: Game, immediate_flush: bool = False) -> None:
         """
-        Update game and mark for batched flush.
-        Immediate flush for important events (status change, game finish).
+        Store ``game``'s live fields without an event and leave the row to the flusher.
+
+        Saved at once when asked to, when the game is over, or without Redis.
         """
-        cls.mark_dirty(game.id)
-        
-        # Store the game object in cache for flushing later
-        cls._cache[game.id] = game
-        
-        # Immediate flush for critical events
-        status_changed = getattr(game, '_status_changed', False)
-        if immediate_flush or status_changed or game.status in [Game.STATUS_FINISHED, Game.STATUS_ABORTED]:
-            cls.flush_if_needed(game.id, force=True)
-        # Don't flush immediately if not critical - let flush_all_dirty handle it
-    
+        r = cls.client()
+        if r and not immediate_flush and game.status in LIVE_STATUSES:
+            try:
+                pipe = r.pipeline(transaction=True)
+                pipe.hset(LIVE_KEY.format(game.id), mapping=encode_fields(game))
+                pipe.expire(LIVE_KEY.format(game.id), LIVE_TTL_SECONDS)
+                pipe.zadd(DIRTY_KEY, {str(game.id): game.last_move_at.timestamp() if game.last_move_at else 0}, nx=True)
+                pipe.execute()
+                return
+            except Exception as exc:
+                logger.warning("Could not store live state of game %s: %s", game.id, exc)
+        game.save(update_fields=list(LIVE_FIELDS))
+
+    # Write-behind
+
     @classmethod
-    def flush_all_dirty(cls):
-        """Flush all dirty games (called periodically)"""
-        # Get all dirty games that should be flushed
-        game_ids_to_flush = [
-            game_id for game_id in cls._dirty.keys()
-            if cls.should_flush(game_id)
-        ]
-        
-        for game_id in game_ids_to_flush:
-            cls.flush_if_needed(game_id)
+    def flush_dirty(cls, limit: Optional[int] = None) -> int:
+        """Write every dirty game's live fields to the database; returns rows written."""
+        r = cls.client()
+        if not r:
+            return 0
+        written = 0
+        while limit is None or written < limit:
+            try:
+                members = r.zrange(DIRTY_KEY, 0, FLUSH_BATCH_SIZE - 1)
+            except Exception as exc:
+                logger.warning("Could not read dirty games: %s", exc)
+                break
+            if not members:
+                break
+            flushed = cls._flush_batch(r, members)
+            written += flushed
+            if len(members) < FLUSH_BATCH_SIZE:
+                break
+        return written
 
+    @classmethod
+    def _flush_batch(cls, r, members: List[str]) -> int:
+        pipe = r.pipeline(transaction=False)
+        for member in members:
+            pipe.hgetall(LIVE_KEY.format(member))
+        snapshots = dict(zip(members, pipe.execute()))
 
-# Periodic flush task (runs every 30 seconds)
-def flush_dirty_games():
-    """Flush all dirty games - call this from Celery Beat"""
-    GameProxy.flush_all_dirty()
+        live = {int(m): data for m, data in snapshots.items() if data and data.get("status") != RETIRED}
+        # A row finished behind the hash's back must not be reopened by a stale snapshot.
+        open_ids = set(
+            Game.objects.filter(id__in=list(live), status__in=LIVE_STATUSES).values_list("id", flat=True)
+        )
+        games = []
+        for game_id in open_ids:
+            game = Game(id=game_id)
+            apply_fields(game, live[game_id])
+            games.append(game)
+        if games:
+            # Filtered on status so a finish committing meanwhile is not overwritten
+            # (the UPDATE re-checks the row once it gets the lock).
+            Game.objects.filter(status__in=LIVE_STATUSES).bulk_update(games, list(LIVE_FIELDS))
+
+        keys, args = [DIRTY_KEY], []
+        for member in members:
+            data = live.get(int(member))
+            keys.append(LIVE_KEY.format(member))
+            args.extend((member, data["ply"] if data and int(member) in open_ids else ""))
+        try:
+            r.register_script(CLEAR_LUA)(keys=keys, args=args)
+        except Exception as exc:
+            logger.warning("Could not clear flushed games: %s", exc)
+        return len(games)
+
+    @classmethod
+    def flush_all_dirty(cls) -> int:
+        return cls.flush_dirty()
 
+
+def flush_dirty_games() -> int:
+    """Flush all dirty games - call this from Celery Beat"""
+    return GameProxy.flush_dirty()
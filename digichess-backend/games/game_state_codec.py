@@ -0,0 +1,125 @@
+"""
+Compact game snapshots for real-time payloads.
+
+GameSerializer is the REST representation: it nests UserSerializer for white,
+black and creator (profile, social links, twelve rating fields and an online
+lookup each) and resolves draw/rematch users through their foreign keys. That
+is the right answer for GET /api/games/<id>/, but game_finished broadcasts,
+timeout sweeps and the GameEventsView gameFull fallback only need to tell a
+connected client what the game now looks like; the players' profiles are
+already on the client from the initial fetch.
+
+encode_game() keeps GameSerializer's field names so clients can merge either
+shape, and trims everything else:
+
+- players are {"id", "username", "is_bot"}, read from the game's cached
+  relations or with a single values() query for all three;
+- draw_offer_by, rematch_requested_by and tournament_id come from the FK
+  columns, never from the related rows;
+- legal moves come from the shared legal_moves cache and are only sent while
+  the game is active;
+- move_count, turn and the first-move deadline are computed once here.
+
+Every snapshot carries "v" (SCHEMA_VERSION). Bump it whenever a field changes
+meaning or disappears, so clients can tell a compact snapshot from a full one.
+"""
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.contrib.auth import get_user_model
+
+from .game_core import FIRST_MOVE_GRACE_SECONDS
+from .legal_moves import legal_moves_for_fen
+from .models import Game
+
+SCHEMA_VERSION = 1
+
+PLAYER_FIELDS = ("id", "username", "is_bot")
+
+
+def _iso(value) -> Optional[str]:
+    # Same text DRF's DateTimeField produces for aware UTC datetimes.
+    if not value:
+        return None
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _players(game: Game) -> Dict[int, Dict[str, Any]]:
+    cards: Dict[int, Dict[str, Any]] = {}
+    missing = set()
+    for field in ("white", "black", "creator"):
+        user_id = getattr(game, f"{field}_id", None)
+        if user_id is None or user_id in cards:
+            continue
+        descriptor = getattr(Game, field)
+        if descriptor.is_cached(game):
+            user = getattr(game, field)
+            cards[user_id] = {name: getattr(user, name) for name in PLAYER_FIELDS}
+        else:
+            missing.add(user_id)
+    missing -= cards.keys()
+    if missing:
+        for row in get_user_model().objects.filter(id__in=missing).values(*PLAYER_FIELDS):
+            cards[row["id"]] = row
+    return cards
+
+
+def _first_move(game: Game, move_count: int):
+    if game.status != Game.STATUS_ACTIVE or not game.started_at or game.tournament_id:
+        return None, None
+    if move_count == 0:
+        return int((game.started_at + timedelta(seconds=FIRST_MOVE_GRACE_SECONDS)).timestamp()), "white"
+    if move_count == 1:
+        anchor = game.last_move_at or game.started_at
+        return int((anchor + timedelta(seconds=FIRST_MOVE_GRACE_SECONDS)).timestamp()), "black"
+    return None, None
+
+
+def encode_game(game: Game) -> Dict[str, Any]:
+    """Compact, versioned snapshot of ``game`` for broadcasts and event replays."""
+    players = _players(game)
+    moves = game.moves or ""
+    move_count = len(moves.split())
+    fen = game.current_fen
+    first_move_deadline, first_move_color = _first_move(game, move_count)
+    if game.status == Game.STATUS_ACTIVE:
+        legal = legal_moves_for_fen(fen)
+    else:
+        legal = {"san": [], "uci": []}
+    try:
+        turn = "white" if (fen or "").split()[1] == "w" else "black"
+    except IndexError:
+        turn = "white"
+    return {
+        "v": SCHEMA_VERSION,
+        "id": game.id,
+        "creator": players.get(game.creator_id),
+        "white": players.get(game.white_id),
+        "black": players.get(game.black_id),
+        "time_control": game.time_control,
+        "rated": game.rated,
+        "white_increment_seconds": game.white_increment_seconds,
+        "black_increment_seconds": game.black_increment_seconds,
+        "white_time_left": game.white_time_left,
+        "black_time_left": game.black_time_left,
+        "status": game.status,
+        "result": game.result,
+        "moves": moves,
+        "current_fen": fen,
+        "turn": turn,
+        "legal_moves": legal["san"],
+        "legal_moves_uci": legal["uci"],
+        "draw_offer_by": game.draw_offer_by_id,
+        "rematch_requested_by": game.rematch_requested_by_id,
+        "rematch_requested_at": _iso(game.rematch_requested_at),
+        "created_at": _iso(game.created_at),
+        "started_at": _iso(game.started_at),
+        "finished_at": _iso(game.finished_at),
+        "first_move_deadline": first_move_deadline,
+        "first_move_color": first_move_color,
+        "move_count": move_count,
+        "white_rating_delta": game.white_rating_delta,
+        "black_rating_delta": game.black_rating_delta,
+        "tournament_id": game.tournament_id,
+    }
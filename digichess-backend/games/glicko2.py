@@ -0,0 +1,201 @@
+"""
+Vectorised Glicko-2 (Glickman, "Example of the Glicko-2 system", 2013).
+
+Everything works on NumPy arrays so one call rates a whole rating period for
+every player at once:
+
+- rate_period() takes per-player arrays (rating, RD, volatility) and the
+  period's results as parallel arrays (player index, opponent index, score)
+  and returns the new arrays. Players without results only have their RD
+  inflated, as step 6 of the paper prescribes.
+- ``periods`` lets a caller stretch that inflation over inactivity: a player
+  idle for 3.5 periods enters the period with phi* = sqrt(phi^2 + 3.5 sigma^2).
+- The volatility update is the paper's Illinois iteration, run for all
+  players together until every one of them has converged.
+- replay_periods() runs rate_period() over a sorted game history, one call
+  per period; games.rating_recompute uses it to rebuild every rating.
+- rate_game() is the one-game case used by live settlement, where each game
+  is its own (fractional) rating period.
+
+Ratings are on the usual Glicko scale; internally mu = (r - 1500) / 173.7178.
+
+Settings (config/settings.py, overridable from the environment):
+GLICKO2_TAU      system constant constraining volatility change (default 0.5)
+GLICKO2_MIN_RD   lowest RD a player can reach (default 45)
+GLICKO2_MAX_RD   RD of an unknown player and the inflation cap (default 350)
+"""
+from typing import Tuple
+
+import numpy as np
+from django.conf import settings
+
+SCALE = 173.7178
+BASE_RATING = 1500.0
+DEFAULT_VOLATILITY = 0.06
+EPSILON = 1e-6
+MAX_ITERATIONS = 100
+
+
+TAU = settings.GLICKO2_TAU
+MIN_RD = settings.GLICKO2_MIN_RD
+MAX_RD = settings.GLICKO2_MAX_RD
+
+Rating = Tuple[float, float, float]
+
+
+def _g(phi):
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi**2 / np.pi**2)
+
+
+def _clamp_phi(phi):
+    return np.clip(phi, MIN_RD / SCALE, MAX_RD / SCALE)
+
+
+def inflate_rd(rd, vol, periods=1.0):
+    """RD after ``periods`` rating periods without games, capped at GLICKO2_MAX_RD."""
+    phi = np.asarray(rd, dtype=float) / SCALE
+    phi = np.sqrt(phi**2 + np.asarray(periods, dtype=float) * np.asarray(vol, dtype=float) ** 2)
+    return np.minimum(phi, MAX_RD / SCALE) * SCALE
+
+
+def _new_volatility(phi, sigma, v, delta, tau):
+    """Step 5 of the paper for every element at once (Illinois regula falsi)."""
+    a = np.log(sigma**2)
+    phi2 = phi**2
+    tau2 = tau**2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta**2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau2
+
+    A = a.copy()
+    big = delta**2 > phi2 + v
+    B = np.where(big, np.log(np.maximum(delta**2 - phi2 - v, 1e-300)), a - tau)
+    fB = f(B)
+    for _ in range(MAX_ITERATIONS):
+        low = ~big & (fB < 0)
+        if not low.any():
+            break
+        B = np.where(low, B - tau, B)
+        fB = np.where(low, f(B), fB)
+
+    fA = f(A)
+    for _ in range(MAX_ITERATIONS):
+        active = np.abs(B - A) > EPSILON
+        if not active.any():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            C = A + (A - B) * fA / (fB - fA)
+        C = np.where(np.isfinite(C), C, B)
+        fC = f(C)
+        swap = fC * fB < 0
+        A = np.where(active & swap, B, A)
+        fA = np.where(active & swap, fB, np.where(active, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+    return np.exp(A / 2.0)
+
+
+def rate_period(rating, rd, vol, player, opponent, score, periods=1.0, tau: float = TAU):
+    """
+    Rate one rating period; returns (rating, rd, vol) arrays for every player.
+
+    ``player``/``opponent``/``score`` hold one row per result from the
+    player's side, so a game between i and j appears twice (i vs j with s and
+    j vs i with 1 - s). Opponents are taken at their pre-period values.
+    ``periods`` (scalar or per player) is how many periods of inactivity the
+    RD is inflated by before the results are applied.
+    """
+    rating = np.asarray(rating, dtype=float)
+    mu = (rating - BASE_RATING) / SCALE
+    phi = np.asarray(rd, dtype=float) / SCALE
+    sigma = np.asarray(vol, dtype=float)
+    periods = np.broadcast_to(np.asarray(periods, dtype=float), mu.shape)
+    player = np.asarray(player, dtype=np.intp)
+    opponent = np.asarray(opponent, dtype=np.intp)
+    score = np.asarray(score, dtype=float)
+    count = mu.shape[0]
+
+    g = _g(phi[opponent])
+    expected = 1.0 / (1.0 + np.exp(-g * (mu[player] - mu[opponent])))
+    v_inv = np.bincount(player, weights=g**2 * expected * (1.0 - expected), minlength=count)
+    improvement = np.bincount(player, weights=g * (score - expected), minlength=count)
+
+    played = v_inv > 0
+    new_mu = mu.copy()
+    new_sigma = sigma.copy()
+    new_phi = np.sqrt(phi**2 + periods * sigma**2)
+
+    if played.any():
+        v = 1.0 / v_inv[played]
+        new_sigma[played] = _new_volatility(
+            phi[played], sigma[played], v, v * improvement[played], tau
+        )
+        phi_star = np.sqrt(phi[played] ** 2 + periods[played] * new_sigma[played] ** 2)
+        new_phi[played] = 1.0 / np.sqrt(1.0 / phi_star**2 + v_inv[played])
+        new_mu[played] = mu[played] + new_phi[played] ** 2 * improvement[played]
+
+    new_phi = np.where(played, _clamp_phi(new_phi), np.minimum(new_phi, MAX_RD / SCALE))
+    return new_mu * SCALE + BASE_RATING, new_phi * SCALE, new_sigma
+
+
+def game_results(white, black, white_score):
+    """Expand game arrays into the two-rows-per-game form rate_period() takes."""
+    white = np.asarray(white, dtype=np.intp)
+    black = np.asarray(black, dtype=np.intp)
+    white_score = np.asarray(white_score, dtype=float)
+    return (
+        np.concatenate([white, black]),
+        np.concatenate([black, white]),
+        np.concatenate([white_score, 1.0 - white_score]),
+    )
+
+
+def rate_game(white: Rating, black: Rating, white_score: float, periods=(1.0, 1.0)) -> Tuple[Rating, Rating]:
+    """One game as its own rating period: new (rating, rd, vol) for white and black."""
+    rating, rd, vol = rate_period(
+        [white[0], black[0]],
+        [white[1], black[1]],
+        [white[2], black[2]],
+        [0, 1],
+        [1, 0],
+        [white_score, 1.0 - white_score],
+        periods=list(periods),
+    )
+    return (
+        (float(rating[0]), float(rd[0]), float(vol[0])),
+        (float(rating[1]), float(rd[1]), float(vol[1])),
+    )
+
+
+def replay_periods(rating, rd, vol, period, white, black, white_score, until=None, tau: float = TAU):
+    """
+    Rate games period by period; returns the final (rating, rd, vol) arrays.
+
+    ``period`` is each game's rating-period number and must be non-decreasing.
+    Every player's RD is inflated across periods without any game, and after
+    the last game up to period ``until`` when given.
+    """
+    period = np.asarray(period, dtype=np.int64)
+    white = np.asarray(white, dtype=np.intp)
+    black = np.asarray(black, dtype=np.intp)
+    white_score = np.asarray(white_score, dtype=float)
+    rating = np.asarray(rating, dtype=float)
+    rd = np.asarray(rd, dtype=float)
+    vol = np.asarray(vol, dtype=float)
+    if period.size == 0:
+        if until is not None:
+            rd = inflate_rd(rd, vol, max(0, until))
+        return rating, rd, vol
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(period)) + 1])
+    ends = np.concatenate([starts[1:], [period.size]])
+    previous = period[0] - 1
+    for start, end in zip(starts, ends):
+        current = int(period[start])
+        player, opponent, score = game_results(white[start:end], black[start:end], white_score[start:end])
+        rating, rd, vol = rate_period(rating, rd, vol, player, opponent, score, periods=current - previous, tau=tau)
+        previous = current
+    if until is not None and until > previous:
+        rd = inflate_rd(rd, vol, until - previous)
+    return rating, rd, vol
@@ -0,0 +1,186 @@
+"""
+Live leaderboards kept in Redis sorted sets, one per rating mode.
+
+Members are zero-padded user ids; scores are negated composite keys so that
+ZRANGE from 0 lists the best player first and ZRANK gives a player's rank in
+O(log n):
+
+    rating modes   rating desc, RD asc, user id asc
+    digiquiz       rating_digiquiz desc, digiquiz_correct desc, user id asc
+
+Only active, non-bot users are ranked. FinishGameView.update_ratings, DigiQuiz
+round finalization and account activation update the sets as they commit; the
+rebuild_leaderboards command backfills them from the database. A mode is served
+from Redis only after a rebuild has marked it ready, so a fresh or flushed Redis
+falls back to the database query instead of showing a partial leaderboard.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "leaderboard:v1"
+# Secondary sort key is packed below the rating: score = rating * SCALE + tiebreak.
+SCALE = 1_000_000
+REBUILD_BATCH_SIZE = 2000
+
+# mode -> (rating field, tiebreak field, tiebreak ascending)
+MODE_FIELDS: Dict[str, Tuple[str, str, bool]] = {
+    "bullet": ("rating_bullet", "rating_bullet_rd", True),
+    "blitz": ("rating_blitz", "rating_blitz_rd", True),
+    "rapid": ("rating_rapid", "rating_rapid_rd", True),
+    "classical": ("rating_classical", "rating_classical_rd", True),
+    "digiquiz": ("rating_digiquiz", "digiquiz_correct", False),
+}
+RATING_MODES = ("bullet", "blitz", "rapid", "classical")
+
+
+def leaderboard_key(mode: str) -> str:
+    return f"{KEY_PREFIX}:{mode}"
+
+
+def ready_key(mode: str) -> str:
+    return f"{KEY_PREFIX}:{mode}:ready"
+
+
+def _member(user_id: int) -> str:
+    return f"{int(user_id):012d}"
+
+
+def _user_id(member) -> int:
+    if isinstance(member, bytes):
+        member = member.decode()
+    return int(member)
+
+
+def score_for(user, mode: str) -> float:
+    rating_field, tiebreak_field, ascending = MODE_FIELDS[mode]
+    rating = int(getattr(user, rating_field, 0) or 0)
+    tiebreak = getattr(user, tiebreak_field, 0) or 0
+    if ascending:
+        # RD is at most 350; two decimals are kept.
+        packed = SCALE - 1 - min(SCALE - 1, max(0, int(round(float(tiebreak) * 100))))
+    else:
+        packed = min(SCALE - 1, max(0, int(tiebreak)))
+    return -float(rating * SCALE + packed)
+
+
+def is_ranked(user) -> bool:
+    return bool(getattr(user, "is_active", False)) and not getattr(user, "is_bot", False)
+
+
+def update_user(r, user, modes: Optional[Iterable[str]] = None) -> None:
+    """Write ``user``'s current scores (or remove them if the user is not ranked)."""
+    if not r or user is None:
+        return
+    modes = list(modes) if modes is not None else list(MODE_FIELDS)
+    try:
+        pipe = r.pipeline(transaction=False)
+        for mode in modes:
+            if is_ranked(user):
+                pipe.zadd(leaderboard_key(mode), {_member(user.id): score_for(user, mode)})
+            else:
+                pipe.zrem(leaderboard_key(mode), _member(user.id))
+        pipe.execute()
+    except Exception as exc:
+        logger.debug("Leaderboard update failed for user %s: %s", getattr(user, "id", None), exc)
+
+
+def update_user_on_commit(user, modes: Optional[Iterable[str]] = None) -> None:
+    """update_user() once the surrounding transaction commits (immediately outside one)."""
+    from utils.redis_client import get_redis
+
+    modes = list(modes) if modes is not None else None
+    transaction.on_commit(lambda: update_user(get_redis(), user, modes))
+
+
+def remove_users(r, user_ids: Iterable[int], modes: Optional[Iterable[str]] = None) -> None:
+    members = [_member(user_id) for user_id in user_ids]
+    if not r or not members:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for mode in modes or MODE_FIELDS:
+            pipe.zrem(leaderboard_key(mode), *members)
+        pipe.execute()
+    except Exception as exc:
+        logger.debug("Leaderboard removal failed: %s", exc)
+
+
+def is_ready(r, mode: str) -> bool:
+    if not r:
+        return False
+    try:
+        return bool(r.exists(ready_key(mode)))
+    except Exception:
+        return False
+
+
+def page(r, mode: str, start: int, stop: int) -> Optional[Tuple[List[int], int]]:
+    """User ids ranked ``start``..``stop - 1`` and the total, or None when Redis cannot serve ``mode``."""
+    if not is_ready(r, mode):
+        return None
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrange(leaderboard_key(mode), start, stop - 1)
+        pipe.zcard(leaderboard_key(mode))
+        members, total = pipe.execute()
+    except Exception as exc:
+        logger.debug("Leaderboard read failed for %s: %s", mode, exc)
+        return None
+    return [_user_id(member) for member in members], int(total or 0)
+
+
+def rank(r, mode: str, user_id: int) -> Optional[int]:
+    """1-based rank of ``user_id``; None if unranked or Redis cannot serve ``mode``."""
+    if not is_ready(r, mode):
+        return None
+    try:
+        position = r.zrank(leaderboard_key(mode), _member(user_id))
+    except Exception:
+        return None
+    return None if position is None else int(position) + 1
+
+
+def rebuild(r, modes: Optional[Iterable[str]] = None, batch_size: int = REBUILD_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Rebuild the sorted sets from the database and mark them ready.
+
+    Each mode is written to a temporary key and renamed over the live one, so
+    readers never see a half-built leaderboard.
+    """
+    from accounts.models import User
+
+    modes = list(modes) if modes is not None else list(MODE_FIELDS)
+    fields = {"id"}
+    for mode in modes:
+        rating_field, tiebreak_field, _ = MODE_FIELDS[mode]
+        fields.update((rating_field, tiebreak_field))
+
+    temp_keys = {mode: f"{leaderboard_key(mode)}:rebuild" for mode in modes}
+    counts = {mode: 0 for mode in modes}
+    r.delete(*temp_keys.values())
+    qs = User.objects.filter(is_active=True, is_bot=False).only(*fields).order_by("id")
+    last_id = 0
+    while True:
+        batch = list(qs.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        pipe = r.pipeline(transaction=False)
+        for mode in modes:
+            pipe.zadd(temp_keys[mode], {_member(user.id): score_for(user, mode) for user in batch})
+            counts[mode] += len(batch)
+        pipe.execute()
+        last_id = batch[-1].id
+
+    pipe = r.pipeline(transaction=True)
+    for mode in modes:
+        if counts[mode]:
+            pipe.rename(temp_keys[mode], leaderboard_key(mode))
+        else:
+            pipe.delete(leaderboard_key(mode))
+        pipe.set(ready_key(mode), 1)
+    pipe.execute()
+    return counts
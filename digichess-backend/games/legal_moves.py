@@ -0,0 +1,135 @@
+"""
+Legal-move lists (SAN and UCI) computed once per position.
+
+After a move the same lists used to be produced several times: by apply_move
+for the gameState broadcast, by GameSerializer.get_legal_moves and
+get_legal_moves_uci, and by get_game_state_export on socket connect, each
+parsing the FEN and calling board.san() -- which plays every move to test for
+check and mate -- for every legal move. legal_moves_for_board() and
+legal_moves_for_fen() return one shared payload instead.
+
+Payloads are keyed by the position part of the FEN (placement, side to move,
+castling, en passant; no clocks), held in a bounded per-process LRU and in
+Redis (LEGAL_MOVES_REDIS_TTL seconds) so another web or ASGI process serving
+the same game skips the work too. Both lists are in the same order, so
+san[i] is uci[i].
+
+Settings (config/settings.py, overridable from the environment):
+LEGAL_MOVES_CACHE_SIZE  positions kept per process (default 4096)
+LEGAL_MOVES_REDIS_TTL   seconds a position stays in Redis (default 21600)
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import chess
+from django.conf import settings
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "legalmoves:v1"
+
+Payload = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def position_key(fen: Optional[str]) -> str:
+    return " ".join((fen or chess.STARTING_FEN).split()[:4])
+
+
+def _compute(board: chess.Board) -> Payload:
+    moves = list(board.legal_moves)
+    return tuple(board.san(move) for move in moves), tuple(move.uci() for move in moves)
+
+
+def _as_dict(payload: Payload) -> Dict[str, List[str]]:
+    return {"san": list(payload[0]), "uci": list(payload[1])}
+
+
+class LegalMoveCache:
+    def __init__(self, max_size: Optional[int] = None, redis_ttl: Optional[int] = None):
+        self.max_size = max(1, max_size if max_size is not None else settings.LEGAL_MOVES_CACHE_SIZE)
+        self.redis_ttl = redis_ttl if redis_ttl is not None else settings.LEGAL_MOVES_REDIS_TTL
+        self._entries: "OrderedDict[str, Payload]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"local_hits": 0, "redis_hits": 0, "computed": 0}
+
+    def _local(self, key: str) -> Optional[Payload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self._metrics["local_hits"] += 1
+            return payload
+
+    def _remember(self, key: str, payload: Payload) -> None:
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _from_redis(self, r, key: str) -> Optional[Payload]:
+        try:
+            raw = r.get(f"{KEY_PREFIX}:{key}")
+        except Exception:
+            return None
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            payload = tuple(data["san"]), tuple(data["uci"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        with self._lock:
+            self._metrics["redis_hits"] += 1
+        return payload
+
+    def _to_redis(self, r, key: str, payload: Payload) -> None:
+        try:
+            r.set(f"{KEY_PREFIX}:{key}", json.dumps({"san": payload[0], "uci": payload[1]}), ex=self.redis_ttl)
+        except Exception as exc:
+            logger.debug("Legal-move cache write failed: %s", exc)
+
+    def lookup(self, key: str, board_factory) -> Payload:
+        payload = self._local(key)
+        if payload is not None:
+            return payload
+        r = get_redis()
+        payload = self._from_redis(r, key) if r else None
+        if payload is None:
+            payload = _compute(board_factory())
+            with self._lock:
+                self._metrics["computed"] += 1
+            if r:
+                self._to_redis(r, key, payload)
+        self._remember(key, payload)
+        return payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._metrics = {name: 0 for name in self._metrics}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "size": len(self._entries), "max_size": self.max_size}
+
+
+legal_move_cache = LegalMoveCache()
+
+
+def legal_moves_for_board(board: chess.Board) -> Dict[str, List[str]]:
+    """{"san": [...], "uci": [...]} for the position on ``board``."""
+    return _as_dict(legal_move_cache.lookup(position_key(board.fen()), lambda: board))
+
+
+def legal_moves_for_fen(fen: Optional[str]) -> Dict[str, List[str]]:
+    """As legal_moves_for_board(); an unparseable FEN has no legal moves."""
+    try:
+        return _as_dict(legal_move_cache.lookup(position_key(fen), lambda: chess.Board(fen or chess.STARTING_FEN)))
+    except ValueError:
+        return {"san": [], "uci": []}
@@ -5,16 +5,23 @@ Uses Lichess API with authentication for:
 - Opening explorer - faster with authenticated requests
 - Tablebase (endgame database) - faster with authenticated requests
 - Puzzle solving - authenticated access
+
+Requests go through the shared client in lichess_client (pooled connections,
+rate limiting, response cache, circuit breaker).
 """
-import requests
 import chess
 from typing import Optional, Dict, Any, List
 from django.conf import settings
 import logging
 
+from .lichess_client import lichess_client
+
 logger = logging.getLogger(__name__)
 
-LICHESS_API_BASE = "https://lichess.org/api"
+# Response cache lifetimes (seconds): found / not found.
+CLOUD_EVAL_TTL = (3600, 600)
+EXPLORER_TTL = (86400, 3600)
+TABLEBASE_TTL = (30 * 86400, 86400)
 
 
 def get_lichess_headers() -> Dict[str, str]:
@@ -45,22 +52,19 @@ def get_cloud_evaluation(fen: str, variant: str = "standard", multi_pv: int = 1,
     Returns:
         Dict with evaluation data or None if failed
     """
+    params = {
+        "fen": fen,
+        "multiPv": min(multi_pv, 5),  # Lichess limits to 5
+        "depth": min(max(depth, 1), 22),  # Lichess limits depth, but auth gets priority
+        "variant": variant
+    }
+    # Use longer timeout for authenticated requests (they can be deeper)
+    timeout = 10 if getattr(settings, "LICHESS_API_TOKEN", "") else 5
     try:
-        url = f"{LICHESS_API_BASE}/cloud-eval"
-        params = {
-            "fen": fen,
-            "multiPv": min(multi_pv, 5),  # Lichess limits to 5
-            "depth": min(max(depth, 1), 22),  # Lichess limits depth, but auth gets priority
-            "variant": variant
-        }
-        
-        headers = get_lichess_headers()
-        # Use longer timeout for authenticated requests (they can be deeper)
-        timeout = 10 if headers.get("Authorization") else 5
-        response = requests.get(url, params=params, headers=headers, timeout=timeout)
-        
-        if response.status_code == 200:
-            data = response.json()
+        status_code, data = lichess_client.get_json(
+            "/cloud-eval", params, ttl=CLOUD_EVAL_TTL[0], negative_ttl=CLOUD_EVAL_TTL[1], timeout=timeout
+        )
+        if status_code == 200 and data is not None:
             return {
                 "fen": fen,
                 "knodes": data.get("knodes", 0),
@@ -70,14 +74,11 @@ def get_cloud_evaluation(fen: str, variant: str = "standard", multi_pv: int = 1,
                 "mate": data.get("pvs", [{}])[0].get("mate") if data.get("pvs") else None,
                 "best_move": data.get("pvs", [{}])[0].get("moves", "").split()[0] if data.get("pvs") and data.get("pvs", [{}])[0].get("moves") else None
             }
-        elif response.status_code == 429:
+        elif status_code == 429:
             logger.warning("Lichess API rate limit reached, falling back to local Stockfish")
             return None
-        else:
-            logger.warning(f"Lichess API returned {response.status_code}: {response.text}")
-            return None
-    except requests.RequestException as e:
-        logger.warning(f"Lichess API request failed: {e}")
+        elif status_code not in (None, 404):
+            logger.warning(f"Lichess API returned {status_code}")
         return None
     except Exception as e:
         logger.error(f"Error getting Lichess evaluation: {e}", exc_info=True)
@@ -98,36 +99,33 @@ def get_opening_explorer(fen: str, variant: str = "standard", speeds: List[str]
     Returns:
         Dict with opening moves data or None if failed
     """
+    params = {
+        "fen": fen,
+        "variant": variant
+    }
+    if speeds:
+        params["speeds"] = ",".join(speeds)
+    if ratings:
+        params["ratings"] = ",".join(map(str, ratings))
+
     try:
-        url = f"{LICHESS_API_BASE}/explorer"
-        params = {
-            "fen": fen,
-            "variant": variant
-        }
-        
-        if speeds:
-            params["speeds"] = ",".join(speeds)
-        if ratings:
-            params["ratings"] = ",".join(map(str, ratings))
-        
-        headers = get_lichess_headers()
-        response = requests.get(url, params=params, headers=headers, timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
+        status_code, data = lichess_client.get_json(
+            "/explorer", params, ttl=EXPLORER_TTL[0], negative_ttl=EXPLORER_TTL[1], timeout=3
+        )
+        if status_code == 200 and data is not None:
             return {
                 "white": data.get("white", 0),
                 "black": data.get("black", 0),
                 "draws": data.get("draws", 0),
                 "moves": data.get("moves", [])
             }
-        elif response.status_code == 404:
+        elif status_code == 404:
             # 404 is common for positions not in database - use debug level
             logger.debug(f"Lichess explorer API returned 404 for position (not in database)")
             return None
         else:
             # Only warn for unexpected errors (not 404)
-            logger.debug(f"Lichess explorer API returned {response.status_code}")
+            logger.debug(f"Lichess explorer API returned {status_code}")
             return None
     except Exception as e:
         logger.warning(f"Error getting Lichess opening explorer: {e}")
@@ -147,14 +145,10 @@ def get_tablebase(fen: str, variant: str = "standard") -> Optional[Dict[str, Any
         Dict with tablebase data or None if failed
     """
     try:
-        url = f"{LICHESS_API_BASE}/tablebase/{variant}"
-        params = {"fen": fen}
-        
-        headers = get_lichess_headers()
-        response = requests.get(url, params=params, headers=headers, timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
+        status_code, data = lichess_client.get_json(
+            f"/tablebase/{variant}", {"fen": fen}, ttl=TABLEBASE_TTL[0], negative_ttl=TABLEBASE_TTL[1], timeout=3
+        )
+        if status_code == 200 and data is not None:
             return {
                 "dtz": data.get("dtz"),  # Distance to zeroing (pawn move or capture)
                 "precise_dtz": data.get("preciseDtz"),
@@ -167,7 +161,7 @@ def get_tablebase(fen: str, variant: str = "standard") -> Optional[Dict[str, Any
                 "moves": data.get("moves", [])
             }
         else:
-            logger.warning(f"Lichess tablebase API returned {response.status_code}")
+            logger.warning(f"Lichess tablebase API returned {status_code}")
             return None
     except Exception as e:
         logger.warning(f"Error getting Lichess tablebase: {e}")
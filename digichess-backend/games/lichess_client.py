@@ -0,0 +1,303 @@
+"""
+Shared HTTP client for the Lichess API (cloud eval, opening explorer, tablebase).
+
+One requests.Session per process keeps TLS connections to Lichess open
+(LICHESS_POOL_SIZE), and every call goes through the same guards:
+
+- a response cache in django.core.cache, per endpoint TTL, so positions
+  asked for by many games or workers are fetched once;
+- at most LICHESS_MAX_CONCURRENCY requests in flight per process;
+- a token bucket (LICHESS_RATE_PER_SECOND, LICHESS_BURST) that a caller waits
+  on for up to LICHESS_MAX_WAIT_SECONDS before giving up;
+- a 429 pause: after Lichess answers 429 nobody calls it again until
+  Retry-After (or LICHESS_RETRY_AFTER_SECONDS, Lichess asks for a minute)
+  has passed. The pause is kept in the shared cache, so every process
+  backs off, and callers fail fast instead of sleeping through it;
+- a circuit breaker: after LICHESS_BREAKER_FAILURES consecutive errors
+  (connection failures, timeouts, 5xx) calls fail fast for
+  LICHESS_BREAKER_RESET_SECONDS, then one trial request decides.
+
+A call that is short-circuited returns status None, which callers treat
+like any other failed lookup (fall back to the local engine).
+LICHESS_API_BASE points the client somewhere else, e.g. the fake server in
+tests/fake_lichess_server.py.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "lichess:v1"
+PAUSE_KEY = f"{CACHE_PREFIX}:paused_until"
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` banked."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic, sleep=time.sleep):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _wait_for_token(self) -> float:
+        """Take a token and return 0, or return how long until one is due."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, max_wait: float) -> bool:
+        deadline = self._clock() + max_wait
+        while True:
+            wait = self._wait_for_token()
+            if wait == 0.0:
+                return True
+            if self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+class CircuitBreaker:
+    """closed -> open after ``threshold`` consecutive failures -> half-open after ``reset_after``."""
+
+    def __init__(self, threshold: int, reset_after: float, clock=time.monotonic):
+        self.threshold = max(1, threshold)
+        self.reset_after = reset_after
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_after:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_after or self._trial:
+                return False
+            # Half-open: exactly one caller gets to try.
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+            self._trial = False
+
+
+class LichessClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        retry_after: Optional[float] = None,
+        breaker_failures: Optional[int] = None,
+        breaker_reset: Optional[float] = None,
+    ):
+        self._base_url = base_url
+        self.max_concurrency = max(
+            1, max_concurrency if max_concurrency is not None else settings.LICHESS_MAX_CONCURRENCY
+        )
+        self.max_wait = max_wait if max_wait is not None else settings.LICHESS_MAX_WAIT_SECONDS
+        self.retry_after = retry_after if retry_after is not None else settings.LICHESS_RETRY_AFTER_SECONDS
+        self.bucket = TokenBucket(
+            rate_per_second if rate_per_second is not None else settings.LICHESS_RATE_PER_SECOND,
+            burst if burst is not None else settings.LICHESS_BURST,
+        )
+        self.breaker = CircuitBreaker(
+            breaker_failures if breaker_failures is not None else settings.LICHESS_BREAKER_FAILURES,
+            breaker_reset if breaker_reset is not None else settings.LICHESS_BREAKER_RESET_SECONDS,
+        )
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._pid = os.getpid()
+        self._metrics = self._empty_metrics()
+
+    @staticmethod
+    def _empty_metrics() -> Dict[str, int]:
+        return {
+            "requests": 0,
+            "cache_hits": 0,
+            "rate_limited": 0,
+            "throttled": 0,
+            "paused": 0,
+            "breaker_rejected": 0,
+            "errors": 0,
+        }
+
+    @property
+    def base_url(self) -> str:
+        return (self._base_url or getattr(settings, "LICHESS_API_BASE", "") or "https://lichess.org/api").rstrip("/")
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def session(self) -> requests.Session:
+        # Pooled connections belong to the process that opened them; a forked
+        # Celery worker builds its own session.
+        with self._lock:
+            if self._session is None or os.getpid() != self._pid:
+                session = requests.Session()
+                pool_size = settings.LICHESS_POOL_SIZE or self.max_concurrency
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                token = getattr(settings, "LICHESS_API_TOKEN", "")
+                if token:
+                    session.headers["Authorization"] = f"Bearer {token}"
+                if os.getpid() != self._pid:
+                    self._metrics = self._empty_metrics()
+                    self._pid = os.getpid()
+                self._session = session
+            return self._session
+
+    def _cache_key(self, path: str, params: Optional[dict]) -> str:
+        raw = json.dumps([self.base_url, path, sorted((params or {}).items())], default=str)
+        return f"{CACHE_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def paused_for(self) -> float:
+        """Seconds left of a 429 pause (0 when Lichess may be called)."""
+        try:
+            until = cache.get(PAUSE_KEY)
+        except Exception:
+            return 0.0
+        return max(0.0, float(until) - time.time()) if until else 0.0
+
+    def _pause(self, response: requests.Response) -> None:
+        try:
+            seconds = float(response.headers.get("Retry-After") or self.retry_after)
+        except ValueError:
+            seconds = self.retry_after
+        logger.warning("Lichess API rate limit reached, pausing calls for %.0fs", seconds)
+        try:
+            cache.set(PAUSE_KEY, time.time() + seconds, max(1, int(seconds + 1)))
+        except Exception:
+            pass
+
+    def get_json(
+        self,
+        path: str,
+        params: Optional[dict] = None,
+        ttl: int = 0,
+        negative_ttl: int = 0,
+        timeout: float = 5.0,
+    ) -> Tuple[Optional[int], Optional[Any]]:
+        """
+        GET ``path`` (relative to the API base) and return (status, json).
+
+        200 answers are cached for ``ttl`` seconds and 404s for
+        ``negative_ttl``; status None means the call was not made or did not
+        complete (paused, throttled, breaker open, network error).
+        """
+        key = self._cache_key(path, params) if ttl or negative_ttl else None
+        if key:
+            try:
+                cached = cache.get(key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                self._bump("cache_hits")
+                return cached["status"], cached["data"]
+
+        if self.paused_for() > 0:
+            self._bump("paused")
+            return None, None
+        if not self._slots.acquire(timeout=self.max_wait):
+            self._bump("throttled")
+            return None, None
+        try:
+            if not self.bucket.acquire(self.max_wait):
+                self._bump("throttled")
+                return None, None
+            if not self.breaker.allow():
+                self._bump("breaker_rejected")
+                return None, None
+            self._bump("requests")
+            try:
+                response = self.session().get(f"{self.base_url}{path}", params=params, timeout=timeout)
+            except requests.RequestException as exc:
+                self._bump("errors")
+                self.breaker.record_failure()
+                logger.warning("Lichess API request failed: %s", exc)
+                return None, None
+        finally:
+            self._slots.release()
+
+        if response.status_code >= 500:
+            self._bump("errors")
+            self.breaker.record_failure()
+            return response.status_code, None
+        self.breaker.record_success()
+        if response.status_code == 429:
+            self._bump("rate_limited")
+            self._pause(response)
+            return 429, None
+
+        data = None
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                self._bump("errors")
+                return None, None
+        store_for = ttl if response.status_code == 200 else negative_ttl if response.status_code == 404 else 0
+        if key and store_for:
+            try:
+                cache.set(key, {"status": response.status_code, "data": data}, store_for)
+            except Exception:
+                pass
+        return response.status_code, data
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            **metrics,
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+            "breaker": self.breaker.state,
+            "paused_for": round(self.paused_for(), 1),
+        }
+
+
+lichess_client = LichessClient()
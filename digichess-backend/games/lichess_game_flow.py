@@ -10,6 +10,7 @@ from typing import Optional, Dict, Any, Tuple
 from django.conf import settings
 import logging
 from .game_core import is_insufficient_material
+from .legal_moves import legal_moves_for_board
 
 logger = logging.getLogger(__name__)
 
@@ -96,15 +97,14 @@ def get_game_state_export(fen: str, moves: str, variant: str = "standard") -> Op
                     break
             board = temp_board
         
-        legal_moves_uci = [move.uci() for move in board.legal_moves]
-        legal_moves_san = [board.san(move) for move in board.legal_moves]
+        legal = legal_moves_for_board(board)
         
         return {
             "fen": board.fen(),
             "moves": " ".join(moves_list),
             "legal_moves": {
-                "uci": legal_moves_uci,
-                "san": legal_moves_san
+                "uci": legal["uci"],
+                "san": legal["san"]
             },
             "turn": "white" if board.turn == chess.WHITE else "black",
             "is_check": board.is_check(),
@@ -125,21 +125,13 @@ def get_maia_move_via_lc0(board: chess.Board, bot_rating: int, timeout: float =
         return None
     
     try:
-        # Use python-chess UCI interface to communicate with lc0
-        import chess.engine
-        
-        # Start lc0 engine (weights are set via UCI command, not command line)
-        cmd = [str(lc0_path)]
-        
-        with chess.engine.SimpleEngine.popen_uci(cmd) as engine:
-            # Set the weights file via UCI option
-            try:
-                engine.configure({"WeightsFile": str(model_path)})
-            except Exception:
-                # If configure fails, try setting weights via command line argument
-                # Some versions of lc0 support --weights flag
-                pass
-            
+        from games.engine_pool import engine_pool
+
+        # lc0 stays warm per weights file: the WeightsFile option is set once
+        # when the process starts instead of reloading the net every move.
+        with engine_pool.checkout(
+            str(lc0_path), startup_options={"WeightsFile": str(model_path)}
+        ) as engine:
             # Get move with time limit (use nodes=1 for speed, like Maia example)
             # engine.play() automatically sets the position from the board
             limit = chess.engine.Limit(nodes=1, time=timeout)
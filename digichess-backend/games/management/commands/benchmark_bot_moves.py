@@ -0,0 +1,234 @@
+"""
+Load test for bot replies: inline in the human's move vs. the bot queue.
+Run with: python manage.py benchmark_bot_moves
+
+Creates N active human-vs-bot games and plays them concurrently. Human moves
+come from --humans threads; bot "thinking" is simulated with --think-ms of
+sleep plus a random legal move, so the numbers measure the pipeline and not
+an engine.
+
+  inline  the old GameMoveView behaviour: the human's move call also picks
+          and applies the bot's reply before returning.
+  queued  the human's move only applies its own move and queues the reply;
+          --workers threads (standing in for the scm_bots Celery workers)
+          run games.bot_moves.play_bot_move for each queued (game, ply).
+
+Reports human move latency (p50/p95), bot replies/s and wall time. The
+throwaway users and games are deleted afterwards. Run it against Postgres:
+SQLite serialises writers, so many concurrent games mostly measure lock waits.
+"""
+import queue
+import random
+import threading
+import time
+import uuid
+
+import chess
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from games.bot_moves import BUSY_ERROR, play_bot_move
+from games.game_core import apply_move
+from games.management.commands.benchmark_ws_moves import _percentile
+from games.models import Game
+
+User = get_user_model()
+
+
+def _retry_busy(fn, *args, attempts: int = 50, **kwargs):
+    """Call a move function again while the game row is locked, as a client or the bot task would."""
+    for _ in range(attempts):
+        result = fn(*args, **kwargs)
+        if result is None or result.error != BUSY_ERROR:
+            return result
+        time.sleep(0.01)
+    return result
+
+
+class Command(BaseCommand):
+    help = "Compare inline and queued bot replies across many concurrent bot games"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=500, help="Concurrent bot games (default: 500)")
+        parser.add_argument("--moves", type=int, default=6, help="Human moves per game (default: 6)")
+        parser.add_argument("--think-ms", type=float, default=50.0, help="Simulated bot think time (default: 50)")
+        parser.add_argument("--humans", type=int, default=8, help="Threads submitting human moves (default: 8)")
+        parser.add_argument("--workers", type=int, default=8, help="Bot worker threads (default: 8)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _make_games(self, count: int, tag: str):
+        users = User.objects.bulk_create(
+            [
+                User(username=f"botbench_{tag}_{idx}_{side}", email=f"botbench_{tag}_{idx}_{side}@example.com",
+                     is_bot=(side == "b"), password="!")
+                for idx in range(count)
+                for side in ("h", "b")
+            ]
+        )
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=f"botbench_{tag}_").order_by("id"))
+        now = timezone.now()
+        Game.objects.bulk_create(
+            [
+                Game(
+                    creator=human,
+                    white=human,
+                    black=bot,
+                    rated=False,
+                    status=Game.STATUS_ACTIVE,
+                    initial_time_seconds=3600,
+                    white_time_left=3600,
+                    black_time_left=3600,
+                    started_at=now,
+                    last_move_at=now,
+                )
+                for human, bot in zip(users[0::2], users[1::2])
+            ]
+        )
+        return list(Game.objects.filter(white__username__startswith=f"botbench_{tag}_").select_related("white"))
+
+    def _thinker(self, think_ms: float, seed: int):
+        local = threading.local()
+
+        def choose(game, board, bot):
+            if not hasattr(local, "rng"):
+                local.rng = random.Random(f"{seed}-{threading.get_ident()}")
+            time.sleep(think_ms / 1000)
+            return local.rng.choice(sorted(board.legal_moves, key=lambda move: move.uci()))
+
+        return choose
+
+    def _human_san(self, game_id: int, rng: random.Random):
+        game = Game.objects.only("current_fen", "status").get(id=game_id)
+        if game.status != Game.STATUS_ACTIVE:
+            return None
+        board = chess.Board(game.current_fen or chess.STARTING_FEN)
+        if board.turn != chess.WHITE:
+            return None
+        return board.san(rng.choice(sorted(board.legal_moves, key=lambda move: move.uci())))
+
+    def _run(self, games, options, queued: bool):
+        choose = self._thinker(options["think_ms"], options["seed"])
+        moves_per_game = options["moves"]
+        human_latencies = []
+        bot_replies = [0]
+        errors = []
+        lock = threading.Lock()
+        human_jobs = queue.Queue()
+        bot_jobs = queue.Queue()
+        remaining = {game.id: moves_per_game for game in games}
+        done = threading.Event()
+        open_games = [len(games)]
+
+        def finish_game(game_id):
+            with lock:
+                open_games[0] -= 1
+                if open_games[0] == 0:
+                    done.set()
+
+        def after_bot_move(game_id, result):
+            with lock:
+                remaining[game_id] -= 1
+                left = remaining[game_id]
+                if result is not None and result.ok:
+                    bot_replies[0] += 1
+            if left > 0 and result is not None and result.ok and not result.finished:
+                human_jobs.put(game_id)
+            else:
+                finish_game(game_id)
+
+        def human_loop(index):
+            rng = random.Random(f"{options['seed']}-human-{index}")
+            while not done.is_set():
+                try:
+                    game_id = human_jobs.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    san = self._human_san(game_id, rng)
+                    if san is None:
+                        finish_game(game_id)
+                        continue
+                    player = game_users[game_id]
+                    start = time.perf_counter()
+                    result = _retry_busy(apply_move, game_id, player, san)
+                    if result.ok and not result.finished:
+                        if queued:
+                            bot_jobs.put((game_id, len(result.game.moves.split())))
+                        else:
+                            reply = _retry_busy(play_bot_move, game_id, choose=choose)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        human_latencies.append(elapsed)
+                    if not result.ok or result.finished:
+                        if not result.ok:
+                            errors.append(f"game {game_id}: {result.error}")
+                        finish_game(game_id)
+                    elif not queued:
+                        after_bot_move(game_id, reply)
+                except Exception as exc:
+                    errors.append(f"game {game_id}: {exc}")
+                    finish_game(game_id)
+                finally:
+                    close_old_connections()
+
+        def bot_loop():
+            while not done.is_set():
+                try:
+                    game_id, ply = bot_jobs.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    result = play_bot_move(game_id, ply, choose=choose)
+                    if result is not None and result.error == BUSY_ERROR:
+                        bot_jobs.put((game_id, ply))  # the task would retry
+                        continue
+                    after_bot_move(game_id, result)
+                except Exception as exc:
+                    errors.append(f"game {game_id}: {exc}")
+                    finish_game(game_id)
+                finally:
+                    close_old_connections()
+
+        game_users = {game.id: game.white for game in games}
+        for game in games:
+            human_jobs.put(game.id)
+
+        threads = [threading.Thread(target=human_loop, args=(i,), daemon=True) for i in range(options["humans"])]
+        if queued:
+            threads += [threading.Thread(target=bot_loop, daemon=True) for _ in range(options["workers"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        done.wait()
+        wall = time.perf_counter() - start
+        for thread in threads:
+            thread.join()
+        return human_latencies, bot_replies[0], wall, errors
+
+    def handle(self, *args, **options):
+        game_count = max(1, options["games"])
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Bot replies: inline vs queued ===\n"))
+        self.stdout.write(
+            f"  {game_count} games x {options['moves']} human moves, bot think {options['think_ms']:.0f}ms, "
+            f"{options['humans']} human threads, {options['workers']} bot workers\n"
+        )
+        self.stdout.write(
+            f"  {'mode':<7} {'human p50':>10} {'human p95':>10} {'replies':>8} {'replies/s':>10} {'wall (s)':>9}"
+        )
+        try:
+            for label, queued in (("inline", False), ("queued", True)):
+                games = self._make_games(game_count, f"{tag}{label[0]}")
+                latencies, replies, wall, errors = self._run(games, options, queued)
+                self.stdout.write(
+                    f"  {label:<7} {_percentile(latencies, 50):>8.1f}ms {_percentile(latencies, 95):>8.1f}ms "
+                    f"{replies:>8} {replies / wall if wall else 0.0:>10.1f} {wall:>9.1f}"
+                )
+                for error in errors[:5]:
+                    self.stdout.write(self.style.WARNING(f"          {error}"))
+        finally:
+            User.objects.filter(username__startswith=f"botbench_{tag}").delete()
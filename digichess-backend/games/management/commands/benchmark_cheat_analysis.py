@@ -0,0 +1,108 @@
+"""
+Benchmark single-pass dual-colour cheat analysis.
+Run with: python manage.py benchmark_cheat_analysis [--engine /path/to/stockfish]
+
+Plays --games random games and builds a full report (both players) for each
+one twice, clearing cached evaluations in between: once as two
+run_cheat_analysis_from_sequence() calls, once as a single
+run_dual_cheat_analysis_from_sequence() pass. Reports engine searches and
+engine time, and checks that both produce the same per-colour results.
+"""
+import random
+import shlex
+import time
+
+import chess
+from django.core.management.base import BaseCommand, CommandError
+
+from games import cheat_detection
+from games.engine_registry import verified_stockfish_path
+from games.eval_cache import eval_cache, normalize_fen
+
+
+def _random_game(plies: int, rng: random.Random):
+    board = chess.Board()
+    moves = []
+    fens = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(list(board.legal_moves))
+        moves.append(board.san(move))
+        board.push(move)
+        fens.append(normalize_fen(board))
+    return moves, fens
+
+
+def _strip(result):
+    return {key: value for key, value in result.items() if key != "eval_cache"}
+
+
+class Command(BaseCommand):
+    help = "Compare engine work of two single-colour cheat analyses with one dual-colour pass"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", default=None, help="UCI engine command (default: verified Stockfish)")
+        parser.add_argument("--games", type=int, default=5)
+        parser.add_argument("--plies", type=int, default=80)
+        parser.add_argument("--depth", type=int, default=12)
+        parser.add_argument("--movetime", type=float, default=0.05, help="Full search time per position in seconds")
+        parser.add_argument("--seed", type=int, default=3)
+
+    def _purge(self, fens, depth):
+        eval_cache.purge(fens, depth)
+        eval_cache.purge(fens, depth, cheat_detection.DEFAULT_MULTIPV)
+
+    def handle(self, *args, **options):
+        if options["engine"]:
+            command = shlex.split(options["engine"])
+        else:
+            ok, message, path = verified_stockfish_path()
+            if not ok:
+                raise CommandError(f"Stockfish unavailable: {message}")
+            command = path
+
+        rng = random.Random(options["seed"])
+        depth = options["depth"]
+        kwargs = {"depth": depth, "time_per_move": options["movetime"], "engine_path": command}
+        totals = {"single": [0, 0.0, 0.0], "dual": [0, 0.0, 0.0]}
+        plies = 0
+
+        for _ in range(options["games"]):
+            moves, fens = _random_game(options["plies"], rng)
+            plies += len(moves)
+
+            self._purge(fens, depth)
+            start = time.perf_counter()
+            white = cheat_detection.run_cheat_analysis_from_sequence(moves, player_is_white=True, **kwargs)
+            black = cheat_detection.run_cheat_analysis_from_sequence(moves, player_is_white=False, **kwargs)
+            wall = time.perf_counter() - start
+            for result in (white, black):
+                totals["single"][0] += result["eval_cache"]["misses"]
+                totals["single"][1] += result["eval_cache"]["engine_ms"] / 1000
+            totals["single"][2] += wall
+
+            self._purge(fens, depth)
+            start = time.perf_counter()
+            dual = cheat_detection.run_dual_cheat_analysis_from_sequence(moves, **kwargs)
+            totals["dual"][0] += dual["eval_cache"]["misses"]
+            totals["dual"][1] += dual["eval_cache"]["engine_ms"] / 1000
+            totals["dual"][2] += time.perf_counter() - start
+            self._purge(fens, depth)
+
+            if _strip(dual["white"]) != _strip(white) or _strip(dual["black"]) != _strip(black):
+                self.stdout.write(self.style.WARNING("  Per-colour results differ from the single-colour runs"))
+
+        self.stdout.write(self.style.SUCCESS("\n=== Cheat analysis: two single-colour runs vs one dual pass ===\n"))
+        self.stdout.write(
+            f"  Games: {options['games']}, plies: {plies}, depth {depth}, movetime {options['movetime']}s"
+        )
+        self.stdout.write(f"  {'mode':<8}{'searches':>10}{'engine s':>10}{'wall s':>9}")
+        for mode, (searches, engine_s, wall) in totals.items():
+            self.stdout.write(f"  {mode:<8}{searches:>10}{engine_s:>10.2f}{wall:>9.2f}")
+        single, dual = totals["single"], totals["dual"]
+        if single[1]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  ✓ Dual pass: {dual[0] / single[0]:.0%} of the searches, "
+                    f"{dual[1] / single[1]:.0%} of the engine time"
+                )
+            )
@@ -0,0 +1,105 @@
+"""
+Microbenchmark for the clock broadcaster.
+Run with: python manage.py benchmark_clock_broadcast
+
+Builds N in-memory active games, marks W of them as watched, and compares the
+old per-game loop (snapshot + async_to_sync(group_send) for every active game)
+against the watched-only batched fan-out in games.clock_broadcast.
+"""
+import random
+import time
+from datetime import timedelta
+
+import chess
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from games.clock_broadcast import build_clock_payloads, send_clock_payloads
+from games.game_core import compute_clock_snapshot
+from games.models import Game
+
+
+class CountingChannelLayer:
+    """Stand-in channel layer that only counts sends, so we time our own overhead."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def group_send(self, group, message):
+        self.sent += 1
+
+
+class Command(BaseCommand):
+    help = "Benchmark clock fan-out for many active games with few watched"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=10_000)
+        parser.add_argument("--watched", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _make_games(self, count: int, rng: random.Random):
+        now = timezone.now()
+        games = []
+        for idx in range(count):
+            games.append(
+                Game(
+                    id=idx + 1,
+                    status=Game.STATUS_ACTIVE,
+                    moves="e4 e5 Nf3",
+                    current_fen="rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+                    white_time_left=rng.randint(30, 300),
+                    black_time_left=rng.randint(30, 300),
+                    last_move_at=now - timedelta(seconds=rng.randint(0, 20)),
+                )
+            )
+        return games
+
+    def _legacy(self, games, channel_layer, now):
+        for game in games:
+            try:
+                board = chess.Board(game.current_fen or chess.STARTING_FEN)
+            except Exception:
+                board = chess.Board()
+            snapshot = compute_clock_snapshot(game, now=now, board=board)
+            async_to_sync(channel_layer.group_send)(
+                f"game_{game.id}",
+                {
+                    "type": "game.event",
+                    "payload": {
+                        "type": "clock",
+                        "game_id": game.id,
+                        "white_time_left": snapshot["white_time_left"],
+                        "black_time_left": snapshot["black_time_left"],
+                        "turn": snapshot["turn"],
+                    },
+                },
+            )
+
+    def _watched_only(self, games, watched_ids, channel_layer, now):
+        watched = [game for game in games if game.id in watched_ids]
+        send_clock_payloads(channel_layer, build_clock_payloads(watched, now=now))
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        games = self._make_games(options["games"], rng)
+        watched_ids = set(rng.sample([g.id for g in games], min(options["watched"], len(games))))
+        now = timezone.now()
+
+        self.stdout.write(self.style.SUCCESS("\n=== Clock broadcast fan-out ===\n"))
+        self.stdout.write(f"  Active games: {len(games)}, watched: {len(watched_ids)}")
+
+        legacy_layer = CountingChannelLayer()
+        start = time.perf_counter()
+        self._legacy(games, legacy_layer, now)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        batched_layer = CountingChannelLayer()
+        start = time.perf_counter()
+        self._watched_only(games, watched_ids, batched_layer, now)
+        batched_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f"  Per-game loop: {legacy_ms:8.1f}ms, {legacy_layer.sent} sends")
+        self.stdout.write(f"  Watched-only:  {batched_ms:8.1f}ms, {batched_layer.sent} sends")
+        if batched_ms:
+            self.stdout.write(self.style.SUCCESS(f"  ✓ {legacy_ms / batched_ms:.1f}x less time per tick"))
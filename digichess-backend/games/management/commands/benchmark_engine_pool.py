@@ -0,0 +1,98 @@
+"""
+Benchmark bot move latency with and without the engine pool.
+Run with: python manage.py benchmark_engine_pool [--engine /path/to/stockfish]
+
+Plays --moves short searches from random positions, once starting a fresh
+engine process per move (the old bot/analysis behaviour) and once through
+games.engine_pool. With the pool, latency should be bound by the search time
+instead of process startup. Pool metrics are printed at the end.
+"""
+import random
+import shlex
+import statistics
+import time
+
+import chess
+import chess.engine
+from django.core.management.base import BaseCommand, CommandError
+
+from games.engine_pool import EnginePool
+from games.engine_registry import verified_stockfish_path
+
+
+def _random_positions(count: int, seed: int):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(4, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            boards.append(board)
+    return boards
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-move engine latency: process per move vs. warm engine pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", default=None, help="UCI engine command (default: verified Stockfish)")
+        parser.add_argument("--moves", type=int, default=50)
+        parser.add_argument("--movetime", type=float, default=0.05, help="Search time per move in seconds")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _report(self, label: str, samples):
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.stdout.write(
+            f"  {label:<18} mean {statistics.mean(samples):8.1f}ms   p95 {p95:8.1f}ms"
+        )
+
+    def handle(self, *args, **options):
+        if options["engine"]:
+            command = shlex.split(options["engine"])
+        else:
+            ok, message, path = verified_stockfish_path()
+            if not ok:
+                raise CommandError(f"Stockfish unavailable: {message}")
+            command = [path]
+        boards = _random_positions(max(1, options["moves"]), options["seed"])
+        limit = chess.engine.Limit(time=options["movetime"])
+        skill_levels = [3, 8, 14, 20]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Engine pool: per-move latency ===\n"))
+        self.stdout.write(f"  Engine: {' '.join(command)}, moves: {len(boards)}, movetime: {options['movetime']}s")
+
+        fresh = []
+        for idx, board in enumerate(boards):
+            start = time.perf_counter()
+            with chess.engine.SimpleEngine.popen_uci(command) as engine:
+                engine.configure({"Skill Level": skill_levels[idx % len(skill_levels)]})
+                engine.play(board, limit)
+            fresh.append((time.perf_counter() - start) * 1000)
+
+        pool = EnginePool(max_idle=1, max_per_key=1)
+        pooled = []
+        try:
+            for idx, board in enumerate(boards):
+                start = time.perf_counter()
+                with pool.checkout(command, options={"Skill Level": skill_levels[idx % len(skill_levels)]}) as engine:
+                    engine.play(board, limit)
+                pooled.append((time.perf_counter() - start) * 1000)
+            stats = pool.stats()
+        finally:
+            pool.close_all()
+
+        self._report("Process per move:", fresh)
+        self._report("Engine pool:", pooled)
+        self.stdout.write(
+            f"  Pool: {stats['checkouts']} checkouts, {stats['spawned']} spawned, "
+            f"reuse rate {stats['reuse_rate']:.1%}, avg spawn {stats['spawn_ms_avg']}ms"
+        )
+        if statistics.mean(pooled):
+            self.stdout.write(
+                self.style.SUCCESS(f"  ✓ {statistics.mean(fresh) / statistics.mean(pooled):.1f}x faster per move")
+            )
@@ -0,0 +1,121 @@
+"""
+Benchmark the position evaluation cache on repeated game analysis.
+Run with: python manage.py benchmark_eval_cache [--engine /path/to/stockfish]
+
+Builds --games games that share a handful of openings, clears any cached
+evaluations for their positions, then runs analyze_game_with_stockfish over
+all of them twice. The first pass only reuses positions shared between games
+(openings, transpositions); the second pass should not search at all.
+"""
+import random
+import shlex
+import time
+
+import chess
+from django.core.management.base import BaseCommand, CommandError
+
+from games.analysis_service import analyze_game_with_stockfish
+from games.engine_registry import verified_stockfish_path
+from games.eval_cache import eval_cache, normalize_fen
+from games.models import Game
+
+OPENINGS = (
+    "e4 e5 Nf3 Nc6 Bb5 a6",
+    "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6",
+    "d4 d5 c4 e6 Nc3 Nf6",
+    "d4 Nf6 c4 g6 Nc3 Bg7 e4 d6",
+    "e4 e6 d4 d5 Nc3 Bb4",
+    "c4 e5 Nc3 Nf6 g3 d5",
+    "e4 c6 d4 d5 e5 Bf5",
+    "Nf3 d5 g3 Nf6 Bg2 e6",
+)
+
+
+def _random_games(count: int, plies: int, seed: int):
+    rng = random.Random(seed)
+    games = []
+    while len(games) < count:
+        board = chess.Board()
+        sans = []
+        for san in rng.choice(OPENINGS).split():
+            sans.append(san)
+            board.push_san(san)
+        while len(sans) < plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            sans.append(board.san(move))
+            board.push(move)
+        if not board.is_game_over():
+            games.append(" ".join(sans))
+    return games
+
+
+def _positions(moves: str):
+    board = chess.Board()
+    for san in moves.split():
+        board.push_san(san)
+        yield normalize_fen(board)
+
+
+class Command(BaseCommand):
+    help = "Analyse the same games twice and report eval cache hit rates and engine time saved"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", default=None, help="UCI engine command (default: verified Stockfish)")
+        parser.add_argument("--games", type=int, default=100)
+        parser.add_argument("--plies", type=int, default=40)
+        parser.add_argument("--depth", type=int, default=10)
+        parser.add_argument("--movetime", type=float, default=0.05, help="Search time per position in seconds")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _run_pass(self, games, command, depth, movetime):
+        totals = {"hits": 0, "misses": 0, "engine_ms": 0.0}
+        start = time.perf_counter()
+        for idx, moves in enumerate(games):
+            game = Game(id=idx + 1, moves=moves, current_fen="")
+            summary = analyze_game_with_stockfish(game, command, time_per_move=movetime, depth=depth)["summary"]
+            for key in totals:
+                totals[key] += summary["eval_cache"][key]
+        totals["wall_ms"] = (time.perf_counter() - start) * 1000
+        return totals
+
+    def handle(self, *args, **options):
+        if options["engine"]:
+            command = shlex.split(options["engine"])
+        else:
+            ok, message, path = verified_stockfish_path()
+            if not ok:
+                raise CommandError(f"Stockfish unavailable: {message}")
+            command = path
+        depth = options["depth"]
+        games = _random_games(options["games"], options["plies"], options["seed"])
+        fens = {fen for moves in games for fen in _positions(moves)}
+        total_positions = sum(len(moves.split()) for moves in games)
+        eval_cache.purge(fens, depth)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Position eval cache: analysing every game twice ===\n"))
+        self.stdout.write(
+            f"  Games: {len(games)}, positions: {total_positions} ({len(fens)} distinct), "
+            f"depth {depth}, movetime {options['movetime']}s"
+        )
+        self.stdout.write(f"  {'pass':<8}{'hits':>8}{'misses':>8}{'hit rate':>10}{'engine s':>10}{'wall s':>9}")
+        passes = []
+        for label in ("first", "second"):
+            totals = self._run_pass(games, command, depth, options["movetime"])
+            passes.append(totals)
+            lookups = totals["hits"] + totals["misses"]
+            self.stdout.write(
+                f"  {label:<8}{totals['hits']:>8}{totals['misses']:>8}"
+                f"{totals['hits'] / lookups if lookups else 0:>10.1%}"
+                f"{totals['engine_ms'] / 1000:>10.2f}{totals['wall_ms'] / 1000:>9.2f}"
+            )
+
+        baseline_ms = total_positions * options["movetime"] * 1000 * 2
+        spent_ms = passes[0]["engine_ms"] + passes[1]["engine_ms"]
+        self.stdout.write(f"  Process-wide cache stats: {eval_cache.stats()['process']}")
+        if baseline_ms:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  ✓ Engine time {spent_ms / 1000:.1f}s vs ~{baseline_ms / 1000:.1f}s uncached "
+                    f"({1 - spent_ms / baseline_ms:.0%} saved)"
+                )
+            )
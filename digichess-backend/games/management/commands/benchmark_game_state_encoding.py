@@ -0,0 +1,135 @@
+"""
+Benchmark: GameSerializer vs. the compact encoder on real-time broadcasts.
+Run with: python manage.py benchmark_game_state_encoding
+
+Creates N games between throwaway users -- half in progress after --plies
+random moves, half finished -- and builds the "game" part of a game_finished /
+gameFull payload for each of them, once per encoder:
+
+  serializer  GameSerializer(game).data, as the broadcasts used to send
+  compact     games.game_state_codec.encode_game(game)
+
+Every sample starts from a freshly loaded Game row (no select_related), as the
+timeout sweep and the views hand them over, and includes json.dumps() of the
+result. Reports p50/p95 time per broadcast, SQL queries per broadcast and the
+JSON payload size. The throwaway users and their games are deleted afterwards.
+"""
+import json
+import random
+import time
+import uuid
+
+import chess
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from games.game_state_codec import encode_game
+from games.legal_moves import legal_move_cache
+from games.management.commands.benchmark_ws_moves import _percentile
+from games.models import Game
+from games.serializers import GameSerializer
+
+User = get_user_model()
+
+
+def _serializer(game):
+    return GameSerializer(game).data
+
+
+ENCODERS = (("serializer", _serializer), ("compact", encode_game))
+
+
+class Command(BaseCommand):
+    help = "Compare time and payload size of GameSerializer and the compact game-state encoder"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=200, help="Games to encode (default: 200)")
+        parser.add_argument("--plies", type=int, default=30, help="Moves played in each game (default: 30)")
+        parser.add_argument("--repeat", type=int, default=3, help="Passes over all games per encoder (default: 3)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _make_games(self, count: int, plies: int, seed: int, tag: str):
+        rng = random.Random(seed)
+        now = timezone.now()
+        ids = []
+        for idx in range(count):
+            white = User.objects.create_user(
+                username=f"encbench_{tag}_{idx}_w", email=f"encbench_{tag}_{idx}_w@example.com", password="x"
+            )
+            black = User.objects.create_user(
+                username=f"encbench_{tag}_{idx}_b", email=f"encbench_{tag}_{idx}_b@example.com", password="x"
+            )
+            board = chess.Board()
+            sans = []
+            while len(sans) < plies and not board.is_game_over():
+                move = rng.choice(list(board.legal_moves))
+                sans.append(board.san(move))
+                board.push(move)
+            finished = idx % 2 == 1
+            game = Game.objects.create(
+                creator=white,
+                white=white,
+                black=black,
+                status=Game.STATUS_FINISHED if finished else Game.STATUS_ACTIVE,
+                result=Game.RESULT_WHITE if finished else Game.RESULT_NONE,
+                moves=" ".join(sans),
+                current_fen=board.fen(),
+                started_at=now,
+                last_move_at=now,
+                finished_at=now if finished else None,
+                draw_offer_by=black if not finished and idx % 4 == 0 else None,
+            )
+            ids.append(game.id)
+        return ids
+
+    def _run(self, encode, game_ids, repeat):
+        timings = []
+        queries = []
+        sizes = []
+        legal_move_cache.clear()
+        for _ in range(repeat):
+            for game_id in game_ids:
+                game = Game.objects.get(id=game_id)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    payload = json.dumps({"type": "game_finished", "game_id": game_id, "game": encode(game)})
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured))
+                sizes.append(len(payload.encode()))
+        return timings, queries, sizes
+
+    def handle(self, *args, **options):
+        game_count = max(2, options["games"])
+        repeat = max(1, options["repeat"])
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Real-time game state: GameSerializer vs compact encoder ===\n"))
+        self.stdout.write(f"  {game_count} games ({options['plies']} plies, half finished) x {repeat} passes\n")
+        self.stdout.write(
+            f"  {'encoder':<10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'queries':>8} {'bytes':>8} {'broadcasts/s':>13}"
+        )
+
+        results = {}
+        try:
+            game_ids = self._make_games(game_count, options["plies"], options["seed"], tag)
+            for label, encode in ENCODERS:
+                timings, queries, sizes = self._run(encode, game_ids, repeat)
+                total = sum(timings) / 1000
+                results[label] = (_percentile(timings, 50), sum(sizes) / len(sizes))
+                self.stdout.write(
+                    f"  {label:<10} {_percentile(timings, 50):>9.3f} {_percentile(timings, 95):>9.3f} "
+                    f"{sum(queries) / len(queries):>8.1f} {sum(sizes) / len(sizes):>8.0f} "
+                    f"{len(timings) / total if total else 0.0:>13.0f}"
+                )
+        finally:
+            User.objects.filter(username__startswith=f"encbench_{tag}").delete()
+
+        before, after = results.get("serializer"), results.get("compact")
+        if before and after and after[0] and after[1]:
+            self.stdout.write(
+                f"\n  Compact encoder: x{before[0] / after[0]:.1f} faster at p50, "
+                f"x{before[1] / after[1]:.1f} smaller payloads"
+            )
@@ -0,0 +1,74 @@
+"""
+Benchmark: Glicko-2 over a synthetic game history, per game vs. per rating period.
+Run with: python manage.py benchmark_glicko2 [--games 1000000 --players 100000 --periods 30]
+
+Generates --games random results between --players players spread over
+--periods rating periods (no database involved), then rates them:
+
+  per-game  games.glicko2.rate_game() once per game, as live settlement does;
+            timed on --sample games and extrapolated to the full history
+  periods   games.glicko2.replay_periods(): one vectorised rate_period() call
+            per period over every player, as recompute_ratings does
+
+Reports wall time, games per second and the spread of the resulting ratings.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from games.glicko2 import DEFAULT_VOLATILITY, rate_game, replay_periods
+
+
+class Command(BaseCommand):
+    help = "Compare per-game and rating-period Glicko-2 on a synthetic history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=1_000_000, help="Games in the history (default: 1000000)")
+        parser.add_argument("--players", type=int, default=100_000, help="Players (default: 100000)")
+        parser.add_argument("--periods", type=int, default=30, help="Rating periods (default: 30)")
+        parser.add_argument("--sample", type=int, default=20_000, help="Games timed for per-game (default: 20000)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        games, players = max(1, options["games"]), max(2, options["players"])
+        periods = max(1, options["periods"])
+
+        strength = rng.normal(1500, 300, players)
+        white = rng.integers(0, players, games)
+        black = (white + rng.integers(1, players, games)) % players
+        expected = 1 / (1 + 10 ** ((strength[black] - strength[white]) / 400))
+        roll = rng.random(games)
+        white_score = np.where(roll < expected * 0.9, 1.0, np.where(roll < expected * 0.9 + 0.1, 0.5, 0.0))
+        period = np.sort(rng.integers(0, periods, games))
+
+        rating = np.full(players, 1500.0)
+        rd = np.full(players, 350.0)
+        vol = np.full(players, DEFAULT_VOLATILITY)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Glicko-2: per game vs rating periods ===\n"))
+        self.stdout.write(f"  {games} games, {players} players, {periods} periods\n")
+        self.stdout.write(f"  {'mode':<9} {'time (s)':>10} {'games/s':>12}")
+
+        sample = min(games, max(1, options["sample"]))
+        state = {}
+        start = time.perf_counter()
+        for w, b, s in zip(white[:sample].tolist(), black[:sample].tolist(), white_score[:sample].tolist()):
+            before_w = state.get(w, (1500.0, 350.0, DEFAULT_VOLATILITY))
+            before_b = state.get(b, (1500.0, 350.0, DEFAULT_VOLATILITY))
+            state[w], state[b] = rate_game(before_w, before_b, s)
+        per_game = (time.perf_counter() - start) / sample * games
+        self.stdout.write(f"  {'per-game':<9} {per_game:>10.2f} {games / per_game:>12.0f}  (from {sample} games)")
+
+        start = time.perf_counter()
+        new_rating, new_rd, _ = replay_periods(rating, rd, vol, period, white, black, white_score, until=periods)
+        batched = time.perf_counter() - start
+        self.stdout.write(f"  {'periods':<9} {batched:>10.2f} {games / batched:>12.0f}")
+
+        correlation = np.corrcoef(strength, new_rating)[0, 1]
+        self.stdout.write(
+            f"\n  ratings {np.percentile(new_rating, 5):.0f}..{np.percentile(new_rating, 95):.0f} (p5..p95), "
+            f"median RD {np.median(new_rd):.1f}, correlation with true strength {correlation:.3f}"
+        )
+        self.stdout.write(f"  Rating periods: x{per_game / batched:.0f} faster")
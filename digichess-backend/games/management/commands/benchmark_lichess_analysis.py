@@ -0,0 +1,118 @@
+"""
+Benchmark cloud-eval game analysis with 1, 2, 4, ... concurrent Lichess requests.
+Run with: python manage.py benchmark_lichess_analysis [--base-url http://host/api]
+
+By default it starts the local stand-in (tests/fake_lichess_server.py, which
+adds --latency seconds to each request) so no request reaches lichess.org.
+Plays one random game of --plies plies and analyses it through a fresh
+LichessClient per concurrency level, clearing cached evaluations and cached
+responses first. Every run must produce the same moves as the serial one.
+"""
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import chess
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from games import analysis_service, lichess_api
+from games.eval_cache import eval_cache
+from games.lichess_client import LichessClient
+from games.management.commands.benchmark_parallel_analysis import _random_game
+from games.models import Game
+
+FAKE_SERVER = Path(settings.BASE_DIR) / "tests" / "fake_lichess_server.py"
+
+
+class Command(BaseCommand):
+    help = "Compare wall time of Lichess cloud-eval analysis across request concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=None, help="Lichess API base (default: start the local stand-in)")
+        parser.add_argument("--server", default=f"{sys.executable} {FAKE_SERVER}", help="Stand-in server command")
+        parser.add_argument("--latency", type=float, default=0.05, help="Stand-in seconds per request")
+        parser.add_argument("--plies", type=int, default=80)
+        parser.add_argument("--depth", type=int, default=18)
+        parser.add_argument("--max-concurrency", type=int, default=8)
+        parser.add_argument("--rate", type=float, default=1000.0, help="Token bucket requests per second")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = options["base_url"]
+        if not base_url:
+            server = subprocess.Popen(
+                shlex.split(options["server"]) + ["--latency", str(options["latency"])],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            base_url = server.stdout.readline().strip()
+            if not base_url:
+                server.kill()
+                raise CommandError("Stand-in Lichess server did not start")
+        try:
+            self._run(base_url, options)
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=5)
+
+    def _run(self, base_url: str, options: dict):
+        depth = options["depth"]
+        moves, fens = _random_game(options["plies"], options["seed"])
+        game = Game(id=1, moves=moves, current_fen="")
+        board = chess.Board()
+        full_fens = []
+        for san in moves.split():
+            board.push_san(san)
+            full_fens.append(board.fen())
+
+        def purge(client: LichessClient):
+            eval_cache.purge(fens, depth)
+            keys = [
+                client._cache_key("/cloud-eval", {"fen": fen, "multiPv": 1, "depth": depth, "variant": "standard"})
+                for fen in full_fens
+            ]
+            cache.delete_many(keys)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Lichess cloud-eval analysis: concurrency ===\n"))
+        self.stdout.write(f"  API: {base_url}, plies: {len(fens)}, depth {depth}")
+        self.stdout.write(f"  {'in flight':<10}{'wall s':>9}{'speedup':>9}{'requests':>10}")
+
+        levels = []
+        level = 1
+        while level < options["max_concurrency"]:
+            levels.append(level)
+            level *= 2
+        levels.append(options["max_concurrency"])
+
+        original = analysis_service.lichess_client, lichess_api.lichess_client
+        baseline = None
+        try:
+            for level in levels:
+                client = LichessClient(
+                    base_url=base_url, max_concurrency=level, rate_per_second=options["rate"], burst=level
+                )
+                analysis_service.lichess_client = lichess_api.lichess_client = client
+                purge(client)
+                start = time.perf_counter()
+                result = analysis_service.analyze_game_with_lichess(game, depth=depth)
+                wall = time.perf_counter() - start
+                purge(client)
+
+                if baseline is None:
+                    baseline = (wall, result["moves"])
+                elif result["moves"] != baseline[1]:
+                    raise CommandError(f"Concurrency {level} produced different moves than the serial run")
+                stats = client.stats()
+                self.stdout.write(
+                    f"  {level:<10}{wall:>9.2f}{baseline[0] / max(wall, 1e-9):>8.1f}x{stats['requests']:>10}"
+                )
+        finally:
+            analysis_service.lichess_client, lichess_api.lichess_client = original
+
+        self.stdout.write(self.style.SUCCESS("  ✓ All concurrency levels matched the serial analysis"))
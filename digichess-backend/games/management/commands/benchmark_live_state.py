@@ -0,0 +1,91 @@
+"""
+Benchmark: game-row writes per game with and without the live state store.
+Run with: python manage.py benchmark_live_state [--games 20]
+
+Plays --games throwaway games of the same 40-ply line through apply_move()
+twice: with GAME_LIVE_STATE=0 (every move saves the row) and with the live
+store (moves go to the Redis hash, rows are written by flush_dirty() after
+every --flush-every plies and on the finish). Reports UPDATE statements on
+games_game per game and per move, and wall time per move. The live pass needs
+Redis. The throwaway users and games are deleted afterwards.
+"""
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from games.game_core import apply_move
+from games.game_proxy import GameProxy
+from games.models import Game
+
+User = get_user_model()
+
+LINE = (
+    "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O h3 Nb8 d4 Nbd7 "
+    "c4 c6 cxb5 axb5 Nc3 Bb7 Bg5 b4 Nb1 h6 Bh4 c5 dxe5 Nxe4 Bxe7 Qxe7 exd6 Qf6 Nbd2 Nxd6"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Count game-row writes per game with and without the live state store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=20, help="Games per mode (default: 20)")
+        parser.add_argument("--flush-every", type=int, default=10, help="Plies between flushes (default: 10)")
+
+    def _play(self, players, games, flush_every):
+        now = timezone.now()
+        ids = []
+        for white, black in players[:games]:
+            game = Game.objects.create(
+                creator=white, white=white, black=black, status=Game.STATUS_ACTIVE, started_at=now,
+                white_time_left=600, black_time_left=600,
+            )
+            ids.append(game.id)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            for ply, move in enumerate(LINE, start=1):
+                for game_id, (white, black) in zip(ids, players):
+                    result = apply_move(game_id, white if ply % 2 else black, move)
+                    if not result.ok:
+                        raise RuntimeError(f"game {game_id} ply {ply}: {result.error}")
+                if ply % flush_every == 0:
+                    GameProxy.flush_dirty()
+            for game_id in ids:
+                Game.objects.get(id=game_id).finish(Game.RESULT_DRAW)
+            elapsed = time.perf_counter() - start
+        writes = sum(1 for q in captured.captured_queries if q["sql"].startswith('UPDATE "games_game"'))
+        return writes, elapsed
+
+    def handle(self, *args, **options):
+        games = max(1, options["games"])
+        tag = uuid.uuid4().hex[:8]
+        moves = games * len(LINE)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Game row writes: per move vs live state ===\n"))
+        self.stdout.write(f"  {games} games x {len(LINE)} plies, flush every {options['flush_every']} plies\n")
+        self.stdout.write(f"  {'mode':<8} {'writes':>8} {'per game':>9} {'per move':>9} {'ms/move':>8}")
+        try:
+            users = [
+                User.objects.create_user(
+                    username=f"livebench_{tag}_{idx}", email=f"livebench_{tag}_{idx}@example.com", password="x"
+                )
+                for idx in range(games * 2)
+            ]
+            players = list(zip(users[0::2], users[1::2]))
+            for label, enabled in (("direct", False), ("live", True)):
+                with override_settings(GAME_LIVE_STATE=enabled):
+                    if enabled and GameProxy.client() is None:
+                        self.stdout.write(self.style.WARNING("  live     skipped: Redis is not reachable"))
+                        continue
+                    writes, elapsed = self._play(players, games, options["flush_every"])
+                self.stdout.write(
+                    f"  {label:<8} {writes:>8} {writes / games:>9.1f} {writes / moves:>9.2f} "
+                    f"{elapsed * 1000 / moves:>8.2f}"
+                )
+        finally:
+            User.objects.filter(username__startswith=f"livebench_{tag}").delete()
@@ -0,0 +1,98 @@
+"""
+Benchmark per-move board preparation cost as a game gets longer.
+Run with: python manage.py benchmark_move_latency
+
+Compares replaying the full SAN history on every move (the old apply_move
+behaviour) against the per-game board cache. With the cache, per-move latency
+should stay flat from ply 10 to ply 300.
+"""
+import random
+import time
+
+import chess
+from django.core.management.base import BaseCommand
+
+from games.board_cache import board_cache
+from games.game_core import build_board_from_moves, load_game_board
+from games.models import Game
+from games.move_optimizer import process_move_optimized
+
+CHECKPOINTS = (10, 50, 100, 200, 300)
+
+
+def _random_game_sans(plies: int, seed: int):
+    """Generate a legal SAN move list of exactly `plies` moves without the game ending."""
+    rng = random.Random(seed)
+    while True:
+        board = chess.Board()
+        sans = []
+        while len(sans) < plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            sans.append(board.san(move))
+            board.push(move)
+        if len(sans) == plies and not board.is_game_over():
+            return sans
+        rng.seed(rng.random())
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-move board preparation with and without the board cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plies", type=int, default=max(CHECKPOINTS))
+        parser.add_argument("--repeat", type=int, default=20, help="Samples per checkpoint (default: 20)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _time_move(self, game: Game, move_list, next_san: str, cached: bool) -> float:
+        start = time.perf_counter()
+        if cached:
+            board = load_game_board(game, move_list)
+        else:
+            board = build_board_from_moves(" ".join(move_list), game.START_FEN)
+        process_move_optimized(game, next_san, board)
+        elapsed = (time.perf_counter() - start) * 1000
+        if cached:
+            board_cache.store(game.id, board)
+        return elapsed
+
+    def handle(self, *args, **options):
+        plies = options["plies"]
+        repeat = max(1, options["repeat"])
+        sans = _random_game_sans(plies + 1, options["seed"])
+        checkpoints = [c for c in CHECKPOINTS if c <= plies] or [plies]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Move latency vs. ply count ===\n"))
+        self.stdout.write(f"  {'ply':>5}  {'replay (ms)':>12}  {'cached (ms)':>12}")
+
+        board_cache.clear()
+        results = []
+        for ply in checkpoints:
+            move_list = sans[:ply]
+            next_san = sans[ply]
+            replay_total = 0.0
+            cached_total = 0.0
+            for _ in range(repeat):
+                game = Game(id=10_000_000 + ply, moves=" ".join(move_list))
+                replay_total += self._time_move(game, move_list, next_san, cached=False)
+                # Prime the cache as the previous move would have, then time the hit.
+                board = build_board_from_moves(" ".join(move_list), game.START_FEN)
+                game.current_fen = board.fen()
+                board_cache.store(game.id, board)
+                cached_total += self._time_move(game, move_list, next_san, cached=True)
+                board_cache.discard(game.id)
+            replay_ms = replay_total / repeat
+            cached_ms = cached_total / repeat
+            results.append((ply, replay_ms, cached_ms))
+            self.stdout.write(f"  {ply:>5}  {replay_ms:>12.3f}  {cached_ms:>12.3f}")
+
+        first, last = results[0], results[-1]
+        replay_growth = last[1] / first[1] if first[1] else 0.0
+        cached_growth = last[2] / first[2] if first[2] else 0.0
+        self.stdout.write(
+            f"\n  ply {first[0]} -> {last[0]} growth: replay x{replay_growth:.1f}, cached x{cached_growth:.1f}"
+        )
+        self.stdout.write(f"  Board cache: {board_cache.stats()}")
+        if cached_growth < 2:
+            self.stdout.write(self.style.SUCCESS("  ✓ Cached per-move latency is flat"))
+        else:
+            self.stdout.write(self.style.WARNING("  ⚠ Cached per-move latency grows with ply count"))
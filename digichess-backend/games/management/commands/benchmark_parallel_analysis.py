@@ -0,0 +1,93 @@
+"""
+Benchmark sharded full-game analysis against the serial path.
+Run with: python manage.py benchmark_parallel_analysis [--engine /path/to/stockfish]
+
+Plays one random game of --plies plies, then analyses it with 1, 2, 4, ...
+engine workers (up to --max-workers), clearing cached evaluations before each
+run so every worker count does the same amount of search. Every run must
+produce the same per-move output as the serial one.
+"""
+import os
+import random
+import shlex
+import time
+
+import chess
+from django.core.management.base import BaseCommand, CommandError
+
+from games.analysis_service import analysis_workers, analyze_game_with_stockfish
+from games.engine_registry import verified_stockfish_path
+from games.eval_cache import eval_cache, normalize_fen
+from games.models import Game
+
+
+def _random_game(plies: int, seed: int):
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    fens = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(list(board.legal_moves))
+        moves.append(board.san(move))
+        board.push(move)
+        fens.append(normalize_fen(board))
+    return " ".join(moves), fens
+
+
+class Command(BaseCommand):
+    help = "Compare wall time of full-game analysis across engine worker counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", default=None, help="UCI engine command (default: verified Stockfish)")
+        parser.add_argument("--plies", type=int, default=120)
+        parser.add_argument("--depth", type=int, default=12)
+        parser.add_argument("--movetime", type=float, default=0.05, help="Search time per position in seconds")
+        parser.add_argument("--max-workers", type=int, default=None, help="Default: analysis_workers()")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        if options["engine"]:
+            command = shlex.split(options["engine"])
+        else:
+            ok, message, path = verified_stockfish_path()
+            if not ok:
+                raise CommandError(f"Stockfish unavailable: {message}")
+            command = path
+        depth = options["depth"]
+        max_workers = analysis_workers(options["max_workers"])
+        moves, fens = _random_game(options["plies"], options["seed"])
+        game = Game(id=1, moves=moves, current_fen="")
+
+        counts = [1]
+        while counts[-1] * 2 <= max_workers:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != max_workers:
+            counts.append(max_workers)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Full-game analysis: serial vs sharded engines ===\n"))
+        self.stdout.write(
+            f"  Plies: {len(fens)}, depth {depth}, movetime {options['movetime']}s, "
+            f"CPUs: {os.cpu_count()}, max workers: {max_workers}"
+        )
+        self.stdout.write(f"  {'workers':<9}{'wall s':>9}{'engine s':>10}{'speedup':>9}  identical")
+
+        baseline = None
+        serial_wall = None
+        for workers in counts:
+            eval_cache.purge(fens, depth)
+            start = time.perf_counter()
+            result = analyze_game_with_stockfish(
+                game, command, time_per_move=options["movetime"], depth=depth, workers=workers
+            )
+            wall = time.perf_counter() - start
+            if baseline is None:
+                baseline, serial_wall = result, wall
+            identical = result["moves"] == baseline["moves"] and result.get("errors") == baseline.get("errors")
+            engine_s = result["summary"]["eval_cache"]["engine_ms"] / 1000
+            self.stdout.write(
+                f"  {workers:<9}{wall:>9.2f}{engine_s:>10.2f}{serial_wall / wall:>8.2f}x  {'yes' if identical else 'NO'}"
+            )
+            if not identical:
+                raise CommandError(f"Analysis with {workers} workers differs from the serial result")
+        eval_cache.purge(fens, depth)
+        self.stdout.write(self.style.SUCCESS("  ✓ Every worker count reproduced the serial analysis"))
@@ -0,0 +1,87 @@
+"""
+Benchmark: time to the first complete eval graph, progressive vs single pass.
+Run with: python manage.py benchmark_progressive_analysis [--engine /path/to/stockfish]
+
+Plays one random game of --plies plies and analyses it twice with cleared
+caches: once at --depth in a single pass, once progressively (a sweep at each
+--sweep depth, then --depth). Reports when the first full graph was ready and
+when the final-depth analysis was, and checks that both end with the same moves.
+"""
+import shlex
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.analysis_service import analyze_game_progressively, analyze_game_with_stockfish, pass_depths
+from games.engine_registry import verified_stockfish_path
+from games.eval_cache import eval_cache
+from games.management.commands.benchmark_parallel_analysis import _random_game
+from games.models import Game
+
+
+class Command(BaseCommand):
+    help = "Compare time to first eval graph of progressive and single-pass analysis"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engine", default=None, help="UCI engine command (default: verified Stockfish)")
+        parser.add_argument("--plies", type=int, default=80)
+        parser.add_argument("--depth", type=int, default=12)
+        parser.add_argument("--sweep", type=int, action="append", default=None, help="Sweep depth (repeatable, default: 6)")
+        parser.add_argument("--movetime", type=float, default=0.1, help="Search time cap per position in seconds")
+        parser.add_argument("--workers", type=int, default=None, help="Default: analysis_workers()")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        if options["engine"]:
+            command = shlex.split(options["engine"])
+        else:
+            ok, message, path = verified_stockfish_path()
+            if not ok:
+                raise CommandError(f"Stockfish unavailable: {message}")
+            command = path
+        depth = options["depth"]
+        sweeps = options["sweep"] or [6]
+        depths = pass_depths(depth, sweeps)
+        moves, fens = _random_game(options["plies"], options["seed"])
+        game = Game(id=1, moves=moves, current_fen="")
+
+        def purge():
+            for pass_depth in depths:
+                eval_cache.purge(fens, pass_depth)
+
+        self.stdout.write(self.style.SUCCESS("\n=== Full-game analysis: single pass vs progressive ===\n"))
+        self.stdout.write(
+            f"  Plies: {len(fens)}, passes at depths {depths}, movetime cap {options['movetime']}s"
+        )
+        self.stdout.write(f"  {'mode':<13}{'first graph s':>14}{'final s':>9}")
+
+        purge()
+        start = time.perf_counter()
+        single = analyze_game_with_stockfish(
+            game, command, time_per_move=options["movetime"], depth=depth, workers=options["workers"]
+        )
+        single_wall = time.perf_counter() - start
+        self.stdout.write(f"  {'single pass':<13}{single_wall:>14.2f}{single_wall:>9.2f}")
+
+        purge()
+        ready = []
+        start = time.perf_counter()
+        progressive = analyze_game_progressively(
+            game,
+            command,
+            time_per_move=options["movetime"],
+            depth=depth,
+            workers=options["workers"],
+            sweep_depths=sweeps,
+            on_pass=lambda result: ready.append(time.perf_counter() - start),
+        )
+        self.stdout.write(f"  {'progressive':<13}{ready[0]:>14.2f}{ready[-1]:>9.2f}")
+        for pass_depth, at in zip(depths, ready):
+            self.stdout.write(f"    depth {pass_depth:<4} ready after {at:.2f}s")
+        purge()
+
+        if len(progressive["moves"]) != len(single["moves"]):
+            raise CommandError("Progressive analysis ended with a different number of analysed moves")
+        self.stdout.write(
+            self.style.SUCCESS(f"  ✓ First graph {single_wall / max(ready[0], 1e-9):.1f}x sooner than the single pass")
+        )
@@ -0,0 +1,94 @@
+"""
+Benchmark: settling a tournament round game by game vs. in one batch.
+Run with: python manage.py benchmark_rating_settlement
+
+Creates --players throwaway users paired into finished rated blitz games (one
+round), then settles the round twice on fresh copies:
+
+  per-game  settle_games([game_id]) for each game, as finishing one game at a
+            time does
+  batch     settle_games(all ids), as the queue worker and the timeout sweep do
+
+Reports SQL statements, statements per game and wall time. The throwaway users
+and their games are deleted afterwards.
+"""
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from games.models import Game
+from games.rating_settlement import settle_games
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare per-game and batched rating settlement for one tournament round"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=200, help="Players in the round (default: 200)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _make_round(self, players, rng):
+        now = timezone.now()
+        shuffled = players[:]
+        rng.shuffle(shuffled)
+        games = [
+            Game(
+                creator=white,
+                white=white,
+                black=black,
+                time_control=Game.TIME_BLITZ,
+                rated=True,
+                status=Game.STATUS_FINISHED,
+                result=rng.choice([Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW]),
+                finished_at=now,
+            )
+            for white, black in zip(shuffled[0::2], shuffled[1::2])
+        ]
+        return [game.id for game in Game.objects.bulk_create(games)]
+
+    def handle(self, *args, **options):
+        count = max(2, options["players"]) // 2 * 2
+        rng = random.Random(options["seed"])
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Rating settlement: per game vs batch ===\n"))
+        self.stdout.write(f"  one round of {count // 2} games ({count} players)\n")
+        self.stdout.write(f"  {'mode':<9} {'queries':>8} {'per game':>9} {'time (ms)':>10}")
+        try:
+            players = [
+                User.objects.create_user(
+                    username=f"ratebench_{tag}_{idx}", email=f"ratebench_{tag}_{idx}@example.com", password="x"
+                )
+                for idx in range(count)
+            ]
+            results = {}
+            for label in ("per-game", "batch"):
+                game_ids = self._make_round(players, rng)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    if label == "batch":
+                        settled = settle_games(game_ids)
+                    else:
+                        settled = {}
+                        for game_id in game_ids:
+                            settled.update(settle_games([game_id]))
+                    elapsed = (time.perf_counter() - start) * 1000
+                queries = len([q for q in captured.captured_queries if "SAVEPOINT" not in q["sql"]])
+                results[label] = (queries, elapsed)
+                self.stdout.write(
+                    f"  {label:<9} {queries:>8} {queries / max(1, len(settled)):>9.2f} {elapsed:>10.1f}"
+                )
+        finally:
+            User.objects.filter(username__startswith=f"ratebench_{tag}").delete()
+
+        per_game, batch = results.get("per-game"), results.get("batch")
+        if per_game and batch and batch[1]:
+            self.stdout.write(f"\n  Batch: x{per_game[1] / batch[1]:.1f} faster, {per_game[0] - batch[0]} fewer queries")
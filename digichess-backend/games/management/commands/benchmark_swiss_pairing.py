@@ -0,0 +1,108 @@
+"""
+Benchmark: Swiss pairing of a large synthetic field over a full event.
+Run with: python manage.py benchmark_swiss_pairing [--players 2000 --rounds 11 --budget 2.0]
+
+Plays --rounds rounds for --players synthetic players (no database involved).
+Results are drawn from the rating difference with a fixed --seed, so every
+run is identical. Two pairers are timed:
+
+  greedy    the previous scan: take the top unpaired player and give them the
+            closest-scored opponent they have not met
+  matching  games.swiss_pairing.pair_round()
+
+For each pairer it reports the slowest round, the total time, forced
+rematches, colour violations (three games in a row with one colour, or a
+colour difference above 2) and the mean score gap per board. The command
+exits with an error if any matching round takes longer than --budget seconds.
+"""
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.swiss_pairing import SwissPlayer, SwissRound, apply_round_results, pair_round
+
+
+def _greedy_round(players):
+    ordered = sorted(players, key=lambda p: (-p.score, p.id))
+    unpaired = ordered[:]
+    pairings = []
+    bye = unpaired.pop() if len(unpaired) % 2 else None
+    while len(unpaired) >= 2:
+        player = unpaired.pop(0)
+        best = min(
+            range(len(unpaired)),
+            key=lambda idx: (
+                unpaired[idx].id in player.opponents,
+                abs(player.score - unpaired[idx].score),
+                unpaired[idx].id,
+            ),
+        )
+        opponent = unpaired.pop(best)
+        if player.color_balance > opponent.color_balance:
+            pairings.append((opponent.id, player.id))
+        else:
+            pairings.append((player.id, opponent.id))
+    by_id = {player.id: player for player in players}
+    rematches = sum(1 for white, black in pairings if black in by_id[white].opponents)
+    return SwissRound(pairings=pairings, bye=bye.id if bye else None, rematches=rematches)
+
+
+class Command(BaseCommand):
+    help = "Time Swiss pairing of a large synthetic field across a whole event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=2000, help="Players (default: 2000)")
+        parser.add_argument("--rounds", type=int, default=11, help="Rounds (default: 11)")
+        parser.add_argument("--budget", type=float, default=2.0, help="Seconds allowed per round (default: 2.0)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _run(self, pairer, count, rounds, seed):
+        rng = random.Random(seed)
+        strength = {idx: rng.gauss(1500, 300) for idx in range(1, count + 1)}
+        players = {idx: SwissPlayer(id=idx, rating=int(strength[idx])) for idx in strength}
+        colours = defaultdict(str)
+        slowest = total = 0.0
+        rematches = violations = 0
+        gaps = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = pairer(list(players.values()))
+            elapsed = time.perf_counter() - start
+            slowest, total = max(slowest, elapsed), total + elapsed
+            rematches += result.rematches
+            scores = {}
+            for white, black in result.pairings:
+                gaps.append(abs(players[white].score - players[black].score))
+                colours[white] += "w"
+                colours[black] += "b"
+                expected = 1 / (1 + 10 ** ((strength[black] - strength[white]) / 400))
+                roll = rng.random()
+                scores[white] = 1.0 if roll < expected - 0.05 else 0.5 if roll < expected + 0.05 else 0.0
+            apply_round_results(players, result, scores)
+        for history in colours.values():
+            if "www" in history or "bbb" in history or abs(history.count("w") - history.count("b")) > 2:
+                violations += 1
+        return slowest, total, rematches, violations, sum(gaps) / max(1, len(gaps))
+
+    def handle(self, *args, **options):
+        count, rounds, seed = max(2, options["players"]), max(1, options["rounds"]), options["seed"]
+        self.stdout.write(self.style.SUCCESS("\n=== Swiss pairing: greedy vs matching ===\n"))
+        self.stdout.write(f"  {count} players, {rounds} rounds, budget {options['budget']:.1f}s per round\n")
+        self.stdout.write(
+            f"  {'pairer':<9} {'max round (s)':>14} {'total (s)':>10} {'rematches':>10} "
+            f"{'colour viol.':>13} {'mean gap':>9}"
+        )
+        results = {}
+        for label, pairer in (("greedy", _greedy_round), ("matching", lambda p: pair_round(p, seed=seed))):
+            results[label] = self._run(pairer, count, rounds, seed)
+            slowest, total, rematches, violations, gap = results[label]
+            self.stdout.write(
+                f"  {label:<9} {slowest:>14.3f} {total:>10.2f} {rematches:>10} {violations:>13} {gap:>9.3f}"
+            )
+        if results["matching"][0] > options["budget"]:
+            raise CommandError(
+                f"Slowest matching round took {results['matching'][0]:.2f}s (budget {options['budget']:.2f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS("\n  Every matching round fit the budget"))
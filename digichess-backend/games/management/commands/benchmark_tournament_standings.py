@@ -0,0 +1,129 @@
+"""
+Benchmark: arena standings replayed from every game vs. read from the materialised rows.
+Run with: python manage.py benchmark_tournament_standings [--players 1000 --games 5000]
+
+Creates a throwaway arena with --players participants and --games finished
+games, then times build_tournament_standings():
+
+  load     only loading every finished TournamentGame with its game, the
+           part of the old per-request replay that grew with the game count
+  replay   rebuild_standings() first, i.e. fold in every game of the
+           tournament and write the rows back, then the read
+  cached   standings read from TournamentParticipant once the games are applied
+  +1 game  one freshly finished game applied incrementally, then the read
+
+Reports SQL statements and wall time. The throwaway users, tournament and
+games are deleted afterwards.
+"""
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from games.models import Game, Tournament, TournamentGame, TournamentParticipant
+from games.tournament_lifecycle import build_tournament_standings
+from games.tournament_standings import rebuild_standings
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare replayed and materialised tournament standings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=1000, help="Arena participants (default: 1000)")
+        parser.add_argument("--games", type=int, default=5000, help="Finished games (default: 5000)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _finished_games(self, tournament, players, count, rng, start):
+        games = []
+        for idx in range(count):
+            white, black = rng.sample(players, 2)
+            games.append(
+                Game(
+                    creator=white,
+                    white=white,
+                    black=black,
+                    time_control=Game.TIME_BLITZ,
+                    status=Game.STATUS_FINISHED,
+                    result=rng.choice([Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW]),
+                    finished_at=start + timezone.timedelta(seconds=idx),
+                    tournament=tournament,
+                )
+            )
+        games = Game.objects.bulk_create(games, batch_size=1000)
+        TournamentGame.objects.bulk_create(
+            [TournamentGame(tournament=tournament, game=game, round_number=1) for game in games], batch_size=1000
+        )
+
+    def _timed(self, label, fn):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - start) * 1000
+        queries = len([q for q in captured.captured_queries if "SAVEPOINT" not in q["sql"]])
+        self.stdout.write(f"  {label:<8} {queries:>8} {elapsed:>10.1f}")
+        return elapsed
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        player_count = max(2, options["players"])
+        game_count = max(1, options["games"])
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Tournament standings: replay vs materialised ===\n"))
+        self.stdout.write(f"  arena with {player_count} players and {game_count} finished games\n")
+        self.stdout.write(f"  {'mode':<8} {'queries':>8} {'time (ms)':>10}")
+        tournament = None
+        try:
+            User.objects.bulk_create(
+                [
+                    User(username=f"standbench_{tag}_{idx}", email=f"standbench_{tag}_{idx}@example.com")
+                    for idx in range(player_count)
+                ],
+                batch_size=1000,
+            )
+            players = list(User.objects.filter(username__startswith=f"standbench_{tag}_"))
+            now = timezone.now()
+            tournament = Tournament.objects.create(
+                name=f"standbench {tag}",
+                creator=players[0],
+                type=Tournament.TYPE_ARENA,
+                time_control=Game.TIME_BLITZ,
+                start_at=now,
+                status=Tournament.STATUS_ACTIVE,
+                current_round=1,
+            )
+            TournamentParticipant.objects.bulk_create(
+                [TournamentParticipant(tournament=tournament, user=player) for player in players], batch_size=1000
+            )
+            self._finished_games(tournament, players, game_count, rng, now)
+
+            load = self._timed(
+                "load",
+                lambda: list(
+                    tournament.tournament_games.select_related("game").filter(game__status=Game.STATUS_FINISHED)
+                ),
+            )
+            replay = self._timed(
+                "replay", lambda: (rebuild_standings(tournament), build_tournament_standings(tournament))
+            )
+            cached = self._timed("cached", lambda: build_tournament_standings(tournament))
+            self._finished_games(tournament, players, 1, rng, now + timezone.timedelta(days=1))
+            self._timed("+1 game", lambda: build_tournament_standings(tournament))
+        finally:
+            if tournament is not None:
+                Game.objects.filter(tournament=tournament).delete()
+                tournament.delete()
+            User.objects.filter(username__startswith=f"standbench_{tag}_").delete()
+
+        if cached:
+            self.stdout.write(
+                f"\n  Materialised read: x{load / cached:.1f} faster than loading the games, "
+                f"x{replay / cached:.1f} faster than a full rebuild"
+            )
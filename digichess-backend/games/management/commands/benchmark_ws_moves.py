@@ -0,0 +1,209 @@
+"""
+Load test: moves over HTTP (GameMoveView) vs. over the game WebSocket.
+Run with: python manage.py benchmark_ws_moves
+
+Creates N active games between throwaway users and plays the same random
+move sequence in every game, concurrently, once per path:
+
+  http  POST /api/games/<id>/move/ from one thread per game; each move spawns
+        broadcast threads in the view.
+  ws    {"type": "move"} on /ws/game/<id>/ from two sockets per game; the
+        consumer applies the move on the bounded move executor, acks the
+        mover and fans gameState out on the channel layer. Latency is taken
+        at the moveAck, and the opponent's gameState is awaited before the
+        next move, so WS numbers include the fan-out.
+
+Reports per-move p50/p95 latency, total moves/s and the peak thread count.
+The throwaway users and their games are deleted afterwards. Run it against
+Postgres: SQLite serialises writers, so concurrent games mostly measure
+"database is locked" retries there (use --games 1 for a smoke run).
+"""
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from config.routing import websocket_urlpatterns
+from games.management.commands.benchmark_move_latency import _random_game_sans
+from games.models import Game
+from games.move_executor import move_executor
+
+User = get_user_model()
+
+
+class ThreadSampler:
+    """Polls threading.active_count() in the background to record the peak."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Compare move latency and throughput over HTTP and over the game WebSocket"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=10, help="Concurrent games (default: 10)")
+        parser.add_argument("--plies", type=int, default=20, help="Moves played in each game (default: 20)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _make_games(self, count: int, tag: str):
+        games = []
+        now = timezone.now()
+        for idx in range(count):
+            white = User.objects.create_user(
+                username=f"wsbench_{tag}_{idx}_w", email=f"wsbench_{tag}_{idx}_w@example.com", password="x"
+            )
+            black = User.objects.create_user(
+                username=f"wsbench_{tag}_{idx}_b", email=f"wsbench_{tag}_{idx}_b@example.com", password="x"
+            )
+            games.append(
+                Game.objects.create(
+                    creator=white,
+                    white=white,
+                    black=black,
+                    rated=False,
+                    status=Game.STATUS_ACTIVE,
+                    initial_time_seconds=3600,
+                    white_time_left=3600,
+                    black_time_left=3600,
+                    started_at=now,
+                    last_move_at=now,
+                )
+            )
+        return games
+
+    def _run_http(self, games, sans):
+        latencies = []
+        errors = []
+
+        def play(game):
+            clients = {}
+            for player in (game.white, game.black):
+                client = APIClient()
+                client.force_authenticate(player)
+                clients[player.id] = client
+            for ply, san in enumerate(sans):
+                mover = game.white if ply % 2 == 0 else game.black
+                start = time.perf_counter()
+                try:
+                    response = clients[mover.id].post(f"/api/games/{game.id}/move/", {"move": san}, format="json")
+                except Exception as exc:
+                    errors.append(f"game {game.id} ply {ply}: {exc}")
+                    return
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors.append(f"game {game.id} ply {ply}: {response.status_code}")
+                    return
+
+        with ThreadPoolExecutor(max_workers=len(games)) as pool:
+            list(pool.map(play, games))
+        return latencies, errors
+
+    def _run_ws(self, games, sans):
+        latencies = []
+        errors = []
+        application = URLRouter(websocket_urlpatterns)
+
+        async def receive(communicator, message_type):
+            while True:
+                message = await communicator.receive_json_from(timeout=30)
+                if message.get("type") == message_type:
+                    return message
+
+        async def play(game):
+            sockets = {}
+            for player in (game.white, game.black):
+                communicator = WebsocketCommunicator(application, f"/ws/game/{game.id}/")
+                communicator.scope["user"] = player
+                await communicator.connect()
+                await receive(communicator, "gameFull")
+                sockets[player.id] = communicator
+            try:
+                for ply, san in enumerate(sans):
+                    mover, other = (game.white, game.black) if ply % 2 == 0 else (game.black, game.white)
+                    start = time.perf_counter()
+                    await sockets[mover.id].send_json_to({"type": "move", "move": san, "id": ply})
+                    ack = await receive(sockets[mover.id], "moveAck")
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if not ack["ok"]:
+                        errors.append(f"game {game.id} ply {ply}: {ack.get('error')}")
+                        return
+                    await receive(sockets[mover.id], "gameState")
+                    await receive(sockets[other.id], "gameState")
+            finally:
+                for communicator in sockets.values():
+                    await communicator.disconnect()
+
+        async def play_all():
+            await asyncio.gather(*(play(game) for game in games))
+
+        async_to_sync(play_all)()
+        return latencies, errors
+
+    def _report(self, label, latencies, errors, elapsed, peak_threads):
+        moves = len(latencies)
+        rate = moves / elapsed if elapsed else 0.0
+        self.stdout.write(
+            f"  {label:<5} {moves:>6} {_percentile(latencies, 50):>9.1f} {_percentile(latencies, 95):>9.1f} "
+            f"{rate:>9.1f} {peak_threads:>8}"
+        )
+        for error in errors[:5]:
+            self.stdout.write(self.style.WARNING(f"        {error}"))
+        return rate
+
+    def handle(self, *args, **options):
+        game_count = max(1, options["games"])
+        sans = _random_game_sans(max(2, options["plies"]), options["seed"])
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(self.style.SUCCESS("\n=== Move submission: HTTP vs WebSocket ===\n"))
+        self.stdout.write(f"  {game_count} concurrent games x {len(sans)} plies\n")
+        self.stdout.write(f"  {'path':<5} {'moves':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'moves/s':>9} {'threads':>8}")
+
+        rates = {}
+        try:
+            for label, runner in (("http", self._run_http), ("ws", self._run_ws)):
+                games = self._make_games(game_count, f"{tag}{label}")
+                with ThreadSampler() as sampler:
+                    start = time.perf_counter()
+                    latencies, errors = runner(games, sans)
+                    elapsed = time.perf_counter() - start
+                    # Let the HTTP path's broadcast threads drain before sampling stops.
+                    time.sleep(0.2)
+                rates[label] = self._report(label, latencies, errors, elapsed, sampler.peak)
+        finally:
+            User.objects.filter(username__startswith=f"wsbench_{tag}").delete()
+
+        self.stdout.write(f"\n  Move executor: {move_executor.stats()}")
+        if rates.get("http"):
+            self.stdout.write(f"  WebSocket throughput: x{rates['ws'] / rates['http']:.2f} of HTTP")
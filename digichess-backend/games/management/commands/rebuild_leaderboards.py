@@ -0,0 +1,38 @@
+"""
+Backfill the Redis leaderboards from the database.
+Run with: python manage.py rebuild_leaderboards [--mode blitz --mode digiquiz]
+
+Run once after deploying, after a Redis flush, or whenever ratings were
+changed outside the application (bulk updates, data fixes). Until a mode has
+been rebuilt its leaderboard is served from the database.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.leaderboard import MODE_FIELDS, REBUILD_BATCH_SIZE, rebuild
+from utils.redis_client import get_redis
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Redis sorted-set leaderboards from user ratings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            choices=sorted(MODE_FIELDS),
+            help="Mode to rebuild (repeatable, default: all)",
+        )
+        parser.add_argument("--batch-size", type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        r = get_redis()
+        if not r:
+            raise CommandError("Redis is unavailable; leaderboards keep using the database.")
+        start = time.perf_counter()
+        counts = rebuild(r, options["mode"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - start
+        for mode, count in counts.items():
+            self.stdout.write(f"  {mode:<10} {count} players")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(counts)} leaderboard(s) in {elapsed:.2f}s"))
@@ -0,0 +1,48 @@
+"""
+Rebuild every user's ratings from game history in Glicko-2 rating periods.
+Run with: python manage.py recompute_ratings [--mode blitz] [--period-hours 24] [--dry-run]
+
+Replays all rated games of each mode from the default rating, one rating
+period at a time, and writes the result back (see games.rating_recompute).
+Use it after changing GLICKO2_TAU or RATING_PERIOD_HOURS, or to repair
+ratings. --dry-run only reports counts and timings.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from games.rating_recompute import MODE_CONTROLS, recompute_all, recompute_ratings
+from games.rating_settlement import RATING_PERIOD
+
+
+class Command(BaseCommand):
+    help = "Recompute all ratings from game history in Glicko-2 rating periods"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            choices=sorted(MODE_CONTROLS),
+            help="Mode to recompute (repeatable, default: all)",
+        )
+        parser.add_argument(
+            "--period-hours",
+            type=float,
+            default=RATING_PERIOD.total_seconds() / 3600,
+            help="Rating period length in hours (default: RATING_PERIOD_HOURS)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Compute without writing")
+
+    def handle(self, *args, **options):
+        modes = options["mode"] or list(MODE_CONTROLS)
+        period = timedelta(hours=options["period_hours"])
+        if options["dry_run"]:
+            results = {mode: recompute_ratings(mode, period=period, write=False) for mode in modes}
+        else:
+            results = recompute_all(modes, period=period)
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"  {mode:<10} {stats['users']} users, {stats['games']} games in {stats['periods']} periods: "
+                f"load {stats['load_seconds']:.2f}s, rate {stats['rate_seconds']:.2f}s, {stats['updated']} updated, {stats['skipped']} skipped"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {len(results)} mode(s)"))
@@ -262,7 +262,6 @@ class Command(BaseCommand):
         # With batching (GameProxy)
         reset_queries()
         start = time.perf_counter()
-        game_proxy = GameProxy(game.id)
         for i in range(iterations):
             game.moves = f"test {i}"
             GameProxy.update_game(game, immediate_flush=False)
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_game_tournament(apps, schema_editor):
+    Game = apps.get_model("games", "Game")
+    TournamentGame = apps.get_model("games", "TournamentGame")
+    pairs = TournamentGame.objects.values_list("game_id", "tournament_id").iterator(chunk_size=1000)
+    for game_id, tournament_id in pairs:
+        Game.objects.filter(id=game_id).update(tournament_id=tournament_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0017_irwinimportjob_and_import_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="tournament",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Tournament this game belongs to (denormalized from TournamentGame)",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="games",
+                to="games.tournament",
+            ),
+        ),
+        migrations.RunPython(backfill_game_tournament, migrations.RunPython.noop),
+    ]
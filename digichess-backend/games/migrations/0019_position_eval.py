@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0018_game_tournament'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionEval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fen', models.CharField(help_text='Normalized FEN (EPD, no move clocks)', max_length=100)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('multipv', models.PositiveSmallIntegerField(default=1)),
+                ('lines', models.JSONField(help_text='PV lines: White-POV cp/mate, UCI pv, reached depth')),
+                ('source', models.CharField(blank=True, max_length=40)),
+                ('knodes', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fen', 'depth', 'multipv'), name='uq_position_eval_fen_depth_multipv')],
+            },
+        ),
+    ]
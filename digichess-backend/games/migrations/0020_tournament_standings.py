@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0019_position_eval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentgame',
+            name='standings_applied',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='color_balance',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='draws',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='losses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='max_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='opponents',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='wins',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentgame',
+            index=models.Index(fields=['tournament', 'standings_applied'], name='games_tourn_tournam_f2fe02_idx'),
+        ),
+    ]
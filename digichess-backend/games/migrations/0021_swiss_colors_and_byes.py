@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0020_tournament_standings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='byes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournamentparticipant',
+            name='recent_colors',
+            field=models.CharField(blank=True, default='', max_length=2),
+        ),
+    ]
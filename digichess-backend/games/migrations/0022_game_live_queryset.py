@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0021_swiss_colors_and_byes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='game',
+            options={'base_manager_name': 'objects', 'ordering': ['-created_at']},
+        ),
+    ]
@@ -1,9 +1,42 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models.query import ModelIterable
 from django.utils import timezone
 
 User = get_user_model()
 
+LIVE_OVERLAY_CHUNK = 100
+
+
+class LiveGameIterable(ModelIterable):
+    """Games in play get their live fields from Redis, one pipeline per chunk of rows."""
+
+    def __iter__(self):
+        from .game_proxy import GameProxy
+
+        chunk = []
+        for game in super().__iter__():
+            chunk.append(game)
+            if len(chunk) >= LIVE_OVERLAY_CHUNK:
+                GameProxy.overlay_many(chunk)
+                yield from chunk
+                chunk = []
+        if chunk:
+            GameProxy.overlay_many(chunk)
+            yield from chunk
+
+
+class GameQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = LiveGameIterable
+
+    def without_live_state(self):
+        """Rows exactly as the database holds them (no Redis round trip)."""
+        clone = self._chain()
+        clone._iterable_class = ModelIterable
+        return clone
+
 
 class Game(models.Model):
     START_FEN = "rn1qkbnr/pppbpppp/8/3p4/3P4/5NP1/PPP1PP1P/RNBQKB1R w KQkq - 0 3"  # overwritten with real start below
@@ -80,12 +113,43 @@ class Game(models.Model):
         help_text="Per-move elapsed time in milliseconds, one entry per ply",
     )
     current_fen = models.TextField(default=START_FEN, help_text="Board state after last move")
+    tournament = models.ForeignKey(
+        "Tournament", null=True, blank=True, on_delete=models.SET_NULL, related_name="games",
+        help_text="Tournament this game belongs to (denormalized from TournamentGame)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
 
+    # Games in play keep their live fields in Redis (games.game_proxy); querysets
+    # (and related-object access / refresh_from_db, via the base manager) overlay them.
+    objects = GameQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        base_manager_name = "objects"
+
+    def save(self, *args, **kwargs):
+        from .game_proxy import GameProxy
+
+        update_fields = kwargs.get("update_fields")
+        existing = self.pk is not None
+        writes_status = update_fields is None or "status" in update_fields
+        if existing and writes_status and self.status in (self.STATUS_FINISHED, self.STATUS_ABORTED):
+            # Finishing: fold the live state into this write; the hash is only
+            # retired once the write commits, so a rollback leaves the game playable.
+            kwargs["update_fields"] = GameProxy.fold(self, update_fields)
+            super().save(*args, **kwargs)
+            game_id = self.pk
+            transaction.on_commit(lambda: GameProxy.retire(game_id))
+            return
+        super().save(*args, **kwargs)
+        if existing and self.status in (self.STATUS_PENDING, self.STATUS_ACTIVE):
+            GameProxy.sync(self, update_fields)
+
+    @property
+    def is_tournament(self) -> bool:
+        return self.tournament_id is not None
 
     def start(self):
         if self.status == self.STATUS_PENDING:
@@ -163,6 +227,29 @@ class GameAnalysis(models.Model):
         return f"Analysis for game {self.game_id} ({self.status})"
 
 
+class PositionEval(models.Model):
+    """
+    Durable tier of the position evaluation cache (games.eval_cache).
+    Redis holds the hot entries; rows here survive Redis eviction and restarts.
+    """
+
+    fen = models.CharField(max_length=100, help_text="Normalized FEN (EPD, no move clocks)")
+    depth = models.PositiveSmallIntegerField()
+    multipv = models.PositiveSmallIntegerField(default=1)
+    lines = models.JSONField(help_text="PV lines: White-POV cp/mate, UCI pv, reached depth")
+    source = models.CharField(max_length=40, blank=True)
+    knodes = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fen", "depth", "multipv"], name="uq_position_eval_fen_depth_multipv"),
+        ]
+
+    def __str__(self):
+        return f"{self.fen} d{self.depth} pv{self.multipv}"
+
+
 class Tournament(models.Model):
     TYPE_KNOCKOUT = "knockout"
     TYPE_ROUND_ROBIN = "round_robin"
@@ -216,10 +303,21 @@ class TournamentGame(models.Model):
     tournament = models.ForeignKey(Tournament, related_name="tournament_games", on_delete=models.CASCADE)
     game = models.ForeignKey(Game, related_name="tournament_entry", on_delete=models.CASCADE)
     round_number = models.IntegerField(default=0)
+    # Set once the finished game's result is folded into the participants' standings.
+    standings_applied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["tournament", "standings_applied"])]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep Game.tournament in sync so hot paths never need to query this table.
+        game = self.game
+        if game.tournament_id != self.tournament_id:
+            game.tournament_id = self.tournament_id
+            Game.objects.filter(id=game.id).update(tournament_id=self.tournament_id)
 
     def __str__(self):
         return f"{self.tournament.name} - Game {self.game_id} (Round {self.round_number})"
@@ -229,6 +327,17 @@ class TournamentParticipant(models.Model):
     tournament = models.ForeignKey(Tournament, related_name="participants", on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name="tournament_participations", on_delete=models.CASCADE)
     joined_at = models.DateTimeField(auto_now_add=True)
+    # Materialised standings, maintained by games.tournament_standings.
+    score = models.FloatField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    streak = models.PositiveIntegerField(default=0)
+    max_streak = models.PositiveIntegerField(default=0)
+    color_balance = models.IntegerField(default=0)
+    recent_colors = models.CharField(max_length=2, blank=True, default="")
+    byes = models.PositiveIntegerField(default=0)
+    opponents = models.JSONField(default=list, blank=True)
 
     class Meta:
         unique_together = ("tournament", "user")
@@ -0,0 +1,103 @@
+"""
+Bounded thread pool for moves submitted over the game WebSocket.
+
+apply_move() is synchronous Django code (row lock, transaction, Redis). Running
+it through database_sync_to_async would put every socket's moves on asgiref's
+single shared thread, so one slow commit stalls every game on the node.
+MoveExecutor gives moves their own pool of WS_MOVE_WORKERS threads and caps
+the queue at WS_MOVE_MAX_PENDING; past that, run() raises MoveExecutorBusy
+and the consumer tells the client to retry instead of queueing without bound.
+
+Jobs close stale database connections before and after they run, as
+database_sync_to_async does.
+
+Settings (config/settings.py, overridable from the environment):
+WS_MOVE_WORKERS      threads applying moves (default 8)
+WS_MOVE_MAX_PENDING  queued + running jobs before submissions are refused (default 256)
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class MoveExecutorBusy(RuntimeError):
+    """Too many moves are already queued on this process."""
+
+
+class MoveExecutor:
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = max(1, workers if workers is not None else settings.WS_MOVE_WORKERS)
+        self.max_pending = max(
+            self.workers, max_pending if max_pending is not None else settings.WS_MOVE_MAX_PENDING
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = os.getpid()
+        self._metrics = {"submitted": 0, "completed": 0, "rejected": 0, "failed": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's threads and in-flight jobs did not come along.
+                self._executor = None
+                self._pending = 0
+                self._pid = os.getpid()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ws-move")
+            return self._executor
+
+    def _run(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._pending -= 1
+                self._metrics["completed"] += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn`` on the pool and await its result."""
+        pool = self._pool()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._metrics["rejected"] += 1
+                raise MoveExecutorBusy("Server is busy. Please retry.")
+            self._pending += 1
+            self._metrics["submitted"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._metrics["failed"] += 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "pending": self._pending, "workers": self.workers, "max_pending": self.max_pending}
+
+
+move_executor = MoveExecutor()
+
+
+def game_state_payload(game, state: dict, legal_moves: List[str], legal_moves_uci: Optional[List[str]] = None) -> dict:
+    """The gameState message sent to everyone watching the game after a move."""
+    payload = {
+        "type": "gameState",
+        "game_id": game.id,
+        **state,
+        "legal_moves": legal_moves,
+    }
+    if legal_moves_uci:
+        payload["legal_moves_uci"] = legal_moves_uci
+    return payload
@@ -10,6 +10,8 @@ from django.core.cache import cache
 import chess
 import logging
 
+from .legal_moves import legal_moves_for_board
+
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
@@ -24,28 +26,35 @@ class MoveLatencyMonitor:
     def __init__(self):
         self._total_millis = 0
         self._count = 0
-        self._cache_key = "move_latency:stats"
+        self._unsaved_micros = 0
+        self._unsaved_count = 0
+        self._cache_keys = ("move_latency:micros", "move_latency:count")
         self._load_from_cache()
     
     def _load_from_cache(self):
-        """Load stats from Redis cache"""
-        cached = cache.get(self._cache_key)
-        if cached:
-            self._total_millis = cached.get('total', 0)
-            self._count = cached.get('count', 0)
+        """Load the totals every worker has recorded from the shared cache"""
+        cached = cache.get_many(self._cache_keys)
+        self._total_millis = cached.get(self._cache_keys[0], 0) / 1000
+        self._count = cached.get(self._cache_keys[1], 0)
     
     def _save_to_cache(self):
-        """Save stats to Redis cache"""
-        cache.set(self._cache_key, {
-            'total': self._total_millis,
-            'count': self._count
-        }, 3600)  # Cache for 1 hour
+        """Add this worker's unsaved samples to the shared totals (atomic incr, so workers don't clobber each other)"""
+        for key, delta in zip(self._cache_keys, (self._unsaved_micros, self._unsaved_count)):
+            cache.add(key, 0, 3600)  # Expire an hour after the first sample
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                cache.set(key, delta, 3600)
+        self._unsaved_micros = 0
+        self._unsaved_count = 0
     
     def record_micros(self, micros: int):
         """Record move processing time in microseconds"""
         millis = (micros / 1000)
         self._total_millis += millis
         self._count += 1
+        self._unsaved_micros += int(micros)
+        self._unsaved_count += 1
         
         # Save to cache periodically
         if self._count % 10 == 0:
@@ -128,14 +137,13 @@ def process_move_optimized(
         # Apply move
         board.push(move)
         
-        # Prepare response data (minimal processing)
-        # Convert legal_moves generator to list and limit to 10 for performance
-        legal_moves_list = list(board.legal_moves)[:10]
+        # Prepare response data (minimal processing); the full list is memoized
+        # per position, so apply_move's broadcast reuses it.
         extra_data = {
             'san': move_san,
             'uci': move.uci(),
             'fen': board.fen(),
-            'legal_moves': [board.san(m) for m in legal_moves_list],
+            'legal_moves': legal_moves_for_board(board)['san'][:10],
             'is_check': board.is_check(),
             'is_checkmate': board.is_checkmate(),
             'is_stalemate': board.is_stalemate(),
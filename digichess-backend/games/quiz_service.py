@@ -14,6 +14,7 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
 
+from .leaderboard import update_user_on_commit
 from .models import (
     DigiQuizAnswer,
     DigiQuizParticipation,
@@ -1042,6 +1043,7 @@ def finalize_round(round_obj: DigiQuizRound, *, now: datetime | None = None) ->
                 "digiquiz_wrong",
             ]
         )
+        update_user_on_commit(user, ["digiquiz"])
         DigiQuizRatingHistory.objects.get_or_create(
             user=user,
             round=round_obj,
@@ -0,0 +1,175 @@
+"""
+Rebuild every player's rating from game history in Glicko-2 rating periods.
+
+Live settlement (games.rating_settlement) rates each game as it finishes.
+recompute_ratings() instead replays all settled rated games of a mode from
+the model defaults, RATING_PERIOD_HOURS at a time, for the whole user base in
+one pass: the games are read as plain columns into NumPy arrays, each period
+is a single games.glicko2.rate_period() call over every player, and the users
+are written back with bulk_update in batches.
+
+Bots are left out: they never play rated games and their seeded rating sets
+their engine strength. Players without a settled game in the mode keep the
+rating they have (an admin may have set it). The users' ratings are read
+before the games, and a user whose rating changed by the time their batch is
+written (settle_games rated another game meanwhile) is skipped rather than
+overwritten; games settled after the load rate on top of the new values.
+
+Use it after changing GLICKO2_TAU or the period length, or to repair ratings.
+The recompute_ratings command and task wrap it; with RATING_RECOMPUTE_NIGHTLY
+set, celery beat runs the task every night before the daily rating snapshot.
+Game deltas and RatingHistory are left as they were recorded.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from utils.redis_client import get_redis
+from . import leaderboard
+from .glicko2 import replay_periods
+from .models import Game
+from .rating_settlement import CONTROL_FIELDS, RATING_PERIOD, SCORED_RESULTS
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 2000
+LOAD_CHUNK_SIZE = 10000
+MODE_CONTROLS = {fields[3]: control for control, fields in CONTROL_FIELDS.items()}
+WHITE_SCORES = {Game.RESULT_WHITE: 1.0, Game.RESULT_BLACK: 0.0, Game.RESULT_DRAW: 0.5}
+
+
+def _load_games(time_control: str, until):
+    rows = (
+        Game.objects.filter(
+            rated=True,
+            status=Game.STATUS_FINISHED,
+            result__in=SCORED_RESULTS,
+            time_control=time_control,
+            white__isnull=False,
+            black__isnull=False,
+            white__is_bot=False,
+            black__is_bot=False,
+            white_rating_delta__isnull=False,
+            finished_at__isnull=False,
+            finished_at__lte=until,
+        )
+        .order_by("finished_at", "id")
+        .values_list("white_id", "black_id", "result", "finished_at")
+        .iterator(chunk_size=LOAD_CHUNK_SIZE)
+    )
+    white, black, score, finished = [], [], [], []
+    for white_id, black_id, result, finished_at in rows:
+        white.append(white_id)
+        black.append(black_id)
+        score.append(WHITE_SCORES[result])
+        finished.append(finished_at.timestamp())
+    return (
+        np.array(white, dtype=np.int64),
+        np.array(black, dtype=np.int64),
+        np.array(score, dtype=float),
+        np.array(finished, dtype=float),
+    )
+
+
+def recompute_ratings(mode: str, period: timedelta = RATING_PERIOD, write: bool = True, now=None) -> Dict:
+    """Replay ``mode`` for every user; returns counts, timings and (when not writing) the arrays."""
+    User = get_user_model()
+    r_field, rd_field, vol_field, _ = CONTROL_FIELDS[MODE_CONTROLS[mode]]
+    now = now or timezone.now()
+    started = time.perf_counter()
+
+    # Users first: a game settled after this read changes its players' rows,
+    # which the write below detects, so no settled game is lost.
+    rows = list(
+        User.objects.filter(is_bot=False).order_by("id").values_list("id", r_field, rd_field, vol_field)
+    )
+    white, black, white_score, finished = _load_games(MODE_CONTROLS[mode], now)
+    loaded = time.perf_counter()
+
+    count = len(rows)
+    user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    snapshot = {row[0]: row[1:] for row in rows}
+    current = np.array([row[1:] for row in rows], dtype=float).reshape(count, 3)
+    rating = np.full(count, float(User._meta.get_field(r_field).default))
+    rd = np.full(count, float(User._meta.get_field(rd_field).default))
+    vol = np.full(count, float(User._meta.get_field(vol_field).default))
+
+    periods_seen = 0
+    played = np.zeros(count, dtype=bool)
+    if white.size and count:
+        white_idx = np.searchsorted(user_ids, white)
+        black_idx = np.searchsorted(user_ids, black)
+        played[white_idx] = played[black_idx] = True
+        origin = finished[0]
+        period_index = ((finished - origin) // period.total_seconds()).astype(np.int64)
+        until = int((now.timestamp() - origin) // period.total_seconds())
+        periods_seen = int(np.unique(period_index).size)
+        rating, rd, vol = replay_periods(rating, rd, vol, period_index, white_idx, black_idx, white_score, until=until)
+    rating = np.where(played, rating, current[:, 0])
+    rd = np.where(played, rd, current[:, 1])
+    vol = np.where(played, vol, current[:, 2])
+    rated = time.perf_counter()
+
+    stats = {
+        "mode": mode,
+        "users": int(count),
+        "games": int(white.size),
+        "periods": periods_seen,
+        "load_seconds": loaded - started,
+        "rate_seconds": rated - loaded,
+        "updated": 0,
+        "skipped": 0,
+    }
+    if not write:
+        stats.update(user_ids=user_ids, rating=rating, rd=rd, vol=vol)
+        return stats
+
+    ratings = np.rint(rating).astype(np.int64)
+    rds = np.round(rd, 2)
+    vols = np.round(vol, 6)
+    fields = ("id", r_field, rd_field, vol_field)
+    for start in range(0, count, WRITE_BATCH_SIZE):
+        batch_ids = user_ids[start:start + WRITE_BATCH_SIZE]
+        changed = []
+        with transaction.atomic():
+            users = User.objects.select_for_update().filter(id__in=batch_ids.tolist()).only(*fields)
+            for user in users:
+                idx = int(np.searchsorted(user_ids, user.id))
+                values = (int(ratings[idx]), float(rds[idx]), float(vols[idx]))
+                stored = (getattr(user, r_field), getattr(user, rd_field), getattr(user, vol_field))
+                if stored != snapshot[user.id]:
+                    stats["skipped"] += 1
+                    continue
+                if values == stored:
+                    continue
+                setattr(user, r_field, values[0])
+                setattr(user, rd_field, values[1])
+                setattr(user, vol_field, values[2])
+                changed.append(user)
+            User.objects.bulk_update(changed, [r_field, rd_field, vol_field])
+        stats["updated"] += len(changed)
+    stats["write_seconds"] = time.perf_counter() - rated
+    logger.info(
+        "Recomputed %s ratings: %d users, %d games, %d periods, %d updated, %d skipped (rated meanwhile)",
+        mode, stats["users"], stats["games"], stats["periods"], stats["updated"], stats["skipped"],
+    )
+    return stats
+
+
+def recompute_all(modes: Optional[Iterable[str]] = None, period: timedelta = RATING_PERIOD) -> Dict[str, Dict]:
+    """Recompute ``modes`` (all rating modes by default) and refresh their leaderboards."""
+    modes = list(modes or MODE_CONTROLS)
+    results = {mode: recompute_ratings(mode, period=period) for mode in modes}
+    r = get_redis()
+    if r:
+        try:
+            leaderboard.rebuild(r, modes)
+        except Exception as exc:
+            logger.warning("Leaderboard rebuild after rating recompute failed: %s", exc)
+    return results
@@ -0,0 +1,315 @@
+"""
+Batched rating settlement for finished games.
+
+FinishGameView.update_ratings used to settle one game at a time wherever the
+game ended (a daemon thread after a move, inline in the timeout sweep or in
+LiveClockView): refresh both users, save each, RatingHistory.get_or_create per
+player, save the deltas -- about eight queries per game, and nothing stopped
+two finishing paths from rating the same game twice.
+
+settle_games() settles any number of games in one transaction:
+
+- the games are locked first, then their players, both in id order, so
+  concurrent batches always take locks in the same order and cannot deadlock;
+- a game whose white_rating_delta is already set has been settled and is
+  skipped, which makes settlement idempotent per game id;
+- games are applied in finish order, so a player with several games in one
+  batch is rated exactly as if they had been settled one by one;
+- each game is rated as its own Glicko-2 rating period (games.glicko2, with
+  the full volatility update); a player's RD is first inflated by the time
+  since their previous rated game in that mode, in RATING_PERIOD_HOURS units;
+- users, game deltas and RatingHistory rows are written with bulk_update /
+  bulk_create: a tournament round that ends together settles in six queries.
+
+queue_settlement() is what finishing code calls. With Redis it pushes the game
+ids onto RATING_QUEUE_KEY once the finish commits and schedules
+games.tasks.settle_pending_ratings after RATING_SETTLE_WINDOW seconds, so
+games finishing together share a batch; the task then broadcasts
+``ratings_updated`` with the deltas. Without Redis (or if the push fails) the
+games are settled inline. The same task runs periodically and re-settles
+rated games left unsettled for RATING_SETTLE_GRACE seconds, covering a worker
+that died between draining the queue and committing.
+
+Settings (config/settings.py, overridable from the environment):
+RATING_SETTLE_WINDOW  seconds finished games are collected before settling (default 0.5)
+RATING_SETTLE_BATCH   games settled per transaction (default 500)
+RATING_SETTLE_GRACE   seconds before an unsettled game is swept up (default 60)
+RATING_PERIOD_HOURS   length of one Glicko-2 rating period (default 24)
+"""
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from utils.redis_client import get_redis
+from .glicko2 import rate_game
+from .leaderboard import update_user_on_commit
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+RATING_QUEUE_KEY = "ratings:pending"
+SCHEDULED_KEY = "ratings:settle:scheduled"
+SWEEP_WINDOW = timedelta(hours=1)
+
+SCORED_RESULTS = {Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW}
+
+# time control -> (rating field, RD field, volatility field, history mode)
+CONTROL_FIELDS: Dict[str, Tuple[str, str, str, str]] = {
+    Game.TIME_BULLET: ("rating_bullet", "rating_bullet_rd", "rating_bullet_vol", "bullet"),
+    Game.TIME_BLITZ: ("rating_blitz", "rating_blitz_rd", "rating_blitz_vol", "blitz"),
+    Game.TIME_RAPID: ("rating_rapid", "rating_rapid_rd", "rating_rapid_vol", "rapid"),
+    Game.TIME_CLASSICAL: ("rating_classical", "rating_classical_rd", "rating_classical_vol", "classical"),
+}
+USER_FIELDS = ("id", "is_active", "is_bot") + tuple(
+    field for fields in CONTROL_FIELDS.values() for field in fields[:3]
+)
+
+Deltas = Dict[int, Tuple[int, int]]
+
+
+SETTLE_WINDOW = settings.RATING_SETTLE_WINDOW
+SETTLE_BATCH = settings.RATING_SETTLE_BATCH
+SETTLE_GRACE = settings.RATING_SETTLE_GRACE
+RATING_PERIOD = timedelta(hours=settings.RATING_PERIOD_HOURS)
+
+
+def glicko2_update(before, opponent, score, periods=1.0):
+    """(rating, rd, vol) after one game against ``opponent``, rounded for storage."""
+    (rating, rd, vol), _ = rate_game(before, opponent, score, periods=(periods, 1.0))
+    return round(rating), round(rd, 2), round(vol, 6)
+
+
+def idle_periods(last_played, played_at) -> float:
+    """Rating periods since the previous rated game; one for a first game."""
+    if last_played is None or played_at is None:
+        return 1.0
+    return max(0.0, (played_at - last_played) / RATING_PERIOD)
+
+
+def _last_played(user_ids, modes) -> Dict[Tuple[int, str], object]:
+    from accounts.models_rating_history import RatingHistory
+
+    rows = (
+        RatingHistory.objects.filter(user_id__in=user_ids, mode__in=modes, source="game")
+        .values("user_id", "mode")
+        .annotate(last=Max("recorded_at"))
+    )
+    return {(row["user_id"], row["mode"]): row["last"] for row in rows}
+
+
+def needs_rating(game: Game) -> bool:
+    return bool(
+        game.rated
+        and game.result in SCORED_RESULTS
+        and game.time_control in CONTROL_FIELDS
+        and game.white_id
+        and game.black_id
+    )
+
+
+def settle_games(game_ids: Iterable[int]) -> Deltas:
+    """Rate every still-unsettled game in ``game_ids``; {game_id: (white_delta, black_delta)}."""
+    from accounts.models_rating_history import RatingHistory
+
+    ids = sorted({int(game_id) for game_id in game_ids})
+    if not ids:
+        return {}
+    User = get_user_model()
+    deltas: Deltas = {}
+    with transaction.atomic():
+        games = [
+            game
+            for game in Game.objects.select_for_update()
+            .filter(id__in=ids, status=Game.STATUS_FINISHED, white_rating_delta__isnull=True)
+            .order_by("id")
+            if needs_rating(game)
+        ]
+        if not games:
+            return {}
+        player_ids = sorted({game.white_id for game in games} | {game.black_id for game in games})
+        users = {
+            user.id: user
+            for user in User.objects.select_for_update().filter(id__in=player_ids).order_by("id").only(*USER_FIELDS)
+        }
+
+        touched_fields = set()
+        touched_modes: Dict[int, set] = {}
+        history = []
+        now = timezone.now()
+        last_played = _last_played(player_ids, sorted({CONTROL_FIELDS[game.time_control][3] for game in games}))
+        for game in sorted(games, key=lambda g: (g.finished_at or now, g.id)):
+            white, black = users.get(game.white_id), users.get(game.black_id)
+            if white is None or black is None:
+                continue
+            r_field, rd_field, vol_field, mode = CONTROL_FIELDS[game.time_control]
+            if game.result == Game.RESULT_WHITE:
+                white_score, black_score = 1, 0
+            elif game.result == Game.RESULT_BLACK:
+                white_score, black_score = 0, 1
+            else:
+                white_score = black_score = 0.5
+
+            recorded_at = game.finished_at or now
+            white_before = (getattr(white, r_field), getattr(white, rd_field), getattr(white, vol_field))
+            black_before = (getattr(black, r_field), getattr(black, rd_field), getattr(black, vol_field))
+            white_after = glicko2_update(
+                white_before, black_before, white_score, idle_periods(last_played.get((white.id, mode)), recorded_at)
+            )
+            black_after = glicko2_update(
+                black_before, white_before, black_score, idle_periods(last_played.get((black.id, mode)), recorded_at)
+            )
+
+            for user, after in ((white, white_after), (black, black_after)):
+                last_played[(user.id, mode)] = recorded_at
+                setattr(user, r_field, after[0])
+                setattr(user, rd_field, after[1])
+                setattr(user, vol_field, after[2])
+                touched_modes.setdefault(user.id, set()).add(mode)
+                history.append(
+                    RatingHistory(
+                        user_id=user.id,
+                        mode=mode,
+                        rating=after[0],
+                        date=timezone.localdate(recorded_at),
+                        recorded_at=recorded_at,
+                        source="game",
+                    )
+                )
+            touched_fields.update((r_field, rd_field, vol_field))
+            game.white_rating_delta = white_after[0] - white_before[0]
+            game.black_rating_delta = black_after[0] - black_before[0]
+            deltas[game.id] = (game.white_rating_delta, game.black_rating_delta)
+
+        settled = [game for game in games if game.id in deltas]
+        User.objects.bulk_update([users[user_id] for user_id in touched_modes], sorted(touched_fields))
+        Game.objects.bulk_update(settled, ["white_rating_delta", "black_rating_delta"])
+        RatingHistory.objects.bulk_create(history)
+
+        for user_id, modes in touched_modes.items():
+            update_user_on_commit(users[user_id], sorted(modes))
+
+    logger.info("Settled ratings for %d game(s)", len(deltas))
+    return deltas
+
+
+def queue_settlement(games: Iterable[Game]) -> Deltas:
+    """
+    Settle ``games`` through the queue; inline (returning the deltas) without Redis.
+
+    Inline settlement also copies the deltas onto the given instances, so a
+    caller that broadcasts the game afterwards sends them along.
+    """
+    games = [game for game in games if needs_rating(game)]
+    if not games:
+        return {}
+    ids = [game.id for game in games]
+    if get_redis():
+        transaction.on_commit(lambda: _enqueue_or_settle(ids))
+        return {}
+    deltas = settle_games(ids)
+    for game in games:
+        if game.id in deltas:
+            game.white_rating_delta, game.black_rating_delta = deltas[game.id]
+    return deltas
+
+
+def _enqueue_or_settle(ids: List[int]) -> None:
+    r = get_redis()
+    try:
+        if not r:
+            raise ConnectionError("Redis unavailable")
+        pipe = r.pipeline()
+        pipe.rpush(RATING_QUEUE_KEY, *ids)
+        pipe.set(SCHEDULED_KEY, "1", nx=True, ex=max(5, int(SETTLE_WINDOW * 10)))
+        _, first = pipe.execute()
+        if first:
+            from .tasks import settle_pending_ratings
+
+            settle_pending_ratings.apply_async(countdown=SETTLE_WINDOW)
+        return
+    except Exception as exc:
+        logger.warning("Queueing rating settlement failed (%s); settling inline", exc)
+    broadcast_rating_updates(settle_games(ids))
+
+
+def drain_queue(r, limit: int = SETTLE_BATCH) -> List[int]:
+    pipe = r.pipeline()
+    pipe.lrange(RATING_QUEUE_KEY, 0, limit - 1)
+    pipe.ltrim(RATING_QUEUE_KEY, limit, -1)
+    raw, _ = pipe.execute()
+    ids = []
+    for value in raw or []:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def unsettled_game_ids(now=None, limit: int = SETTLE_BATCH) -> List[int]:
+    """Rated games finished more than RATING_SETTLE_GRACE seconds ago without deltas."""
+    now = now or timezone.now()
+    return list(
+        Game.objects.filter(
+            rated=True,
+            status=Game.STATUS_FINISHED,
+            result__in=SCORED_RESULTS,
+            time_control__in=list(CONTROL_FIELDS),
+            white_rating_delta__isnull=True,
+            finished_at__lt=now - timedelta(seconds=SETTLE_GRACE),
+            finished_at__gte=now - SWEEP_WINDOW,
+        )
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def settle_pending(r=None) -> Deltas:
+    """Drain the queue batch by batch, then sweep up games the queue lost."""
+    r = r if r is not None else get_redis()
+    deltas: Deltas = {}
+    if r:
+        try:
+            r.delete(SCHEDULED_KEY)
+            while True:
+                ids = drain_queue(r)
+                if not ids:
+                    break
+                deltas.update(settle_games(ids))
+        except Exception as exc:
+            logger.warning("Draining the rating queue failed: %s", exc)
+    deltas.update(settle_games(unsettled_game_ids()))
+    return deltas
+
+
+def broadcast_rating_updates(deltas: Deltas) -> None:
+    channel_layer = get_channel_layer()
+    if not channel_layer or not deltas:
+        return
+    for game_id, (white_delta, black_delta) in deltas.items():
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"game_{game_id}",
+                {
+                    "type": "game.event",
+                    "payload": {
+                        "type": "ratings_updated",
+                        "game_id": game_id,
+                        "game": {
+                            "id": game_id,
+                            "white_rating_delta": white_delta,
+                            "black_rating_delta": black_delta,
+                        },
+                    },
+                },
+            )
+        except Exception as exc:
+            logger.debug("Broadcasting ratings for game %s failed: %s", game_id, exc)
@@ -5,8 +5,9 @@ import chess
 from datetime import timedelta
 
 from accounts.serializers import UserSerializer
-from .models import Game, TournamentGame
+from .models import Game
 from .game_core import FIRST_MOVE_GRACE_SECONDS, CHALLENGE_EXPIRY_MINUTES
+from .legal_moves import legal_moves_for_fen
 from utils.email import send_email_notification
 
 User = get_user_model()
@@ -107,15 +108,13 @@ class GameSerializer(serializers.ModelSerializer):
 
     def get_legal_moves(self, obj):
         try:
-            board = chess.Board(obj.current_fen or chess.STARTING_FEN)
-            return [board.san(mv) for mv in board.legal_moves]
+            return legal_moves_for_fen(obj.current_fen)["san"]
         except Exception:
             return []
 
     def get_legal_moves_uci(self, obj):
         try:
-            board = chess.Board(obj.current_fen or chess.STARTING_FEN)
-            return [mv.uci() for mv in board.legal_moves]
+            return legal_moves_for_fen(obj.current_fen)["uci"]
         except Exception:
             return []
 
@@ -150,11 +149,7 @@ class GameSerializer(serializers.ModelSerializer):
         return obj.draw_offer_by.id if obj.draw_offer_by else None
 
     def get_tournament_id(self, obj):
-        try:
-            tg = TournamentGame.objects.filter(game=obj).only('tournament_id').first()
-            return tg.tournament_id if tg else None
-        except Exception:
-            return None
+        return obj.tournament_id
 
     def _validate_time_settings(
         self,
@@ -0,0 +1,299 @@
+"""
+Swiss pairing engine: Dutch-style score brackets solved as min-cost matchings.
+
+The old pairing walked the standings greedily, giving each player the
+closest-scored opponent they had not met. Players left at the bottom often
+had only rematches left, and every pick scanned all remaining players.
+
+pair_round() works on plain SwissPlayer records, with no database access:
+
+1. Players are ranked by score, rating and id. With an odd field, the
+   lowest-ranked player who has not had a bye gets one.
+2. Score groups are paired from the top down. Each bracket is its group
+   plus the players floated down from above, and is split Dutch-style into
+   S1 (top half) and S2 (bottom half). S1[i] - S2[i] is the ideal pairing.
+   If that pairing breaks a constraint, the bracket is solved as a min-cost
+   assignment of S1 to S2 (Hungarian algorithm, NumPy rows). The cost is the
+   distance from the Dutch pairing plus colour and score-gap penalties.
+   Rematches, and two players who both need the same colour, are forbidden.
+   Anyone left over floats to the next bracket.
+3. If players are still left after the last bracket, the brackets above
+   are collapsed into it one at a time and re-paired. Only when the whole
+   field cannot be paired that way is it paired once more as a last resort:
+   rematches are allowed (and counted), and absolute colour clashes become
+   costly instead of forbidden, so nobody is left without a game.
+4. Colours follow FIDE-style preferences. Absolute: a colour difference of
+   2 or two games in a row with one colour. Strong: a difference of 1. Mild:
+   alternate from the last game. Boards without any preference alternate
+   from an initial colour drawn from ``seed``, so a given seed and input
+   always produce the same round.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+WHITE, BLACK = "w", "b"
+
+FORBIDDEN = 1e6
+REMATCH_COST = 1e4
+ABSOLUTE_CLASH_COST = 1e3  # last resort only; forbidden otherwise
+SCORE_GAP_COST = 50.0
+# Two players preferring the same colour: mild, strong.
+COLOR_CLASH_COST = {1: 1.0, 2: 4.0}
+
+
+@dataclass
+class SwissPlayer:
+    id: int
+    score: float = 0.0
+    rating: int = 0
+    opponents: Set[int] = field(default_factory=set)
+    color_balance: int = 0  # whites minus blacks
+    recent_colors: str = ""  # last colours played, oldest first
+    byes: int = 0
+
+
+@dataclass
+class SwissRound:
+    pairings: List[Tuple[int, int]]  # (white, black), in board order
+    bye: Optional[int] = None
+    rematches: int = 0
+
+
+def color_preference(player: SwissPlayer) -> Tuple[Optional[str], int]:
+    """(colour, strength): 3 absolute, 2 strong, 1 mild, 0 none."""
+    diff = player.color_balance
+    last_two = player.recent_colors[-2:]
+    if diff <= -2 or last_two == BLACK * 2:
+        return WHITE, 3
+    if diff >= 2 or last_two == WHITE * 2:
+        return BLACK, 3
+    if diff == -1:
+        return WHITE, 2
+    if diff == 1:
+        return BLACK, 2
+    if player.recent_colors:
+        return (WHITE if player.recent_colors[-1] == BLACK else BLACK), 1
+    return None, 0
+
+
+def _pair_cost(a: SwissPlayer, b: SwissPlayer, last_resort: bool = False) -> float:
+    cost = SCORE_GAP_COST * abs(a.score - b.score)
+    if b.id in a.opponents:
+        if not last_resort:
+            return FORBIDDEN
+        cost += REMATCH_COST
+    color_a, strength_a = color_preference(a)
+    color_b, strength_b = color_preference(b)
+    if color_a and color_a == color_b:
+        if strength_a == 3 and strength_b == 3:
+            if not last_resort:
+                return FORBIDDEN
+            return cost + ABSOLUTE_CLASH_COST
+        cost += COLOR_CLASH_COST[min(strength_a, strength_b, 2)]
+    return cost
+
+
+def assign(cost: np.ndarray) -> List[int]:
+    """
+    Min-cost assignment of every row to a distinct column (rows <= columns).
+
+    Shortest-augmenting-path Hungarian algorithm; each augmentation step
+    relaxes a whole row with NumPy. Returns the column of each row.
+    """
+    rows, cols = cost.shape
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    owner = np.zeros(cols + 1, dtype=np.intp)  # column -> row (1-based), 0 = free
+    way = np.zeros(cols + 1, dtype=np.intp)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        col0 = 0
+        minv = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            row0 = owner[col0]
+            free = ~used[1:]
+            reduced = cost[row0 - 1] - u[row0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col0
+            candidates = np.where(free, minv[1:], np.inf)
+            col1 = int(np.argmin(candidates)) + 1
+            delta = candidates[col1 - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            col0 = col1
+            if owner[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            owner[col0] = owner[col1]
+            col0 = col1
+    result = [0] * rows
+    for col in range(1, cols + 1):
+        if owner[col]:
+            result[owner[col] - 1] = col - 1
+    return result
+
+
+def _pair_bracket(
+    bracket: List[SwissPlayer], last_resort: bool = False
+) -> Tuple[List[Tuple[SwissPlayer, SwissPlayer]], List[SwissPlayer]]:
+    """Pair one ranked bracket; returns (pairs, players floating down)."""
+    floaters = []
+    if len(bracket) % 2:
+        floaters.append(bracket[-1])
+        bracket = bracket[:-1]
+    if not bracket:
+        return [], floaters
+    half = len(bracket) // 2
+    s1, s2 = bracket[:half], bracket[half:]
+
+    costs = [_pair_cost(a, b, last_resort) for a, b in zip(s1, s2)]
+    if all(cost == SCORE_GAP_COST * abs(a.score - b.score) for cost, a, b in zip(costs, s1, s2)):
+        return list(zip(s1, s2)), floaters
+
+    matrix = np.empty((half, len(s2)))
+    for i, a in enumerate(s1):
+        for j, b in enumerate(s2):
+            matrix[i, j] = _pair_cost(a, b, last_resort) + abs(i - j)
+    pairs, left = [], []
+    matched = set()
+    for i, j in enumerate(assign(matrix)):
+        if matrix[i, j] >= FORBIDDEN:
+            left.append(s1[i])
+        else:
+            pairs.append((s1[i], s2[j]))
+            matched.add(j)
+    left.extend(b for j, b in enumerate(s2) if j not in matched)
+
+    # Players the S1/S2 split could not place may still fit each other.
+    left.sort(key=_rank_key)
+    while left:
+        a = left.pop(0)
+        partner = next((b for b in left if _pair_cost(a, b, last_resort) < FORBIDDEN), None)
+        if partner is None:
+            floaters.append(a)
+            continue
+        left.remove(partner)
+        pairs.append((a, partner))
+    floaters.sort(key=_rank_key)
+    return pairs, floaters
+
+
+def _rank_key(player: SwissPlayer):
+    return (-player.score, -player.rating, player.id)
+
+
+def _choose_bye(ranked: List[SwissPlayer]) -> Optional[SwissPlayer]:
+    if len(ranked) % 2 == 0:
+        return None
+    fewest = min(player.byes for player in ranked)
+    return next(player for player in reversed(ranked) if player.byes == fewest)
+
+
+def _allocate_colors(
+    pairs: Sequence[Tuple[SwissPlayer, SwissPlayer]], initial: str
+) -> List[Tuple[int, int]]:
+    boards = sorted(
+        (sorted(pair, key=_rank_key) for pair in pairs),
+        key=lambda pair: (_rank_key(pair[0]), _rank_key(pair[1])),
+    )
+    result = []
+    for board, (top, other) in enumerate(boards):
+        color_top, strength_top = color_preference(top)
+        color_other, strength_other = color_preference(other)
+        if color_top and (color_top != color_other or strength_top >= strength_other):
+            top_color = color_top
+        elif color_other:
+            top_color = WHITE if color_other == BLACK else BLACK
+        else:
+            top_color = initial if board % 2 == 0 else (WHITE if initial == BLACK else BLACK)
+        result.append((top.id, other.id) if top_color == WHITE else (other.id, top.id))
+    return result
+
+
+def pair_round(players: Sequence[SwissPlayer], seed: int = 0) -> SwissRound:
+    """Pair one Swiss round; deterministic for a given ``seed``."""
+    ranked = sorted(players, key=_rank_key)
+    bye = _choose_bye(ranked)
+    if bye is not None:
+        ranked.remove(bye)
+
+    groups: List[List[SwissPlayer]] = []
+    for player in ranked:
+        if groups and groups[-1][0].score == player.score:
+            groups[-1].append(player)
+        else:
+            groups.append([player])
+
+    # One entry per bracket: (pairs made there, players paired there).
+    settled: List[List[Tuple[SwissPlayer, SwissPlayer]]] = []
+    floaters: List[SwissPlayer] = []
+    for group in groups:
+        pairs, floaters = _pair_bracket(floaters + group)
+        settled.append(pairs)
+
+    # Collapse brackets upwards until the leftovers can be paired. When the
+    # whole field has been absorbed and still leaves players over, every
+    # remaining player goes to the last-resort pass below.
+    while floaters and settled:
+        absorbed = settled.pop()
+        bracket = sorted([p for pair in absorbed for p in pair] + floaters, key=_rank_key)
+        pairs, floaters = _pair_bracket(bracket)
+        if floaters:
+            floaters = bracket  # keep collapsing with this bracket's players
+            continue
+        settled.append(pairs)
+
+    rematches = 0
+    if floaters:
+        # Nothing is forbidden here, so an even field always pairs completely.
+        pairs, floaters = _pair_bracket(floaters, last_resort=True)
+        rematches = sum(1 for a, b in pairs if b.id in a.opponents)
+        settled.append(pairs)
+
+    initial = WHITE if random.Random(seed).random() < 0.5 else BLACK
+    return SwissRound(
+        pairings=_allocate_colors([pair for pairs in settled for pair in pairs], initial),
+        bye=bye.id if bye is not None else None,
+        rematches=rematches,
+    )
+
+
+def swiss_players_from_rows(rows, rating_field: Optional[str] = None) -> List[SwissPlayer]:
+    """SwissPlayer records from TournamentParticipant rows (with ``user`` loaded)."""
+    return [
+        SwissPlayer(
+            id=row.user_id,
+            score=row.score,
+            rating=int(getattr(row.user, rating_field, 0) or 0) if rating_field else 0,
+            opponents=set(row.opponents or []),
+            color_balance=row.color_balance,
+            recent_colors=row.recent_colors or "",
+            byes=row.byes,
+        )
+        for row in rows
+    ]
+
+
+def apply_round_results(players: Dict[int, SwissPlayer], round_: SwissRound, scores: Dict[int, float]) -> None:
+    """Update in-memory players after a round: ``scores`` maps white id to white's score."""
+    for white_id, black_id in round_.pairings:
+        white, black = players[white_id], players[black_id]
+        white.score += scores[white_id]
+        black.score += 1.0 - scores[white_id]
+        white.opponents.add(black_id)
+        black.opponents.add(white_id)
+        white.color_balance += 1
+        black.color_balance -= 1
+        white.recent_colors = (white.recent_colors + WHITE)[-2:]
+        black.recent_colors = (black.recent_colors + BLACK)[-2:]
+    if round_.bye is not None:
+        players[round_.bye].score += 1.0
+        players[round_.bye].byes += 1
@@ -11,10 +11,11 @@ import chess
 
 from utils.redis_client import get_redis
 from .irwin_imports import iter_csv_rows, save_single_import_sample
-from .models import Game, GameAnalysis, Tournament, TournamentParticipant, TournamentGame, IrwinImportJob, IrwinTrainingData
-from .views import FinishGameView, GameMoveView
-from .serializers import GameSerializer
-from .bot_utils import get_bot_move_with_error
+from .models import Game, Tournament, TournamentParticipant, TournamentGame, IrwinImportJob, IrwinTrainingData
+from .views import FinishGameView
+from .game_state_codec import encode_game
+from .rating_settlement import broadcast_rating_updates, settle_games, settle_pending
+from .rating_recompute import recompute_all
 from .game_proxy import GameProxy
 from .game_core import (
     compute_clock_snapshot,
@@ -24,8 +25,10 @@ from .game_core import (
     append_game_event,
 )
 from .move_optimizer import process_move_optimized, latency_monitor
+from .clock_deadlines import pop_expired_game_ids, reindex_active_games, schedule_game_deadline
+from .clock_broadcast import broadcast_watched_clocks
 from accounts.models_rating_history import RatingHistory
-from .analysis_service import run_full_analysis
+from .analysis_jobs import enqueue_analysis, run_analysis
 from .tournament_lifecycle import (
     advance_tournament,
     finish_tournament,
@@ -48,6 +51,21 @@ def update_ratings_async(game_id: int, result: str):
     return
 
 
+@shared_task
+def settle_pending_ratings():
+    """Settle queued finished games in batches and push the rating deltas to their sockets."""
+    deltas = settle_pending()
+    broadcast_rating_updates(deltas)
+    return len(deltas)
+
+
+@shared_task
+def recompute_ratings(modes=None):
+    """Rebuild every user's ratings from game history in Glicko-2 rating periods."""
+    results = recompute_all(modes)
+    return {mode: stats["updated"] for mode, stats in results.items()}
+
+
 @shared_task
 def import_digiquiz_question_bank():
     from .quiz_service import import_question_bank
@@ -120,7 +138,12 @@ def store_daily_rating_snapshots():
 
 @shared_task
 def analyze_game_full_async(game_id: int, prefer_lichess: bool = True, force: bool = False):
-    """Run full game analysis in the background and cache results."""
+    """
+    Queue a full analysis of a finished game (deduplicated, see analysis_jobs.enqueue_analysis).
+
+    prefer_lichess and force are still accepted so messages already queued
+    keep working; the job record decides what runs.
+    """
     try:
         game = Game.objects.get(id=game_id)
     except Game.DoesNotExist:
@@ -128,58 +151,13 @@ def analyze_game_full_async(game_id: int, prefer_lichess: bool = True, force: bo
 
     if game.status not in [Game.STATUS_FINISHED, Game.STATUS_ABORTED]:
         return
+    enqueue_analysis(game)
 
-    analysis_record, created = GameAnalysis.objects.get_or_create(
-        game=game,
-        defaults={"status": GameAnalysis.STATUS_QUEUED},
-    )
 
-    if analysis_record.status == GameAnalysis.STATUS_RUNNING and not force:
-        return
-    if analysis_record.status == GameAnalysis.STATUS_COMPLETED and analysis_record.analysis and not force:
-        return
-
-    if analysis_record.status == GameAnalysis.STATUS_COMPLETED and analysis_record.analysis and not force:
-        return
-
-    now = timezone.now()
-    analysis_record.status = GameAnalysis.STATUS_RUNNING
-    analysis_record.started_at = now
-    analysis_record.completed_at = None
-    analysis_record.error = ""
-    analysis_record.source = ""
-    analysis_record.analysis = None
-    analysis_record.save(update_fields=["status", "started_at", "completed_at", "error", "source", "analysis", "updated_at"])
-
-    try:
-        analysis_data, source, _engine_path = run_full_analysis(
-            game,
-            prefer_lichess=False,
-            time_per_move=0.1,
-            depth=12,
-            max_moves=None,
-            allow_lichess_fallback=False,
-        )
-        analysis_record.analysis = analysis_data
-        analysis_record.source = source
-        analysis_record.status = GameAnalysis.STATUS_COMPLETED
-        analysis_record.completed_at = timezone.now()
-        analysis_record.error = ""
-        analysis_record.save(
-            update_fields=[
-                "analysis",
-                "source",
-                "status",
-                "completed_at",
-                "error",
-                "updated_at",
-            ]
-        )
-    except Exception as exc:
-        analysis_record.status = GameAnalysis.STATUS_FAILED
-        analysis_record.error = str(exc)
-        analysis_record.completed_at = timezone.now()
-        analysis_record.save(update_fields=["status", "error", "completed_at", "updated_at"])
+@shared_task
+def run_analysis_job(game_id: int):
+    """Run one queued GameAnalysis job; routed to ANALYSIS_QUEUE so only engine workers take it."""
+    return run_analysis(game_id)
 
 
 @shared_task
@@ -301,107 +279,23 @@ def process_irwin_csv_import_job(job_id: int):
         )
 
 
-@shared_task
-def make_bot_move_async(game_id: int):
-    """Make a move for a bot player"""
-    import time
-    from django.utils import timezone
-    from games.views import GameMoveView
-    
-    try:
-        game = Game.objects.get(id=game_id)
-    except Game.DoesNotExist:
-        return
-    
-    # Check if game is still active
-    if game.status != Game.STATUS_ACTIVE:
-        return
-    
-    # Load board
-    board = chess.Board(game.current_fen or chess.STARTING_FEN)
-    
-    # Determine whose turn it is
-    current_player = game.white if board.turn == chess.WHITE else game.black
-    
-    # Check if current player is a bot
-    if not current_player or not current_player.is_bot:
-        return
-    
-    # Get bot rating for the current time control
-    rating_field_map = {
-        Game.TIME_BULLET: 'rating_bullet',
-        Game.TIME_BLITZ: 'rating_blitz',
-        Game.TIME_RAPID: 'rating_rapid',
-        Game.TIME_CLASSICAL: 'rating_classical',
-    }
-    rating_field = rating_field_map.get(game.time_control, 'rating_blitz')
-    bot_rating = getattr(current_player, rating_field, 800)
-    bot_engine = getattr(current_player, 'bot_engine', None) or 'maia'
-    
-    # Get bot move - use Lichess APIs for optimization
-    move_list = (game.moves or "").strip().split()
-    ply_count = len(move_list)
-    
-    try:
-        bot_move = get_bot_move_with_error(
-            board, 
-            bot_rating,
-            time_control=game.time_control,
-            ply_count=ply_count,
-            engine=bot_engine,
-        )
-        move_san = board.san(bot_move)
-        
-        # Make the move directly (simulate a POST request)
-        mv = GameMoveView()
-        from unittest.mock import Mock
-        mock_request = Mock()
-        mock_request.user = current_player
-        mock_request.data = {'move': move_san}
-        
-        # Make the move
-        response = mv.post(mock_request, game.id)
-        
-        # The move handler will automatically trigger the next bot move if needed
-    except Exception as e:
-        import sys
-        print(f"[bot_move] Error making bot move: {e}", file=sys.stderr)
+@shared_task(bind=True, max_retries=20)
+def make_bot_move_async(self, game_id: int, ply: int = None):
+    """Play the bot's reply in a game; routed to BOT_MOVE_QUEUE (see games.bot_moves)."""
+    from .bot_moves import BUSY_ERROR, play_bot_move
+
+    result = play_bot_move(game_id, ply)
+    if result is None:
+        return None
+    if not result.ok and result.error == BUSY_ERROR:
+        raise self.retry(countdown=0.1)
+    return result.state.get("san") if result.ok and result.state else None
 
 
 @shared_task
 def broadcast_clock_updates():
-    """Broadcast clock updates for all active games via WebSocket"""
-    from django.utils import timezone
-    from channels.layers import get_channel_layer
-    from asgiref.sync import async_to_sync
-    import chess
-    
-    active_games = Game.objects.filter(status=Game.STATUS_ACTIVE).select_related('white', 'black')
-    now = timezone.now()
-    channel_layer = get_channel_layer()
-    
-    if not channel_layer:
-        return
-    
-    for game in active_games:
-        try:
-            board = chess.Board(game.current_fen or chess.STARTING_FEN)
-        except Exception:
-            board = chess.Board()
-        snapshot = compute_clock_snapshot(game, now=now, board=board)
-        async_to_sync(channel_layer.group_send)(
-            f"game_{game.id}",
-            {
-                "type": "game.event",
-                "payload": {
-                    "type": "clock",
-                    "game_id": game.id,
-                    "white_time_left": snapshot["white_time_left"],
-                    "black_time_left": snapshot["black_time_left"],
-                    "turn": snapshot["turn"],
-                },
-            },
-        )
+    """Broadcast clock updates via WebSocket to games that have connected sockets"""
+    return broadcast_watched_clocks()
 
 
 @shared_task
@@ -459,10 +353,12 @@ def check_tournament_finish():
 def cleanup_orphaned_tournament_games():
     """Abort/draw any active games belonging to completed tournaments."""
     now = timezone.now()
-    orphaned = TournamentGame.objects.filter(
+    orphaned = list(TournamentGame.objects.filter(
         tournament__status=Tournament.STATUS_COMPLETED,
         game__status__in=[Game.STATUS_PENDING, Game.STATUS_ACTIVE],
-    ).select_related("game")
+    ).select_related("game"))
+    # The move count decides draw or abort, so read it from the live state.
+    GameProxy.overlay_many([tg.game for tg in orphaned])
     cleaned = []
     for tg in orphaned:
         game = tg.game
@@ -496,8 +392,8 @@ def pair_arena_idle_players():
 
 @shared_task
 def flush_dirty_games():
-    """Flush all dirty games to database (Lichess-style batched writes)"""
-    GameProxy.flush_all_dirty()
+    """Write the live state of games with unflushed moves to the database (see games.game_proxy)."""
+    return GameProxy.flush_dirty()
 
 
 @shared_task
@@ -510,13 +406,19 @@ def check_game_timeouts():
     from django.utils import timezone
     from channels.layers import get_channel_layer
     from asgiref.sync import async_to_sync
-    from .serializers import GameSerializer
     import chess
     
-    active_games = Game.objects.filter(status=Game.STATUS_ACTIVE)
     now = timezone.now()
     channel_layer = get_channel_layer()
+    r = get_redis()
+    if r:
+        # Only the games whose indexed flag time has passed (see clock_deadlines)
+        expired_ids = pop_expired_game_ids(r, now)
+        active_games = Game.objects.filter(id__in=expired_ids, status=Game.STATUS_ACTIVE)
+    else:
+        active_games = Game.objects.filter(status=Game.STATUS_ACTIVE)
     
+    flagged = []
     for game in active_games:
         try:
             board = chess.Board(game.current_fen or chess.STARTING_FEN)
@@ -525,10 +427,9 @@ def check_game_timeouts():
         move_count = len((game.moves or "").strip().split()) if game.moves else 0
         # For regular games: don't enforce clock until both players have moved once.
         # For tournament games: clock runs immediately.
-        if move_count < 2:
-            is_tournament = TournamentGame.objects.filter(game_id=game.id).exists()
-            if not is_tournament:
-                continue
+        is_tournament = game.is_tournament
+        if move_count < 2 and not is_tournament:
+            continue
         snapshot = compute_clock_snapshot(game, now=now, board=board)
         result = None
         if snapshot["turn"] == "white" and snapshot["white_time_left"] <= 0:
@@ -536,6 +437,8 @@ def check_game_timeouts():
         if snapshot["turn"] == "black" and snapshot["black_time_left"] <= 0:
             result = Game.RESULT_WHITE
         if not result:
+            # A move landed after the deadline was claimed; put the new one back.
+            schedule_game_deadline(r, game, board, is_tournament=is_tournament)
             continue
         reason = "timeout"
         if is_insufficient_material(board):
@@ -557,10 +460,15 @@ def check_game_timeouts():
             ]
         )
         game.refresh_from_db()
-        if game.rated:
-            FinishGameView().update_ratings(game, result)
+        flagged.append((game, reason))
+
+    # Games flagged in the same sweep (a tournament round on one clock) settle as one batch.
+    deltas = settle_games([game.id for game, _ in flagged])
+    for game, reason in flagged:
+        if game.id in deltas:
+            game.white_rating_delta, game.black_rating_delta = deltas[game.id]
         if channel_layer:
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -568,7 +476,7 @@ def check_game_timeouts():
                     "payload": {
                         "type": "game_finished",
                         "game_id": game.id,
-                        "result": result,
+                        "result": game.result,
                         "reason": reason,
                         "game": game_data,
                     },
@@ -608,7 +516,7 @@ def check_game_timeouts():
             "rematch_status": reason,
         })
         if channel_layer:
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             payload = {
                 "type": reason,
                 "game_id": game.id,
@@ -626,6 +534,18 @@ def check_game_timeouts():
             )
 
 
+@shared_task
+def reindex_clock_deadlines():
+    """
+    Rebuild the clock deadline index from the database.
+    Covers games whose clock started while Redis was unavailable.
+    """
+    r = get_redis()
+    if not r:
+        return 0
+    return reindex_active_games(r)
+
+
 @shared_task
 def check_first_move_timeouts():
     """
@@ -635,12 +555,9 @@ def check_first_move_timeouts():
     """
     now = timezone.now()
     channel_layer = get_channel_layer()
-    tournament_game_ids = set(TournamentGame.objects.values_list("game_id", flat=True))
-    games = Game.objects.filter(status=Game.STATUS_ACTIVE)
+    games = Game.objects.filter(status=Game.STATUS_ACTIVE, tournament__isnull=True)
 
     for game in games:
-        if game.id in tournament_game_ids:
-            continue
         move_count = len((game.moves or "").strip().split()) if game.moves else 0
 
         if move_count == 0:
@@ -665,7 +582,7 @@ def check_first_move_timeouts():
         game.save(update_fields=["status", "result", "finished_at"])
 
         if channel_layer:
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -718,7 +635,7 @@ def check_pending_challenge_expiry():
             pass
 
         if channel_layer:
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -7,7 +7,13 @@ from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 
+from utils.redis_client import get_redis
+from .clock_deadlines import schedule_game_deadline
+from .game_proxy import GameProxy
 from .models import Game, Tournament, TournamentGame, TournamentParticipant
+from .rating_settlement import CONTROL_FIELDS
+from .swiss_pairing import pair_round, swiss_players_from_rows
+from .tournament_standings import participant_standings, record_bye
 
 OPEN_GAME_STATUSES = [Game.STATUS_PENDING, Game.STATUS_ACTIVE]
 
@@ -39,16 +45,6 @@ def _round_has_open_games(tournament: Tournament, round_number: int) -> bool:
     ).exists()
 
 
-def _game_points(result: str, player_is_white: bool) -> float:
-    if result == Game.RESULT_DRAW:
-        return 0.5
-    if player_is_white and result == Game.RESULT_WHITE:
-        return 1.0
-    if (not player_is_white) and result == Game.RESULT_BLACK:
-        return 1.0
-    return 0.0
-
-
 def _create_tournament_game(
     tournament: Tournament,
     white_id: int,
@@ -73,10 +69,13 @@ def _create_tournament_game(
         status=Game.STATUS_ACTIVE,
         started_at=timezone.now(),
         last_move_at=timezone.now(),
+        tournament=tournament,
     )
     TournamentGame.objects.create(
         tournament=tournament, game=game, round_number=round_number
     )
+    # Tournament clocks run from the start, so index the first flag time now.
+    schedule_game_deadline(get_redis(), game, is_tournament=game.is_tournament)
     return game.id
 
 
@@ -94,148 +93,58 @@ def _choose_colors(
     return (user_a, user_b) if user_a < user_b else (user_b, user_a)
 
 
-def _score_table_standard(
-    tournament: Tournament,
-) -> Tuple[Dict[int, float], Dict[int, List[int]]]:
-    participant_ids = _participant_ids(tournament)
-    scores = {uid: 0.0 for uid in participant_ids}
-    opponents = {uid: [] for uid in participant_ids}
-    games = tournament.tournament_games.select_related("game").filter(
-        game__status=Game.STATUS_FINISHED
-    )
-    for tg in games:
-        game = tg.game
-        scores[game.white_id] = scores.get(game.white_id, 0.0) + _game_points(
-            game.result, True
-        )
-        scores[game.black_id] = scores.get(game.black_id, 0.0) + _game_points(
-            game.result, False
-        )
-        opponents.setdefault(game.white_id, []).append(game.black_id)
-        opponents.setdefault(game.black_id, []).append(game.white_id)
-    return scores, opponents
-
-
-def _score_table_arena(
-    tournament: Tournament,
-) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
-    participant_ids = _participant_ids(tournament)
-    scores = {uid: 0 for uid in participant_ids}
-    current_streak = {uid: 0 for uid in participant_ids}
-    max_streak = {uid: 0 for uid in participant_ids}
-    wins = {uid: 0 for uid in participant_ids}
-    draws = {uid: 0 for uid in participant_ids}
-    losses = {uid: 0 for uid in participant_ids}
-
-    games = (
-        tournament.tournament_games.select_related("game")
-        .filter(game__status=Game.STATUS_FINISHED)
-        .order_by("game__finished_at", "id")
-    )
-
-    def apply_win(user_id: int):
-        wins[user_id] = wins.get(user_id, 0) + 1
-        current_streak[user_id] = current_streak.get(user_id, 0) + 1
-        max_streak[user_id] = max(max_streak.get(user_id, 0), current_streak[user_id])
-        points = 2
-        if current_streak[user_id] >= 3:
-            points += 2
-        scores[user_id] = scores.get(user_id, 0) + points
-
-    def apply_non_win(user_id: int):
-        current_streak[user_id] = 0
-
-    for tg in games:
-        game = tg.game
-        white_id = game.white_id
-        black_id = game.black_id
-        if game.result == Game.RESULT_WHITE:
-            apply_win(white_id)
-            losses[black_id] = losses.get(black_id, 0) + 1
-            apply_non_win(black_id)
-        elif game.result == Game.RESULT_BLACK:
-            apply_win(black_id)
-            losses[white_id] = losses.get(white_id, 0) + 1
-            apply_non_win(white_id)
-        elif game.result == Game.RESULT_DRAW:
-            draws[white_id] = draws.get(white_id, 0) + 1
-            draws[black_id] = draws.get(black_id, 0) + 1
-            scores[white_id] = scores.get(white_id, 0) + 1
-            scores[black_id] = scores.get(black_id, 0) + 1
-            apply_non_win(white_id)
-            apply_non_win(black_id)
-
-    return scores, current_streak, max_streak, wins, draws, losses
-
-
 def build_tournament_standings(tournament: Tournament) -> List[dict]:
-    username_map = _participant_username_map(tournament)
-    participant_ids = list(username_map.keys())
+    participants = participant_standings(tournament)
     if tournament.type == Tournament.TYPE_ARENA:
-        scores, streak, max_streak, wins, draws, losses = _score_table_arena(tournament)
-        ranked = sorted(
-            participant_ids,
-            key=lambda uid: (
-                -scores.get(uid, 0),
-                -wins.get(uid, 0),
-                -max_streak.get(uid, 0),
-                uid,
-            ),
-        )
+        ranked = sorted(participants, key=lambda p: (-p.score, -p.wins, -p.max_streak, p.user_id))
         return [
             {
-                "user_id": uid,
-                "username": username_map[uid],
-                "score": scores.get(uid, 0),
-                "wins": wins.get(uid, 0),
-                "draws": draws.get(uid, 0),
-                "losses": losses.get(uid, 0),
-                "streak": streak.get(uid, 0),
-                "max_streak": max_streak.get(uid, 0),
+                "user_id": p.user_id,
+                "username": p.user.username,
+                "score": int(p.score),
+                "wins": p.wins,
+                "draws": p.draws,
+                "losses": p.losses,
+                "streak": p.streak,
+                "max_streak": p.max_streak,
             }
-            for uid in ranked
+            for p in ranked
         ]
 
-    scores, opponents = _score_table_standard(tournament)
     if tournament.type == Tournament.TYPE_SWISS:
+        scores = {p.user_id: p.score for p in participants}
         buchholz = {}
         median_buchholz = {}
-        for uid in participant_ids:
-            opps = opponents.get(uid, [])
-            opp_scores = [scores.get(opp_uid, 0.0) for opp_uid in opps]
-            buchholz[uid] = sum(opp_scores)
+        for p in participants:
+            opp_scores = [scores.get(opp_uid, 0.0) for opp_uid in p.opponents or []]
+            buchholz[p.user_id] = sum(opp_scores)
             if len(opp_scores) <= 2:
-                median_buchholz[uid] = buchholz[uid]
+                median_buchholz[p.user_id] = buchholz[p.user_id]
             else:
-                median_buchholz[uid] = sum(sorted(opp_scores)[1:-1])
+                median_buchholz[p.user_id] = sum(sorted(opp_scores)[1:-1])
         ranked = sorted(
-            participant_ids,
-            key=lambda uid: (
-                -scores.get(uid, 0.0),
-                -buchholz.get(uid, 0.0),
-                -median_buchholz.get(uid, 0.0),
-                uid,
-            ),
+            participants,
+            key=lambda p: (-p.score, -buchholz[p.user_id], -median_buchholz[p.user_id], p.user_id),
         )
         return [
             {
-                "user_id": uid,
-                "username": username_map[uid],
-                "score": scores.get(uid, 0.0),
-                "buchholz": buchholz.get(uid, 0.0),
-                "median_buchholz": median_buchholz.get(uid, 0.0),
+                "user_id": p.user_id,
+                "username": p.user.username,
+                "score": p.score,
+                "buchholz": buchholz[p.user_id],
+                "median_buchholz": median_buchholz[p.user_id],
             }
-            for uid in ranked
+            for p in ranked
         ]
 
-    ranked = sorted(participant_ids, key=lambda uid: (-scores.get(uid, 0.0), uid))
+    ranked = sorted(participants, key=lambda p: (-p.score, p.user_id))
     return [
         {
-            "user_id": uid,
-            "username": username_map[uid],
-            "score": scores.get(uid, 0.0),
+            "user_id": p.user_id,
+            "username": p.user.username,
+            "score": p.score,
         }
-        for uid in ranked
+        for p in ranked
     ]
 
 
@@ -274,10 +183,12 @@ def finish_tournament(
         locked.finished_at = now
         locked.save(update_fields=["winners", "status", "finished_at"])
 
-        orphaned = TournamentGame.objects.filter(
+        orphaned = list(TournamentGame.objects.filter(
             tournament=locked,
             game__status__in=OPEN_GAME_STATUSES,
-        ).select_related("game")
+        ).select_related("game"))
+        # The move count decides draw or abort, so read it from the live state.
+        GameProxy.overlay_many([tg.game for tg in orphaned])
         for tg in orphaned:
             game = tg.game
             move_count = len((game.moves or "").strip().split()) if game.moves else 0
@@ -300,7 +211,7 @@ def _broadcast_orphaned_game_finishes(tournament: Tournament, finished_at):
     try:
         from channels.layers import get_channel_layer
         from asgiref.sync import async_to_sync
-        from .serializers import GameSerializer
+        from .game_state_codec import encode_game
 
         channel_layer = get_channel_layer()
         if not channel_layer:
@@ -315,7 +226,7 @@ def _broadcast_orphaned_game_finishes(tournament: Tournament, finished_at):
             game = tg.game
             if game.status not in (Game.STATUS_FINISHED, Game.STATUS_ABORTED):
                 continue
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             reason = "tournament_ended"
             payload = {
                 "type": "game_finished",
@@ -337,23 +248,6 @@ def _broadcast_orphaned_game_finishes(tournament: Tournament, finished_at):
         pass
 
 
-def _swiss_history(
-    tournament: Tournament,
-) -> Tuple[Dict[int, set], Dict[int, int]]:
-    history = defaultdict(set)
-    color_balance = defaultdict(int)
-    games = tournament.tournament_games.select_related("game").exclude(
-        game__status=Game.STATUS_ABORTED
-    )
-    for tg in games:
-        game = tg.game
-        history[game.white_id].add(game.black_id)
-        history[game.black_id].add(game.white_id)
-        color_balance[game.white_id] += 1
-        color_balance[game.black_id] -= 1
-    return history, color_balance
-
-
 def generate_swiss_pairings(
     tournament: Tournament,
     round_number: Optional[int] = None,
@@ -372,41 +266,17 @@ def generate_swiss_pairings(
                 ).values_list("game_id", flat=True)
             )
 
-        participant_ids = _participant_ids(locked)
-        if len(participant_ids) < 2:
+        participants = participant_standings(locked)
+        if len(participants) < 2:
             return []
 
-        scores, _ = _score_table_standard(locked)
-        history, color_balance = _swiss_history(locked)
-        ordered = sorted(participant_ids, key=lambda uid: (-scores.get(uid, 0.0), uid))
-        unpaired = ordered[:]
-        pairings = []
-
-        while len(unpaired) >= 2:
-            player_id = unpaired.pop(0)
-            best_index = None
-            best_key = None
-            for idx, candidate_id in enumerate(unpaired):
-                replay_penalty = 1 if candidate_id in history.get(player_id, set()) else 0
-                score_gap = abs(scores.get(player_id, 0.0) - scores.get(candidate_id, 0.0))
-                key = (replay_penalty, score_gap, candidate_id)
-                if best_key is None or key < best_key:
-                    best_key = key
-                    best_index = idx
-
-            if best_index is None:
-                break
-
-            opponent_id = unpaired.pop(best_index)
-            white_id, black_id = _choose_colors(player_id, opponent_id, color_balance)
-            pairings.append((white_id, black_id))
-            history[player_id].add(opponent_id)
-            history[opponent_id].add(player_id)
-            color_balance[white_id] += 1
-            color_balance[black_id] -= 1
+        rating_field = CONTROL_FIELDS.get(locked.time_control, (None,))[0]
+        pairing = pair_round(swiss_players_from_rows(participants, rating_field), seed=locked.id)
+        if pairing.bye is not None:
+            record_bye(locked, pairing.bye)
 
         created = []
-        for white_id, black_id in pairings:
+        for white_id, black_id in pairing.pairings:
             created.append(
                 _create_tournament_game(
                     tournament=locked,
@@ -535,10 +405,11 @@ def pair_idle_arena_players(tournament: Tournament) -> List[int]:
         if locked.status != Tournament.STATUS_ACTIVE:
             return []
 
-        participant_ids = _participant_ids(locked)
-        if len(participant_ids) < 2:
+        participants = participant_standings(locked)
+        if len(participants) < 2:
             return []
 
+        participant_ids = [p.user_id for p in participants]
         players_with_open_games = set()
         open_games = locked.tournament_games.select_related("game").filter(
             game__status__in=OPEN_GAME_STATUSES
@@ -553,13 +424,8 @@ def pair_idle_arena_players(tournament: Tournament) -> List[int]:
         if len(available) < 2:
             return []
 
-        color_balance = defaultdict(int)
-        all_games = locked.tournament_games.select_related("game").exclude(
-            game__status=Game.STATUS_ABORTED
-        )
-        for tg in all_games:
-            color_balance[tg.game.white_id] += 1
-            color_balance[tg.game.black_id] -= 1
+        # Players in open games are not available, so finished games are all that matter.
+        color_balance = defaultdict(int, {p.user_id: p.color_balance for p in participants})
 
         created = []
         for idx in range(0, len(available) - 1, 2):
@@ -0,0 +1,145 @@
+"""
+Materialised tournament standings.
+
+Standings used to be rebuilt on every request by replaying every finished
+TournamentGame of the tournament, and Swiss pairing replayed them once more.
+The per-player aggregates now live on TournamentParticipant (score, W/D/L,
+streaks, colour balance and the opponent list Buchholz is computed from) and
+every finished game is folded in exactly once:
+
+- apply_pending_results() picks up the finished games whose
+  ``standings_applied`` flag is unset, applies them in finish order under the
+  tournament row lock and sets the flag. Standings reads and both pairing
+  paths call it first, so a game finished through any path (move, flag,
+  resignation, tournament end, admin edit) is counted the next time anyone
+  looks; when nothing is pending it is one indexed exists() query.
+- participant_standings() then reads one row per participant: standings and
+  pairings cost O(participants) however many games have been played.
+- record_bye() credits a Swiss pairing-allocated bye (a full point, no
+  opponent, no colour).
+- rebuild_standings() resets the aggregates and replays the tournament, for
+  repairs.
+"""
+import logging
+from typing import List
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Game, Tournament, TournamentGame, TournamentParticipant
+
+logger = logging.getLogger(__name__)
+
+STANDINGS_FIELDS = [
+    "score", "wins", "draws", "losses", "streak", "max_streak", "color_balance", "recent_colors", "opponents",
+]
+
+# Arena (Lichess) scoring: 2 per win, 1 per draw, doubled from the third win in a row.
+ARENA_WIN_POINTS = 2
+ARENA_DRAW_POINTS = 1
+ARENA_STREAK_BONUS = 2
+ARENA_STREAK_FROM = 3
+SWISS_BYE_POINTS = 1.0
+
+
+def _apply_game(rows, game: Game, arena: bool) -> None:
+    white, black = rows.get(game.white_id), rows.get(game.black_id)
+    if white is not None:
+        white.opponents = list(white.opponents or []) + [game.black_id]
+        white.color_balance += 1
+        white.recent_colors = (white.recent_colors + "w")[-2:]
+    if black is not None:
+        black.opponents = list(black.opponents or []) + [game.white_id]
+        black.color_balance -= 1
+        black.recent_colors = (black.recent_colors + "b")[-2:]
+
+    if game.result == Game.RESULT_WHITE:
+        outcomes = ((white, "win"), (black, "loss"))
+    elif game.result == Game.RESULT_BLACK:
+        outcomes = ((white, "loss"), (black, "win"))
+    elif game.result == Game.RESULT_DRAW:
+        outcomes = ((white, "draw"), (black, "draw"))
+    else:
+        return
+
+    for row, outcome in outcomes:
+        if row is None:
+            continue
+        if outcome == "win":
+            row.wins += 1
+            row.streak += 1
+            row.max_streak = max(row.max_streak, row.streak)
+            if arena:
+                row.score += ARENA_WIN_POINTS
+                if row.streak >= ARENA_STREAK_FROM:
+                    row.score += ARENA_STREAK_BONUS
+            else:
+                row.score += 1.0
+        elif outcome == "draw":
+            row.draws += 1
+            row.streak = 0
+            row.score += ARENA_DRAW_POINTS if arena else 0.5
+        else:
+            row.losses += 1
+            row.streak = 0
+
+
+def apply_pending_results(tournament: Tournament) -> int:
+    """Fold finished, not yet applied games into the standings; returns how many."""
+    pending = TournamentGame.objects.filter(
+        tournament_id=tournament.id,
+        standings_applied=False,
+        game__status=Game.STATUS_FINISHED,
+    )
+    if not pending.exists():
+        return 0
+    with transaction.atomic():
+        locked = Tournament.objects.select_for_update().only("id", "type").get(id=tournament.id)
+        entries = list(pending.select_related("game").order_by("game__finished_at", "id"))
+        if not entries:
+            return 0
+        player_ids = {tg.game.white_id for tg in entries} | {tg.game.black_id for tg in entries}
+        rows = {
+            row.user_id: row
+            for row in TournamentParticipant.objects.filter(tournament_id=locked.id, user_id__in=player_ids)
+        }
+        arena = locked.type == Tournament.TYPE_ARENA
+        for tg in entries:
+            _apply_game(rows, tg.game, arena)
+        TournamentParticipant.objects.bulk_update(list(rows.values()), STANDINGS_FIELDS)
+        TournamentGame.objects.filter(id__in=[tg.id for tg in entries]).update(standings_applied=True)
+    return len(entries)
+
+
+def record_bye(tournament: Tournament, user_id: int) -> None:
+    TournamentParticipant.objects.filter(tournament_id=tournament.id, user_id=user_id).update(
+        byes=F("byes") + 1, score=F("score") + SWISS_BYE_POINTS
+    )
+
+
+def participant_standings(tournament: Tournament) -> List[TournamentParticipant]:
+    """Up-to-date participants (with user) in join order."""
+    apply_pending_results(tournament)
+    return list(tournament.participants.select_related("user").order_by("joined_at", "id"))
+
+
+def rebuild_standings(tournament: Tournament) -> int:
+    """Reset the aggregates and re-apply every finished game of ``tournament``."""
+    with transaction.atomic():
+        Tournament.objects.select_for_update().only("id").get(id=tournament.id)
+        # Byes are not games; their points are kept.
+        TournamentParticipant.objects.filter(tournament_id=tournament.id).update(
+            score=F("byes") * SWISS_BYE_POINTS,
+            wins=0,
+            draws=0,
+            losses=0,
+            streak=0,
+            max_streak=0,
+            color_balance=0,
+            recent_colors="",
+            opponents=[],
+        )
+        TournamentGame.objects.filter(tournament_id=tournament.id).update(standings_applied=False)
+        applied = apply_pending_results(tournament)
+    logger.info("Rebuilt standings of tournament %s from %d game(s)", tournament.id, applied)
+    return applied
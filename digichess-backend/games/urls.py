@@ -23,6 +23,7 @@ from .views import (
 from .views_analysis import (
     GameFullAnalysisView,
     GameAnalysisRequestView,
+    EngineStatusView,
     OpeningExplorerView,
     TablebaseView,
 )
@@ -42,7 +43,7 @@ from .views_tournament import (
 from .views_matchmaking import EnqueueView, CancelQueueView, QueueStatusView
 from .views_public_clock import LiveClockView
 from .views_prediction import PredictionCreateView
-from .views_events import GameEventsView
+from .views_events import GameEventStreamView, GameEventsView
 from .views_leaderboard import RatingLeaderboardView, DigiQuizLeaderboardView
 from .views_bot import BotListView, CreateBotGameView
 from .views_puzzle import DailyPuzzleView, PuzzleView, NextPuzzleView, PuzzleBatchView
@@ -83,6 +84,7 @@ urlpatterns = [
     path("<int:pk>/analysis/request/", GameAnalysisRequestView.as_view(), name="game-analysis-request"),
     path("opening-explorer/", OpeningExplorerView.as_view(), name="opening-explorer"),
     path("tablebase/", TablebaseView.as_view(), name="tablebase"),
+    path("engines/status/", EngineStatusView.as_view(), name="engine-status"),
     path("<int:pk>/spectate/", GameSpectateView.as_view(), name="game-spectate"),
     path("<int:pk>/offer-draw/", GameDrawOfferView.as_view(), name="game-offer-draw"),
     path("<int:pk>/respond-draw/", GameDrawRespondView.as_view(), name="game-respond-draw"),
@@ -126,6 +128,7 @@ urlpatterns = [
     path("bots/", BotListView.as_view(), name="bots-list"),
     path("bots/create-game/", CreateBotGameView.as_view(), name="bot-create-game"),
     path("<int:pk>/events/", GameEventsView.as_view(), name="game-events"),
+    path("<int:pk>/events/stream/", GameEventStreamView.as_view(), name="game-events-stream"),
     path("puzzles/daily/", DailyPuzzleView.as_view(), name="puzzle-daily"),
     path("puzzles/<str:puzzle_id>/", PuzzleView.as_view(), name="puzzle-detail"),
     path("puzzles/next/", NextPuzzleView.as_view(), name="puzzle-next"),
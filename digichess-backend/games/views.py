@@ -26,7 +26,12 @@ from .game_core import (
     is_insufficient_material,
     append_game_event,
 )
-from .stockfish_utils import ensure_stockfish_works, get_stockfish_path
+from .engine_pool import stockfish_engine
+from .engine_registry import verified_stockfish_path
+from .bot_moves import schedule_bot_move
+from .move_executor import game_state_payload
+from .rating_settlement import SCORED_RESULTS, queue_settlement
+from .game_state_codec import encode_game
 
 
 class GameListCreateView(APIView):
@@ -71,14 +76,7 @@ class GameMoveView(APIView):
             channel_layer = get_channel_layer()
             if not channel_layer:
                 return
-            payload = {
-                "type": "gameState",
-                "game_id": game.id,
-                **state,
-                "legal_moves": legal_moves,
-            }
-            if legal_moves_uci:
-                payload["legal_moves_uci"] = legal_moves_uci
+            payload = game_state_payload(game, state, legal_moves, legal_moves_uci)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {"type": "game.event", "payload": payload},
@@ -94,7 +92,7 @@ class GameMoveView(APIView):
             channel_layer = get_channel_layer()
             if not channel_layer:
                 return
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -165,63 +163,6 @@ class GameMoveView(APIView):
             threading.Thread(target=_finish_tasks, daemon=True).start()
         return result
 
-    def _make_bot_move(self, game: Game, bot_player):
-        """Make a move for a bot player synchronously using the core."""
-        from games.bot_utils import get_bot_move_with_error
-
-        game.refresh_from_db()
-        if game.status != Game.STATUS_ACTIVE:
-            return
-
-        board = self._load_board(game)
-        current_player = game.white if board.turn == chess.WHITE else game.black
-        if current_player != bot_player or not bot_player.is_bot:
-            return
-
-        rating_field_map = {
-            Game.TIME_BULLET: "rating_bullet",
-            Game.TIME_BLITZ: "rating_blitz",
-            Game.TIME_RAPID: "rating_rapid",
-            Game.TIME_CLASSICAL: "rating_classical",
-        }
-        rating_field = rating_field_map.get(game.time_control, "rating_blitz")
-        bot_rating = getattr(bot_player, rating_field, 800)
-        bot_engine = getattr(bot_player, 'bot_engine', None) or 'maia'
-
-        move_list = (game.moves or "").strip().split()
-        ply_count = len(move_list)
-
-        try:
-            bot_move = get_bot_move_with_error(
-                board,
-                bot_rating,
-                time_control=game.time_control,
-                ply_count=ply_count,
-                engine=bot_engine,
-            )
-            move_san = board.san(bot_move)
-        except Exception as e:
-            import sys
-            print(f"[bot_move] Error getting bot move: {e}", file=sys.stderr)
-            return
-
-        result = self._apply_and_broadcast(game.id, bot_player, move_san)
-        if not result.ok or not result.game:
-            return
-
-        if result.game.status == Game.STATUS_ACTIVE:
-            try:
-                next_board = chess.Board(result.game.current_fen or chess.STARTING_FEN)
-            except Exception:
-                next_board = chess.Board()
-            next_player = (
-                result.game.white if next_board.turn == chess.WHITE else result.game.black
-            )
-            if next_player and next_player.is_bot:
-                import time
-                time.sleep(0.1)
-                self._make_bot_move(result.game, next_player)
-
     def _load_board(self, game: Game) -> chess.Board:
         try:
             return chess.Board(game.current_fen or chess.STARTING_FEN)
@@ -244,21 +185,8 @@ class GameMoveView(APIView):
             return Response({"detail": result.error or "Illegal move."}, status=status.HTTP_400_BAD_REQUEST)
 
         data = GameSerializer(result.game).data if result.game else {}
-
-        if result.game and result.game.status == Game.STATUS_ACTIVE:
-            try:
-                board = chess.Board(result.game.current_fen or chess.STARTING_FEN)
-            except Exception:
-                board = chess.Board()
-            next_player = (
-                result.game.white if board.turn == chess.WHITE else result.game.black
-            )
-            if next_player and next_player.is_bot:
-                try:
-                    self._make_bot_move(result.game, next_player)
-                except Exception as e:
-                    import sys
-                    print(f"[bot_move] Error making bot move synchronously: {e}", file=sys.stderr)
+        if result.game and not result.finished:
+            schedule_bot_move(result.game)
 
         return Response(data)
 
@@ -310,140 +238,10 @@ class FinishGameView(APIView):
         pass
 
     def update_ratings(self, game: Game, result: str):
-        import sys
-        
-        # Only update ratings for rated games
-        if not game.rated:
-            print(f"[rating] Game {game.id} is not rated, skipping rating update", file=sys.stderr)
-            return
-        
-        # Check if game has valid players
-        if not game.white or not game.black:
-            print(f"[rating] Game {game.id} missing players (white={game.white}, black={game.black}), skipping rating update", file=sys.stderr)
-            return
-        
-        # Check if result is valid
-        if result not in {Game.RESULT_WHITE, Game.RESULT_BLACK, Game.RESULT_DRAW}:
-            print(f"[rating] Game {game.id} has invalid result: {result}, skipping rating update", file=sys.stderr)
+        """Settle ratings for a finished game; see games.rating_settlement."""
+        if not game.rated or result not in SCORED_RESULTS:
             return
-        
-        print(f"[rating] Updating ratings for game {game.id}, result: {result}, time_control: {game.time_control}, white: {game.white.username or game.white.id}, black: {game.black.username or game.black.id}", file=sys.stderr)
-        
-        # Simplified Glicko-2 (single update step)
-        def glicko2_update(ra, rd, vol, rb, rdb, score):
-            # Convert to Glicko scale
-            q = 0.0057565
-            def g(rd):
-                return 1 / ((1 + (3 * q**2 * rd**2) / (3.14159**2)) ** 0.5)
-            def E(ra, rb, rdb):
-                return 1 / (1 + 10 ** (-g(rdb) * (ra - rb) / 400))
-            ea = E(ra, rb, rdb)
-            d2 = 1 / (q**2 * g(rdb)**2 * ea * (1 - ea))
-            new_rd = min(350, (rd**-2 + d2**-1) ** -0.5)
-            new_r = ra + q / ((1 / new_rd**2)) * g(rdb) * (score - ea)
-            return round(new_r), round(new_rd), vol  # keep vol unchanged for simplicity
-
-        control_map = {
-            Game.TIME_BULLET: ("rating_bullet", "rating_bullet_rd", "rating_bullet_vol"),
-            Game.TIME_BLITZ: ("rating_blitz", "rating_blitz_rd", "rating_blitz_vol"),
-            Game.TIME_RAPID: ("rating_rapid", "rating_rapid_rd", "rating_rapid_vol"),
-            Game.TIME_CLASSICAL: ("rating_classical", "rating_classical_rd", "rating_classical_vol"),
-        }
-        fields = control_map.get(game.time_control)
-        if not fields:
-            # Time control not in map (e.g., TIME_CUSTOM), skip rating update
-            import sys
-            print(f"[rating] Game {game.id} has unsupported time_control: {game.time_control}, skipping rating update", file=sys.stderr)
-            return
-        
-        r_field, rd_field, vol_field = fields
-        mode_map = {
-            Game.TIME_BULLET: "bullet",
-            Game.TIME_BLITZ: "blitz",
-            Game.TIME_RAPID: "rapid",
-            Game.TIME_CLASSICAL: "classical",
-        }
-        mode_key = mode_map.get(game.time_control)
-        snapshot_time = game.finished_at or timezone.now()
-        snapshot_date = timezone.localdate(snapshot_time)
-        
-        # Refresh users from database to get latest ratings
-        game.white.refresh_from_db()
-        game.black.refresh_from_db()
-        
-        white_rating = getattr(game.white, r_field, 800)
-        black_rating = getattr(game.black, r_field, 800)
-        white_rd = getattr(game.white, rd_field, 350.0)
-        black_rd = getattr(game.black, rd_field, 350.0)
-        white_vol = getattr(game.white, vol_field, 0.06)
-        black_vol = getattr(game.black, vol_field, 0.06)
-        
-        if result == Game.RESULT_WHITE:
-            white_score, black_score = 1, 0
-        elif result == Game.RESULT_BLACK:
-            white_score, black_score = 0, 1
-        else:
-            white_score = black_score = 0.5
-
-        new_w_r, new_w_rd, new_w_vol = glicko2_update(
-            white_rating, white_rd, white_vol, black_rating, black_rd, white_score
-        )
-        new_b_r, new_b_rd, new_b_vol = glicko2_update(
-            black_rating, black_rd, black_vol, white_rating, white_rd, black_score
-        )
-        white_delta = new_w_r - white_rating
-        black_delta = new_b_r - black_rating
-        
-        # Update and save white player ratings
-        try:
-            setattr(game.white, r_field, new_w_r)
-            setattr(game.white, rd_field, new_w_rd)
-            setattr(game.white, vol_field, new_w_vol)
-            game.white.save(update_fields=[r_field, rd_field, vol_field])
-            print(f"[rating] Successfully updated white player ({game.white.username or game.white.id}) ratings: {white_rating} -> {new_w_r}", file=sys.stderr)
-            if mode_key:
-                from accounts.models_rating_history import RatingHistory
-                RatingHistory.objects.get_or_create(
-                    user_id=game.white.id,
-                    mode=mode_key,
-                    recorded_at=snapshot_time,
-                    source="game",
-                    defaults={"rating": new_w_r, "date": snapshot_date},
-                )
-        except Exception as e:
-            print(f"[rating] Error updating white player ratings: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-        
-        # Update and save black player ratings
-        try:
-            setattr(game.black, r_field, new_b_r)
-            setattr(game.black, rd_field, new_b_rd)
-            setattr(game.black, vol_field, new_b_vol)
-            game.black.save(update_fields=[r_field, rd_field, vol_field])
-            print(f"[rating] Successfully updated black player ({game.black.username or game.black.id}) ratings: {black_rating} -> {new_b_r}", file=sys.stderr)
-            if mode_key:
-                from accounts.models_rating_history import RatingHistory
-                RatingHistory.objects.get_or_create(
-                    user_id=game.black.id,
-                    mode=mode_key,
-                    recorded_at=snapshot_time,
-                    source="game",
-                    defaults={"rating": new_b_r, "date": snapshot_date},
-                )
-        except Exception as e:
-            print(f"[rating] Error updating black player ratings: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-
-        try:
-            game.white_rating_delta = white_delta
-            game.black_rating_delta = black_delta
-            game.save(update_fields=["white_rating_delta", "black_rating_delta"])
-        except Exception:
-            pass
-        
-        print(f"[rating] Rating update complete for game {game.id}", file=sys.stderr)
+        queue_settlement([game])
 
 
 class AcceptGameView(APIView):
@@ -487,7 +285,7 @@ class AcceptGameView(APIView):
                 try:
                     channel_layer = get_channel_layer()
                     if channel_layer:
-                        game_data = GameSerializer(game).data
+                        game_data = encode_game(game)
                         async_to_sync(channel_layer.group_send)(
                             f"game_{game.id}",
                             {
@@ -610,7 +408,7 @@ class AbortGameView(APIView):
                 pass
             channel_layer = get_channel_layer()
             if channel_layer:
-                game_data = GameSerializer(game).data
+                game_data = encode_game(game)
                 async_to_sync(channel_layer.group_send)(
                     f"game_{game.id}",
                     {
@@ -682,7 +480,7 @@ class RejectGameView(APIView):
         # Broadcast rejection to game group
         channel_layer = get_channel_layer()
         if channel_layer:
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -755,38 +553,33 @@ class GameAnalysisView(APIView):
 
         # Use local Stockfish only (no Lichess API).
         if not engine_info:
-            engine_path = get_stockfish_path()
+            works, message, engine_path = verified_stockfish_path()
             
-            if not engine_path:
-                engine_info = {"error": "STOCKFISH_PATH not configured and repo Stockfish not available."}
+            if not works:
+                engine_info = {"error": message, "engine_path": engine_path}
             else:
-                works, message, engine_path = ensure_stockfish_works(engine_path)
-                
-                if not works:
-                    engine_info = {"error": message, "engine_path": engine_path}
-                else:
-                    try:
-                        with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
-                            limit = chess.engine.Limit(time=0.2)
-                            result = engine.analyse(board, limit)
-                            if result:
-                                score = result.get("score")
-                                pv = result.get("pv", [])
-                                engine_info = {
-                                    "best_move": board.san(pv[0]) if pv else None,
-                                    "score": score.pov(board.turn).score(mate_score=100000) if score else None,
-                                    "mate": score.pov(board.turn).mate() if score else None,
-                                    "depth": result.get("depth", 0),
-                                }
-                                engine_source = "local_stockfish"
-                            else:
-                                engine_info = {"error": "Stockfish returned no analysis result"}
-                    except Exception as exc:
-                        engine_info = {
-                            "error": str(exc),
-                            "error_type": type(exc).__name__,
-                            "engine_path": engine_path
-                        }
+                try:
+                    with stockfish_engine(engine_path) as engine:
+                        limit = chess.engine.Limit(time=0.2)
+                        result = engine.analyse(board, limit)
+                        if result:
+                            score = result.get("score")
+                            pv = result.get("pv", [])
+                            engine_info = {
+                                "best_move": board.san(pv[0]) if pv else None,
+                                "score": score.pov(board.turn).score(mate_score=100000) if score else None,
+                                "mate": score.pov(board.turn).mate() if score else None,
+                                "depth": result.get("depth", 0),
+                            }
+                            engine_source = "local_stockfish"
+                        else:
+                            engine_info = {"error": "Stockfish returned no analysis result"}
+                except Exception as exc:
+                    engine_info = {
+                        "error": str(exc),
+                        "error_type": type(exc).__name__,
+                        "engine_path": engine_path
+                    }
         
         if engine_source:
             engine_info["source"] = engine_source
@@ -854,7 +647,7 @@ class GameDrawRespondView(APIView):
                 FinishGameView().update_ratings(game, result)
             # Broadcast game_finished event for draw
             channel_layer = get_channel_layer()
-            game_data = GameSerializer(game).data
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
@@ -910,7 +703,7 @@ class GameResignView(APIView):
             FinishGameView().update_ratings(game, result)
         
         channel_layer = get_channel_layer()
-        game_data = GameSerializer(game).data
+        game_data = encode_game(game)
         async_to_sync(channel_layer.group_send)(
             f"game_{game.id}",
             {"type": "game.event", "payload": {"type": "resign", "game_id": game.id, "by": request.user.id}},
@@ -1166,13 +959,7 @@ class GameRematchView(APIView):
         game.start()
         
         # If bot is white, make first move automatically
-        if game.white.is_bot:
-            try:
-                mv = GameMoveView()
-                mv._make_bot_move(game, game.white)
-            except Exception as e:
-                import sys
-                print(f"[rematch] Error making initial bot move: {e}", file=sys.stderr)
+        schedule_bot_move(game)
 
         game_data = GameSerializer(game).data
         payload = {
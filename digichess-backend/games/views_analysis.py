@@ -11,9 +11,11 @@ import logging
 
 from .models import Game, GameAnalysis
 from .serializers import GameSerializer
-from .stockfish_utils import ensure_stockfish_works, get_stockfish_path
+from .engine_pool import engine_pool, stockfish_engine
+from .engine_registry import engine_registry
 from .lichess_api import analyze_position_with_lichess, get_cloud_evaluation, get_opening_explorer, get_tablebase
-from .analysis_service import run_full_analysis
+from .analysis_jobs import analysis_is_complete, enqueue_analysis, mark_seen, progress_snapshot
+from .permissions import IsSuperAdmin
 
 logger = logging.getLogger(__name__)
 
@@ -46,25 +48,19 @@ def _serialize_analysis_record(record: GameAnalysis, include_analysis: bool = Tr
     }
 
 
-def _analysis_is_complete(analysis: dict | None) -> bool:
-    if not analysis:
-        return False
-    summary = analysis.get("summary") or {}
-    if summary.get("partial"):
-        return False
-    total_moves = summary.get("total_moves")
-    moves = analysis.get("moves") or []
-    if total_moves is None:
-        return True
-    return total_moves == 0 or len(moves) >= total_moves
-
-
 class GameFullAnalysisView(APIView):
     """Full game analysis with Stockfish or Lichess API"""
     permission_classes = [permissions.AllowAny]
 
     def post(self, request, pk: int):
-        """Request full game analysis"""
+        """
+        Request full game analysis.
+
+        Never runs the engine here: the analysis is queued (or an existing job
+        for the game is joined) and 202 is returned with the job record;
+        progress and each finished pass stream on ws/analysis/<pk>/. A finished
+        analysis comes back with 200 straight away.
+        """
         game = get_object_or_404(Game, id=pk)
         
         # Check if game is finished
@@ -74,76 +70,15 @@ class GameFullAnalysisView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        force = _parse_bool(request.data.get("force"), default=False)
-
-        analysis_record, created = GameAnalysis.objects.get_or_create(
-            game=game,
-            defaults={"status": GameAnalysis.STATUS_QUEUED},
-        )
-
-        if (
-            analysis_record.status == GameAnalysis.STATUS_COMPLETED
-            and analysis_record.analysis
-            and _analysis_is_complete(analysis_record.analysis)
-        ):
-            return Response(_serialize_analysis_record(analysis_record))
-
-        now = timezone.now()
-        analysis_record.status = GameAnalysis.STATUS_RUNNING
-        analysis_record.requested_at = now
-        analysis_record.started_at = now
-        analysis_record.completed_at = None
-        analysis_record.error = ""
-        analysis_record.source = ""
-        analysis_record.analysis = None
-        analysis_record.quick_eval = None
-        analysis_record.save(
-            update_fields=[
-                "status",
-                "requested_at",
-                "started_at",
-                "completed_at",
-                "error",
-                "source",
-                "analysis",
-                "quick_eval",
-                "updated_at",
-            ]
-        )
-
-        try:
-            analysis_data, source, _engine_path = run_full_analysis(
-                game,
-                prefer_lichess=False,
-                time_per_move=0.1,
-                depth=12,
-                max_moves=None,
-                allow_lichess_fallback=False,
-            )
-            if not _analysis_is_complete(analysis_data):
-                raise Exception("Analysis incomplete: not all moves were analyzed.")
-            analysis_record.analysis = analysis_data
-            analysis_record.source = source
-            analysis_record.status = GameAnalysis.STATUS_COMPLETED
-            analysis_record.completed_at = timezone.now()
-            analysis_record.error = ""
-            analysis_record.save(
-                update_fields=[
-                    "analysis",
-                    "source",
-                    "status",
-                    "completed_at",
-                    "error",
-                    "updated_at",
-                ]
-            )
+        analysis_record, _enqueued = enqueue_analysis(game, request.user)
+        if analysis_record.status == GameAnalysis.STATUS_COMPLETED:
             return Response(_serialize_analysis_record(analysis_record))
-        except Exception as exc:
-            analysis_record.status = GameAnalysis.STATUS_FAILED
-            analysis_record.error = str(exc)
-            analysis_record.completed_at = timezone.now()
-            analysis_record.save(update_fields=["status", "error", "completed_at", "updated_at"])
+        if analysis_record.status == GameAnalysis.STATUS_FAILED:
             return Response(_serialize_analysis_record(analysis_record), status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        # Carries the latest finished pass, if any, while deeper passes run.
+        payload = _serialize_analysis_record(analysis_record)
+        payload["progress"] = progress_snapshot(game.id)
+        return Response(payload, status=status.HTTP_202_ACCEPTED)
 
     def _analyze_with_stockfish(self, game: Game, engine_path: str):
         """Analyze game with local Stockfish"""
@@ -155,7 +90,7 @@ class GameFullAnalysisView(APIView):
             # If no moves, analyze the starting position
             board = chess.Board(game.current_fen or chess.STARTING_FEN)
             try:
-                with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
+                with stockfish_engine(engine_path) as engine:
                     limit = chess.engine.Limit(time=0.5, depth=15)
                     result = engine.analyse(board, limit)
                     score = result.get("score")
@@ -191,7 +126,7 @@ class GameFullAnalysisView(APIView):
         errors = []
         
         try:
-            with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
+            with stockfish_engine(engine_path) as engine:
                 # Analyze each position from the standard starting position.
                 temp_board = chess.Board()
                 
@@ -243,7 +178,7 @@ class GameFullAnalysisView(APIView):
         
         except OSError as e:
             if e.errno == 8:  # Exec format error
-                # This shouldn't happen if ensure_stockfish_works was called, but handle it anyway
+                # The engine registry validated this binary; handle a mismatch anyway
                 raise Exception(
                     f"Stockfish architecture mismatch detected. "
                     f"This should have been auto-fixed. Please check server logs."
@@ -440,7 +375,7 @@ class GameAnalysisRequestView(APIView):
         if (
             analysis_record.status == GameAnalysis.STATUS_COMPLETED
             and analysis_record.analysis
-            and not _analysis_is_complete(analysis_record.analysis)
+            and not analysis_is_complete(analysis_record.analysis)
         ):
             analysis_record.status = GameAnalysis.STATUS_FAILED
             analysis_record.error = "Analysis incomplete. Please run analysis again."
@@ -450,16 +385,30 @@ class GameAnalysisRequestView(APIView):
                 update_fields=["status", "error", "completed_at", "analysis", "updated_at"]
             )
 
+        pending = analysis_record.status in (GameAnalysis.STATUS_QUEUED, GameAnalysis.STATUS_RUNNING)
         payload = _serialize_analysis_record(
             analysis_record,
-            include_analysis=analysis_record.status == GameAnalysis.STATUS_COMPLETED,
+            include_analysis=pending or analysis_record.status == GameAnalysis.STATUS_COMPLETED,
         )
         payload["can_analyze"] = game.status == Game.STATUS_FINISHED
+        if pending:
+            # A poll counts as watching: refinement passes keep going.
+            mark_seen(game.id)
+            payload["progress"] = progress_snapshot(game.id)
         return Response(payload)
 
 
+class EngineStatusView(APIView):
+    """
+    GET this process's engine registry and pool state (super-admin).
 
+    ?refresh=1 drops the cached discovery and validates the default Stockfish again.
+    """
 
+    permission_classes = [IsSuperAdmin]
 
-
-
+    def get(self, request):
+        if _parse_bool(request.query_params.get("refresh")):
+            engine_registry.forget()
+            engine_registry.warm()
+        return Response({**engine_registry.status(), "pool": engine_pool.stats()})
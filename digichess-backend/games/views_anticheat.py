@@ -94,22 +94,96 @@ class CheatReportDetailView(APIView):
         return Response(CheatReportSerializer(report).data)
 
 
+def _report_color(report: CheatReport) -> str:
+    if report.game.white_id == report.reported_user_id:
+        return "white"
+    if report.game.black_id == report.reported_user_id:
+        return "black"
+    raise ValueError("Target user is not a player in this game.")
+
+
+def _save_cheat_analysis(report: CheatReport, result: dict) -> CheatAnalysis:
+    irwin_score = None
+    try:
+        from .irwin_model import irwin
+        if irwin.is_trained() and result.get("tensor_data"):
+            irwin_score = irwin.predict(result["tensor_data"])
+    except Exception as exc:
+        logger.warning("Irwin prediction skipped: %s", exc)
+
+    analysis, _created = CheatAnalysis.objects.update_or_create(
+        report=report,
+        defaults={
+            "game": report.game,
+            "analyzed_user": report.reported_user,
+            "t1_pct": result["t1_pct"],
+            "t2_pct": result["t2_pct"],
+            "t3_pct": result["t3_pct"],
+            "t4_pct": result["t4_pct"],
+            "t5_pct": result["t5_pct"],
+            "avg_centipawn_loss": result["avg_centipawn_loss"],
+            "avg_winning_chances_loss": result["avg_winning_chances_loss"],
+            "best_move_streak": result["best_move_streak"],
+            "accuracy_score": result["accuracy_score"],
+            "position_stats": result["position_stats"],
+            "move_classifications": result["move_classifications"],
+            "forced_moves_excluded": result["forced_moves_excluded"],
+            "book_moves_excluded": result["book_moves_excluded"],
+            "cp_loss_distribution": result["cp_loss_distribution"],
+            "suspicious_moves": result["suspicious_moves"],
+            "irwin_score": irwin_score,
+            "verdict": result["verdict"],
+            "confidence": result["confidence"],
+            "total_moves_analyzed": result["total_moves_analyzed"],
+            "full_analysis": result.get("tensor_data"),
+        },
+    )
+    return analysis
+
+
 class RunCheatAnalysisView(APIView):
-    """POST trigger analysis on a report (super-admin)."""
+    """
+    POST trigger analysis on a report (super-admin).
+
+    Only the reported player's side is analysed, unless the game also has
+    open reports against the other player: then both are analysed in one
+    engine pass. Every open report on the game gets its analysis refreshed.
+    """
 
     permission_classes = [IsSuperAdmin]
 
     def post(self, request, pk):
-        report = get_object_or_404(CheatReport, pk=pk)
+        report = get_object_or_404(
+            CheatReport.objects.select_related("game", "game__white", "game__black", "reported_user"),
+            pk=pk,
+        )
 
         if report.status == CheatReport.STATUS_PENDING:
             report.status = CheatReport.STATUS_UNDER_REVIEW
             report.save(update_fields=["status"])
 
-        from .cheat_detection import run_cheat_analysis
+        from .cheat_detection import run_cheat_analysis, run_dual_cheat_analysis
 
+        open_reports = list(
+            CheatReport.objects.filter(
+                game=report.game,
+                status__in=(CheatReport.STATUS_PENDING, CheatReport.STATUS_UNDER_REVIEW),
+            )
+            .exclude(pk=report.pk)
+            .select_related("game", "reported_user")
+        )
         try:
-            result = run_cheat_analysis(report.game, report.reported_user)
+            color = _report_color(report)
+            other_colors = set()
+            for other in open_reports:
+                try:
+                    other_colors.add(_report_color(other))
+                except ValueError:
+                    continue
+            if other_colors - {color}:
+                results = run_dual_cheat_analysis(report.game)
+            else:
+                results = {color: run_cheat_analysis(report.game, report.reported_user)}
         except Exception as exc:
             logger.error("Cheat analysis failed for report %s: %s", pk, exc)
             return Response(
@@ -117,41 +191,13 @@ class RunCheatAnalysisView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        irwin_score = None
-        try:
-            from .irwin_model import irwin
-            if irwin.is_trained() and result.get("tensor_data"):
-                irwin_score = irwin.predict(result["tensor_data"])
-        except Exception as exc:
-            logger.warning("Irwin prediction skipped: %s", exc)
-
-        analysis, _created = CheatAnalysis.objects.update_or_create(
-            report=report,
-            defaults={
-                "game": report.game,
-                "analyzed_user": report.reported_user,
-                "t1_pct": result["t1_pct"],
-                "t2_pct": result["t2_pct"],
-                "t3_pct": result["t3_pct"],
-                "t4_pct": result["t4_pct"],
-                "t5_pct": result["t5_pct"],
-                "avg_centipawn_loss": result["avg_centipawn_loss"],
-                "avg_winning_chances_loss": result["avg_winning_chances_loss"],
-                "best_move_streak": result["best_move_streak"],
-                "accuracy_score": result["accuracy_score"],
-                "position_stats": result["position_stats"],
-                "move_classifications": result["move_classifications"],
-                "forced_moves_excluded": result["forced_moves_excluded"],
-                "book_moves_excluded": result["book_moves_excluded"],
-                "cp_loss_distribution": result["cp_loss_distribution"],
-                "suspicious_moves": result["suspicious_moves"],
-                "irwin_score": irwin_score,
-                "verdict": result["verdict"],
-                "confidence": result["confidence"],
-                "total_moves_analyzed": result["total_moves_analyzed"],
-                "full_analysis": result.get("tensor_data"),
-            },
-        )
+        analysis = _save_cheat_analysis(report, results[color])
+
+        for other in open_reports:
+            try:
+                _save_cheat_analysis(other, results[_report_color(other)])
+            except ValueError:
+                continue
 
         return Response(CheatAnalysisSerializer(analysis).data)
 
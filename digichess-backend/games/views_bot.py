@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied
 from accounts.models import User
+from .bot_moves import schedule_bot_move
 from .models import Game
 from .serializers import GameSerializer
 
@@ -140,14 +141,7 @@ class CreateBotGameView(APIView):
         game.start()
         
         # If bot is white, make first move automatically
-        if white.is_bot:
-            from games.views import GameMoveView
-            try:
-                mv = GameMoveView()
-                mv._make_bot_move(game, white)
-            except Exception as e:
-                import sys
-                print(f"[bot_game] Error making initial bot move: {e}", file=sys.stderr)
-        
+        schedule_bot_move(game)
+
         return Response(GameSerializer(game).data, status=status.HTTP_201_CREATED)
 
@@ -1,59 +1,176 @@
+import asyncio
+import json
+import time
+
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
 
-from utils.redis_client import get_redis
+from utils.redis_client import get_async_redis, get_redis
+from .event_stream import (
+    FINISHED_STATUSES,
+    LONGPOLL_MAX_SECONDS,
+    SSE_KEEPALIVE_SECONDS,
+    SSE_MAX_SECONDS,
+    aread_from_cursor,
+    aread_since_seq,
+    atail_id,
+    event_hub,
+    has_gap,
+    parse_stream_id,
+    read_from_cursor,
+    read_since_seq,
+    seq_key,
+    stream_key,
+    tail_id,
+)
+from .game_state_codec import encode_game
 from .models import Game
-from .serializers import GameSerializer
+
+
+def _int_param(raw, default: int = 0) -> int:
+    try:
+        return max(0, int(raw))
+    except (TypeError, ValueError):
+        return default
+
+
+def _full_snapshot(pk: int, seq: int) -> dict:
+    game = Game.objects.select_related("white", "black", "creator").get(id=pk)
+    return {"type": "gameFull", "game": encode_game(game), "seq": seq}
 
 
 class GameEventsView(APIView):
+    """
+    Events after ``since`` (seq) or ``cursor`` (stream id) for clients without a socket.
+
+    With ``wait=<seconds>`` the request is a long poll: when nothing is new it
+    is parked on the process EventHub until an entry arrives or the wait runs
+    out. The game row is only read when Redis does not know the game (404
+    check) or when the stream was trimmed past the client and a gameFull
+    snapshot has to stand in for the missing entries. Responses carry
+    ``cursor``; sending it back (with ``since``) resumes exactly where the
+    previous response ended.
+    """
+
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, pk: int):
-        game = get_object_or_404(Game, id=pk)
-        since_raw = request.query_params.get("since") or "0"
-        try:
-            since = int(since_raw)
-        except ValueError:
-            since = 0
+        since = _int_param(request.query_params.get("since"))
+        cursor = request.query_params.get("cursor")
+        cursor = cursor if parse_stream_id(cursor) else None
+        wait = min(float(_int_param(request.query_params.get("wait"))), LONGPOLL_MAX_SECONDS)
 
-        events = []
-        last_seq = since
-        r = None
         try:
             r = get_redis()
         except Exception:
             r = None
+        if not r:
+            if not Game.objects.filter(id=pk).exists():
+                raise Http404
+            return Response({"events": [], "last_seq": since, "cursor": cursor})
+
+        try:
+            last_seq = int(r.get(seq_key(pk)) or 0)
+            if not last_seq and not Game.objects.filter(id=pk).exists():
+                raise Http404
+            if cursor:
+                events = read_from_cursor(r, pk, cursor)
+            else:
+                events = read_since_seq(r, pk, since, last_seq)
+            # Seq-only client whose entries were trimmed: nothing to wait for.
+            trimmed = not events and not cursor and last_seq > since
+            if not events and not trimmed and wait > 0:
+                cursor = cursor or tail_id(r, pk)
+                if event_hub.wait(pk, cursor, wait):
+                    events = read_from_cursor(r, pk, cursor)
+        except Http404:
+            raise
+        except Exception:
+            return Response({"events": [], "last_seq": since, "cursor": cursor})
 
-        if r:
+        events = [event for event in events if not since or event["seq"] > since]
+        if events:
+            cursor = events[-1]["event_id"]
+            last_seq = max(last_seq, events[-1]["seq"])
+        if trimmed or has_gap(events, since):
             try:
-                last_seq = int(r.get(f"game:seq:{game.id}") or 0)
-                if last_seq > since:
-                    entries = r.xrevrange(f"game:events:{game.id}", count=200)
-                    for _, fields in reversed(entries):
-                        try:
-                            seq = int(fields.get("seq") or 0)
-                        except Exception:
-                            seq = 0
-                        if seq <= since:
-                            continue
-                        event = {}
-                        for key, value in fields.items():
-                            if key in {"white_time_left", "black_time_left", "move_count", "seq"}:
-                                try:
-                                    event[key] = int(value)
-                                except Exception:
-                                    event[key] = value
-                            else:
-                                event[key] = value
-                        event["seq"] = seq or event.get("seq", 0)
-                        events.append(event)
-            except Exception:
-                events = []
+                events = [_full_snapshot(pk, last_seq)]
+            except Game.DoesNotExist:
+                raise Http404
+        return Response({"events": events, "last_seq": max(last_seq, since), "cursor": cursor})
+
 
-        if not events and last_seq > since:
-            events = [{"type": "gameFull", "game": GameSerializer(game).data, "seq": last_seq}]
+def _sse(event: dict) -> str:
+    return f"id: {event['event_id']}\ndata: {json.dumps(event)}\n\n"
 
-        return Response({"events": events, "last_seq": last_seq})
+
+class GameEventStreamView(View):
+    """
+    Server-sent events for game:events:{id}.
+
+    Each stream entry is sent as one message whose ``id`` is the stream id, so
+    a reconnecting EventSource resumes through Last-Event-ID (or ?cursor=)
+    without any replay. ``?since=<seq>`` serves clients that only know seq.
+    The response ends once the game is over or after EVENTS_SSE_MAX_SECONDS;
+    the browser then reconnects from the last id it saw. Waiting happens on
+    the EventHub, so an idle stream holds neither a thread nor a Redis
+    connection.
+    """
+
+    async def get(self, request, pk: int):
+        r = await get_async_redis()
+        if not r:
+            return JsonResponse({"detail": "Live events are unavailable; poll /events/ instead."}, status=503)
+        try:
+            known = await r.exists(seq_key(pk), stream_key(pk))
+        except Exception:
+            return JsonResponse({"detail": "Live events are unavailable; poll /events/ instead."}, status=503)
+        if not known and not await Game.objects.filter(id=pk).aexists():
+            raise Http404
+
+        cursor = request.headers.get("Last-Event-ID") or request.GET.get("cursor")
+        cursor = cursor if parse_stream_id(cursor) else None
+        since = _int_param(request.GET.get("since"))
+
+        response = StreamingHttpResponse(self._stream(pk, cursor, since), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _stream(self, pk: int, cursor, since: int):
+        yield "retry: 2000\n\n"
+        # Fetched again here: the server may iterate the body on another event loop.
+        r = await get_async_redis()
+        if not r:
+            return
+        try:
+            if cursor:
+                events = await aread_from_cursor(r, pk, cursor)
+            else:
+                events = await aread_since_seq(r, pk, since, int(await r.get(seq_key(pk)) or 0)) if since else []
+                cursor = events[-1]["event_id"] if events else await atail_id(r, pk)
+        except Exception:
+            return
+
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while True:
+            for event in events:
+                cursor = event["event_id"]
+                yield _sse(event)
+                if event.get("status") in FINISHED_STATUSES:
+                    return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                moved = await event_hub.await_entries(pk, cursor, min(SSE_KEEPALIVE_SECONDS, remaining))
+                events = await aread_from_cursor(r, pk, cursor) if moved else []
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return
+            if not moved:
+                yield ": keepalive\n\n"
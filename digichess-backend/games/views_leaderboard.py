@@ -6,23 +6,61 @@ from rest_framework.views import APIView
 
 from accounts.models import User
 from accounts.serializers import UserLookupSerializer
+from utils.redis_client import get_redis
 
+from . import leaderboard
 
-def paginate(queryset, request):
+
+def page_bounds(request):
     try:
         limit = int(request.query_params.get("limit", 10))
     except ValueError:
         limit = 10
     limit = max(1, min(limit, 100))
-    page = int(request.query_params.get("page", 1)) if request.query_params.get("page") else 1
+    try:
+        page = int(request.query_params.get("page", 1)) if request.query_params.get("page") else 1
+    except ValueError:
+        page = 1
     page = max(1, page)
     start = (page - 1) * limit
-    end = start + limit
+    return page, limit, start, start + limit
+
+
+def paginate(queryset, request):
+    page, limit, start, end = page_bounds(request)
     total = queryset.count()
-    return {"results": queryset[start:end], "total": total, "page": page, "limit": limit}
+    return {"results": list(queryset[start:end]), "total": total, "page": page, "limit": limit}
+
+
+def _ranked_page(r, mode, request):
+    """
+    One page of users from the Redis leaderboard, or None to fall back to the database.
+
+    Users that are no longer ranked (deactivated, deleted, turned into bots)
+    are dropped from the set as they are found and the page is read again.
+    """
+    page, limit, start, end = page_bounds(request)
+    for _ in range(3):
+        ranked = leaderboard.page(r, mode, start, end)
+        if ranked is None:
+            return None
+        ids, total = ranked
+        users = User.objects.filter(id__in=ids, is_active=True, is_bot=False).in_bulk()
+        stale = [user_id for user_id in ids if user_id not in users]
+        if not stale:
+            break
+        leaderboard.remove_users(r, stale)
+    return {"results": [users[i] for i in ids if i in users], "total": total, "page": page, "limit": limit}
 
 
 class RatingLeaderboardView(APIView):
+    """
+    GET ?mode=blitz&page=1&limit=10
+
+    Served from the Redis sorted set for the mode when it is available;
+    authenticated users also get their own rank as "me".
+    """
+
     permission_classes = [permissions.AllowAny]
 
     rating_field_map = {
@@ -32,50 +70,84 @@ class RatingLeaderboardView(APIView):
         "classical": ("rating_classical", "rating_classical_rd"),
     }
 
+    def _db_rank(self, user, r_field, rd_field):
+        rating = getattr(user, r_field, 0)
+        rd = getattr(user, rd_field, 0)
+        ahead = User.objects.filter(is_active=True, is_bot=False).filter(
+            Q(**{f"{r_field}__gt": rating})
+            | Q(**{r_field: rating, f"{rd_field}__lt": rd})
+            | Q(**{r_field: rating, rd_field: rd, "id__lt": user.id})
+        )
+        return ahead.count() + 1
+
     def get(self, request):
         mode = request.query_params.get("mode", "blitz")
         fields = self.rating_field_map.get(mode)
         if not fields:
             return Response({"detail": "Invalid mode"}, status=400)
         r_field, rd_field = fields
-        qs = User.objects.filter(is_active=True, is_bot=False).order_by(F(r_field).desc(), F(rd_field).asc(), "username")
-        page = paginate(qs, request)
+        r = get_redis()
+        page = _ranked_page(r, mode, request)
+        if page is None:
+            qs = User.objects.filter(is_active=True, is_bot=False).order_by(
+                F(r_field).desc(), F(rd_field).asc(), "id"
+            )
+            page = paginate(qs, request)
         data = UserLookupSerializer(page["results"], many=True).data
         # include rating in response
-        for item in data:
-            user = qs.get(id=item["id"])
+        for item, user in zip(data, page["results"]):
             item["rating"] = getattr(user, r_field, 0)
-        return Response(
-            {
-                "mode": mode,
-                "total": page["total"],
-                "page": page["page"],
-                "limit": page["limit"],
-                "results": data,
-            }
-        )
+        payload = {
+            "mode": mode,
+            "total": page["total"],
+            "page": page["page"],
+            "limit": page["limit"],
+            "results": data,
+        }
+        user = request.user
+        if user.is_authenticated and leaderboard.is_ranked(user):
+            my_rank = leaderboard.rank(r, mode, user.id)
+            if my_rank is None:
+                my_rank = self._db_rank(user, r_field, rd_field)
+            payload["me"] = {"rank": my_rank, "rating": getattr(user, r_field, 0)}
+        return Response(payload)
 
 
 class DigiQuizLeaderboardView(APIView):
     permission_classes = [permissions.AllowAny]
 
-    def get(self, request):
-        qs = User.objects.filter(is_active=True, is_bot=False).order_by(
-            F("rating_digiquiz").desc(), F("digiquiz_correct").desc(), "username"
+    def _db_rank(self, user):
+        ahead = User.objects.filter(is_active=True, is_bot=False).filter(
+            Q(rating_digiquiz__gt=user.rating_digiquiz)
+            | Q(rating_digiquiz=user.rating_digiquiz, digiquiz_correct__gt=user.digiquiz_correct)
+            | Q(rating_digiquiz=user.rating_digiquiz, digiquiz_correct=user.digiquiz_correct, id__lt=user.id)
         )
-        page = paginate(qs, request)
+        return ahead.count() + 1
+
+    def get(self, request):
+        r = get_redis()
+        page = _ranked_page(r, "digiquiz", request)
+        if page is None:
+            qs = User.objects.filter(is_active=True, is_bot=False).order_by(
+                F("rating_digiquiz").desc(), F("digiquiz_correct").desc(), "id"
+            )
+            page = paginate(qs, request)
         data = UserLookupSerializer(page["results"], many=True).data
-        for item in data:
-            user = qs.get(id=item["id"])
+        for item, user in zip(data, page["results"]):
             item["rating_digiquiz"] = user.rating_digiquiz
             item["digiquiz_correct"] = user.digiquiz_correct
             item["digiquiz_wrong"] = user.digiquiz_wrong
-        return Response(
-            {
-                "mode": "digiquiz",
-                "total": page["total"],
-                "page": page["page"],
-                "limit": page["limit"],
-                "results": data,
-            }
-        )
+        payload = {
+            "mode": "digiquiz",
+            "total": page["total"],
+            "page": page["page"],
+            "limit": page["limit"],
+            "results": data,
+        }
+        user = request.user
+        if user.is_authenticated and leaderboard.is_ranked(user):
+            my_rank = leaderboard.rank(r, "digiquiz", user.id)
+            if my_rank is None:
+                my_rank = self._db_rank(user)
+            payload["me"] = {"rank": my_rank, "rating_digiquiz": user.rating_digiquiz}
+        return Response(payload)
@@ -9,6 +9,7 @@ from rest_framework.views import APIView
 import chess
 
 from .models import Game
+from .legal_moves import legal_moves_for_board
 from .lichess_game_flow import validate_move_fast, get_instant_move_feedback
 
 
@@ -79,8 +80,8 @@ class OptimisticMoveView(APIView):
         temp_board = board.copy()
         temp_board.push(move)
         
-        # Calculate new legal moves
-        new_legal_moves = [temp_board.san(mv) for mv in temp_board.legal_moves]
+        # Legal moves after the move (memoized per position)
+        new_legal_moves = legal_moves_for_board(temp_board)["san"]
         
         return Response({
             "valid": True,
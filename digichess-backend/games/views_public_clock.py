@@ -67,8 +67,8 @@ class LiveClockView(APIView):
                 from games.views import FinishGameView
                 FinishGameView().update_ratings(game, result)
             channel_layer = get_channel_layer()
-            from games.serializers import GameSerializer
-            game_data = GameSerializer(game).data
+            from games.game_state_codec import encode_game
+            game_data = encode_game(game)
             async_to_sync(channel_layer.group_send)(
                 f"game_{game.id}",
                 {
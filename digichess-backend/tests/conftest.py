@@ -5,10 +5,17 @@ from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
+from tests.fake_redis import FakeRedis
 
 _user_counter = itertools.count(1)
 
 
+@pytest.fixture
+def fake_redis():
+    """An empty in-memory Redis (tests/fake_redis.py); patch it in where the code calls get_redis()."""
+    return FakeRedis()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -74,3 +81,25 @@ def create_game(auth_client, create_user):
         return response.data, challenger, opponent
 
     return _create_game
+
+
+@pytest.fixture
+def active_game(create_game, auth_client):
+    """An accepted game; SAN ``moves`` are played through the API, then ``fields`` are saved onto the row."""
+    from games.models import Game
+
+    def _active_game(*moves, **fields):
+        game_data, white, black = create_game(preferred_color="white")
+        clients = [auth_client(white)[0], auth_client(black)[0]]
+        clients[1].post(f"/api/games/{game_data['id']}/accept/")
+        for ply, move in enumerate(moves):
+            response = clients[ply % 2].post(f"/api/games/{game_data['id']}/move/", {"move": move}, format="json")
+            assert response.status_code == 200, response.data
+        game = Game.objects.get(id=game_data["id"])
+        if fields:
+            for name, value in fields.items():
+                setattr(game, name, value)
+            game.save(update_fields=list(fields))
+        return game, white, black
+
+    return _active_game
@@ -0,0 +1,148 @@
+"""
+Local stand-in for the Lichess API (cloud eval, explorer, tablebase); no network needed.
+
+Answers are a deterministic function of the position, like fake_uci_engine.py.
+Each request can be slowed by ``latency`` seconds to stand in for the round
+trip, and tests can queue failures (``fail_next(429)`` / ``fail_next(500)``).
+The server counts requests, distinct client connections and the peak number
+of requests in flight.
+
+In tests:   with FakeLichessServer(latency=0.02) as server: ... server.url
+Standalone: python tests/fake_lichess_server.py [--port 0] [--latency 0.05]
+            prints its API base URL (for LICHESS_API_BASE) and serves until killed.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import chess
+
+
+def _score(fen: str) -> int:
+    return int(hashlib.sha1(fen.encode()).hexdigest()[:4], 16) % 400 - 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        return
+
+    def do_GET(self):
+        server = self.server.fake
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failure = server.failures.pop(0) if server.failures else None
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            if failure:
+                self._send(failure, {"error": "injected"}, {"Retry-After": str(server.retry_after)})
+                return
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            status, body = server.answer(url.path, params)
+            self._send(status, body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeLichessServer:
+    def __init__(self, port: int = 0, latency: float = 0.0, retry_after: float = 1.0):
+        self.latency = latency
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failures: list[int] = []
+        self.missing: set[str] = set()  # EPDs the cloud has no eval for (404)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def fail_next(self, status: int, times: int = 1) -> None:
+        with self.lock:
+            self.failures.extend([status] * times)
+
+    def answer(self, path: str, params: dict) -> tuple[int, dict]:
+        try:
+            board = chess.Board(params.get("fen", ""))
+        except ValueError:
+            return 400, {"error": "Invalid fen"}
+        moves = list(board.legal_moves)
+        if path == "/api/cloud-eval":
+            if board.epd() in self.missing or not moves:
+                return 404, {"error": "No cloud evaluation available for that position"}
+            multi_pv = min(int(params.get("multiPv", 1)), len(moves))
+            pvs = [{"moves": moves[i].uci(), "cp": _score(board.epd()) - 7 * i} for i in range(multi_pv)]
+            return 200, {"fen": params["fen"], "knodes": 1000, "depth": int(params.get("depth", 18)), "pvs": pvs}
+        if path == "/api/explorer":
+            rows = [{"uci": move.uci(), "san": board.san(move), "white": 20 - i, "draws": 5, "black": 10}
+                    for i, move in enumerate(moves[:5])]
+            return 200, {"white": 100, "draws": 25, "black": 50, "moves": rows}
+        if path.startswith("/api/tablebase/"):
+            rows = [{"uci": move.uci(), "san": board.san(move), "category": "draw"} for move in moves]
+            return 200, {"category": "draw", "dtz": 0, "checkmate": board.is_checkmate(),
+                         "stalemate": board.is_stalemate(), "moves": rows}
+        return 404, {"error": "Not found"}
+
+    def start(self) -> "FakeLichessServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-lichess", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    args = parser.parse_args()
+    server = FakeLichessServer(port=args.port, latency=args.latency)
+    print(server.url, flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
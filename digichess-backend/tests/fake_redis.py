@@ -0,0 +1,278 @@
+"""
+In-memory stand-in for a redis-py client; no Redis server needed.
+
+Covers the commands the code under test uses on strings, hashes, sorted sets,
+lists, streams and pub/sub, plus pipelines (queued, replayed on execute()).
+One FakeRedis is one server: hand the same instance to every simulated
+process. Commands run under one lock and their names are appended to
+``commands``.
+
+Lua is not interpreted. A script found in ``scripts`` (script text -> fn(keys,
+args)) runs that Python emulation; any other script is taken to be the usual
+compare-and-delete lock release (KEYS[1], ARGV[1]).
+
+In tests: the ``fake_redis`` fixture (tests/conftest.py), patched in where the
+module under test calls get_redis().
+"""
+import fnmatch
+import functools
+import threading
+
+
+def _command(method):
+    @functools.wraps(method)
+    def run(self, *args, **kwargs):
+        with self.lock:
+            self.commands.append(method.__name__)
+            return method(self, *args, **kwargs)
+
+    return run
+
+
+def _stop(end):
+    return None if end == -1 else end + 1
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+class FakeScript:
+    def __init__(self, redis, script):
+        self.redis = redis
+        self.script = script
+
+    def __call__(self, keys=None, args=None, client=None):
+        keys = list(keys or [])
+        return self.redis.eval(self.script, len(keys), *keys, *(args or []))
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = []
+        self.channels = set()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        self.redis.subscribers.append(self)
+
+    def get_message(self, timeout=0.0):
+        with self.redis.lock:
+            return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        self.redis.subscribers.remove(self)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.commands = []
+        self.strings = {}
+        self.hashes = {}
+        self.zsets = {}
+        self.lists = {}
+        self.streams = {}
+        self.scripts = {}
+        self.subscribers = []
+
+    def _stores(self):
+        return (self.strings, self.hashes, self.zsets, self.lists, self.streams)
+
+    # keys
+    @_command
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            found = [store for store in self._stores() if key in store]
+            for store in found:
+                del store[key]
+            removed += bool(found)
+        return removed
+
+    @_command
+    def exists(self, *keys):
+        return sum(1 for key in keys if any(key in store for store in self._stores()))
+
+    @_command
+    def expire(self, key, seconds):
+        return 1
+
+    @_command
+    def rename(self, src, dst):
+        for store in self._stores():
+            if src in store:
+                store[dst] = store.pop(src)
+        return True
+
+    @_command
+    def scan_iter(self, match=None, count=None):
+        keys = [key for store in self._stores() for key in store]
+        return [key for key in keys if match is None or fnmatch.fnmatchcase(key, match)]
+
+    # strings
+    @_command
+    def get(self, key):
+        return self.strings.get(key)
+
+    @_command
+    def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value)
+        return True
+
+    @_command
+    def incrby(self, key, amount=1):
+        self.strings[key] = str(int(self.strings.get(key, 0)) + amount)
+        return int(self.strings[key])
+
+    def incr(self, key, amount=1):
+        return self.incrby(key, amount)
+
+    # hashes
+    @_command
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = dict(mapping or {})
+        if field is not None:
+            values[field] = value
+        fields = self.hashes.setdefault(key, {})
+        added = sum(1 for name in values if str(name) not in fields)
+        fields.update({str(name): str(item) for name, item in values.items()})
+        return added
+
+    @_command
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(str(field))
+
+    @_command
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    @_command
+    def hincrby(self, key, field, amount=1):
+        fields = self.hashes.setdefault(key, {})
+        fields[str(field)] = str(int(fields.get(str(field), 0)) + amount)
+        return int(fields[str(field)])
+
+    @_command
+    def hdel(self, key, *fields):
+        values = self.hashes.get(key, {})
+        return sum(1 for field in fields if values.pop(str(field), None) is not None)
+
+    # sorted sets
+    def _ranked(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    @_command
+    def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and str(member) in zset:
+                continue
+            added += str(member) not in zset
+            zset[str(member)] = float(score)
+        return added
+
+    @_command
+    def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(1 for member in members if zset.pop(str(member), None) is not None)
+
+    @_command
+    def zrange(self, key, start, end, withscores=False):
+        items = self._ranked(key)[start:_stop(end)]
+        return items if withscores else [member for member, _ in items]
+
+    @_command
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        low, high = float(low), float(high)
+        members = [member for member, score in self._ranked(key) if low <= score <= high]
+        return members[start:] if num is None else members[start:start + num]
+
+    @_command
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    @_command
+    def zrank(self, key, member):
+        members = [name for name, _ in self._ranked(key)]
+        return members.index(str(member)) if str(member) in members else None
+
+    @_command
+    def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(str(member))
+
+    # lists
+    @_command
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(str(value) for value in values)
+        return len(self.lists[key])
+
+    @_command
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:_stop(end)]
+
+    @_command
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:_stop(end)]
+        return True
+
+    # streams
+    @_command
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        stream = self.streams.setdefault(key, [])
+        entry_id = f"{len(stream) + 1}-0"
+        stream.append((entry_id, {name: str(value) for name, value in fields.items()}))
+        return entry_id
+
+    @_command
+    def xrevrange(self, key, max="+", min="-", count=None):
+        entries = list(reversed(self.streams.get(key, [])))
+        if max != "+":
+            bound = int(max.lstrip("(").split("-")[0])
+            entries = [entry for entry in entries if int(entry[0].split("-")[0]) < bound]
+        return entries[:count] if count else entries
+
+    # scripts
+    @_command
+    def eval(self, script, numkeys, *keys_and_args):
+        keys, args = list(keys_and_args[:numkeys]), [str(arg) for arg in keys_and_args[numkeys:]]
+        if script in self.scripts:
+            return self.scripts[script](keys, args)
+        if self.strings.get(keys[0]) == args[0]:
+            del self.strings[keys[0]]
+            return 1
+        return 0
+
+    def register_script(self, script):
+        return FakeScript(self, script)
+
+    # pub/sub and pipelines
+    @_command
+    def publish(self, channel, message):
+        for subscriber in self.subscribers:
+            if channel in subscriber.channels:
+                subscriber.messages.append({"type": "message", "channel": channel, "data": message})
+        return len(self.subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
@@ -0,0 +1,68 @@
+"""
+Minimal UCI engine used by the engine pool tests (no Stockfish binary needed).
+
+Plays the first legal move, reports option values through "info string" so
+tests can see what a checkout configured, and exits on "crash". Scores are a
+deterministic function of the position so cached and fresh searches agree;
+"go movetime N" sleeps N ms to stand in for search time, and "go depth N"
+reports depth N (depth 1 otherwise).
+"""
+import sys
+import time
+
+import chess
+
+OPTIONS = {
+    "Skill Level": ("spin", "20", "min 0 max 20"),
+    "UCI_LimitStrength": ("check", "false", ""),
+    "UCI_Elo": ("spin", "1500", "min 1320 max 3190"),
+    "WeightsFile": ("string", "<autodiscover>", ""),
+    "MultiPV": ("spin", "1", "min 1 max 500"),
+}
+
+
+def main():
+    values = {name: spec[1] for name, spec in OPTIONS.items()}
+    board = chess.Board()
+    for raw in sys.stdin:
+        parts = raw.strip().split()
+        if not parts:
+            continue
+        cmd = parts[0]
+        if cmd == "uci":
+            print("id name FakeEngine")
+            for name, (kind, default, extra) in OPTIONS.items():
+                print(f"option name {name} type {kind} default {default} {extra}".rstrip())
+            print("uciok")
+        elif cmd == "isready":
+            print("readyok")
+        elif cmd == "setoption":
+            line = raw.strip()
+            name = line.split(" name ", 1)[1].split(" value ", 1)[0]
+            values[name] = line.split(" value ", 1)[1] if " value " in line else ""
+        elif cmd == "position":
+            board = chess.Board()
+            if "moves" in parts:
+                for uci in parts[parts.index("moves") + 1:]:
+                    board.push_uci(uci)
+        elif cmd == "go":
+            if "movetime" in parts:
+                # Stand in for search time so benchmarks see realistic engine cost.
+                time.sleep(int(parts[parts.index("movetime") + 1]) / 1000.0)
+            depth = int(parts[parts.index("depth") + 1]) if "depth" in parts else 1
+            moves = list(board.legal_moves)
+            state = ";".join(f"{k}={v}" for k, v in sorted(values.items()))
+            print(f"info string {state}")
+            base = len(moves) - 20
+            for idx, move in enumerate(moves[: int(values["MultiPV"])]):
+                print(f"info depth {depth} multipv {idx + 1} score cp {base - 7 * idx} pv {move.uci()}")
+            print(f"bestmove {moves[0].uci()}")
+        elif cmd == "crash":
+            sys.exit(1)
+        elif cmd == "quit":
+            break
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
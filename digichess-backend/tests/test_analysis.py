@@ -5,20 +5,20 @@ from games.models import Game, GameAnalysis
 
 
 @pytest.mark.django_db
-def test_full_analysis_runs_sync(api_client, create_game, auth_client, monkeypatch):
+def test_full_analysis_runs_on_worker(api_client, create_game, auth_client, monkeypatch):
     game_data, challenger, opponent = create_game(preferred_color="white")
     auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
     game = Game.objects.get(id=game_data["id"])
     game.finish(Game.RESULT_DRAW)
 
-    def fake_run_full_analysis(game, prefer_lichess, time_per_move, depth, max_moves, allow_lichess_fallback):
+    def fake_run_full_analysis(game, prefer_lichess, time_per_move, depth, max_moves, allow_lichess_fallback, **kwargs):
         return (
             {"summary": {"total_moves": 0, "analyzed_moves": 0}, "moves": []},
             "local_stockfish",
             "/usr/local/bin/stockfish",
         )
 
-    monkeypatch.setattr("games.views_analysis.run_full_analysis", fake_run_full_analysis)
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", fake_run_full_analysis)
 
     response = api_client.post(f"/api/games/{game.id}/analysis/full/", {}, format="json")
     assert response.status_code == 200
@@ -48,7 +48,7 @@ def test_full_analysis_returns_cached_when_complete(api_client, create_game, aut
     def should_not_run(*args, **kwargs):
         raise AssertionError("run_full_analysis should not be called for cached analysis")
 
-    monkeypatch.setattr("games.views_analysis.run_full_analysis", should_not_run)
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", should_not_run)
 
     response = api_client.post(f"/api/games/{game.id}/analysis/full/", {}, format="json")
     assert response.status_code == 200
@@ -77,7 +77,7 @@ def test_full_analysis_force_returns_cached(api_client, create_game, auth_client
     def should_not_run(*args, **kwargs):
         raise AssertionError("run_full_analysis should not be called for cached analysis")
 
-    monkeypatch.setattr("games.views_analysis.run_full_analysis", should_not_run)
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", should_not_run)
 
     response = api_client.post(
         f"/api/games/{game.id}/analysis/full/",
@@ -95,14 +95,14 @@ def test_full_analysis_fails_when_incomplete(api_client, create_game, auth_clien
     game = Game.objects.get(id=game_data["id"])
     game.finish(Game.RESULT_DRAW)
 
-    def fake_run_full_analysis(game, prefer_lichess, time_per_move, depth, max_moves, allow_lichess_fallback):
+    def fake_run_full_analysis(game, prefer_lichess, time_per_move, depth, max_moves, allow_lichess_fallback, **kwargs):
         return (
             {"summary": {"total_moves": 2, "analyzed_moves": 1}, "moves": [{"move": "e4"}]},
             "local_stockfish",
             "/usr/local/bin/stockfish",
         )
 
-    monkeypatch.setattr("games.views_analysis.run_full_analysis", fake_run_full_analysis)
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", fake_run_full_analysis)
 
     response = api_client.post(f"/api/games/{game.id}/analysis/full/", {}, format="json")
     assert response.status_code == 503
@@ -0,0 +1,224 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.utils import timezone
+
+from config.routing import websocket_urlpatterns
+from games import analysis_jobs, tasks
+from games.analysis_jobs import DEFAULT_PRIORITY, PLAYER_PRIORITY, run_analysis
+from games.models import Game, GameAnalysis
+
+RESULT = (
+    {"summary": {"total_moves": 2, "analyzed_moves": 2}, "moves": [{"move": "e4"}, {"move": "e5"}]},
+    "local_stockfish",
+    "/usr/local/bin/stockfish",
+)
+
+
+@pytest.fixture
+def finished_game(create_game, auth_client):
+    game_data, challenger, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    game = Game.objects.get(id=game_data["id"])
+    game.finish(Game.RESULT_DRAW)
+    cache.clear()
+    yield game
+    cache.clear()
+
+
+@pytest.fixture
+def held_queue(monkeypatch):
+    """The broker: records what was queued instead of running it."""
+    sent = []
+    monkeypatch.setattr(tasks.run_analysis_job, "apply_async", lambda args, priority: sent.append((args[0], priority)))
+    return sent
+
+
+def _post(client, game):
+    return client.post(f"/api/games/{game.id}/analysis/full/", {}, format="json")
+
+
+@pytest.mark.django_db
+def test_request_is_queued_not_run(api_client, finished_game, held_queue, monkeypatch):
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", lambda *a, **kw: pytest.fail("ran in the request"))
+    response = _post(api_client, finished_game)
+    assert response.status_code == 202
+    assert response.data["status"] == GameAnalysis.STATUS_QUEUED
+    assert held_queue == [(finished_game.id, DEFAULT_PRIORITY)]
+
+
+@pytest.mark.django_db
+def test_requests_for_the_same_game_share_one_job(api_client, finished_game, held_queue):
+    assert _post(api_client, finished_game).status_code == 202
+    assert _post(api_client, finished_game).status_code == 202
+    GameAnalysis.objects.filter(game=finished_game).update(status=GameAnalysis.STATUS_RUNNING, started_at=timezone.now())
+    assert _post(api_client, finished_game).status_code == 202
+    assert held_queue == [(finished_game.id, DEFAULT_PRIORITY)]
+
+
+@pytest.mark.django_db
+def test_player_requests_jump_the_queue(api_client, auth_client, finished_game, held_queue, monkeypatch):
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", lambda game, progress, **options: RESULT)
+    player = auth_client(finished_game.white)[0]
+    _post(api_client, finished_game)
+    # The player joins the visitor's queued job and resends it at their priority, once.
+    _post(player, finished_game)
+    _post(player, finished_game)
+    assert held_queue == [(finished_game.id, DEFAULT_PRIORITY), (finished_game.id, PLAYER_PRIORITY)]
+
+    # Only one copy gets to run.
+    assert run_analysis(finished_game.id) == GameAnalysis.STATUS_COMPLETED
+    assert run_analysis(finished_game.id) is None
+
+
+@pytest.mark.django_db
+def test_stale_job_is_requeued(api_client, finished_game, held_queue):
+    _post(api_client, finished_game)
+    GameAnalysis.objects.filter(game=finished_game).update(
+        status=GameAnalysis.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=1)
+    )
+    _post(api_client, finished_game)
+    assert len(held_queue) == 2
+    assert GameAnalysis.objects.get(game=finished_game).status == GameAnalysis.STATUS_QUEUED
+
+
+@pytest.mark.django_db
+def test_job_streams_progress_and_stores_the_result(api_client, finished_game, held_queue, monkeypatch):
+    def fake_run_full_analysis(game, progress, **options):
+        status = GameAnalysis.objects.get(game=game).status
+        assert status == GameAnalysis.STATUS_RUNNING
+        for ply, move in enumerate(["e4", "e5"], start=1):
+            progress({"ply": ply, "move": move, "eval": 0.3, "mate": None, "depth": 12}, ply, 2)
+            assert analysis_jobs.progress_snapshot(game.id)["done"] == ply
+        return RESULT
+
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", fake_run_full_analysis)
+    _post(api_client, finished_game)
+
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f"analysis_{finished_game.id}", channel)
+    assert tasks.run_analysis_job(finished_game.id) == GameAnalysis.STATUS_COMPLETED
+
+    events = [async_to_sync(channel_layer.receive)(channel)["payload"] for _ in range(4)]
+    assert [event["type"] for event in events] == [
+        "analysis_started", "analysis_progress", "analysis_progress", "analysis_completed"
+    ]
+    assert [(event["ply"], event["done"], event["total"]) for event in events[1:3]] == [(1, 1, 2), (2, 2, 2)]
+    assert analysis_jobs.progress_snapshot(finished_game.id) is None
+
+    response = _post(api_client, finished_game)
+    assert response.status_code == 200
+    assert response.data["analysis"]["summary"]["analyzed_moves"] == 2
+    assert len(held_queue) == 1
+
+
+@pytest.mark.django_db
+def test_failed_job_is_reported_and_can_be_retried(api_client, finished_game, held_queue, monkeypatch):
+    def broken(game, progress, **options):
+        raise Exception("Local Stockfish unavailable: not found")
+
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", broken)
+    _post(api_client, finished_game)
+    assert run_analysis(finished_game.id) == GameAnalysis.STATUS_FAILED
+    status = api_client.get(f"/api/games/{finished_game.id}/analysis/request/").data
+    assert status["status"] == GameAnalysis.STATUS_FAILED
+    assert "unavailable" in status["error"]
+
+    assert _post(api_client, finished_game).status_code == 202
+    assert len(held_queue) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_socket_gets_current_state_then_events(api_client, finished_game, held_queue):
+    _post(api_client, finished_game)
+    cache.set(analysis_jobs.PROGRESS_KEY.format(finished_game.id), {"type": "analysis_progress", "done": 3, "total": 10})
+
+    async def scenario():
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/analysis/{finished_game.id}/")
+        connected, _ = await communicator.connect()
+        assert connected
+        snapshot = await communicator.receive_json_from()
+        await get_channel_layer().group_send(
+            f"analysis_{finished_game.id}", {"type": "analysis.event", "payload": {"type": "analysis_completed"}}
+        )
+        event = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return snapshot, event
+
+    snapshot, event = async_to_sync(scenario)()
+    assert snapshot["status"] == GameAnalysis.STATUS_QUEUED
+    assert snapshot["progress"]["done"] == 3
+    assert event["type"] == "analysis_completed"
+
+
+def _two_passes(record_seen):
+    shallow = {**RESULT[0], "summary": {**RESULT[0]["summary"], "pass_depth": 6, "passes": 1, "refined": False}}
+    deep = {**RESULT[0], "summary": {**RESULT[0]["summary"], "pass_depth": 12, "passes": 2, "refined": True}}
+
+    def fake_run_full_analysis(game, progress, progressive, on_pass, keep_refining, **options):
+        assert progressive
+        on_pass(shallow)
+        record_seen.append(GameAnalysis.objects.get(game=game).analysis)
+        if not keep_refining():
+            return shallow, "local_stockfish", None
+        on_pass(deep)
+        return deep, "local_stockfish", None
+
+    return fake_run_full_analysis
+
+
+@pytest.mark.django_db
+def test_each_pass_is_stored_and_streamed(api_client, finished_game, held_queue, monkeypatch):
+    stored = []
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", _two_passes(stored))
+    _post(api_client, finished_game)
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f"analysis_{finished_game.id}", channel)
+
+    assert run_analysis(finished_game.id) == GameAnalysis.STATUS_COMPLETED
+    assert stored[0]["summary"]["pass_depth"] == 6  # readable before the deeper pass ran
+    events = [async_to_sync(channel_layer.receive)(channel)["payload"] for _ in range(4)]
+    assert [(e["type"], e.get("depth")) for e in events] == [
+        ("analysis_started", None), ("analysis_pass", 6), ("analysis_pass", 12), ("analysis_completed", None)
+    ]
+    assert events[-1]["refined"] is True
+    assert GameAnalysis.objects.get(game=finished_game).analysis["summary"]["pass_depth"] == 12
+
+
+@pytest.mark.django_db
+def test_refinement_stops_when_nobody_watches_and_resumes_on_request(
+    api_client, finished_game, held_queue, monkeypatch
+):
+    monkeypatch.setattr("games.analysis_jobs.run_full_analysis", _two_passes([]))
+    _post(api_client, finished_game)
+    cache.delete(analysis_jobs.SEEN_KEY.format(finished_game.id))  # the requester went away
+
+    assert run_analysis(finished_game.id) == GameAnalysis.STATUS_COMPLETED
+    record = GameAnalysis.objects.get(game=finished_game)
+    assert record.analysis["summary"]["refined"] is False
+
+    # Asking again requeues the refinement and serves the sweep meanwhile.
+    response = _post(api_client, finished_game)
+    assert response.status_code == 202
+    assert response.data["analysis"]["summary"]["pass_depth"] == 6
+    assert run_analysis(finished_game.id) == GameAnalysis.STATUS_COMPLETED
+    assert GameAnalysis.objects.get(game=finished_game).analysis["summary"]["refined"] is True
+    assert len(held_queue) == 2
+
+
+@pytest.mark.django_db
+def test_an_open_socket_counts_as_watching(finished_game):
+    assert not analysis_jobs.is_watched(finished_game.id)
+    analysis_jobs.watch(finished_game.id)
+    analysis_jobs.watch(finished_game.id)
+    analysis_jobs.unwatch(finished_game.id)
+    assert analysis_jobs.is_watched(finished_game.id)
+    analysis_jobs.unwatch(finished_game.id)
+    assert not analysis_jobs.is_watched(finished_game.id)
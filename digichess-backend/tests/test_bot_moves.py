@@ -0,0 +1,88 @@
+import chess
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from games import bot_moves
+from games.models import Game
+
+
+@pytest.fixture
+def bot_game(create_user):
+    human = create_user(username="human")
+    bot = create_user(username="bot", is_bot=True)
+    game = Game.objects.create(creator=human, white=human, black=bot, rated=False, status=Game.STATUS_ACTIVE)
+    return game, human, bot
+
+
+def _first_legal(game, board, bot):
+    return sorted(board.legal_moves, key=lambda move: move.uci())[0]
+
+
+@pytest.mark.django_db
+def test_human_move_returns_before_bot_replies(
+    bot_game, auth_client, monkeypatch, django_capture_on_commit_callbacks
+):
+    game, human, _ = bot_game
+    chosen = []
+
+    def choose(board, rating, **kwargs):
+        chosen.append(board.fen())
+        return sorted(board.legal_moves, key=lambda move: move.uci())[0]
+
+    monkeypatch.setattr(bot_moves, "get_bot_move_with_error", choose)
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f"game_{game.id}", channel)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = auth_client(human)[0].post(f"/api/games/{game.id}/move/", {"move": "e4"}, format="json")
+    assert response.status_code == 200
+    assert response.data["moves"] == "e4"
+    assert chosen == []
+    assert len(callbacks) == 1
+
+    callbacks[0]()  # what the bot worker does once the task is delivered
+    game.refresh_from_db()
+    assert len(game.moves.split()) == 2
+    assert len(chosen) == 1
+
+    payloads = []
+    while len(payloads) < 2:
+        event = async_to_sync(channel_layer.receive)(channel)
+        if event["payload"]["type"] == "gameState":
+            payloads.append(event["payload"])
+    assert payloads[-1]["moves"] == game.moves
+
+
+@pytest.mark.django_db
+def test_stale_or_human_turn_bot_tasks_do_nothing(bot_game):
+    game, human, _ = bot_game
+    # White (human) to move: nothing to do.
+    assert bot_moves.play_bot_move(game.id, choose=_first_legal) is None
+
+    board = chess.Board()
+    board.push_san("e4")
+    Game.objects.filter(id=game.id).update(moves="e4", current_fen=board.fen())
+    # Queued for an earlier ply (a duplicate delivery): skipped.
+    assert bot_moves.play_bot_move(game.id, ply=0, choose=_first_legal) is None
+
+    result = bot_moves.play_bot_move(game.id, ply=1, choose=_first_legal)
+    assert result.ok
+    game.refresh_from_db()
+    assert len(game.moves.split()) == 2
+    # The same delivery again is now stale.
+    assert bot_moves.play_bot_move(game.id, ply=1, choose=_first_legal) is None
+
+
+@pytest.mark.django_db
+def test_bot_as_white_is_scheduled_not_played_inline(create_user, django_capture_on_commit_callbacks):
+    human = create_user()
+    bot = create_user(is_bot=True)
+    game = Game.objects.create(creator=human, white=bot, black=human, status=Game.STATUS_ACTIVE)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        assert bot_moves.schedule_bot_move(game) is True
+        game.status = Game.STATUS_FINISHED
+        assert bot_moves.schedule_bot_move(game) is False
+    assert len(callbacks) == 1
@@ -0,0 +1,137 @@
+import sys
+from pathlib import Path
+
+import chess
+import pytest
+
+from games import cheat_detection
+from games.eval_cache import eval_cache, normalize_fen
+from games.models import CheatAnalysis, CheatReport, Game
+
+FAKE_ENGINE = [sys.executable, str(Path(__file__).with_name("fake_uci_engine.py"))]
+MOVES = (
+    "e4 e5 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d4 exd4 cxd4 Bb4+ Bd2 Bxd2+ Nbxd2 d5 "
+    "exd5 Nxd5 Qb3 Na5 Qa4+ c6 Bxd5 Qxd5 O-O O-O"
+).split()
+
+
+def _purge(moves, depth):
+    board = chess.Board()
+    fens = []
+    for san in moves:
+        board.push_san(san)
+        fens.append(normalize_fen(board))
+    eval_cache.purge(fens, depth)
+    eval_cache.purge(fens, depth, cheat_detection.DEFAULT_MULTIPV)
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    monkeypatch.setattr(cheat_detection, "_get_engine_path", lambda: FAKE_ENGINE)
+
+
+def _without_cache_summary(result):
+    return {key: value for key, value in result.items() if key != "eval_cache"}
+
+
+@pytest.mark.django_db
+def test_dual_analysis_matches_single_color_runs_with_one_search_per_ply(fake_engine):
+    times = [1500 + 100 * i for i in range(len(MOVES))]
+    kwargs = {"move_times_ms": times, "book_depth": 2, "depth": 6, "time_per_move": 0.01}
+
+    _purge(MOVES, 6)
+    white = cheat_detection.run_cheat_analysis_from_sequence(MOVES, player_is_white=True, player_rating=1500, **kwargs)
+    black = cheat_detection.run_cheat_analysis_from_sequence(MOVES, player_is_white=False, player_rating=1700, **kwargs)
+    _purge(MOVES, 6)
+    dual = cheat_detection.run_dual_cheat_analysis_from_sequence(
+        MOVES, white_rating=1500, black_rating=1700, **kwargs
+    )
+
+    assert _without_cache_summary(dual["white"]) == _without_cache_summary(white)
+    assert _without_cache_summary(dual["black"]) == _without_cache_summary(black)
+    assert dual["white"]["total_moves_analyzed"] == len(MOVES) // 2 - 2
+    assert len(dual["black"]["tensor_data"]["move_features"]) == 60
+
+    single_searches = white["eval_cache"]["misses"] + black["eval_cache"]["misses"]
+    assert dual["eval_cache"]["misses"] == len(MOVES)
+    # Book plies are shared between the single-color runs; everything after is searched twice.
+    assert single_searches == 2 * len(MOVES) - 4
+
+
+@pytest.mark.django_db
+def test_run_analysis_fills_open_reports_for_both_players(
+    fake_engine, monkeypatch, create_user, create_game, auth_client
+):
+    game_data, white_player, black_player = create_game(preferred_color="white")
+    game = Game.objects.get(id=game_data["id"])
+    game.moves = " ".join(MOVES)
+    game.save(update_fields=["moves"])
+
+    report_white = CheatReport.objects.create(reporter=black_player, reported_user=white_player, game=game)
+    report_black = CheatReport.objects.create(reporter=white_player, reported_user=black_player, game=game)
+
+    admin = create_user(is_superuser=True, is_staff=True)
+    client, _ = auth_client(admin)
+    monkeypatch.setattr(
+        cheat_detection,
+        "run_dual_cheat_analysis",
+        lambda game: cheat_detection.run_dual_cheat_analysis_from_sequence(
+            MOVES, book_depth=2, depth=6, time_per_move=0.01
+        ),
+    )
+    response = client.post(f"/api/games/anticheat/reports/{report_white.id}/analyze/")
+    assert response.status_code == 200, response.data
+
+    white_analysis = CheatAnalysis.objects.get(report=report_white)
+    black_analysis = CheatAnalysis.objects.get(report=report_black)
+    assert white_analysis.analyzed_user_id == white_player.id
+    assert black_analysis.analyzed_user_id == black_player.id
+    assert [m["ply"] % 2 for m in white_analysis.move_classifications] == [0] * white_analysis.total_moves_analyzed
+    assert [m["ply"] % 2 for m in black_analysis.move_classifications] == [1] * black_analysis.total_moves_analyzed
+
+
+@pytest.mark.django_db
+def test_run_analysis_searches_only_the_reported_side(fake_engine, monkeypatch, create_user, create_game, auth_client):
+    game_data, white_player, black_player = create_game(preferred_color="white")
+    game = Game.objects.get(id=game_data["id"])
+    game.moves = " ".join(MOVES)
+    game.save(update_fields=["moves"])
+    report = CheatReport.objects.create(reporter=white_player, reported_user=black_player, game=game)
+    also_black = CheatReport.objects.create(reporter=create_user(), reported_user=black_player, game=game)
+
+    analysed = []
+
+    def single(game, target_user):
+        analysed.append(target_user.id)
+        return cheat_detection.run_cheat_analysis_from_sequence(
+            MOVES, player_is_white=False, book_depth=2, depth=6, time_per_move=0.01
+        )
+
+    monkeypatch.setattr(cheat_detection, "run_dual_cheat_analysis", lambda game: pytest.fail("analysed both sides"))
+    monkeypatch.setattr(cheat_detection, "run_cheat_analysis", single)
+    client, _ = auth_client(create_user(is_superuser=True, is_staff=True))
+    response = client.post(f"/api/games/anticheat/reports/{report.id}/analyze/")
+    assert response.status_code == 200, response.data
+    assert analysed == [black_player.id]
+    assert CheatAnalysis.objects.get(report=also_black).analyzed_user_id == black_player.id
+
+
+@pytest.mark.django_db
+def test_progressive_dual_analysis_ends_with_the_full_depth_result(fake_engine):
+    kwargs = {"book_depth": 2, "depth": 6, "time_per_move": 0.01}
+    _purge(MOVES, 6)
+    full = cheat_detection.run_dual_cheat_analysis_from_sequence(MOVES, **kwargs)
+
+    _purge(MOVES, 3)
+    passes = []
+    progressive = cheat_detection.run_dual_cheat_analysis_from_sequence(
+        MOVES, sweep_depths=[3], on_pass=lambda result: passes.append(result["white"]["pass_depth"]), **kwargs
+    )
+    assert passes == [3, 6]
+    assert progressive["refined"] and progressive["black"]["refined"]
+    assert progressive["white"]["t1_pct"] == full["white"]["t1_pct"]
+
+    stopped = cheat_detection.run_dual_cheat_analysis_from_sequence(
+        MOVES, sweep_depths=[3], keep_refining=lambda: False, **kwargs
+    )
+    assert stopped["pass_depth"] == 3 and stopped["white"]["refined"] is False
@@ -0,0 +1,76 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from games import tasks
+from games.clock_deadlines import (
+    DEADLINE_ZSET_KEY,
+    flag_deadline,
+    pop_expired_game_ids,
+    schedule_game_deadline,
+)
+from games.models import Game
+
+
+def _ticking_game(active_game, moves=("e4", "e5"), seconds_ago=10, white_left=60):
+    game, _, _ = active_game(
+        *moves,
+        white_time_left=white_left,
+        black_time_left=100,
+        last_move_at=timezone.now() - timedelta(seconds=seconds_ago),
+    )
+    return game
+
+
+@pytest.mark.django_db
+def test_flag_deadline_waits_for_both_first_moves(active_game):
+    game = _ticking_game(active_game, moves=("e4",))
+    assert flag_deadline(game) is None
+    assert flag_deadline(game, is_tournament=True) is not None
+
+
+@pytest.mark.django_db
+def test_pop_expired_only_claims_past_deadlines(active_game, fake_redis):
+    expired = _ticking_game(active_game, seconds_ago=30, white_left=5)
+    running = _ticking_game(active_game, seconds_ago=1, white_left=300)
+    schedule_game_deadline(fake_redis, expired)
+    schedule_game_deadline(fake_redis, running)
+
+    assert pop_expired_game_ids(fake_redis, timezone.now()) == [expired.id]
+    assert pop_expired_game_ids(fake_redis, timezone.now()) == []
+    assert str(running.id) in fake_redis.zsets[DEADLINE_ZSET_KEY]
+
+
+@pytest.mark.django_db
+def test_timeout_task_flags_only_indexed_games(active_game, fake_redis, monkeypatch):
+    monkeypatch.setattr(tasks, "get_redis", lambda: fake_redis)
+    indexed = _ticking_game(active_game, seconds_ago=30, white_left=5)
+    unindexed = _ticking_game(active_game, seconds_ago=30, white_left=5)
+    schedule_game_deadline(fake_redis, indexed)
+
+    tasks.check_game_timeouts()
+
+    indexed.refresh_from_db()
+    unindexed.refresh_from_db()
+    assert indexed.status == Game.STATUS_FINISHED
+    assert indexed.result == Game.RESULT_BLACK
+    assert unindexed.status == Game.STATUS_ACTIVE
+
+    assert tasks.reindex_clock_deadlines() == 1
+    tasks.check_game_timeouts()
+    unindexed.refresh_from_db()
+    assert unindexed.status == Game.STATUS_FINISHED
+
+
+@pytest.mark.django_db
+def test_timeout_task_requeues_games_that_moved(active_game, fake_redis, monkeypatch):
+    monkeypatch.setattr(tasks, "get_redis", lambda: fake_redis)
+    game = _ticking_game(active_game, seconds_ago=1, white_left=300)
+    # Stale entry claiming the game already flagged
+    fake_redis.zadd(DEADLINE_ZSET_KEY, {game.id: timezone.now().timestamp() - 5})
+
+    tasks.check_game_timeouts()
+
+    game.refresh_from_db()
+    assert game.status == Game.STATUS_ACTIVE
+    assert fake_redis.zsets[DEADLINE_ZSET_KEY][str(game.id)] == pytest.approx(flag_deadline(game))
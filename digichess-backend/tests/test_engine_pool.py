@@ -0,0 +1,100 @@
+import sys
+import time
+from pathlib import Path
+
+import chess
+import chess.engine
+import pytest
+
+from games.engine_pool import EnginePool, EnginePoolTimeout
+
+FAKE_ENGINE = [sys.executable, str(Path(__file__).with_name("fake_uci_engine.py"))]
+
+
+def _options_seen(engine):
+    info = engine.analyse(chess.Board(), chess.engine.Limit(depth=1), info=chess.engine.INFO_ALL)
+    return dict(item.split("=", 1) for item in info["string"].split(";"))
+
+
+@pytest.fixture
+def pool():
+    pool = EnginePool(max_idle=2, max_per_key=2, acquire_timeout=1.0, health_check_idle=30.0)
+    yield pool
+    pool.close_all()
+
+
+def test_engine_is_reused_across_checkouts(pool):
+    for _ in range(3):
+        with pool.checkout(FAKE_ENGINE) as engine:
+            result = engine.play(chess.Board(), chess.engine.Limit(depth=1))
+            assert result.move in chess.Board().legal_moves
+
+    stats = pool.stats()
+    assert stats["spawned"] == 1
+    assert stats["reused"] == 2
+    assert stats["checkouts"] == 3
+
+
+def test_checkout_options_do_not_leak_to_next_caller(pool):
+    with pool.checkout(FAKE_ENGINE, options={"Skill Level": 3}) as engine:
+        assert _options_seen(engine)["Skill Level"] == "3"
+
+    with pool.checkout(FAKE_ENGINE, options={"UCI_LimitStrength": True, "UCI_Elo": 2000}) as engine:
+        seen = _options_seen(engine)
+
+    assert pool.stats()["spawned"] == 1
+    assert seen["Skill Level"] == "20"
+    assert seen["UCI_LimitStrength"] == "true"
+    assert seen["UCI_Elo"] == "2000"
+
+
+def test_startup_options_get_their_own_engines(pool):
+    with pool.checkout(FAKE_ENGINE, startup_options={"WeightsFile": "a.pb.gz"}) as engine:
+        assert _options_seen(engine)["WeightsFile"] == "a.pb.gz"
+    with pool.checkout(FAKE_ENGINE, startup_options={"WeightsFile": "b.pb.gz"}) as engine:
+        assert _options_seen(engine)["WeightsFile"] == "b.pb.gz"
+    with pool.checkout(FAKE_ENGINE, startup_options={"WeightsFile": "a.pb.gz"}):
+        pass
+
+    assert pool.stats()["spawned"] == 2
+
+
+def test_dead_engine_is_discarded_and_replaced(pool):
+    with pytest.raises(chess.engine.EngineTerminatedError):
+        with pool.checkout(FAKE_ENGINE) as engine:
+            engine.protocol.send_line("crash")
+            engine.play(chess.Board(), chess.engine.Limit(depth=1))
+
+    with pool.checkout(FAKE_ENGINE) as engine:
+        assert engine.play(chess.Board(), chess.engine.Limit(depth=1)).move
+
+    stats = pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["spawned"] == 2
+
+
+def test_idle_engine_that_died_is_restarted(pool):
+    with pool.checkout(FAKE_ENGINE) as engine:
+        engine.protocol.send_line("crash")
+    # Wait for the crashed process to be reaped while it sits idle in the pool.
+    deadline = time.monotonic() + 5
+    idle = pool._pools[pool._key(FAKE_ENGINE, None)].idle[0]
+    while not idle.engine.protocol.returncode.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pool.checkout(FAKE_ENGINE) as engine:
+        assert engine.play(chess.Board(), chess.engine.Limit(depth=1)).move
+
+    assert pool.stats()["restarts"] == 1
+
+
+def test_checkout_times_out_when_all_slots_are_busy():
+    pool = EnginePool(max_idle=1, max_per_key=1, acquire_timeout=0.05)
+    try:
+        with pool.checkout(FAKE_ENGINE):
+            with pytest.raises(EnginePoolTimeout):
+                with pool.checkout(FAKE_ENGINE):
+                    pass
+        assert pool.stats()["timeouts"] == 1
+    finally:
+        pool.close_all()
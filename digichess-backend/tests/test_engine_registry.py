@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from games import engine_registry as registry_module
+from games.engine_pool import stockfish_engine
+from games.engine_registry import EngineRegistry
+
+
+class CountingDiscovery:
+    def __init__(self, path, ok=True):
+        self.path = path
+        self.ok = ok
+        self.calls = []
+
+    def __call__(self, requested):
+        self.calls.append(requested)
+        if self.ok:
+            return True, "Stockfish is working", self.path
+        return False, "Stockfish not found", self.path
+
+
+def test_discovery_runs_once_per_process(tmp_path):
+    binary = tmp_path / "stockfish"
+    binary.write_text("")
+    binary.chmod(0o755)
+    discover = CountingDiscovery(str(binary))
+    registry = EngineRegistry(ttl=0, retry_after=30, discover=discover)
+
+    for _ in range(5):
+        assert registry.resolve() == (True, "Stockfish is working", str(binary))
+    # Past the TTL only the file is checked; nothing is launched again.
+    assert discover.calls == [None]
+
+    binary.unlink()
+    registry.resolve()
+    assert discover.calls == [None, None]
+
+
+def test_failed_discovery_is_not_retried_until_the_retry_window(monkeypatch):
+    discover = CountingDiscovery("/missing/stockfish", ok=False)
+    registry = EngineRegistry(ttl=3600, retry_after=30, discover=discover)
+    clock = [1000.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: clock[0])
+
+    assert registry.resolve()[0] is False
+    assert registry.resolve()[0] is False
+    assert len(discover.calls) == 1
+
+    clock[0] += 31
+    discover.ok = True
+    assert registry.resolve()[0] is True
+    assert len(discover.calls) == 2
+    assert registry.status()["engines"][0]["failures"] == 1
+
+
+def test_engine_start_failure_triggers_revalidation(monkeypatch):
+    discover = CountingDiscovery("/missing/stockfish")
+    registry = EngineRegistry(discover=discover)
+    monkeypatch.setattr(registry_module, "engine_registry", registry)
+
+    ok, _, path = registry.resolve()
+    assert ok
+    with pytest.raises(OSError):
+        with stockfish_engine(path):
+            pass
+    assert registry.status()["engines"][0]["stale"] is True
+
+    registry.resolve()
+    registry.resolve()
+    assert len(discover.calls) == 2
+
+
+@pytest.mark.django_db
+def test_engine_status_endpoint(auth_client, create_user, monkeypatch):
+    engine = os.path.join(os.path.dirname(__file__), "fake_uci_engine.py")
+    registry = EngineRegistry(discover=CountingDiscovery(engine))
+    monkeypatch.setattr("games.views_analysis.engine_registry", registry)
+    registry.resolve()
+
+    client, _ = auth_client(create_user())
+    assert client.get("/api/games/engines/status/").status_code == 403
+
+    admin_client, _ = auth_client(create_user(is_superuser=True, is_staff=True))
+    response = admin_client.get("/api/games/engines/status/")
+    assert response.status_code == 200
+    assert response.data["engines"][0]["path"] == engine
+    assert response.data["engines"][0]["ok"] is True
+    assert response.data["validations"] == 1
+    assert "pool" in response.data
+
+    response = admin_client.get("/api/games/engines/status/", {"refresh": "1"})
+    assert response.data["validations"] == 2
@@ -0,0 +1,138 @@
+import sys
+from pathlib import Path
+
+import chess
+import chess.engine
+import pytest
+
+from games import analysis_service, cheat_detection
+from games.eval_cache import (
+    EvalSession,
+    eval_cache,
+    infos_from_lines,
+    lines_from_infos,
+    normalize_fen,
+)
+from games.models import Game, PositionEval
+
+FAKE_ENGINE = [sys.executable, str(Path(__file__).with_name("fake_uci_engine.py"))]
+MOVES = "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O"
+
+
+def test_normalized_fen_ignores_move_clocks():
+    board = chess.Board()
+    board.push_san("Nf3")
+    board.push_san("Nf6")
+    board.push_san("Ng1")
+    board.push_san("Ng8")
+    assert normalize_fen(board) == normalize_fen(chess.STARTING_FEN)
+
+
+@pytest.mark.parametrize(
+    "score",
+    [
+        chess.engine.PovScore(chess.engine.Cp(-37), chess.BLACK),
+        chess.engine.PovScore(chess.engine.Mate(3), chess.WHITE),
+        chess.engine.PovScore(chess.engine.Mate(-2), chess.BLACK),
+        chess.engine.PovScore(chess.engine.Mate(0), chess.WHITE),
+        chess.engine.PovScore(chess.engine.Mate(0), chess.BLACK),
+    ],
+)
+def test_cached_lines_round_trip_scores(score):
+    info = {"score": score, "pv": [chess.Move.from_uci("e2e4")], "depth": 12}
+    rebuilt = infos_from_lines(lines_from_infos([info]))[0]
+    assert rebuilt["score"].pov(chess.WHITE).score(mate_score=100000) == score.pov(chess.WHITE).score(
+        mate_score=100000
+    )
+    assert rebuilt["score"].pov(chess.WHITE).mate() == score.pov(chess.WHITE).mate()
+    assert rebuilt["pv"] == info["pv"]
+    assert rebuilt["depth"] == 12
+
+
+@pytest.mark.django_db
+def test_second_game_analysis_is_served_from_cache(monkeypatch):
+    game = Game(id=1, moves=MOVES)
+    game.current_fen = ""
+
+    first = analysis_service.analyze_game_with_stockfish(game, FAKE_ENGINE, time_per_move=0.01, depth=8)
+    assert first["summary"]["eval_cache"]["misses"] == 16
+    assert PositionEval.objects.filter(depth=8, multipv=1).count() == 16
+
+    def no_engine(*args, **kwargs):
+        raise AssertionError("engine should not be searched for cached positions")
+
+    monkeypatch.setattr(chess.engine.SimpleEngine, "analyse", no_engine)
+    second = analysis_service.analyze_game_with_stockfish(game, FAKE_ENGINE, time_per_move=0.01, depth=8)
+
+    assert second["moves"] == first["moves"]
+    assert second["summary"]["eval_cache"]["hits"] == 16
+    assert second["summary"]["eval_cache"]["misses"] == 0
+
+
+@pytest.mark.django_db
+def test_cloud_eval_is_cached():
+    calls = []
+
+    def fake_cloud(fen, depth, multi_pv):
+        calls.append(fen)
+        return {"fen": fen, "depth": depth, "knodes": 1234, "pvs": [{"moves": "e7e5 g1f3", "cp": 25}]}
+
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    first = EvalSession().cloud_eval(fen, 18, 1, fake_cloud)
+    eval_cache.flush()
+    # Same position at a later move number still hits.
+    later = fen.replace(" 0 1", " 4 9")
+    second = EvalSession().cloud_eval(later, 18, 1, fake_cloud)
+
+    assert len(calls) == 1
+    assert second["pvs"] == first["pvs"]
+    assert second["knodes"] == 1234
+
+
+@pytest.mark.django_db
+def test_entries_short_of_the_requested_depth_are_not_hits():
+    board = chess.Board()
+    board.push_san("d4")
+    limit = chess.engine.Limit(time=0.05, depth=12)
+    # A time-limited search that stopped at depth 5.
+    shallow = {"score": chess.engine.PovScore(chess.engine.Cp(30), chess.BLACK), "pv": [], "depth": 5}
+    session = EvalSession()
+    session.store(board, limit, shallow)
+    eval_cache.flush()
+    assert EvalSession().lookup(board, limit) is None
+    assert EvalSession().lookup(board, chess.engine.Limit(depth=5)) is None  # different key
+
+    deep = {**shallow, "depth": 12}
+    session.store(board, limit, deep)
+    eval_cache.flush()
+    assert EvalSession().lookup(board, limit)["depth"] == 12
+
+    calls = []
+
+    def shallow_cloud(fen, depth, multi_pv):
+        calls.append(fen)
+        return {"fen": fen, "depth": 10, "knodes": 1, "pvs": [{"moves": "e7e5", "cp": 25}]}
+
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    EvalSession().cloud_eval(fen, 18, 1, shallow_cloud)
+    eval_cache.flush()
+    EvalSession().cloud_eval(fen, 18, 1, shallow_cloud)
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_cheat_analysis_reuses_cached_multipv_lines(monkeypatch):
+    monkeypatch.setattr(cheat_detection, "_get_engine_path", lambda: FAKE_ENGINE)
+    moves = MOVES.split()
+
+    first = cheat_detection.run_cheat_analysis_from_sequence(
+        moves, player_is_white=True, book_depth=1, depth=6, time_per_move=0.01
+    )
+    second = cheat_detection.run_cheat_analysis_from_sequence(
+        moves, player_is_white=True, book_depth=1, depth=6, time_per_move=0.01
+    )
+
+    assert first["eval_cache"]["misses"] == len(moves)
+    assert second["eval_cache"]["misses"] == 0
+    assert second["move_classifications"] == first["move_classifications"]
+    assert PositionEval.objects.filter(multipv=cheat_detection.DEFAULT_MULTIPV).exists()
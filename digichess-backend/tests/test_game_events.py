@@ -0,0 +1,220 @@
+import threading
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from games.event_stream import EventHub, parse_stream_id
+from games.models import Game
+
+
+class FakeStreamRedis:
+    """Enough of Redis streams for the events views: XADD/XREAD (with BLOCK)/XREVRANGE."""
+
+    def __init__(self):
+        self.values = {}
+        self.streams = {}
+        self.calls = []
+        self._clock = 1000
+        self._changed = threading.Condition()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key) or 0) + 1)
+        return int(self.values[key])
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.values or key in self.streams)
+
+    def expire(self, key, seconds):
+        return True
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        with self._changed:
+            self._clock += 1
+            entry_id = f"{self._clock}-0"
+            entries = self.streams.setdefault(key, [])
+            entries.append((entry_id, dict(fields)))
+            if maxlen:
+                del entries[:-maxlen]
+            self._changed.notify_all()
+            return entry_id
+
+    def xrevrange(self, key, count=None):
+        self.calls.append(("xrevrange", key, count))
+        entries = list(reversed(self.streams.get(key, [])))
+        return entries[:count] if count else entries
+
+    def _after(self, streams, count):
+        found = []
+        for key, cursor in streams.items():
+            after = parse_stream_id(cursor)
+            entries = [entry for entry in self.streams.get(key, []) if parse_stream_id(entry[0]) > after]
+            if entries:
+                found.append([key, entries[:count]])
+        return found
+
+    def xread(self, streams, count=None, block=None):
+        self.calls.append(("xread", dict(streams), block))
+        deadline = time.monotonic() + (block or 0) / 1000
+        with self._changed:
+            while True:
+                found = self._after(streams, count)
+                remaining = deadline - time.monotonic()
+                if found or block is None or remaining <= 0:
+                    return found
+                self._changed.wait(remaining)
+
+
+class AsyncFakeStreamRedis:
+    def __init__(self, fake):
+        self.fake = fake
+
+    async def get(self, key):
+        return self.fake.get(key)
+
+    async def exists(self, *keys):
+        return self.fake.exists(*keys)
+
+    async def xread(self, streams, count=None, block=None):
+        return self.fake.xread(streams, count=count)
+
+    async def xrevrange(self, key, count=None):
+        return self.fake.xrevrange(key, count=count)
+
+
+async def _collect(content):
+    return "".join([chunk.decode() async for chunk in content])
+
+
+def append(fake, game_id, **fields):
+    seq = fake.incr(f"game:seq:{game_id}")
+    fake.xadd(f"game:events:{game_id}", {"seq": str(seq), **{k: str(v) for k, v in fields.items()}})
+    return seq
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeStreamRedis()
+    hub = EventHub(block_ms=50, redis_factory=lambda: fake)
+
+    async def async_redis():
+        return AsyncFakeStreamRedis(fake)
+
+    monkeypatch.setattr("games.views_events.get_redis", lambda: fake)
+    monkeypatch.setattr("games.views_events.get_async_redis", async_redis)
+    monkeypatch.setattr("games.views_events.event_hub", hub)
+    return fake
+
+
+@pytest.fixture
+def game(create_game):
+    game_data, _, _ = create_game()
+    return Game.objects.get(id=game_data["id"])
+
+
+@pytest.mark.django_db
+def test_poll_reads_only_missing_entries_without_the_game_row(api_client, fake_redis, game):
+    for ply in range(30):
+        append(fake_redis, game.id, type="move", san=f"m{ply}")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(f"/api/games/{game.id}/events/", {"since": 27})
+    assert response.status_code == 200
+    assert [event["seq"] for event in response.data["events"]] == [28, 29, 30]
+    assert response.data["last_seq"] == 30
+    assert ("xrevrange", f"game:events:{game.id}", 3) in fake_redis.calls
+    assert not any("games_game" in query["sql"] for query in queries.captured_queries)
+
+    cursor = response.data["events"][0]["event_id"]
+    response = api_client.get(f"/api/games/{game.id}/events/", {"cursor": cursor, "since": 28})
+    assert [event["seq"] for event in response.data["events"]] == [29, 30]
+    assert response.data["cursor"] == response.data["events"][-1]["event_id"]
+
+
+@pytest.mark.django_db
+def test_long_poll_waits_for_the_next_entry(api_client, fake_redis, game):
+    append(fake_redis, game.id, type="move", san="e4")
+    first = api_client.get(f"/api/games/{game.id}/events/", {"since": 0}).data
+
+    threading.Timer(0.3, append, args=(fake_redis, game.id), kwargs={"type": "move", "san": "e5"}).start()
+    start = time.monotonic()
+    response = api_client.get(
+        f"/api/games/{game.id}/events/", {"since": first["last_seq"], "cursor": first["cursor"], "wait": 10}
+    )
+    elapsed = time.monotonic() - start
+
+    assert [event["san"] for event in response.data["events"]] == ["e5"]
+    assert response.data["last_seq"] == 2
+    assert 0.2 < elapsed < 5
+
+
+@pytest.mark.django_db
+def test_long_poll_times_out_empty(api_client, fake_redis, game, monkeypatch):
+    append(fake_redis, game.id, type="move", san="e4")
+    monkeypatch.setattr("games.views_events.LONGPOLL_MAX_SECONDS", 0.2)
+    response = api_client.get(f"/api/games/{game.id}/events/", {"since": 1, "wait": 30})
+    assert response.data["events"] == []
+    assert parse_stream_id(response.data["cursor"])
+
+
+@pytest.mark.django_db
+def test_trimmed_stream_falls_back_to_snapshot(api_client, fake_redis, game):
+    for ply in range(5):
+        append(fake_redis, game.id, type="move", san=f"m{ply}")
+    del fake_redis.streams[f"game:events:{game.id}"][:3]
+
+    response = api_client.get(f"/api/games/{game.id}/events/", {"since": 1})
+    (event,) = response.data["events"]
+    assert event["type"] == "gameFull"
+    assert event["game"]["id"] == game.id
+    assert event["seq"] == 5
+
+
+@pytest.mark.django_db
+def test_unknown_game_is_404(api_client, fake_redis):
+    assert api_client.get("/api/games/999999/events/").status_code == 404
+    assert api_client.get("/api/games/999999/events/stream/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_sse_resumes_from_last_event_id_and_ends_with_the_game(client, fake_redis, game):
+    append(fake_redis, game.id, type="move", san="e4", status="active")
+    resume_from = fake_redis.streams[f"game:events:{game.id}"][-1][0]
+    append(fake_redis, game.id, type="move", san="e5", status="active")
+    append(fake_redis, game.id, type="resign", status="finished")
+
+    response = client.get(f"/api/games/{game.id}/events/stream/", HTTP_LAST_EVENT_ID=resume_from)
+    assert response["Content-Type"] == "text/event-stream"
+    body = async_to_sync(_collect)(response.streaming_content)
+
+    messages = [chunk for chunk in body.split("\n\n") if chunk.startswith("id: ")]
+    assert len(messages) == 2
+    assert '"san": "e5"' in messages[0]
+    assert '"status": "finished"' in messages[1]
+    assert "e4" not in body
+
+
+def test_hub_shares_one_blocking_read_between_waiters():
+    fake = FakeStreamRedis()
+    hub = EventHub(block_ms=50, redis_factory=lambda: fake)
+    cursor = fake.xadd("game:events:7", {"seq": "1"})
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(hub.wait(7, cursor, 5))) for _ in range(20)]
+    for thread in waiters:
+        thread.start()
+    time.sleep(0.2)
+    fake.xadd("game:events:7", {"seq": "2"})
+    for thread in waiters:
+        thread.join(5)
+
+    assert results == [True] * 20
+    blocking_reads = [call for call in fake.calls if call[0] == "xread" and call[2]]
+    # One hub loop: reads happen per block slice, not per waiting request.
+    assert len(blocking_reads) < 20
+    assert all("game:events:7" in call[1] for call in blocking_reads)
+    assert hub.stats()["games"] == 0
@@ -0,0 +1,271 @@
+import functools
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from games import game_core, game_proxy
+from games.game_core import apply_move
+from games.game_proxy import DIRTY_KEY, LIVE_KEY, GameProxy, flush_dirty_games
+from games.models import Game
+from tests.fake_redis import FakePipeline
+
+
+# The Lua scripts, emulated in Python on the shared fake (tests/fake_redis.py).
+def _commit(redis, keys, args):
+    live, seq_key, events, dirty = keys
+    current = redis.hashes.get(live, {}).get("ply")
+    if current is not None:
+        if redis.hashes[live].get("status") == "retired":
+            return -1
+        if current != args[0]:
+            return -2
+    count = int(args[5])
+    fields = args[6:6 + count * 2]
+    redis.hashes.setdefault(live, {}).update(dict(zip(fields[0::2], fields[1::2])))
+    redis.zadd(dirty, {args[1]: float(args[2])}, nx=True)
+    seq = redis.incr(seq_key)
+    event = args[6 + count * 2:]
+    redis.xadd(events, dict([("seq", str(seq))] + list(zip(event[0::2], event[1::2]))))
+    return seq
+
+
+def _retire(redis, keys, args):
+    data = redis.hashes.get(keys[0])
+    if not data:
+        return []
+    flat = [item for pair in data.items() for item in pair]
+    data["status"] = "retired"
+    redis.zrem(keys[1], args[0])
+    return flat
+
+
+def _sync(redis, keys, args):
+    data = redis.hashes.get(keys[0])
+    if not data or data.get("status") in (None, "retired"):
+        return 0
+    data.update(dict(zip(args[0::2], args[1::2])))
+    return 1
+
+
+def _clear(redis, keys, args):
+    cleared = 0
+    for i, key in enumerate(keys[1:]):
+        member, ply = args[2 * i], args[2 * i + 1]
+        if ply == "" or redis.hashes.get(key, {}).get("ply") == ply:
+            cleared += redis.zrem(keys[0], member)
+    return cleared
+
+
+@pytest.fixture
+def fake_redis(fake_redis, monkeypatch):
+    for script, emulate in (
+        (game_proxy.COMMIT_LUA, _commit),
+        (game_proxy.RETIRE_LUA, _retire),
+        (game_proxy.SYNC_LUA, _sync),
+        (game_proxy.CLEAR_LUA, _clear),
+    ):
+        fake_redis.scripts[script] = functools.partial(emulate, fake_redis)
+    monkeypatch.setattr(game_core, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(game_proxy, "get_redis", lambda: fake_redis)
+    return fake_redis
+
+
+@pytest.fixture
+def live_game(create_game, auth_client):
+    game_data, challenger, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    game = Game.objects.get(id=game_data["id"])
+    return game, game.white, game.black
+
+
+def _row(game_id, *fields):
+    # values() skips the live overlay, so this is what the database holds.
+    return Game.objects.filter(id=game_id).values(*fields).get()
+
+
+def _game_writes(captured):
+    return [q["sql"] for q in captured.captured_queries if q["sql"].startswith('UPDATE "games_game"')]
+
+
+def _play(game, white, black, moves):
+    players = (white, black)
+    start = len((GameProxy.get_game(game.id).moves or "").split())
+    for idx, move in enumerate(moves):
+        result = apply_move(game.id, players[(start + idx) % 2], move)
+        assert result.ok, result.error
+    return result
+
+
+@pytest.mark.django_db
+def test_moves_mutate_live_state_without_row_writes(fake_redis, live_game):
+    game, white, black = live_game
+    with CaptureQueriesContext(connection) as captured:
+        result = _play(game, white, black, ["e4", "e5", "Nf3", "Nc6"])
+    assert _game_writes(captured) == []
+    assert result.seq == 4
+
+    assert _row(game.id, "moves")["moves"] == ""
+    live = Game.objects.get(id=game.id)
+    assert live.moves == "e4 e5 Nf3 Nc6"
+    assert len(live.move_times_ms) == 4
+    assert fake_redis.hashes[LIVE_KEY.format(game.id)]["ply"] == "4"
+    assert list(fake_redis.zsets[DIRTY_KEY]) == [str(game.id)]
+
+    with CaptureQueriesContext(connection) as captured:
+        assert flush_dirty_games() == 1
+    assert len(_game_writes(captured)) == 1
+    row = _row(game.id, "moves", "current_fen", "move_times_ms")
+    assert row["moves"] == "e4 e5 Nf3 Nc6"
+    assert row["current_fen"] == live.current_fen
+    assert len(row["move_times_ms"]) == 4
+    assert fake_redis.zsets[DIRTY_KEY] == {}
+
+
+@pytest.mark.django_db
+def test_finishing_move_writes_row_and_retires_live_state(fake_redis, live_game, django_capture_on_commit_callbacks):
+    game, white, black = live_game
+    with django_capture_on_commit_callbacks(execute=True):
+        result = _play(game, white, black, ["f3", "e5", "g4", "Qh4#"])
+    assert result.finished
+    row = _row(game.id, "status", "result", "moves", "finished_at")
+    assert row["status"] == Game.STATUS_FINISHED
+    assert row["result"] == Game.RESULT_BLACK
+    assert row["moves"] == "f3 e5 g4 Qh4#"
+    assert row["finished_at"] is not None
+    assert fake_redis.hashes[LIVE_KEY.format(game.id)]["status"] == "retired"
+    assert str(game.id) not in fake_redis.zsets[DIRTY_KEY]
+
+    late = apply_move(game.id, white, "a3")
+    assert not late.ok
+    assert late.error == "Game is not active."
+
+
+@pytest.mark.django_db
+def test_resignation_folds_unflushed_moves_into_the_finish(fake_redis, live_game):
+    game, white, black = live_game
+    _play(game, white, black, ["d4", "d5", "c4"])
+    loaded = Game.objects.get(id=game.id)
+    loaded.finish(Game.RESULT_WHITE)
+    row = _row(game.id, "status", "moves", "move_times_ms")
+    assert row["status"] == Game.STATUS_FINISHED
+    assert row["moves"] == "d4 d5 c4"
+    assert len(row["move_times_ms"]) == 3
+
+
+@pytest.mark.django_db
+def test_lost_live_state_is_recovered_from_event_stream(fake_redis, live_game):
+    game, white, black = live_game
+    _play(game, white, black, ["e4", "e5"])
+    flush_dirty_games()
+    _play(game, white, black, ["Nf3", "Nc6", "Bb5"])
+
+    # Redis loses the hash (eviction, restart without it); the event stream survives.
+    fake_redis.delete(LIVE_KEY.format(game.id))
+    assert Game.objects.get(id=game.id).moves == "e4 e5"
+
+    recovered = GameProxy.get_game(game.id)
+    assert recovered.moves == "e4 e5 Nf3 Nc6 Bb5"
+    assert len(recovered.move_times_ms) == 5
+    assert recovered.current_fen.startswith("r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2")
+
+    result = apply_move(game.id, black, "a6")
+    assert result.ok, result.error
+    flush_dirty_games()
+    assert _row(game.id, "moves")["moves"] == "e4 e5 Nf3 Nc6 Bb5 a6"
+
+
+@pytest.mark.django_db
+def test_recovery_after_total_loss_of_live_state_replays_only_newer_plies(fake_redis, live_game):
+    game, white, black = live_game
+    _play(game, white, black, ["e4", "e5", "Nf3"])
+    flush_dirty_games()
+    _play(game, white, black, ["Nc6"])
+    fake_redis.hashes.clear()
+    fake_redis.zsets.clear()
+
+    _play(game, white, black, ["Bc4"])
+    flush_dirty_games()
+    row = _row(game.id, "moves", "move_times_ms")
+    assert row["moves"] == "e4 e5 Nf3 Nc6 Bc4"
+    assert len(row["move_times_ms"]) == 5
+
+
+@pytest.mark.django_db
+def test_direct_saves_are_mirrored_and_cleared_by_the_next_move(fake_redis, live_game):
+    game, white, black = live_game
+    _play(game, white, black, ["e4"])
+    offered = Game.objects.get(id=game.id)
+    offered.draw_offer_by = white
+    offered.save(update_fields=["draw_offer_by"])
+    assert fake_redis.hashes[LIVE_KEY.format(game.id)]["draw_offer_by_id"] == str(white.id)
+    assert Game.objects.get(id=game.id).draw_offer_by_id == white.id
+
+    result = apply_move(game.id, black, "e5")
+    assert result.draw_offer_cleared
+    assert Game.objects.get(id=game.id).draw_offer_by_id is None
+    last_event = fake_redis.streams[f"game:events:{game.id}"][-2][1]
+    assert last_event["type"] == "move" and last_event["draw_offer_cleared"] == "1"
+
+
+@pytest.mark.django_db
+def test_flush_never_reopens_a_finished_row(fake_redis, live_game):
+    game, white, black = live_game
+    _play(game, white, black, ["e4", "e5"])
+    Game.objects.filter(id=game.id).update(status=Game.STATUS_FINISHED, result=Game.RESULT_DRAW)
+
+    assert flush_dirty_games() == 0
+    assert _row(game.id, "status")["status"] == Game.STATUS_FINISHED
+    assert fake_redis.zsets[DIRTY_KEY] == {}
+
+
+@pytest.mark.django_db
+def test_without_redis_moves_are_saved_directly(live_game):
+    game, white, black = live_game
+    with CaptureQueriesContext(connection) as captured:
+        _play(game, white, black, ["e4", "e5"])
+    assert len(_game_writes(captured)) == 2
+    assert _row(game.id, "moves")["moves"] == "e4 e5"
+
+
+@pytest.mark.django_db
+def test_querysets_overlay_live_state_in_one_round_trip(fake_redis, live_game, create_game, auth_client, monkeypatch):
+    game, white, black = live_game
+    game_data, _, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    _play(game, white, black, ["e4"])
+    other = Game.objects.get(id=game_data["id"])
+    _play(other, other.white, other.black, ["d4"])
+
+    # Every HGETALL must arrive inside one pipeline.
+    reads, batches = [], []
+    hgetall, execute = fake_redis.hgetall, FakePipeline.execute
+    monkeypatch.setattr(fake_redis, "hgetall", lambda key: reads.append(key) or hgetall(key))
+    monkeypatch.setattr(FakePipeline, "execute", lambda pipe: batches.append(len(pipe.calls)) or execute(pipe))
+    games = {g.id: g for g in Game.objects.filter(id__in=[game.id, other.id])}
+    assert batches == [2] and len(reads) == 2
+    assert games[game.id].moves == "e4"
+    assert games[other.id].moves == "d4"
+    assert Game.objects.filter(id=game.id).without_live_state().get().moves == ""
+    assert batches == [2] and len(reads) == 2
+
+
+@pytest.mark.django_db
+def test_rolled_back_finish_leaves_the_game_playable(fake_redis, live_game, django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    game, white, black = live_game
+    _play(game, white, black, ["e4", "e5"])
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        try:
+            with transaction.atomic():
+                Game.objects.get(id=game.id).finish(Game.RESULT_WHITE)
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+    assert callbacks == []
+    assert fake_redis.hashes[LIVE_KEY.format(game.id)]["status"] == Game.STATUS_ACTIVE
+    assert str(game.id) in fake_redis.zsets[DIRTY_KEY]
+    assert _row(game.id, "status")["status"] == Game.STATUS_ACTIVE
+    result = apply_move(game.id, white, "Nf3")
+    assert result.ok, result.error
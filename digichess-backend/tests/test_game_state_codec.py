@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from games.event_stream import seq_key
+from games.game_state_codec import SCHEMA_VERSION, encode_game
+from games.models import Game
+from games.serializers import GameSerializer
+
+
+@pytest.mark.django_db
+def test_snapshot_agrees_with_game_serializer(active_game):
+    game, white, black = active_game("e4")
+    full = GameSerializer(game).data
+    compact = encode_game(game)
+
+    assert compact["v"] == SCHEMA_VERSION
+    assert compact["white"] == {"id": white.id, "username": white.username, "is_bot": False}
+    assert compact["black"]["id"] == black.id
+    for field in set(compact) - {"v", "turn", "white", "black", "creator"}:
+        assert compact[field] == full[field], field
+    assert compact["turn"] == "black"
+    assert len(json.dumps(compact)) < len(json.dumps(full)) / 2
+
+
+@pytest.mark.django_db
+def test_players_cost_at_most_one_query(active_game):
+    game, _, _ = active_game("e4")
+    with CaptureQueriesContext(connection) as queries:
+        encode_game(game)
+    assert len(queries) == 1
+
+    game = Game.objects.select_related("white", "black", "creator").get(id=game.id)
+    with CaptureQueriesContext(connection) as queries:
+        encode_game(game)
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_finished_game_carries_no_legal_moves(active_game, auth_client):
+    game, white, _ = active_game("e4")
+    auth_client(white)[0].post(f"/api/games/{game.id}/resign/")
+    game.refresh_from_db()
+
+    compact = encode_game(game)
+    assert compact["status"] == Game.STATUS_FINISHED
+    assert compact["legal_moves"] == compact["legal_moves_uci"] == []
+    assert compact["first_move_deadline"] is None
+
+
+@pytest.mark.django_db
+def test_events_fallback_sends_compact_snapshot(active_game, auth_client, fake_redis, monkeypatch):
+    game, white, _ = active_game("e4")
+    fake_redis.set(seq_key(game.id), 3)
+    monkeypatch.setattr("games.views_events.get_redis", lambda: fake_redis)
+
+    response = auth_client(white)[0].get(f"/api/games/{game.id}/events/", {"since": 1})
+    assert response.status_code == 200
+    event = response.data["events"][0]
+    assert event["type"] == "gameFull"
+    assert event["seq"] == 3
+    assert event["game"]["v"] == SCHEMA_VERSION
+    assert event["game"]["moves"] == "e4"
+    assert "e5" in event["game"]["legal_moves"]
@@ -1,7 +1,10 @@
+import chess
 import pytest
 from datetime import timedelta
 from django.utils import timezone
 
+from games import game_core
+from games.board_cache import board_cache
 from games.models import Game
 from games.tasks import check_first_move_timeouts
 
@@ -98,3 +101,62 @@ def test_black_first_move_timeout_after_white_moves(create_game, auth_client):
 
     game.refresh_from_db()
     assert game.status == Game.STATUS_ABORTED
+
+
+@pytest.mark.django_db
+def test_move_reuses_cached_board(create_game, auth_client, monkeypatch):
+    game_data, challenger, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    white_client, _ = auth_client(challenger)
+    black_client, _ = auth_client(opponent)
+
+    assert white_client.post(
+        f"/api/games/{game_data['id']}/move/", {"move": "e4"}, format="json"
+    ).status_code == 200
+
+    def should_not_replay(*args, **kwargs):
+        raise AssertionError("history should not be replayed on a cache hit")
+
+    monkeypatch.setattr(game_core, "build_board_from_moves", should_not_replay)
+    response = black_client.post(
+        f"/api/games/{game_data['id']}/move/", {"move": "e5"}, format="json"
+    )
+    assert response.status_code == 200
+    assert response.data["moves"] == "e4 e5"
+
+
+@pytest.mark.django_db
+def test_stale_cached_board_is_ignored(create_game, auth_client):
+    game_data, challenger, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    white_client, _ = auth_client(challenger)
+
+    stale = chess.Board()
+    stale.push_san("d4")
+    stale.push_san("d5")
+    board_cache.store(game_data["id"], stale)
+
+    response = white_client.post(
+        f"/api/games/{game_data['id']}/move/", {"move": "e4"}, format="json"
+    )
+    assert response.status_code == 200
+    game = Game.objects.get(id=game_data["id"])
+    assert game.moves == "e4"
+
+
+@pytest.mark.django_db
+def test_move_query_count_does_not_touch_tournament_table(create_game, auth_client, django_assert_max_num_queries):
+    game_data, challenger, opponent = create_game(preferred_color="white")
+    auth_client(opponent)[0].post(f"/api/games/{game_data['id']}/accept/")
+    white_client, _ = auth_client(challenger)
+    black_client, _ = auth_client(opponent)
+    assert white_client.post(
+        f"/api/games/{game_data['id']}/move/", {"move": "e4"}, format="json"
+    ).status_code == 200
+
+    with django_assert_max_num_queries(9) as captured:
+        response = black_client.post(
+            f"/api/games/{game_data['id']}/move/", {"move": "e5"}, format="json"
+        )
+    assert response.status_code == 200
+    assert not any("tournamentgame" in q["sql"].lower() for q in captured.captured_queries)
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from games.glicko2 import inflate_rd, rate_game, rate_period, replay_periods
+from games.models import Game
+from games.rating_recompute import recompute_ratings
+from games.rating_settlement import glicko2_update, idle_periods
+
+
+def test_matches_the_worked_example_from_the_paper():
+    rating, rd, vol = rate_period(
+        [1500, 1400, 1550, 1700], [200, 30, 100, 300], [0.06] * 4, [0, 0, 0], [1, 2, 3], [1, 0, 0]
+    )
+    assert rating[0] == pytest.approx(1464.06, abs=0.01)
+    assert rd[0] == pytest.approx(151.52, abs=0.01)
+    assert vol[0] == pytest.approx(0.05999, abs=1e-5)
+    # Opponents had no results of their own this period: only their RD grows.
+    assert list(rating[1:]) == [1400, 1550, 1700]
+    assert np.all(rd[1:] > [30, 100, 300])
+
+
+def test_single_game_is_symmetric_and_moves_volatility():
+    white, black = rate_game((1500, 350, 0.06), (1500, 350, 0.06), 1.0)
+    assert white[0] - 1500 == pytest.approx(1500 - black[0])
+    assert white[1] == pytest.approx(black[1])
+    assert white[1] < 350
+    assert white[2] != 0.06
+
+
+def test_inactivity_inflates_rd_up_to_the_cap():
+    assert inflate_rd(50.0, 0.06, 0) == pytest.approx(50.0)
+    assert 50 < inflate_rd(50.0, 0.06, 10) < inflate_rd(50.0, 0.06, 100) < 350
+    assert inflate_rd(50.0, 0.06, 10**6) == pytest.approx(350.0)
+
+    now = timezone.now()
+    assert idle_periods(None, now) == 1.0
+    assert idle_periods(now - timedelta(days=3), now) == pytest.approx(3.0)
+    fresh = glicko2_update((1500, 60.0, 0.06), (1500, 60.0, 0.06), 1.0, periods=0.01)
+    rusty = glicko2_update((1500, 60.0, 0.06), (1500, 60.0, 0.06), 1.0, periods=200)
+    assert rusty[0] - 1500 > fresh[0] - 1500 > 0
+
+
+def test_replay_is_one_rate_period_per_period():
+    rating, rd, vol = np.full(4, 1500.0), np.full(4, 350.0), np.full(4, 0.06)
+    white, black, score, period = [0, 2, 1, 0], [1, 3, 2, 3], [1.0, 0.5, 0.0, 1.0], [0, 0, 2, 2]
+
+    replayed = replay_periods(rating, rd, vol, period, white, black, score, until=4)
+
+    expected = rate_period(rating, rd, vol, [0, 2, 1, 3], [1, 3, 0, 2], [1.0, 0.5, 0.0, 0.5])
+    expected = rate_period(*expected, [1, 0, 2, 3], [2, 3, 1, 0], [0.0, 1.0, 1.0, 0.0], periods=2)
+    assert np.allclose(replayed[0], expected[0])
+    assert np.allclose(replayed[1], inflate_rd(expected[1], expected[2], 2))
+
+
+def _settled_games(players, results):
+    start = timezone.now() - timedelta(days=len(results))
+    for day, (white, black, result) in enumerate(results):
+        Game.objects.create(
+            creator=players[white],
+            white=players[white],
+            black=players[black],
+            time_control=Game.TIME_BLITZ,
+            rated=True,
+            status=Game.STATUS_FINISHED,
+            result=result,
+            finished_at=start + timedelta(days=day),
+            white_rating_delta=0,
+            black_rating_delta=0,
+        )
+
+
+@pytest.mark.django_db
+def test_recompute_rebuilds_ratings_from_history(create_user):
+    players = [create_user() for _ in range(3)]
+    _settled_games(players, [(0, 1, Game.RESULT_WHITE), (1, 2, Game.RESULT_DRAW), (2, 0, Game.RESULT_BLACK)])
+
+    stats = recompute_ratings("blitz")
+    assert (stats["games"], stats["periods"]) == (3, 3)
+    assert stats["updated"] >= 3
+    for user in players:
+        user.refresh_from_db()
+    assert players[0].rating_blitz > 800 > players[1].rating_blitz
+    assert 45 <= players[0].rating_blitz_rd < 350
+    assert recompute_ratings("blitz")["updated"] == 0
+
+
+@pytest.mark.django_db
+def test_recompute_leaves_bots_and_players_without_games_alone(create_user):
+    players = [create_user() for _ in range(2)]
+    bot = create_user(is_bot=True, rating_blitz=2500)
+    idle = create_user(rating_blitz=1900)
+    _settled_games(players, [(0, 1, Game.RESULT_WHITE)])
+
+    stats = recompute_ratings("blitz")
+    assert stats["updated"] == 2
+    bot.refresh_from_db()
+    idle.refresh_from_db()
+    assert (bot.rating_blitz, idle.rating_blitz) == (2500, 1900)
+
+
+@pytest.mark.django_db
+def test_recompute_skips_players_rated_after_the_load(create_user, monkeypatch):
+    from games import rating_recompute
+
+    players = [create_user() for _ in range(3)]
+    _settled_games(players, [(0, 1, Game.RESULT_WHITE), (1, 2, Game.RESULT_DRAW)])
+    load_games = rating_recompute._load_games
+
+    def settle_meanwhile(*args):
+        loaded = load_games(*args)
+        # settle_games rates a new game for player 0 while the recompute runs.
+        get_user_model().objects.filter(id=players[0].id).update(rating_blitz=1234)
+        return loaded
+
+    monkeypatch.setattr(rating_recompute, "_load_games", settle_meanwhile)
+    stats = recompute_ratings("blitz")
+    assert (stats["updated"], stats["skipped"]) == (2, 1)
+    players[0].refresh_from_db()
+    assert players[0].rating_blitz == 1234
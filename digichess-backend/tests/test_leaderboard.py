@@ -0,0 +1,92 @@
+import pytest
+
+from games import leaderboard, views_leaderboard
+from games.models import Game
+from games.views import FinishGameView
+
+
+@pytest.fixture
+def players(create_user):
+    users = [
+        create_user(username="low", rating_blitz=1200),
+        create_user(username="top", rating_blitz=1900),
+        create_user(username="mid_sure", rating_blitz=1500, rating_blitz_rd=60.0),
+        create_user(username="mid_new", rating_blitz=1500, rating_blitz_rd=300.0),
+    ]
+    create_user(username="bot", rating_blitz=2500, is_bot=True)
+    create_user(username="inactive", rating_blitz=2400, is_active=False)
+    return users
+
+
+def _usernames(response):
+    return [item["username"] for item in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_leaderboard_falls_back_to_database_without_redis(api_client, players, monkeypatch, django_assert_max_num_queries):
+    monkeypatch.setattr(views_leaderboard, "get_redis", lambda: None)
+    with django_assert_max_num_queries(2):
+        response = api_client.get("/api/games/leaderboard/ratings/", {"mode": "blitz", "limit": 3})
+    assert response.status_code == 200
+    assert response.data["total"] == 4
+    assert _usernames(response) == ["top", "mid_sure", "mid_new"]
+    assert [item["rating"] for item in response.data["results"]] == [1900, 1500, 1500]
+
+
+@pytest.mark.django_db
+def test_redis_leaderboard_matches_database_and_ranks_me(api_client, auth_client, players, fake_redis, monkeypatch):
+    monkeypatch.setattr(views_leaderboard, "get_redis", lambda: fake_redis)
+
+    # Not rebuilt yet: served from the database.
+    before = api_client.get("/api/games/leaderboard/ratings/", {"mode": "blitz"})
+    counts = leaderboard.rebuild(fake_redis)
+    assert counts["blitz"] == 4
+
+    client, _ = auth_client(players[0])
+    after = client.get("/api/games/leaderboard/ratings/", {"mode": "blitz", "page": 2, "limit": 2})
+    assert _usernames(after) == ["mid_new", "low"]
+    assert after.data["total"] == 4
+    assert after.data["me"] == {"rank": 4, "rating": 1200}
+    assert _usernames(api_client.get("/api/games/leaderboard/ratings/", {"mode": "blitz"})) == _usernames(before)
+
+    quiz = client.get("/api/games/leaderboard/digiquiz/")
+    assert quiz.data["total"] == 4
+    assert quiz.data["me"]["rank"] == 1  # all tied at 0: earliest account first
+
+
+@pytest.mark.django_db
+def test_rated_game_updates_redis_leaderboard(
+    create_game, auth_client, fake_redis, monkeypatch, django_capture_on_commit_callbacks
+):
+    monkeypatch.setattr(views_leaderboard, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr("utils.redis_client.get_redis", lambda: fake_redis)
+    game_data, white, black = create_game(preferred_color="white")
+    auth_client(black)[0].post(f"/api/games/{game_data['id']}/accept/")
+    leaderboard.rebuild(fake_redis)
+    assert leaderboard.rank(fake_redis, "blitz", white.id) == 1  # tied; lower id first
+
+    game = Game.objects.get(id=game_data["id"])
+    game.finish(Game.RESULT_BLACK)
+    with django_capture_on_commit_callbacks(execute=True):
+        FinishGameView().update_ratings(game, Game.RESULT_BLACK)
+
+    assert leaderboard.rank(fake_redis, "blitz", black.id) == 1
+    assert leaderboard.rank(fake_redis, "blitz", white.id) == 2
+    black.refresh_from_db()
+    response = auth_client(black)[0].get("/api/games/leaderboard/ratings/", {"mode": "blitz"})
+    assert response.data["results"][0]["rating"] == black.rating_blitz > 800
+    assert response.data["me"]["rank"] == 1
+
+
+@pytest.mark.django_db
+def test_deactivated_users_are_dropped_from_redis_leaderboard(api_client, players, fake_redis, monkeypatch):
+    monkeypatch.setattr(views_leaderboard, "get_redis", lambda: fake_redis)
+    leaderboard.rebuild(fake_redis, ["blitz"])
+    top = players[1]
+    top.is_active = False
+    top.save(update_fields=["is_active"])
+
+    response = api_client.get("/api/games/leaderboard/ratings/", {"mode": "blitz", "limit": 2})
+    assert _usernames(response) == ["mid_sure", "mid_new"]
+    assert leaderboard.rank(fake_redis, "blitz", top.id) is None
+    assert response.data["total"] == 3
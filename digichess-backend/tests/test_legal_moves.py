@@ -0,0 +1,92 @@
+import chess
+import pytest
+
+from games import legal_moves
+from games.lichess_game_flow import get_game_state_export
+from games.models import Game
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = legal_moves.LegalMoveCache(max_size=8)
+    monkeypatch.setattr(legal_moves, "legal_move_cache", cache)
+    monkeypatch.setattr(legal_moves, "get_redis", lambda: None)
+    return cache
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        chess.STARTING_FEN,
+        "r3k2r/pppq1ppp/2npbn2/4p3/2B1P3/2NP1N2/PPPQ1PPP/R3K2R w KQkq - 4 8",  # both castles
+        "8/P6k/8/8/8/8/6Kp/8 w - - 0 1",  # promotions
+        "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",  # mated
+    ],
+)
+def test_payload_matches_board(fresh_cache, fen):
+    board = chess.Board(fen)
+    expected_uci = [move.uci() for move in board.legal_moves]
+    expected_san = [board.san(move) for move in board.legal_moves]
+
+    assert legal_moves.legal_moves_for_fen(fen) == {"san": expected_san, "uci": expected_uci}
+    assert legal_moves.legal_moves_for_board(board) == {"san": expected_san, "uci": expected_uci}
+    assert fresh_cache.stats()["computed"] == 1
+
+
+def test_invalid_fen_has_no_moves(fresh_cache):
+    assert legal_moves.legal_moves_for_fen("not a fen") == {"san": [], "uci": []}
+
+
+def test_lru_is_bounded_and_ignores_move_clocks(fresh_cache):
+    board = chess.Board()
+    fens = []
+    for san in ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6", "Ba4", "Nf6", "O-O", "Be7"]:
+        board.push_san(san)
+        fens.append(board.fen())
+        legal_moves.legal_moves_for_board(board)
+    assert fresh_cache.stats()["size"] == 8
+
+    *position, _halfmove, _fullmove = fens[-1].split()
+    legal_moves.legal_moves_for_fen(" ".join(position + ["0", "99"]))
+    assert fresh_cache.stats()["local_hits"] == 1
+
+
+def test_redis_tier_is_shared_between_processes(fake_redis, monkeypatch):
+    monkeypatch.setattr(legal_moves, "get_redis", lambda: fake_redis)
+    first = legal_moves.LegalMoveCache()
+    second = legal_moves.LegalMoveCache()  # another worker: empty LRU
+
+    monkeypatch.setattr(legal_moves, "legal_move_cache", first)
+    payload = legal_moves.legal_moves_for_fen(chess.STARTING_FEN)
+    monkeypatch.setattr(legal_moves, "legal_move_cache", second)
+    assert legal_moves.legal_moves_for_fen(chess.STARTING_FEN) == payload
+    assert first.stats()["computed"] == 1
+    assert second.stats()["redis_hits"] == 1
+    assert second.stats()["computed"] == 0
+
+
+@pytest.mark.django_db
+def test_move_serializer_and_socket_export_share_one_computation(fresh_cache, create_game, auth_client, monkeypatch):
+    computed = []
+    real_compute = legal_moves._compute
+
+    def counting_compute(board):
+        computed.append(board.fen())
+        return real_compute(board)
+
+    monkeypatch.setattr(legal_moves, "_compute", counting_compute)
+    game_data, white, black = create_game(preferred_color="white")
+    auth_client(black)[0].post(f"/api/games/{game_data['id']}/accept/")
+    client = auth_client(white)[0]
+
+    computed.clear()
+    response = client.post(f"/api/games/{game_data['id']}/move/", {"move": "e4"}, format="json")
+    assert response.status_code == 200
+    game = Game.objects.get(id=game_data["id"])
+    detail = client.get(f"/api/games/{game.id}/")
+    export = get_game_state_export(game.current_fen, game.moves)
+
+    assert len(computed) == 1
+    assert response.data["legal_moves"] == detail.data["legal_moves"] == export["legal_moves"]["san"]
+    assert detail.data["legal_moves_uci"] == export["legal_moves"]["uci"]
+    assert "e5" in export["legal_moves"]["san"]
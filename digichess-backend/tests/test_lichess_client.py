@@ -0,0 +1,164 @@
+import chess
+import pytest
+from django.core.cache import cache
+
+from games import analysis_service, lichess_api
+from games.eval_cache import eval_cache, normalize_fen
+from games.lichess_client import PAUSE_KEY, CircuitBreaker, LichessClient, TokenBucket
+from games.models import Game
+from tests.fake_lichess_server import FakeLichessServer
+
+# Includes an illegal move (Qh8) and a knight shuffle that repeats positions.
+MOVES = "e4 e5 Qh8 Nf3 Nc6 Ng1 Nb8 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d4 exd4 cxd4 Bb4+ Bd2 Bxd2+ Nbxd2 d5"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def server():
+    cache.clear()
+    with FakeLichessServer() as running:
+        yield running
+    cache.clear()
+
+
+@pytest.fixture
+def use_client(server, monkeypatch):
+    """Point lichess_api and analysis_service at a fresh client talking to ``server``."""
+
+    def use(**options):
+        options.setdefault("rate_per_second", 1000)
+        options.setdefault("burst", 1000)
+        client = LichessClient(base_url=server.url, **options)
+        monkeypatch.setattr(lichess_api, "lichess_client", client)
+        monkeypatch.setattr(analysis_service, "lichess_client", client)
+        return client
+
+    return use
+
+
+def _fens(count):
+    board = chess.Board()
+    fens = []
+    for move in ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6", "Ba4", "Nf6"][:count]:
+        board.push_san(move)
+        fens.append(board.fen())
+    return fens
+
+
+def test_connection_is_reused(server, use_client):
+    use_client(max_concurrency=1)
+    for fen in _fens(5):
+        assert lichess_api.get_cloud_evaluation(fen)["pvs"]
+    assert server.requests == 5
+    assert len(server.connections) == 1
+
+
+def test_answers_and_misses_are_cached(server, use_client):
+    client = use_client()
+    fen = _fens(1)[0]
+    server.missing.add(chess.Board(fen).epd())
+    assert lichess_api.get_cloud_evaluation(fen) is None
+    assert lichess_api.get_cloud_evaluation(fen) is None
+    assert lichess_api.get_opening_explorer(fen)["moves"]
+    assert lichess_api.get_opening_explorer(fen)["moves"]
+    assert server.requests == 2
+    assert client.stats()["cache_hits"] == 2
+
+
+def test_429_pauses_every_caller(server, use_client):
+    client = use_client()
+    fens = _fens(3)
+    server.fail_next(429)
+    assert lichess_api.get_cloud_evaluation(fens[0]) is None
+    # Paused: nobody calls Lichess until Retry-After has passed.
+    assert lichess_api.get_cloud_evaluation(fens[1]) is None
+    assert server.requests == 1
+    assert client.stats()["rate_limited"] == 1
+    assert client.stats()["paused"] == 1
+    assert 0 < client.paused_for() <= server.retry_after
+
+    cache.delete(PAUSE_KEY)
+    assert lichess_api.get_cloud_evaluation(fens[2])["pvs"]
+
+
+def test_breaker_opens_then_recovers_after_one_trial(server, use_client):
+    clock = FakeClock()
+    client = use_client()
+    client.breaker = CircuitBreaker(threshold=2, reset_after=30, clock=clock)
+    fens = _fens(4)
+    server.fail_next(500, times=2)
+    assert lichess_api.get_cloud_evaluation(fens[0]) is None
+    assert lichess_api.get_cloud_evaluation(fens[1]) is None
+    assert client.breaker.state == "open"
+    assert lichess_api.get_cloud_evaluation(fens[2]) is None
+    assert server.requests == 2
+
+    clock.now += 30
+    assert client.breaker.state == "half_open"
+    assert client.breaker.allow()
+    assert not client.breaker.allow()  # one trial at a time
+    client.breaker.record_failure()
+    assert client.breaker.state == "open"
+
+    clock.now += 30
+    assert lichess_api.get_cloud_evaluation(fens[3])["pvs"]
+    assert client.breaker.state == "closed"
+
+
+def test_token_bucket_paces_and_gives_up():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(0) and bucket.acquire(0)
+    assert not bucket.acquire(0.1)
+    assert bucket.acquire(1)
+    assert clock.now == pytest.approx(0.5)
+
+
+def _purge(depth):
+    board = chess.Board()
+    fens = []
+    for san in MOVES.split():
+        try:
+            board.push_san(san)
+        except ValueError:
+            continue
+        fens.append(normalize_fen(board))
+    eval_cache.purge(fens, depth)
+
+
+@pytest.mark.django_db
+def test_concurrent_lichess_analysis_matches_serial(server, use_client):
+    server.latency = 0.02
+    game = Game(id=1, moves=MOVES, current_fen="")
+
+    use_client(max_concurrency=1)
+    _purge(18)
+    serial = analysis_service.analyze_game_with_lichess(game, depth=18)
+    assert server.max_in_flight == 1
+
+    cache.clear()
+    _purge(18)
+    server.max_in_flight = 0
+    use_client(max_concurrency=4)
+    seen = []
+    concurrent = analysis_service.analyze_game_with_lichess(
+        game, depth=18, progress=lambda event, done, total: seen.append((event["ply"], done, total))
+    )
+    _purge(18)
+
+    assert concurrent["moves"] == serial["moves"]
+    assert concurrent["summary"]["errors"] == serial["summary"]["errors"]
+    assert concurrent["summary"]["analyzed_moves"] == len(MOVES.split()) - 1
+    assert server.max_in_flight > 1
+    assert sorted(ply for ply, _, _ in seen) == [m["move_number"] for m in concurrent["moves"]]
+    assert [done for _, done, _ in seen] == list(range(1, len(seen) + 1))
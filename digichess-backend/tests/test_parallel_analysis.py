@@ -0,0 +1,120 @@
+import sys
+import threading
+from pathlib import Path
+
+import chess.engine
+import pytest
+
+from games import analysis_service
+from games.eval_cache import eval_cache, normalize_fen
+from games.models import Game
+
+FAKE_ENGINE = [sys.executable, str(Path(__file__).with_name("fake_uci_engine.py"))]
+# Includes an illegal move (Qh8) and a knight shuffle that repeats positions.
+MOVES = (
+    "e4 e5 Qh8 Nf3 Nc6 Ng1 Nb8 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d4 exd4 cxd4 Bb4+ "
+    "Bd2 Bxd2+ Nbxd2 d5 exd5 Nxd5 Qb3 Na5 Qa4+ c6 Bxd5 Qxd5 O-O O-O Rfe1"
+)
+
+
+def _purge(moves, depth):
+    board = chess.Board()
+    fens = []
+    for san in moves.split():
+        try:
+            board.push_san(san)
+        except ValueError:
+            continue
+        fens.append(normalize_fen(board))
+    eval_cache.purge(fens, depth)
+
+
+@pytest.mark.django_db
+def test_parallel_analysis_matches_serial(monkeypatch, settings):
+    settings.ANALYSIS_CHUNK_PLIES = 4
+    game = Game(id=1, moves=MOVES, current_fen="")
+
+    serial = analysis_service.analyze_game_with_stockfish(game, FAKE_ENGINE, time_per_move=0.01, depth=8, workers=1)
+
+    threads = set()
+    original = chess.engine.SimpleEngine.analyse
+
+    def tracking_analyse(self, *args, **kwargs):
+        threads.add(threading.current_thread().name)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(chess.engine.SimpleEngine, "analyse", tracking_analyse)
+    _purge(MOVES, 8)
+    parallel = analysis_service.analyze_game_with_stockfish(game, FAKE_ENGINE, time_per_move=0.01, depth=8, workers=4)
+
+    assert len([name for name in threads if name.startswith("analysis")]) > 1
+    assert parallel["moves"] == serial["moves"]
+    assert parallel["errors"] == serial["errors"]
+    assert parallel["errors"][0].startswith("Move 3 (Qh8)")
+    assert parallel["summary"]["white"] == serial["summary"]["white"]
+    assert parallel["summary"]["black"] == serial["summary"]["black"]
+    cache_serial = serial["summary"]["eval_cache"]
+    cache_parallel = parallel["summary"]["eval_cache"]
+    assert (cache_parallel["hits"], cache_parallel["misses"]) == (cache_serial["hits"], cache_serial["misses"])
+    assert cache_serial["hits"] == 3
+
+
+def test_analysis_workers_respects_pool_limit(settings):
+    settings.ANALYSIS_WORKERS = 64
+    assert analysis_service.analysis_workers() == analysis_service.engine_pool.max_per_key
+    assert analysis_service.analysis_workers(1) == 1
+    settings.ANALYSIS_WORKERS = 0
+    assert 1 <= analysis_service.analysis_workers() <= analysis_service.engine_pool.max_per_key
+
+
+@pytest.mark.django_db
+def test_parallel_analysis_reports_every_ply_once(settings):
+    settings.ANALYSIS_CHUNK_PLIES = 4
+    game = Game(id=1, moves=MOVES, current_fen="")
+    _purge(MOVES, 8)
+    events = []
+    result = analysis_service.analyze_game_with_stockfish(
+        game, FAKE_ENGINE, time_per_move=0.01, depth=8, workers=4,
+        progress=lambda event, done, total: events.append((event, done, total)),
+    )
+
+    analysed = len(result["moves"])
+    assert [done for _, done, _ in events] == list(range(1, analysed + 1))
+    assert {total for _, _, total in events} == {analysed}
+    by_ply = {event["ply"]: event for event, _, _ in events}
+    assert sorted(by_ply) == [move["move_number"] for move in result["moves"]]
+    assert all(by_ply[move["move_number"]]["eval"] == move["eval"] for move in result["moves"])
+
+
+@pytest.mark.django_db
+def test_progressive_analysis_publishes_a_sweep_then_refines():
+    game = Game(id=1, moves=MOVES, current_fen="")
+    _purge(MOVES, 3)
+    _purge(MOVES, 8)
+    passes, events = [], []
+    result = analysis_service.analyze_game_progressively(
+        game, FAKE_ENGINE, time_per_move=0.01, depth=8, workers=2, sweep_depths=[3, 12],
+        progress=lambda event, done, total: events.append(event),
+        on_pass=lambda analysis: passes.append(dict(analysis["summary"])),
+    )
+
+    assert [(p["pass_depth"], p["passes"], p["refined"]) for p in passes] == [(3, 1, False), (8, 2, True)]
+    assert all(p["analyzed_moves"] == result["summary"]["analyzed_moves"] for p in passes)
+    assert {event["pass_depth"] for event in events} == {3, 8}
+    assert result["summary"]["refined"] is True
+    single = analysis_service.analyze_game_with_stockfish(game, FAKE_ENGINE, time_per_move=0.01, depth=8)
+    assert result["moves"] == single["moves"]
+
+
+@pytest.mark.django_db
+def test_progressive_analysis_stops_after_the_sweep_when_unwatched():
+    game = Game(id=1, moves=MOVES, current_fen="")
+    _purge(MOVES, 3)
+    passes = []
+    result = analysis_service.analyze_game_progressively(
+        game, FAKE_ENGINE, time_per_move=0.01, depth=8, workers=1, sweep_depths=[3],
+        on_pass=passes.append, keep_refining=lambda: False,
+    )
+    assert len(passes) == 1
+    assert result["summary"]["pass_depth"] == 3
+    assert result["summary"]["refined"] is False
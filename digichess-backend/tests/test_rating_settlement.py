@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models_rating_history import RatingHistory
+from games import rating_settlement
+from games.models import Game
+from games.rating_settlement import glicko2_update, idle_periods, queue_settlement, settle_games, settle_pending
+
+
+@pytest.fixture
+def finished_games(create_user):
+    def _make(pairs, minutes_ago=0):
+        finished_at = timezone.now() - timedelta(minutes=minutes_ago)
+        games = []
+        for index, (white, black, result) in enumerate(pairs):
+            games.append(
+                Game.objects.create(
+                    creator=white,
+                    white=white,
+                    black=black,
+                    time_control=Game.TIME_BLITZ,
+                    rated=True,
+                    status=Game.STATUS_FINISHED,
+                    result=result,
+                    finished_at=finished_at + timedelta(seconds=index),
+                )
+            )
+        return games
+
+    return _make
+
+
+@pytest.mark.django_db
+def test_round_settles_in_constant_queries_and_matches_one_by_one(create_user, finished_games):
+    players = [create_user() for _ in range(12)]
+    pairs = [(players[i], players[i + 6], Game.RESULT_WHITE if i % 3 else Game.RESULT_DRAW) for i in range(6)]
+    # A seventh game for the first player: applied after their first one.
+    pairs.append((players[6], players[0], Game.RESULT_BLACK))
+    games = finished_games(pairs)
+
+    expected = {user.id: (user.rating_blitz, user.rating_blitz_rd, user.rating_blitz_vol) for user in players}
+    last_played = {}
+    for game, (white, black, result) in zip(games, pairs):
+        w, b = expected[white.id], expected[black.id]
+        score = {Game.RESULT_WHITE: 1, Game.RESULT_BLACK: 0}.get(result, 0.5)
+        w_idle = idle_periods(last_played.get(white.id), game.finished_at)
+        b_idle = idle_periods(last_played.get(black.id), game.finished_at)
+        expected[white.id] = glicko2_update(w, b, score, w_idle)
+        expected[black.id] = glicko2_update(b, w, 1 - score, b_idle)
+        last_played[white.id] = last_played[black.id] = game.finished_at
+
+    with CaptureQueriesContext(connection) as queries:
+        deltas = settle_games([game.id for game in games])
+    statements = [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+
+    assert len(deltas) == 7
+    assert len(statements) <= 6
+    for user in players:
+        user.refresh_from_db()
+        assert (user.rating_blitz, user.rating_blitz_rd, user.rating_blitz_vol) == expected[user.id]
+    assert RatingHistory.objects.filter(source="game").count() == 14
+    games[-1].refresh_from_db()
+    assert (games[-1].white_rating_delta, games[-1].black_rating_delta) == deltas[games[-1].id]
+
+
+@pytest.mark.django_db
+def test_settlement_is_idempotent_per_game(create_user, finished_games):
+    white, black = create_user(), create_user()
+    (game,) = finished_games([(white, black, Game.RESULT_WHITE)])
+
+    first = settle_games([game.id, game.id])
+    white.refresh_from_db()
+    rating = white.rating_blitz
+    assert settle_games([game.id]) == {}
+    white.refresh_from_db()
+    assert white.rating_blitz == rating > 800
+    assert first[game.id][0] == rating - 800
+    assert RatingHistory.objects.filter(user=white).count() == 1
+
+
+@pytest.mark.django_db
+def test_unrated_and_unfinished_games_are_left_alone(create_user, finished_games):
+    white, black = create_user(), create_user()
+    unrated, aborted = finished_games([(white, black, Game.RESULT_WHITE), (white, black, Game.RESULT_NONE)])
+    unrated.rated = False
+    unrated.save(update_fields=["rated"])
+    assert settle_games([unrated.id, aborted.id]) == {}
+
+
+@pytest.mark.django_db
+def test_queue_batches_games_and_broadcasts_deltas(
+    create_user, finished_games, fake_redis, monkeypatch, django_capture_on_commit_callbacks
+):
+    monkeypatch.setattr(rating_settlement, "get_redis", lambda: fake_redis)
+    players = [create_user() for _ in range(4)]
+    games = finished_games([(players[0], players[1], Game.RESULT_WHITE), (players[2], players[3], Game.RESULT_BLACK)])
+
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f"game_{games[0].id}", channel)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert queue_settlement(games) == {}
+        games[0].refresh_from_db()
+        assert games[0].white_rating_delta is None
+
+    games[0].refresh_from_db()
+    assert games[0].white_rating_delta > 0
+    assert fake_redis.lists[rating_settlement.RATING_QUEUE_KEY] == []
+    event = async_to_sync(channel_layer.receive)(channel)
+    assert event["payload"]["type"] == "ratings_updated"
+    assert event["payload"]["game"]["white_rating_delta"] == games[0].white_rating_delta
+
+
+@pytest.mark.django_db
+def test_sweep_settles_games_the_queue_lost(create_user, finished_games):
+    white, black = create_user(), create_user()
+    (lost,) = finished_games([(white, black, Game.RESULT_BLACK)], minutes_ago=5)
+    (recent,) = finished_games([(white, black, Game.RESULT_BLACK)])
+
+    deltas = settle_pending()
+    assert set(deltas) == {lost.id}
+    recent.refresh_from_db()
+    assert recent.white_rating_delta is None
@@ -0,0 +1,72 @@
+import pytest
+
+from utils import redis_client
+
+
+@pytest.fixture(autouse=True)
+def _fresh_clients():
+    redis_client.reset_redis_clients()
+    yield
+    redis_client.reset_redis_clients()
+
+
+def test_breaker_opens_after_failed_probe(monkeypatch, settings):
+    settings.REDIS_URL = "redis://127.0.0.1:1/0"
+    assert redis_client.get_redis() is None
+    assert redis_client.breaker.state == redis_client.RedisCircuitBreaker.OPEN
+
+    # While open, callers get None without touching the network.
+    def _no_pool():
+        raise AssertionError("pool should not be used while the breaker is open")
+
+    monkeypatch.setattr(redis_client, "_get_pool", _no_pool)
+    assert redis_client.get_redis() is None
+
+
+def test_breaker_half_opens_after_cooldown(monkeypatch):
+    breaker = redis_client.RedisCircuitBreaker(cooldown=0.0)
+    breaker.record_failure()
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.needs_probe()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    assert not breaker.needs_probe()
+
+
+def test_clients_share_one_pool(monkeypatch):
+    monkeypatch.setattr(redis_client.breaker, "_state", redis_client.RedisCircuitBreaker.CLOSED)
+    first = redis_client.get_redis()
+    second = redis_client.get_redis()
+    assert first is not None and second is not None
+    assert first.connection_pool is second.connection_pool
+    assert redis_client.redis_pool_stats()["breaker_state"] == "closed"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [redis_client.redis.exceptions.MaxConnectionsError, redis_client.redis.ConnectionError],
+    ids=["max-connections-error", "older-redis-py"],
+)
+def test_exhausted_pool_does_not_trip_the_breaker(monkeypatch, error):
+    monkeypatch.setattr(redis_client.breaker, "_state", redis_client.RedisCircuitBreaker.CLOSED)
+
+    def exhausted(self, *args, **options):
+        raise error("Too many connections")
+
+    monkeypatch.setattr(redis_client.redis.Redis, "execute_command", exhausted)
+    client = redis_client.get_redis()
+    with pytest.raises(redis_client.redis.ConnectionError):
+        client.get("key")
+    assert redis_client.breaker.state == redis_client.RedisCircuitBreaker.CLOSED
+    assert redis_client.breaker.failures == 0
+
+
+def test_only_one_caller_probes_when_half_open():
+    breaker = redis_client.RedisCircuitBreaker(cooldown=0.0)
+    breaker.record_failure()
+    assert breaker.try_probe()
+    assert not breaker.try_probe()
+    breaker.end_probe()
+    assert breaker.try_probe()
+    breaker.record_success()
+    assert not breaker.try_probe()
@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from games.models import Game, Tournament, TournamentGame, TournamentParticipant
+from games.swiss_pairing import SwissPlayer, apply_round_results, assign, pair_round
+from games.tournament_lifecycle import build_tournament_standings, generate_swiss_pairings
+
+
+def field(count):
+    return {idx: SwissPlayer(id=idx, rating=2000 - idx * 10) for idx in range(1, count + 1)}
+
+
+def test_assignment_is_optimal_on_a_small_matrix():
+    cost = np.array([[4.0, 1.0, 3.0], [2.0, 0.0, 5.0], [3.0, 2.0, 2.0]])
+    columns = assign(cost)
+    assert sorted(columns) == [0, 1, 2]
+    assert sum(cost[row, col] for row, col in enumerate(columns)) == 5.0
+
+
+def test_first_round_is_dutch_and_deterministic():
+    players = list(field(8).values())
+    first = pair_round(players, seed=7)
+    assert first == pair_round(players, seed=7)
+    assert [frozenset(pair) for pair in first.pairings] == [
+        frozenset((1, 5)), frozenset((2, 6)), frozenset((3, 7)), frozenset((4, 8))
+    ]
+    # Colours alternate down the boards from the seeded initial colour.
+    top_is_white = [pair[0] in (1, 2, 3, 4) for pair in first.pairings]
+    assert top_is_white in ([True, False, True, False], [False, True, False, True])
+
+
+def test_bottom_players_are_not_forced_into_a_rematch():
+    players = field(4)
+    players[3].opponents.add(4)
+    players[4].opponents.add(3)
+    # Greedy top-down pairing would take 1-2 and leave 3-4 to replay.
+    result = pair_round(list(players.values()))
+    assert result.rematches == 0
+    assert {frozenset(pair) for pair in result.pairings} == {frozenset((1, 3)), frozenset((2, 4))}
+
+
+def test_a_round_that_needs_a_rematch_still_pairs_everyone():
+    # Two players who already met, in round 2, with the same absolute colour need.
+    players = field(2)
+    players[1].opponents.add(2)
+    players[2].opponents.add(1)
+    players[1].recent_colors = players[2].recent_colors = "bb"
+    result = pair_round(list(players.values()))
+    assert result.rematches == 1
+    assert [frozenset(pair) for pair in result.pairings] == [frozenset((1, 2))]
+
+    # More rounds than players minus one: everyone has met everyone.
+    players = field(4)
+    for player in players.values():
+        player.opponents = set(players) - {player.id}
+    result = pair_round(list(players.values()))
+    assert result.rematches == 2
+    assert sorted(idx for pair in result.pairings for idx in pair) == [1, 2, 3, 4]
+
+
+def test_bye_goes_to_the_lowest_player_without_one_and_colours_are_respected():
+    players = field(5)
+    players[5].byes = 1
+    players[1].recent_colors, players[1].color_balance = "ww", 2
+    result = pair_round(list(players.values()))
+    assert result.bye == 4
+    board = next(pair for pair in result.pairings if 1 in pair)
+    assert board[1] == 1
+
+
+def test_eleven_rounds_without_rematches_or_colour_violations():
+    rng = random.Random(3)
+    players = field(40)
+    history = {idx: "" for idx in players}
+    byes = []
+    for _ in range(11):
+        result = pair_round(list(players.values()), seed=1)
+        paired = [pid for pair in result.pairings for pid in pair]
+        assert len(paired) == len(set(paired)) == 40
+        assert result.rematches == 0
+        for white, black in result.pairings:
+            history[white] += "w"
+            history[black] += "b"
+        apply_round_results(players, result, {w: rng.choice([0.0, 0.5, 1.0]) for w, _ in result.pairings})
+        byes.append(result.bye)
+    assert byes == [None] * 11
+    for colours in history.values():
+        assert "www" not in colours and "bbb" not in colours
+        assert abs(colours.count("w") - colours.count("b")) <= 2
+
+
+@pytest.mark.django_db
+def test_odd_swiss_field_records_a_bye(create_user):
+    creator = create_user()
+    tournament = Tournament.objects.create(
+        name="Swiss bye",
+        creator=creator,
+        type=Tournament.TYPE_SWISS,
+        time_control=Game.TIME_BLITZ,
+        start_at=timezone.now(),
+        status=Tournament.STATUS_ACTIVE,
+        swiss_rounds=3,
+        current_round=1,
+    )
+    players = [create_user(rating_blitz=1500 - idx * 50) for idx in range(5)]
+    for player in players:
+        TournamentParticipant.objects.create(tournament=tournament, user=player)
+
+    created = generate_swiss_pairings(tournament, round_number=1)
+    assert len(created) == 2
+    assert generate_swiss_pairings(tournament, round_number=1) == []  # round is open
+    standings = {row["user_id"]: row["score"] for row in build_tournament_standings(tournament)}
+    assert standings[players[-1].id] == 1.0
+    assert TournamentGame.objects.filter(tournament=tournament).count() == 2
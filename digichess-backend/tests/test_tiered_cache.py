@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from utils import tiered_cache
+from utils.tiered_cache import TieredCache
+
+
+def _process(**options):
+    """A backend with its own L1, as a separate worker process would have."""
+    tiered_cache._local_tiers.clear()
+    return TieredCache("", {"KEY_PREFIX": "t", "TIMEOUT": 60, "OPTIONS": options})
+
+
+@pytest.fixture
+def redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(tiered_cache, "get_redis", lambda: fake_redis)
+    yield fake_redis
+    tiered_cache._local_tiers.clear()
+
+
+def test_two_processes_see_each_others_writes(redis):
+    a, b = _process(), _process()
+    a.set("board", {"fen": "start"})
+    assert b.get("board") == {"fen": "start"}  # now cached in b's L1 as well
+
+    a.set("board", {"fen": "after e4"})
+    assert b.get("board") == {"fen": "after e4"}
+
+    b.delete("board")
+    assert a.get("board") is None
+
+    a.set("visits", 1)
+    b.incr("visits", 5)
+    assert a.get("visits") == 6
+    assert redis.strings["t:1:visits"] == "6"
+
+    a.set("other", "x")
+    b.get("other")
+    a.clear()
+    assert b.get("other") is None
+
+
+def test_repeat_reads_are_served_from_l1(redis):
+    cache = _process()
+    cache.set("k", "v")
+    redis.commands.clear()
+    for _ in range(5):
+        assert cache.get("k") == "v"
+    assert redis.commands == []
+    stats = cache.stats()["process"]
+    assert stats["l1_hits"] == 5
+    assert stats["hit_rate"] == 1.0
+
+
+def test_l1_is_bounded_lru(redis):
+    cache = _process(MAX_ENTRIES=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    redis.commands.clear()
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert redis.commands == []
+    assert cache.get("b") == 2  # evicted from L1, still in Redis
+    assert redis.commands == ["get"]
+
+
+def test_keys_are_namespaced_and_versioned(redis):
+    cache = _process()
+    cache.set("k", "v1")
+    cache.set("k", "v2", version=2)
+    assert "t:1:k" in redis.strings and "t:2:k" in redis.strings
+    assert cache.get("k") == "v1"
+    assert cache.get("k", version=2) == "v2"
+    cache.incr_version("k", version=2)
+    assert cache.get("k", version=3) == "v2"
+    assert cache.get("k", version=2) is None
+
+
+def test_get_or_set_computes_once_under_a_stampede(redis, monkeypatch):
+    monkeypatch.setattr(tiered_cache, "LOCK_POLL_SECONDS", 0.01)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "expensive"
+
+    workers = [_process() for _ in range(6)]
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_set("hot", slow, 60))) for c in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["expensive"] * 6
+    assert len(calls) == 1
+    assert "t:1:hot:lock" not in redis.strings
+
+
+def test_get_or_set_recomputes_early_near_expiry(redis, monkeypatch):
+    cache = _process()
+    assert cache.get_or_set("report", lambda: "old", 60) == "old"
+    # Pretend the last compute took ten minutes: a 60s entry is always due.
+    payload = redis.strings["t:1:report"]
+    value, expires_at, _ = tiered_cache._decode(payload)
+    redis.strings["t:1:report"] = tiered_cache._encode(value, expires_at, 600.0)
+    cache = _process()
+    monkeypatch.setattr(tiered_cache.random, "random", lambda: 0.5)
+
+    assert cache.get_or_set("report", lambda: "fresh", 60) == "fresh"
+    assert cache.stats()["process"]["early_recomputes"] == 1
+    # A cheap recompute far from expiry keeps serving the cached value.
+    assert cache.get_or_set("report", lambda: "newer", 60) == "fresh"
+
+
+def test_works_in_process_without_redis(monkeypatch):
+    monkeypatch.setattr(tiered_cache, "get_redis", lambda: None)
+    cache = _process()
+    assert cache.add("k", 1)
+    assert not cache.add("k", 2)
+    assert cache.incr("k") == 2
+    assert cache.get_or_set("g", lambda: [1, 2]) == [1, 2]
+    cache.set("gone", "x", 0)
+    assert cache.get("gone") is None
+    tiered_cache._local_tiers.clear()
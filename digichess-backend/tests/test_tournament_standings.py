@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from games.models import Game, Tournament, TournamentGame, TournamentParticipant
+from games.tournament_lifecycle import build_tournament_standings
+from games.tournament_standings import apply_pending_results, rebuild_standings
+
+
+@pytest.fixture
+def tournament_with(create_user):
+    def _make(kind, player_count):
+        creator = create_user()
+        tournament = Tournament.objects.create(
+            name=f"{kind} standings",
+            creator=creator,
+            type=kind,
+            time_control=Game.TIME_BLITZ,
+            initial_time_seconds=300,
+            start_at=timezone.now(),
+            status=Tournament.STATUS_ACTIVE,
+            swiss_rounds=5,
+            current_round=1,
+        )
+        players = [create_user() for _ in range(player_count)]
+        for player in players:
+            TournamentParticipant.objects.create(tournament=tournament, user=player)
+        return tournament, players
+
+    return _make
+
+
+def play(tournament, white, black, result, minutes=0, status=Game.STATUS_FINISHED):
+    game = Game.objects.create(
+        creator=white,
+        white=white,
+        black=black,
+        status=status,
+        result=result,
+        finished_at=timezone.now() + timedelta(minutes=minutes),
+    )
+    TournamentGame.objects.create(tournament=tournament, game=game, round_number=1)
+    return game
+
+
+@pytest.mark.django_db
+def test_results_are_applied_once_and_incrementally(tournament_with):
+    tournament, (a, b, c) = tournament_with(Tournament.TYPE_ARENA, 3)
+    for minute in range(3):
+        play(tournament, a, b, Game.RESULT_WHITE, minutes=minute)
+    open_game = play(tournament, c, a, Game.RESULT_NONE, status=Game.STATUS_ACTIVE)
+
+    assert apply_pending_results(tournament) == 3
+    assert apply_pending_results(tournament) == 0
+    row = TournamentParticipant.objects.get(tournament=tournament, user=a)
+    assert (row.score, row.wins, row.streak, row.color_balance) == (8, 3, 3, 3)
+
+    open_game.finish(Game.RESULT_WHITE)
+    standings = build_tournament_standings(tournament)
+    first = standings[0]
+    assert (first["user_id"], first["score"], first["losses"], first["streak"]) == (a.id, 8, 1, 0)
+    assert standings[1]["user_id"] == c.id
+
+
+@pytest.mark.django_db
+def test_standings_reads_do_not_scale_with_games(tournament_with):
+    tournament, players = tournament_with(Tournament.TYPE_SWISS, 8)
+    for round_no in range(4):
+        for idx in range(0, 8, 2):
+            play(tournament, players[idx], players[(idx + 1 + 2 * round_no) % 8], Game.RESULT_WHITE, minutes=round_no)
+    build_tournament_standings(tournament)
+
+    with CaptureQueriesContext(connection) as queries:
+        standings = build_tournament_standings(tournament)
+    # The pending-results check and the participant rows; no game is loaded.
+    assert len(queries.captured_queries) == 2
+    assert len(standings) == 8
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_incremental_swiss_tiebreaks(tournament_with):
+    tournament, players = tournament_with(Tournament.TYPE_SWISS, 6)
+    results = [Game.RESULT_WHITE, Game.RESULT_DRAW, Game.RESULT_BLACK]
+    for round_no in range(3):
+        for idx in range(3):
+            white, black = players[idx], players[(idx + 3 + round_no) % 6]
+            play(tournament, white, black, results[(idx + round_no) % 3], minutes=round_no)
+        # Read between rounds so later rounds are applied on top of earlier ones.
+        incremental = build_tournament_standings(tournament)
+
+    rebuild_standings(tournament)
+    assert build_tournament_standings(tournament) == incremental
+    assert sum(row["score"] for row in incremental) == 9
+    assert all("buchholz" in row for row in incremental)
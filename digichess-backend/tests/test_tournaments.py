@@ -318,6 +318,9 @@ def test_tournament_unregister_and_my_game(auth_client, create_user):
         status=Game.STATUS_PENDING,
     )
     TournamentGame.objects.create(tournament=tournament, game=game, round_number=1)
+    game.refresh_from_db()
+    assert game.tournament_id == tournament.id
+    assert game.is_tournament
 
     my_game_resp = player_client.get(f"/api/games/tournaments/{tournament_id}/my-game/")
     assert my_game_resp.status_code == 200
@@ -65,3 +65,54 @@ def test_chat_event_payload(create_game):
     event = async_to_sync(channel_layer.receive)(channel)
     assert event["payload"]["type"] == "chat"
     assert event["payload"]["message"] == "hello"
+
+
+class FakeWatcherRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hincrby(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field] = int(h.get(field, 0)) + amount
+        return h[field]
+
+    def hdel(self, key, *fields):
+        h = self.hashes.get(key, {})
+        for field in fields:
+            h.pop(field, None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_clock_broadcast_only_reaches_watched_games(create_game, auth_client, monkeypatch):
+    from games import clock_broadcast
+
+    fake = FakeWatcherRedis()
+    monkeypatch.setattr(clock_broadcast, "get_redis", lambda: fake)
+
+    watched_data, _, watched_opponent = create_game()
+    idle_data, _, idle_opponent = create_game()
+    auth_client(watched_opponent)[0].post(f"/api/games/{watched_data['id']}/accept/")
+    auth_client(idle_opponent)[0].post(f"/api/games/{idle_data['id']}/accept/")
+
+    channel_layer = get_channel_layer()
+    watched_channel = async_to_sync(channel_layer.new_channel)()
+    idle_channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f"game_{watched_data['id']}", watched_channel)
+    async_to_sync(channel_layer.group_add)(f"game_{idle_data['id']}", idle_channel)
+
+    clock_broadcast.register_watcher(watched_data["id"])
+    clock_broadcast.register_watcher(idle_data["id"])
+    clock_broadcast.unregister_watcher(idle_data["id"])
+    assert str(idle_data["id"]) not in fake.hashes[clock_broadcast.WATCHERS_KEY]
+
+    assert clock_broadcast.broadcast_watched_clocks(channel_layer) == 1
+    event = async_to_sync(channel_layer.receive)(watched_channel)
+    assert event["payload"]["type"] == "clock"
+    assert event["payload"]["game_id"] == watched_data["id"]
+
+    Game.objects.filter(id=watched_data["id"]).update(status=Game.STATUS_FINISHED)
+    assert clock_broadcast.broadcast_watched_clocks(channel_layer) == 0
+    assert fake.hashes[clock_broadcast.WATCHERS_KEY] == {}
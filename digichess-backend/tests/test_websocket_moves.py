@@ -0,0 +1,149 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+
+from config.routing import websocket_urlpatterns
+from games import consumers
+from games.move_executor import MoveExecutor
+
+
+def _connect(game_id, user):
+    communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/game/{game_id}/")
+    communicator.scope["user"] = user
+    return communicator
+
+
+async def _receive_type(communicator, message_type):
+    while True:
+        message = await communicator.receive_json_from(timeout=5)
+        if message.get("type") == message_type:
+            return message
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_move_acks_mover_and_broadcasts_state(active_game):
+    game, white, black = active_game()
+
+    async def scenario():
+        mover = _connect(game.id, white)
+        watcher = _connect(game.id, black)
+        assert (await mover.connect())[0]
+        assert (await watcher.connect())[0]
+        await _receive_type(mover, "gameFull")
+        await _receive_type(watcher, "gameFull")
+
+        await mover.send_json_to({"type": "move", "move": "e4", "id": 7})
+        ack = await _receive_type(mover, "moveAck")
+        state = await _receive_type(watcher, "gameState")
+        mover_state = await _receive_type(mover, "gameState")
+        await mover.disconnect()
+        await watcher.disconnect()
+        return ack, state, mover_state
+
+    ack, state, mover_state = async_to_sync(scenario)()
+    assert ack["ok"] is True
+    assert ack["id"] == 7
+    assert ack["san"] == "e4"
+    assert ack["seq"] is None  # no Redis event stream in tests
+    assert state == mover_state
+    assert state["moves"] == "e4"
+    assert "e5" in state["legal_moves"]
+    game.refresh_from_db()
+    assert game.moves == "e4"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_move_rejections(active_game, create_user):
+    game, white, black = active_game()
+    stranger = create_user()
+
+    async def scenario():
+        acks = []
+        for user, move in ((black, "e5"), (white, "Ke2"), (stranger, "e4"), (white, "")):
+            communicator = _connect(game.id, user)
+            await communicator.connect()
+            await communicator.send_json_to({"type": "move", "move": move})
+            acks.append(await _receive_type(communicator, "moveAck"))
+            await communicator.disconnect()
+        return acks
+
+    acks = async_to_sync(scenario)()
+    assert [ack["ok"] for ack in acks] == [False, False, False, False]
+    assert all(ack.get("error") for ack in acks)
+    game.refresh_from_db()
+    assert game.moves in ("", None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_move_requires_authentication(active_game):
+    from django.contrib.auth.models import AnonymousUser
+
+    game, _, _ = active_game()
+
+    async def scenario():
+        communicator = _connect(game.id, AnonymousUser())
+        await communicator.connect()
+        await communicator.send_json_to({"type": "move", "move": "e4"})
+        ack = await _receive_type(communicator, "moveAck")
+        await communicator.disconnect()
+        return ack
+
+    ack = async_to_sync(scenario)()
+    assert ack["ok"] is False
+    assert ack["error"] == "Authentication required."
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_move_refused_when_executor_is_full(active_game, monkeypatch):
+    game, white, _ = active_game()
+    full = MoveExecutor(workers=1, max_pending=1)
+    full._pending = 1
+    monkeypatch.setattr(consumers, "move_executor", full)
+
+    async def scenario():
+        communicator = _connect(game.id, white)
+        await communicator.connect()
+        await communicator.send_json_to({"type": "move", "move": "e4", "id": "a"})
+        ack = await _receive_type(communicator, "moveAck")
+        await communicator.disconnect()
+        return ack
+
+    ack = async_to_sync(scenario)()
+    assert ack["ok"] is False
+    assert ack["retry"] is True
+    assert full.stats()["rejected"] == 1
+    game.refresh_from_db()
+    assert game.moves in ("", None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_committed_move_still_schedules_the_bot_when_executor_fills_up(active_game, monkeypatch):
+    game, white, _ = active_game()
+    executor = MoveExecutor(workers=1, max_pending=1)
+    original_run = executor.run
+
+    async def run_then_fill(fn, *args, **kwargs):
+        result = await original_run(fn, *args, **kwargs)
+        executor._pending = executor.max_pending  # saturated right after the move committed
+        return result
+
+    executor.run = run_then_fill
+    scheduled = []
+    monkeypatch.setattr(consumers, "move_executor", executor)
+    monkeypatch.setattr(consumers, "schedule_bot_move", lambda g: scheduled.append(g.id))
+
+    async def scenario():
+        communicator = _connect(game.id, white)
+        await communicator.connect()
+        await communicator.send_json_to({"type": "move", "move": "e4", "id": "a"})
+        ack = await _receive_type(communicator, "moveAck")
+        await _receive_type(communicator, "gameState")
+        closed = not await communicator.receive_nothing(timeout=0.2)
+        await communicator.disconnect()
+        return ack, closed
+
+    ack, closed = async_to_sync(scenario)()
+    assert ack["ok"] is True
+    assert not closed
+    assert scheduled == [game.id]
@@ -1,12 +1,229 @@
-import os
+"""
+Shared Redis clients.
+
+get_redis() hands out a client bound to one process-wide connection pool, so
+callers no longer pay a TCP connect plus PING on every call. A small circuit
+breaker remembers when Redis is unreachable: while it is open, get_redis()
+returns None immediately instead of every caller waiting on its own connect
+timeout. After REDIS_BREAKER_COOLDOWN seconds one caller probes Redis again
+while the others keep getting None. An exhausted pool (MaxConnectionsError)
+is local load, not an outage, and does not trip the breaker.
+
+get_async_redis() is the asyncio counterpart for consumers. redis.asyncio
+connections belong to the event loop that opened them, so there is one pool
+per loop; both variants share the breaker.
+
+Pool sizing and timeouts come from settings (config/settings.py):
+REDIS_URL, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT,
+REDIS_HEALTH_CHECK_INTERVAL, REDIS_BREAKER_COOLDOWN.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
 import redis
+import redis.asyncio as redis_async
+from django.conf import settings
+
+# Older redis-py releases raise a plain ConnectionError("Too many connections").
+_MaxConnectionsError = getattr(redis.exceptions, "MaxConnectionsError", None)
+
+
+def _pool_exhausted(exc: Exception) -> bool:
+    if _MaxConnectionsError is not None and isinstance(exc, _MaxConnectionsError):
+        return True
+    return isinstance(exc, redis.ConnectionError) and str(exc) == "Too many connections"
+
+
+def _redis_url() -> str:
+    return settings.REDIS_URL
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "decode_responses": True,
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+class RedisCircuitBreaker:
+    """
+    Tracks Redis reachability for the whole process.
+
+    closed    -> Redis is believed healthy; clients are handed out without a PING
+    open      -> Redis failed recently; callers get None until the cooldown passes
+    half_open -> cooldown passed; one caller probes with a PING, the rest wait it out
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, cooldown: float):
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = self.HALF_OPEN  # unknown until the first probe
+        self._opened_at = 0.0
+        self._probing = False
+        self.failures = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        return self.state != self.OPEN
+
+    def needs_probe(self) -> bool:
+        return self.state == self.HALF_OPEN
+
+    def try_probe(self) -> bool:
+        """Claim the half-open probe; False when another caller already holds it."""
+        if self.state != self.HALF_OPEN:
+            return False
+        with self._lock:
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def end_probe(self) -> None:
+        """Give up the probe without a verdict (e.g. the pool was exhausted)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.HALF_OPEN
+            self._opened_at = 0.0
+            self._probing = False
+            self.failures = 0
+
+
+breaker = RedisCircuitBreaker(cooldown=settings.REDIS_BREAKER_COOLDOWN)
+
+_CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError, OSError)
+
+
+class _BreakerRedis(redis.Redis):
+    """Redis client that trips the breaker when a command cannot reach the server."""
+
+    def execute_command(self, *args, **options):
+        try:
+            return super().execute_command(*args, **options)
+        except _CONNECTION_ERRORS as exc:
+            if not _pool_exhausted(exc):
+                breaker.record_failure()
+            raise
+
+
+class _BreakerAsyncRedis(redis_async.Redis):
+    async def execute_command(self, *args, **options):
+        try:
+            return await super().execute_command(*args, **options)
+        except _CONNECTION_ERRORS as exc:
+            if not _pool_exhausted(exc):
+                breaker.record_failure()
+            raise
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_pool() -> redis.ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool.from_url(_redis_url(), **_pool_kwargs())
+    return _pool
 
 
 def get_redis():
-    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    """Return a pooled Redis client, or None when Redis is unreachable."""
+    if not breaker.allow():
+        return None
+    probing = breaker.needs_probe()
+    if probing and not breaker.try_probe():
+        return None
+    try:
+        client = _BreakerRedis(connection_pool=_get_pool())
+        if probing:
+            client.ping()
+            breaker.record_success()
+        return client
+    except Exception as exc:
+        if not _pool_exhausted(exc):
+            breaker.record_failure()
+        elif probing:
+            breaker.end_probe()
+        return None
+
+
+async def get_async_redis():
+    """Async variant of get_redis() for consumers; one pool per event loop."""
+    if not breaker.allow():
+        return None
+    probing = breaker.needs_probe()
+    if probing and not breaker.try_probe():
+        return None
     try:
-        client = redis.Redis.from_url(url, decode_responses=True)
-        client.ping()
+        loop = asyncio.get_running_loop()
+        client = _async_clients.get(loop)
+        if client is None:
+            pool = redis_async.ConnectionPool.from_url(_redis_url(), **_pool_kwargs())
+            client = _BreakerAsyncRedis(connection_pool=pool)
+            _async_clients[loop] = client
+        if probing:
+            await client.ping()
+            breaker.record_success()
         return client
-    except Exception:
+    except Exception as exc:
+        if not _pool_exhausted(exc):
+            breaker.record_failure()
+        elif probing:
+            breaker.end_probe()
         return None
+
+
+def reset_redis_clients() -> None:
+    """Drop pooled connections and breaker state (used after config changes and in tests)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.disconnect()
+        _pool = None
+    _async_clients.clear()
+    breaker.reset()
+
+
+def redis_pool_stats() -> dict:
+    pool = _pool
+    return {
+        "breaker_state": breaker.state,
+        "breaker_failures": breaker.failures,
+        "max_connections": pool.max_connections if pool else _pool_kwargs()["max_connections"],
+        "in_use_connections": len(getattr(pool, "_in_use_connections", ())) if pool else 0,
+        "idle_connections": len(getattr(pool, "_available_connections", ())) if pool else 0,
+    }
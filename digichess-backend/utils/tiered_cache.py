@@ -0,0 +1,436 @@
+"""
+Two-tier Django cache backend: a per-process LRU in front of Redis.
+
+Without a CACHES setting every django.core.cache user was on LocMemCache, so
+nothing cached in one ASGI or Celery worker was visible to another, and
+nothing survived a restart. TieredCache is the "default" cache:
+
+- L2 is Redis through utils.redis_client.get_redis(), so it shares the pooled
+  connections and the circuit breaker. Values are pickled. Plain ints are
+  stored raw so incr() is atomic.
+- L1 is a size-bounded LRU (MAX_ENTRIES) with a short TTL (L1_TIMEOUT),
+  shared by every thread of the process. Every write publishes the key on
+  ``<KEY_PREFIX>:invalidate``. Each process drains that channel before it
+  reads, so another process's write is never served stale from L1. While
+  the subscription is down, L1 is bypassed. Without Redis, L1 is the only
+  tier.
+- Keys are namespaced and versioned by Django's make_key: KEY_PREFIX, then
+  VERSION (CACHE_VERSION, bump it to orphan every entry), then the key.
+  incr_version() works per key.
+- get_or_set() guards against stampedes. On a miss, one caller takes a Redis
+  lock and computes; the others wait for its value (up to LOCK_TIMEOUT). Near
+  expiry, a single caller recomputes early with probability growing as
+  expiry approaches. This is XFetch: recompute when
+  ``now - delta * beta * ln(rand) >= expiry``, where delta is the last
+  compute time and beta is EARLY_RECOMPUTE_BETA. The others keep getting the
+  current value meanwhile.
+- Hit/miss counters are kept per process and added up across processes in
+  ``<KEY_PREFIX>:stats``. stats() returns both.
+"""
+import base64
+import logging
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+PICKLED = "p:"
+LOCK_POLL_SECONDS = 0.05
+STATS_FLUSH_EVERY = 100
+COUNTERS = ("l1_hits", "l2_hits", "misses", "sets", "deletes", "early_recomputes", "lock_waits", "errors")
+
+_RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+  return redis.call("del", KEYS[1])
+else
+  return 0
+end
+"""
+
+
+def _encode(value, expires_at: Optional[float] = None, delta: float = 0.0) -> str:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    blob = pickle.dumps((value, expires_at, delta), pickle.HIGHEST_PROTOCOL)
+    return PICKLED + base64.b64encode(blob).decode("ascii")
+
+
+def _decode(payload: str):
+    """(value, expires_at, delta) of a stored payload."""
+    if payload.startswith(PICKLED):
+        return pickle.loads(base64.b64decode(payload[len(PICKLED):]))
+    return int(payload), None, 0.0
+
+
+class LocalTier:
+    """In-process LRU with per-entry expiry, kept coherent through Redis pub/sub."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self.origin = uuid.uuid4().hex
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pubsub = None
+        # Counters are per process too, not per backend instance (Django makes one per thread).
+        self.counts_lock = threading.Lock()
+        self.counts = {name: 0 for name in COUNTERS}
+        self.unflushed = {name: 0 for name in COUNTERS}
+
+    def get(self, key: str, now: float):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            if item[1] is not None and item[1] <= now:
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, payload: str, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._data[key] = (payload, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def sync(self, r, channel: str) -> bool:
+        """Apply other processes' invalidations; False when L1 cannot be trusted."""
+        with self._lock:
+            try:
+                if self._pubsub is None:
+                    pubsub = r.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(channel)
+                    self._pubsub = pubsub
+                    # Writes made while we were not listening may have been missed.
+                    self._data.clear()
+                while True:
+                    message = self._pubsub.get_message(timeout=0.0)
+                    if message is None:
+                        return True
+                    if message.get("type") != "message":
+                        continue
+                    origin, _, key = str(message["data"]).partition("|")
+                    if origin == self.origin:
+                        continue
+                    if key == "*":
+                        self._data.clear()
+                    else:
+                        self._data.pop(key, None)
+            except Exception as exc:
+                logger.warning("Cache invalidation channel lost: %s", exc)
+                self._drop_subscription()
+                return False
+
+    def _drop_subscription(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        self._data.clear()
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+
+# One L1 per namespace per process, whichever thread's backend instance uses it.
+_local_tiers: Dict[str, LocalTier] = {}
+_local_tiers_lock = threading.Lock()
+
+
+def _local_tier(namespace: str, max_entries: int) -> LocalTier:
+    with _local_tiers_lock:
+        tier = _local_tiers.get(namespace)
+        if tier is None:
+            tier = _local_tiers[namespace] = LocalTier(max_entries)
+        return tier
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.l1_timeout = float(options.get("L1_TIMEOUT", 5.0))
+        self.lock_timeout = float(options.get("LOCK_TIMEOUT", 10.0))
+        self.beta = float(options.get("EARLY_RECOMPUTE_BETA", 1.0))
+        namespace = self.key_prefix or "cache"
+        self.channel = f"{namespace}:invalidate"
+        self.stats_key = f"{namespace}:stats"
+        self._local = _local_tier(namespace, self._max_entries)
+
+    # plumbing
+
+    def _redis(self):
+        try:
+            return get_redis()
+        except Exception:
+            return None
+
+    def _count(self, r, name: str, amount: int = 1) -> None:
+        tier = self._local
+        with tier.counts_lock:
+            tier.counts[name] += amount
+            tier.unflushed[name] += amount
+            if sum(tier.unflushed.values()) < STATS_FLUSH_EVERY or not r:
+                return
+            pending, tier.unflushed = tier.unflushed, {counter: 0 for counter in COUNTERS}
+        try:
+            pipe = r.pipeline(transaction=False)
+            for counter, value in pending.items():
+                if value:
+                    pipe.hincrby(self.stats_key, counter, value)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def _local_usable(self, r) -> bool:
+        return r is None or self._local.sync(r, self.channel)
+
+    def _l1_expiry(self, expires_at: Optional[float], now: float, r) -> Optional[float]:
+        if r is None:
+            return expires_at
+        return now + self.l1_timeout if expires_at is None else min(expires_at, now + self.l1_timeout)
+
+    def _read(self, r, key: str) -> Optional[str]:
+        now = time.time()
+        usable = self._local_usable(r)
+        if usable:
+            payload = self._local.get(key, now)
+            if payload is not _MISSING:
+                self._count(r, "l1_hits")
+                return payload
+        if r is None:
+            self._count(r, "misses")
+            return None
+        try:
+            payload = r.get(key)
+        except Exception:
+            self._count(r, "errors")
+            return None
+        if payload is None:
+            self._count(r, "misses")
+            return None
+        self._count(r, "l2_hits")
+        if usable:
+            self._local.set(key, payload, self._l1_expiry(_decode(payload)[1], now, r))
+        return payload
+
+    def _publish(self, r, pipe, key: str) -> None:
+        pipe.publish(self.channel, f"{self._local.origin}|{key}")
+
+    def _write(self, r, key: str, value, timeout, delta: float = 0.0, only_new: bool = False) -> bool:
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        now = time.time()
+        if timeout is not None and timeout <= 0:
+            self._delete(r, key)
+            return True
+        expires_at = now + timeout if timeout is not None else None
+        payload = _encode(value, expires_at, delta)
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.set(key, payload, ex=math.ceil(timeout) if timeout else None, nx=only_new)
+                self._publish(r, pipe, key)
+                if not pipe.execute()[0]:
+                    return False
+            except Exception as exc:
+                logger.warning("Cache write of %s failed: %s", key, exc)
+                self._count(r, "errors")
+                self._local.discard(key)
+                return False
+        elif only_new and self._local.get(key, now) is not _MISSING:
+            return False
+        self._count(r, "sets")
+        if self._local_usable(r):
+            self._local.set(key, payload, self._l1_expiry(expires_at, now, r))
+        return True
+
+    def _delete(self, r, key: str) -> bool:
+        existed = self._local.get(key, time.time()) is not _MISSING
+        self._local.discard(key)
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(key)
+                self._publish(r, pipe, key)
+                existed = bool(pipe.execute()[0])
+            except Exception:
+                self._count(r, "errors")
+                return False
+        self._count(r, "deletes")
+        return existed
+
+    # Django cache API
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        payload = self._read(self._redis(), key)
+        return default if payload is None else _decode(payload)[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(self._redis(), key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(self._redis(), key, value, timeout, only_new=True)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._delete(self._redis(), key)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        r = self._redis()
+        payload = self._read(r, key)
+        if payload is None:
+            return False
+        return self._write(r, key, _decode(payload)[0], timeout)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        r = self._redis()
+        if r is None:
+            payload = self._read(r, key)
+            if payload is None:
+                raise ValueError("Key '%s' not found" % key)
+            value, expires_at, _ = _decode(payload)
+            value += delta
+            self._local.set(key, _encode(value, expires_at), expires_at)
+            return value
+        if not r.exists(key):
+            raise ValueError("Key '%s' not found" % key)
+        pipe = r.pipeline(transaction=False)
+        pipe.incrby(key, delta)
+        self._publish(r, pipe, key)
+        value = pipe.execute()[0]
+        self._local.discard(key)
+        return int(value)
+
+    def clear(self):
+        r = self._redis()
+        self._local.clear()
+        if r is None:
+            return
+        try:
+            batch = []
+            for key in r.scan_iter(match=f"{self.key_prefix}:*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    r.delete(*batch)
+                    batch = []
+            if batch:
+                r.delete(*batch)
+            r.publish(self.channel, f"{self._local.origin}|*")
+        except Exception as exc:
+            logger.warning("Cache clear failed: %s", exc)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        r = self._redis()
+        payload = self._read(r, key)
+        if payload is not None:
+            value, expires_at, delta = _decode(payload)
+            if not (delta and expires_at and self._recompute_early(expires_at, delta)):
+                return value
+            token = self._lock(r, key)
+            if token is None:
+                return value
+            self._count(r, "early_recomputes")
+            return self._compute(r, key, default, timeout, token)
+
+        if not callable(default):
+            self._write(r, key, default, timeout, only_new=True)
+            return self.get(key, default, version=version)
+        token = self._lock(r, key)
+        if r is not None and token is None:
+            payload = self._wait(r, key)
+            if payload is not None:
+                return _decode(payload)[0]
+        return self._compute(r, key, default, timeout, token)
+
+    # stampede protection
+
+    def _recompute_early(self, expires_at: float, delta: float) -> bool:
+        return time.time() - delta * self.beta * math.log(random.random() or 1e-12) >= expires_at
+
+    def _lock(self, r, key: Optional[str] = None) -> Optional[str]:
+        if r is None:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            if r.set(f"{key}:lock", token, nx=True, px=int(self.lock_timeout * 1000)):
+                return token
+        except Exception:
+            self._count(r, "errors")
+        return None
+
+    def _wait(self, r, key: str) -> Optional[str]:
+        self._count(r, "lock_waits")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            try:
+                payload = r.get(key)
+            except Exception:
+                return None
+            if payload is not None:
+                return payload
+        return None
+
+    def _compute(self, r, key: str, default, timeout, token: Optional[str]):
+        try:
+            started = time.perf_counter()
+            value = default()
+            self._write(r, key, value, timeout, delta=time.perf_counter() - started)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    r.eval(_RELEASE_LOCK_LUA, 1, f"{key}:lock", token)
+                except Exception:
+                    pass
+
+    # metrics
+
+    def stats(self) -> dict:
+        with self._local.counts_lock:
+            local = dict(self._local.counts)
+        hits = local["l1_hits"] + local["l2_hits"]
+        lookups = hits + local["misses"]
+        local["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        local["l1_entries"] = len(self._local)
+        result = {"process": local}
+        r = self._redis()
+        if r:
+            try:
+                shared = {name: int(value) for name, value in (r.hgetall(self.stats_key) or {}).items()}
+                shared_hits = shared.get("l1_hits", 0) + shared.get("l2_hits", 0)
+                shared_lookups = shared_hits + shared.get("misses", 0)
+                shared["hit_rate"] = round(shared_hits / shared_lookups, 3) if shared_lookups else 0.0
+                result["all_processes"] = shared
+            except Exception:
+                pass
+        return result
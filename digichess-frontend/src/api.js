@@ -111,8 +111,16 @@ export const requestGameAnalysis = (gameId, payload = {}) =>
 export const createPrediction = (gameId, predicted_result) =>
     api.post(`/games/${gameId}/predict/`, { predicted_result });
 
-export const fetchGameEvents = (gameId, since) =>
-    api.get(`/games/${gameId}/events/${since ? `?since=${since}` : ''}`);
+// With `wait` the server holds the request until an event arrives (long poll);
+// `cursor` is the stream id from the previous response.
+export const fetchGameEvents = (gameId, since, { cursor, wait } = {}) => {
+    const params = new URLSearchParams();
+    if (since) params.set('since', since);
+    if (cursor) params.set('cursor', cursor);
+    if (wait) params.set('wait', wait);
+    const query = params.toString();
+    return api.get(`/games/${gameId}/events/${query ? `?${query}` : ''}`);
+};
 
 export const listTournaments = (params = {}) => {
     const query = new URLSearchParams(params).toString();
@@ -29,6 +29,8 @@ const buildWsUrl = (path, token) => {
     return `${protocol}://${window.location.host}${path}${token ? `?token=${token}` : ''}`;
 };
 
+const LONG_POLL_SECONDS = 20;
+
 const deriveTurnFromFen = (fen) => {
     if (!fen) return null;
     const parts = fen.split(' ');
@@ -38,6 +40,15 @@ const deriveTurnFromFen = (fen) => {
     return null;
 };
 
+// Real-time payloads carry a compact snapshot (versioned by "v") whose players
+// are only {id, username, is_bot}; keep the profile fields already loaded.
+const mergeGame = (prev, next) => {
+    if (!next) return prev;
+    if (!next.v || !prev) return { ...prev, ...next };
+    const player = (key) => (next[key] ? { ...prev[key], ...next[key] } : prev[key]);
+    return { ...prev, ...next, white: player('white'), black: player('black'), creator: player('creator') };
+};
+
 export default function useGameSync({ gameId, spectate = false, token }) {
     const [connected, setConnected] = useState(false);
     const [game, setGame] = useState(null);
@@ -49,11 +60,11 @@ export default function useGameSync({ gameId, spectate = false, token }) {
     const wsRef = useRef(null);
     const lastSeqRef = useRef(0);
     const reconnectRef = useRef(null);
-    const pollingRef = useRef(null);
     const syncRef = useRef(null);
     const eventsUnsupportedRef = useRef(false);
     const recentChatsRef = useRef([]);
     const activeGameIdRef = useRef(gameId);
+    const cursorRef = useRef(null);
 
     useEffect(() => {
         activeGameIdRef.current = gameId;
@@ -78,10 +89,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
             clearTimeout(reconnectRef.current);
             reconnectRef.current = null;
         }
-        if (pollingRef.current) {
-            clearInterval(pollingRef.current);
-            pollingRef.current = null;
-        }
+        cursorRef.current = null;
     }, [gameId]);
 
     const updateSeq = (seq) => {
@@ -177,8 +185,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
         });
         if (payload?.game) {
             setGame((prev) => ({
-                ...prev,
-                ...payload.game,
+                ...mergeGame(prev, payload.game),
                 legal_moves: payload.game?.legal_moves ?? payload.game?.game_state?.legal_moves?.san ?? prev?.legal_moves,
                 legal_moves_uci: payload.game?.legal_moves_uci ?? payload.game?.game_state?.legal_moves?.uci ?? prev?.legal_moves_uci,
                 draw_offer_by: hasGameDrawOffer ? payload.game.draw_offer_by : prev?.draw_offer_by,
@@ -212,7 +219,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
     const handleEvent = useCallback((payload) => {
         if (!payload) return;
         if (payload.type === 'gameFull') {
-            setGame(payload.game);
+            setGame((prev) => mergeGame(prev, payload.game));
             setState((prev) => ({
                 ...prev,
                 ...payload.game,
@@ -287,7 +294,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
                 }
                 if (!updateSeq(payload.seq)) return;
             }
-            if (payload.game) setGame(payload.game);
+            if (payload.game) setGame((prev) => mergeGame(prev, payload.game));
             mergeState(payload);
             return;
         }
@@ -328,7 +335,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
         }));
     }, [gameId, spectate]);
 
-    const syncEvents = useCallback(async (force = false) => {
+    const syncEvents = useCallback(async (force = false, wait = 0) => {
         if (!gameId) return;
         const targetGameId = gameId;
         try {
@@ -337,7 +344,10 @@ export default function useGameSync({ gameId, spectate = false, token }) {
                 setError(null);
                 return;
             }
-            const data = await fetchGameEvents(targetGameId, lastSeqRef.current || undefined);
+            const data = await fetchGameEvents(targetGameId, lastSeqRef.current || undefined, {
+                cursor: cursorRef.current,
+                wait,
+            });
             if (activeGameIdRef.current !== targetGameId) return;
             (data.events || []).forEach((event) => {
                 handleEvent(event);
@@ -345,6 +355,7 @@ export default function useGameSync({ gameId, spectate = false, token }) {
             if (data.last_seq) {
                 updateSeq(data.last_seq);
             }
+            cursorRef.current = data.cursor || cursorRef.current;
             setError(null);
         } catch (err) {
             if (err?.status === 404) {
@@ -443,18 +454,23 @@ export default function useGameSync({ gameId, spectate = false, token }) {
     }, [gameId, spectate, token, handleEvent]);
 
     useEffect(() => {
-        if (connected) {
-            if (pollingRef.current) {
-                clearInterval(pollingRef.current);
-                pollingRef.current = null;
+        if (connected) return;
+        // Without a socket, long-poll: each request waits server-side for the next event.
+        let stopped = false;
+        const poll = async () => {
+            while (!stopped) {
+                const started = Date.now();
+                await syncEvents(false, LONG_POLL_SECONDS);
+                // Errors and servers without long-poll answer at once; keep the old pace then.
+                const elapsed = Date.now() - started;
+                if (!stopped && elapsed < 1000) {
+                    await new Promise((resolve) => setTimeout(resolve, 3000 - elapsed));
+                }
             }
-            return;
-        }
-        pollingRef.current = setInterval(() => {
-            syncEvents();
-        }, 3000);
+        };
+        poll();
         return () => {
-            if (pollingRef.current) clearInterval(pollingRef.current);
+            stopped = true;
         };
     }, [connected, syncEvents]);
 